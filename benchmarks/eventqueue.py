@@ -0,0 +1,111 @@
+"""
+benchmarks/eventqueue.py - Event queue throughput
+
+Compares the per-event semaphore path (one read and write per event and one
+task per event) against batch draining (one read per wakeup and one task per
+batch).
+
+Run with ``python -m benchmarks.eventqueue``.
+"""
+
+import argparse
+import asyncio
+from threading import Thread
+import time
+
+from routesia.eventqueue import EventQueue
+
+
+async def handler(event):
+    pass
+
+
+def produce(queue, count):
+    for i in range(count):
+        queue.put(i)
+
+
+async def run_per_event(count):
+    loop = asyncio.get_running_loop()
+    queue = EventQueue()
+    done = loop.create_future()
+    tasks = []
+    handled = 0
+
+    async def handle_event(event):
+        nonlocal handled
+        await handler(event)
+        handled += 1
+        if handled == count:
+            done.set_result(True)
+
+    def handle_eventqueue():
+        while True:
+            try:
+                event = queue.get()
+            except BlockingIOError:
+                break
+            tasks.append(loop.create_task(handle_event(event)))
+        for task in tasks.copy():
+            if task.done():
+                tasks.remove(task)
+
+    loop.add_reader(queue, handle_eventqueue)
+    thread = Thread(target=produce, args=(queue, count))
+    start = time.perf_counter()
+    thread.start()
+    await done
+    elapsed = time.perf_counter() - start
+    thread.join()
+    loop.remove_reader(queue)
+    queue.close()
+    return elapsed
+
+
+async def run_batch(count):
+    loop = asyncio.get_running_loop()
+    queue = EventQueue(batch=True)
+    done = loop.create_future()
+    tasks = set()
+    handled = 0
+
+    async def handle_events(events):
+        nonlocal handled
+        for event in events:
+            await handler(event)
+        handled += len(events)
+        if handled == count:
+            done.set_result(True)
+
+    def handle_eventqueue():
+        events = queue.drain()
+        if not events:
+            return
+        task = loop.create_task(handle_events(events))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    loop.add_reader(queue, handle_eventqueue)
+    thread = Thread(target=produce, args=(queue, count))
+    start = time.perf_counter()
+    thread.start()
+    await done
+    elapsed = time.perf_counter() - start
+    thread.join()
+    loop.remove_reader(queue)
+    queue.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event queue throughput")
+    parser.add_argument("--events", type=int, default=100000, help="Number of events")
+    args = parser.parse_args()
+
+    for name, fn in (("per-event", run_per_event), ("batch", run_batch)):
+        elapsed = asyncio.run(fn(args.events))
+        print(f"{name:>10}: {args.events / elapsed:12.0f} events/sec ({elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+benchmarks/route_blackhole.py - Blackhole routes from a large prefix list
+
+Writes a prefix list of random IPv4 prefixes and blackholes it in a table,
+then reloads it unchanged and with some prefixes replaced. Reports how long
+each takes, the longest the event loop went without running and how many
+notifications the monitor had to parse, which the blackhole routes should
+not add to.
+
+Runs in a new network namespace, so it needs CAP_SYS_ADMIN but leaves the
+host untouched.
+
+Run with ``python -m benchmarks.route_blackhole``.
+"""
+
+import argparse
+import asyncio
+from ctypes import CDLL, get_errno
+import gc
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+from pyroute2.netlink.rtnl import RTNLGRP_IPV4_ROUTE
+
+from routesia.blockingexecutor import BlockingExecutor
+from routesia.route.prefixlist import BlackholeRoutes
+from routesia.rtnetlink.batch import NetlinkBatch, create_socket
+from routesia.rtnetlink.dump import dump_route_summaries
+from routesia.rtnetlink.monitor import NetlinkMonitor
+from routesia.rtnetlink.provider import IGNORED_ROUTES, RT_PROTO
+from routesia.schema.v1 import route_pb2
+
+
+CLONE_NEWNET = 0x40000000
+
+TABLE = 1000
+
+
+class IPRouteProvider:
+    rt_proto = RT_PROTO
+
+    def __init__(self):
+        self.bulk_socket = create_socket()
+
+    def bulk_batch(self) -> NetlinkBatch:
+        return NetlinkBatch(self.bulk_socket)
+
+    def dump_own_routes(self):
+        sock = create_socket()
+        try:
+            yield from dump_route_summaries(sock, 1, proto=self.rt_proto)
+        finally:
+            sock.close()
+
+
+class Service:
+    def __init__(self):
+        self.blocking_executor = BlockingExecutor()
+
+    async def run_blocking(self, resource: str, fn, *args, **kwargs):
+        return await self.blocking_executor.run(resource, fn, *args, **kwargs)
+
+
+def setup_namespace() -> None:
+    libc = CDLL("libc.so.6", use_errno=True)
+    if libc.unshare(CLONE_NEWNET):
+        raise OSError(get_errno(), "Could not create network namespace")
+    subprocess.run("ip link set lo up".split(), check=True)
+
+
+def random_prefix() -> str:
+    "Return a random /24 or host prefix, which rarely aggregate"
+    address = random.randrange(1 << 24, 224 << 24)
+    if random.random() < 0.8:
+        return f"{address >> 24}.{address >> 16 & 0xff}.{address >> 8 & 0xff}.0/24"
+    return f"{address >> 24}.{address >> 16 & 0xff}.{address >> 8 & 0xff}.{address & 0xff}"
+
+
+def write_prefix_list(path: str, prefixes: list[str]) -> None:
+    with open(path, "w") as f:
+        f.write("; Benchmark prefix list\n")
+        for prefix in prefixes:
+            f.write(f"{prefix} ; SBL0\n")
+
+
+async def measure(coroutine, monitor: NetlinkMonitor):
+    """
+    Run ``coroutine`` while reading notifications as the provider would.
+    Returns its duration, the longest loop stall and the number of
+    notifications parsed.
+    """
+    stall = 0.0
+    parsed = 0
+    done = False
+
+    def read():
+        nonlocal parsed
+        parsed += len(monitor.read())
+
+    async def tick():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stall = max(stall, now - last)
+            last = now
+
+    loop = asyncio.get_running_loop()
+    loop.add_reader(monitor, read)
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await coroutine
+    elapsed = time.perf_counter() - start
+    done = True
+    await ticker
+    # Drain what is left
+    while monitor.read():
+        pass
+    loop.remove_reader(monitor)
+    return elapsed, stall, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blackhole routes from a large prefix list")
+    parser.add_argument("--prefixes", type=int, default=500000, help="Number of prefixes")
+    parser.add_argument("--change", type=int, default=5000, help="Number of prefixes replaced on reload")
+    args = parser.parse_args()
+
+    setup_namespace()
+    prefixes = list(dict.fromkeys(random_prefix() for _ in range(args.prefixes)))
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "drop")
+    write_prefix_list(path, prefixes)
+
+    config = route_pb2.RouteTableConfigList()
+    prefix_list = config.prefix_list.add()
+    prefix_list.name = "drop"
+    prefix_list.path = path
+    table = config.table.add()
+    table.id = TABLE
+    table.blackhole_list.append("drop")
+
+    service = Service()
+    blackholes = BlackholeRoutes(service, IPRouteProvider())
+    blackholes.configure(config)
+    monitor = NetlinkMonitor(groups=[RTNLGRP_IPV4_ROUTE], ignored_routes=IGNORED_ROUTES)
+
+    def report(label: str, elapsed: float, stall: float, parsed: int):
+        state = blackholes.tables[TABLE]
+        print(
+            f"{label:>9}: {elapsed * 1000:9.1f}ms  max stall {stall * 1000:7.1f}ms  "
+            f"added {state.added} deleted {state.deleted} installed {len(state.installed)}  "
+            f"parsed {parsed} overflows {monitor.overflows}"
+        )
+
+    gc.collect()
+    report("load", *asyncio.run(measure(blackholes.run(), monitor)))
+    report("unchanged", *asyncio.run(measure(blackholes.reload(), monitor)))
+
+    prefixes[:args.change] = [random_prefix() for _ in range(args.change)]
+    write_prefix_list(path, prefixes)
+    report("changed", *asyncio.run(measure(blackholes.reload(), monitor)))
+
+    # As after a restart, learning the routes installed from a dump
+    blackholes = BlackholeRoutes(service, IPRouteProvider())
+    blackholes.configure(config)
+    report("restart", *asyncio.run(measure(blackholes.run(), monitor)))
+
+    os.unlink(path)
+    os.rmdir(directory)
+    service.blocking_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+benchmarks/route_config.py - Route config commit latency
+
+Times TableEntity.handle_config_change for a table of static routes, for
+the initial apply, a commit that leaves the routes unchanged and a commit
+that changes one route. As on commit, each config is a new message.
+
+Run with ``python -m benchmarks.route_config``.
+"""
+
+import argparse
+import time
+
+from routesia.route.entities import TableEntity
+from routesia.schema.v1 import route_pb2
+
+
+class Batch:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def route(self, *args, callback=None, **kwargs):
+        if callback:
+            callback(None)
+
+
+class IPRouteProvider:
+    interface_map = {2: "eth0"}
+    interface_name_map = {"eth0": 2}
+
+    def get_interface_name_by_index(self, index):
+        return self.interface_map[index]
+
+    def batch(self):
+        return Batch()
+
+
+def create_config(count: int) -> route_pb2.RouteTableConfig:
+    config = route_pb2.RouteTableConfig()
+    config.id = 1000
+    for i in range(count):
+        route = config.route.add()
+        route.destination = f"10.{i >> 8 & 255}.{i & 255}.0/24"
+        route.nexthop.add().interface = "eth0"
+    return config
+
+
+def commit(table: TableEntity, config: route_pb2.RouteTableConfig) -> float:
+    start = time.perf_counter()
+    table.handle_config_change(config)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route config commit latency")
+    parser.add_argument("--routes", type=int, default=20000, help="Number of routes")
+    args = parser.parse_args()
+
+    table = TableEntity(IPRouteProvider(), 1000)
+    table.interfaces.add("eth0")
+    config = create_config(args.routes)
+    print(f"initial:   {commit(table, config) * 1000:8.1f}ms")
+
+    unchanged = route_pb2.RouteTableConfig()
+    unchanged.CopyFrom(config)
+    print(f"unchanged: {commit(table, unchanged) * 1000:8.1f}ms")
+
+    changed = route_pb2.RouteTableConfig()
+    changed.CopyFrom(unchanged)
+    changed.route[0].nexthop[0].gateway = "192.0.2.1"
+    print(f"one route: {commit(table, changed) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+benchmarks/route_failover.py - ECMP gateway failover cost
+
+Installs routes over two gateways, then removes one gateway and restores
+it. The routes are installed either with inline multipath nexthops, each
+rewritten on failover as Routesia did before nexthop groups, or referring
+to a kernel nexthop group, where failover replaces only the group.
+
+Runs in a new network namespace, so it needs CAP_SYS_ADMIN but leaves the
+host untouched. The kernel must support nexthop objects (Linux 5.3+).
+
+Run with ``python -m benchmarks.route_failover``.
+"""
+
+import argparse
+from ctypes import CDLL, get_errno
+import socket
+import subprocess
+import time
+
+from routesia.rtnetlink.batch import NetlinkBatch, create_socket
+from routesia.rtnetlink.provider import RT_PROTO
+
+
+CLONE_NEWNET = 0x40000000
+
+GATEWAYS = ("192.0.2.2", "192.0.2.3")
+GROUP_ID = 100
+
+
+def setup_namespace() -> int:
+    libc = CDLL("libc.so.6", use_errno=True)
+    if libc.unshare(CLONE_NEWNET):
+        raise OSError(get_errno(), "Could not create network namespace")
+    for command in (
+        "ip link set lo up",
+        "ip link add bench0 type veth peer name bench1",
+        "ip link set bench0 up",
+        "ip link set bench1 up",
+        "ip addr add 192.0.2.1/24 dev bench0",
+    ):
+        subprocess.run(command.split(), check=True)
+    return socket.if_nametoindex("bench0")
+
+
+def destinations(count: int):
+    for i in range(count):
+        yield f"{16 + (i >> 16)}.{i >> 8 & 0xff}.{i & 0xff}.0/24"
+
+
+def set_multipath(sock, ifindex: int, count: int, gateways) -> None:
+    batch = NetlinkBatch(sock)
+    for destination in destinations(count):
+        batch.route(
+            "replace",
+            dst=destination,
+            table=1000,
+            proto=RT_PROTO,
+            multipath=[{"gateway": gateway, "oif": ifindex} for gateway in gateways],
+        )
+    batch.commit()
+
+
+def set_group(sock, gateways) -> None:
+    batch = NetlinkBatch(sock)
+    batch.nexthop(
+        "replace",
+        id=GROUP_ID,
+        group=[(GATEWAYS.index(gateway) + 1, 1) for gateway in gateways],
+        proto=RT_PROTO,
+    )
+    batch.commit()
+
+
+def install_group(sock, ifindex: int, count: int) -> None:
+    batch = NetlinkBatch(sock)
+    for i, gateway in enumerate(GATEWAYS):
+        batch.nexthop("replace", id=i + 1, gateway=gateway, oif=ifindex, proto=RT_PROTO)
+    batch.commit()
+    set_group(sock, GATEWAYS)
+    batch = NetlinkBatch(sock)
+    for destination in destinations(count):
+        batch.route("replace", dst=destination, table=1001, proto=RT_PROTO, nh_id=GROUP_ID)
+    batch.commit()
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ECMP gateway failover cost")
+    parser.add_argument("--routes", type=int, default=10000, help="Number of routes")
+    args = parser.parse_args()
+
+    ifindex = setup_namespace()
+    sock = create_socket()
+
+    set_multipath(sock, ifindex, args.routes, GATEWAYS)
+    failover = timed(set_multipath, sock, ifindex, args.routes, GATEWAYS[:1])
+    restore = timed(set_multipath, sock, ifindex, args.routes, GATEWAYS)
+    print(f"multipath: failover {failover * 1000:9.2f}ms  restore {restore * 1000:9.2f}ms")
+
+    install_group(sock, ifindex, args.routes)
+    failover = timed(set_group, sock, GATEWAYS[:1])
+    restore = timed(set_group, sock, GATEWAYS)
+    print(f"    group: failover {failover * 1000:9.2f}ms  restore {restore * 1000:9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
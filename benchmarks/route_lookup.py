@@ -0,0 +1,111 @@
+"""
+benchmarks/route_lookup.py - Nexthop reachability lookups
+
+Compares finding the routes covering a gateway by scanning every route in
+a table, as TableEntity did before, against the prefix trie in RouteIndex.
+Each run is done in a forked process so its peak memory is measured
+separately.
+
+Run with ``python -m benchmarks.route_lookup``.
+"""
+
+import argparse
+from ipaddress import IPv4Address, IPv4Network
+import os
+import random
+import resource
+import time
+
+from routesia.route.trie import RouteIndex
+
+
+def generate_routes(count: int):
+    "Yield a spread of /16 to /32 routes below 16.0.0.0/4"
+    rng = random.Random(0)
+    for _ in range(count):
+        length = rng.randint(16, 32)
+        key = (1 << 28) | rng.getrandbits(28)
+        yield IPv4Network((key >> (32 - length) << (32 - length), length)), (("", "eth0"),)
+
+
+def generate_addresses(count: int):
+    rng = random.Random(1)
+    return [IPv4Address((1 << 28) | rng.getrandbits(28)) for _ in range(count)]
+
+
+def build_linear(count: int):
+    return dict(generate_routes(count))
+
+
+def lookup_linear(routes: dict, address: IPv4Address):
+    matches = []
+    for destination, nexthops in routes.items():
+        if address in destination:
+            matches.append((destination, nexthops))
+    return max(matches, key=lambda match: match[0].prefixlen, default=None)
+
+
+def build_index(count: int):
+    index = RouteIndex()
+    for destination, nexthops in generate_routes(count):
+        index.add(destination, nexthops)
+    return index
+
+
+def lookup_index(index: RouteIndex, address: IPv4Address):
+    return index.lookup(address)
+
+
+def run(name: str, build, lookup, count: int, lookups: int):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    routes = build(count)
+    built = time.perf_counter() - start
+
+    # The index applies the routes added on the first lookup, so it is
+    # part of the startup cost
+    addresses = generate_addresses(lookups + 1)
+    start = time.perf_counter()
+    lookup(routes, addresses[0])
+    first = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+
+    start = time.perf_counter()
+    for address in addresses[1:]:
+        lookup(routes, address)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>7} {count:>8} routes: build {built:7.2f}s, first lookup {first:7.2f}s, "
+        f"startup {built + first:7.2f}s {peak / 1024:6.0f}MiB, "
+        f"lookup {elapsed * 1000000 / lookups:10.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nexthop reachability lookups")
+    parser.add_argument(
+        "--routes",
+        type=int,
+        nargs="+",
+        default=[10000, 1000000],
+        help="Number of routes",
+    )
+    parser.add_argument("--lookups", type=int, default=100, help="Number of lookups")
+    args = parser.parse_args()
+
+    for count in args.routes:
+        for name, build, lookup in (
+            ("linear", build_linear, lookup_linear),
+            ("trie", build_index, lookup_index),
+        ):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    run(name, build, lookup, count, args.lookups)
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
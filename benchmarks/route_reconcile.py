@@ -0,0 +1,183 @@
+"""
+benchmarks/route_reconcile.py - Reconciliation of installed routes
+
+Installs configured routes, then makes some go missing, changes some and
+adds some stale ones behind Routesia's back. Reports how long the
+reconciler takes to find and fix the drift, and the longest the event loop
+went without running while it did.
+
+Runs in a new network namespace, so it needs CAP_SYS_ADMIN but leaves the
+host untouched.
+
+Run with ``python -m benchmarks.route_reconcile``.
+"""
+
+import argparse
+import asyncio
+from ctypes import CDLL, get_errno
+import gc
+from ipaddress import ip_network
+import socket
+import subprocess
+import time
+
+from routesia.blockingexecutor import BlockingExecutor
+from routesia.route.entities import TableEntity
+from routesia.route.reconcile import RouteReconciler
+from routesia.rtnetlink.batch import NetlinkBatch, create_socket
+from routesia.rtnetlink.dump import dump_route_summaries
+from routesia.rtnetlink.provider import RT_PROTO
+from routesia.schema.v1 import route_pb2
+
+
+CLONE_NEWNET = 0x40000000
+
+TABLE = 1000
+
+
+class IPRouteProvider:
+    rt_proto = RT_PROTO
+
+    def __init__(self, ifindex: int):
+        self.interface_map = {ifindex: "bench0"}
+        self.interface_name_map = {"bench0": ifindex}
+        self.sock = create_socket()
+
+    def get_interface_name_by_index(self, index):
+        return self.interface_map[index]
+
+    def batch(self) -> NetlinkBatch:
+        return NetlinkBatch(self.sock)
+
+    def dump_own_routes(self):
+        sock = create_socket()
+        try:
+            yield from dump_route_summaries(sock, 1, proto=self.rt_proto)
+        finally:
+            sock.close()
+
+
+class Service:
+    def __init__(self):
+        self.blocking_executor = BlockingExecutor()
+
+    async def run_blocking(self, resource: str, fn, *args, **kwargs):
+        return await self.blocking_executor.run(resource, fn, *args, **kwargs)
+
+
+class RouteEvent:
+    "Carries what the route handlers read from an event"
+    def __init__(self, destination, ifindex):
+        self.destination = ip_network(destination)
+        self.message = {"proto": 2, "scope": 253}
+        self.attrs = {"RTA_OIF": ifindex}
+
+
+def setup_namespace() -> int:
+    libc = CDLL("libc.so.6", use_errno=True)
+    if libc.unshare(CLONE_NEWNET):
+        raise OSError(get_errno(), "Could not create network namespace")
+    for command in (
+        "ip link set lo up",
+        "ip link add bench0 type veth peer name bench1",
+        "ip link set bench0 up",
+        "ip link set bench1 up",
+        "ip addr add 192.0.2.1/24 dev bench0",
+    ):
+        subprocess.run(command.split(), check=True)
+    return socket.if_nametoindex("bench0")
+
+
+def destination(i: int) -> str:
+    return f"{16 + (i >> 16)}.{i >> 8 & 0xff}.{i & 0xff}.0/24"
+
+
+def create_table(iproute: IPRouteProvider, ifindex: int, count: int) -> TableEntity:
+    config = route_pb2.RouteTableConfig()
+    config.id = TABLE
+    for i in range(count):
+        route = config.route.add()
+        route.destination = destination(i)
+        route.nexthop.add().gateway = "192.0.2.2"
+    table = TableEntity(iproute, TABLE, config=config)
+    table.handle_route_add_event(RouteEvent("192.0.2.0/24", ifindex))
+    table.apply()
+    return table
+
+
+def make_drift(count: int, drift: int) -> None:
+    "Delete, change and add ``drift`` routes each"
+    batch = NetlinkBatch(create_socket())
+    for i in range(drift):
+        batch.route("delete", dst=destination(i), table=TABLE, proto=RT_PROTO)
+        batch.route(
+            "replace",
+            dst=destination(drift + i),
+            table=TABLE,
+            proto=RT_PROTO,
+            gateway="192.0.2.3",
+        )
+        batch.route(
+            "replace",
+            dst=destination(count + i),
+            table=TABLE,
+            proto=RT_PROTO,
+            gateway="192.0.2.2",
+        )
+    batch.commit()
+
+
+async def run_reconciler(reconciler: RouteReconciler):
+    "Run the reconciler, returning its duration and the longest loop stall"
+    stall = 0.0
+    done = False
+
+    async def tick():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            stall = max(stall, now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await reconciler.run()
+    elapsed = time.perf_counter() - start
+    done = True
+    await ticker
+    return elapsed, stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconciliation of installed routes")
+    parser.add_argument("--routes", type=int, default=100000, help="Number of routes")
+    parser.add_argument("--drift", type=int, default=1000, help="Number of routes of each kind of drift")
+    args = parser.parse_args()
+
+    ifindex = setup_namespace()
+    iproute = IPRouteProvider(ifindex)
+    table = create_table(iproute, ifindex, args.routes)
+    service = Service()
+    reconciler = RouteReconciler(service, iproute, {TABLE: table})
+
+    make_drift(args.routes, args.drift)
+    # Collect what setting up left behind so it is not counted as a stall
+    gc.collect()
+    elapsed, stall = asyncio.run(run_reconciler(reconciler))
+    print(
+        f"   drift: {elapsed * 1000:9.1f}ms  max stall {stall * 1000:7.1f}ms  "
+        f"missing {reconciler.missing} changed {reconciler.changed} stale {reconciler.stale}"
+    )
+    elapsed, stall = asyncio.run(run_reconciler(reconciler))
+    print(
+        f"no drift: {elapsed * 1000:9.1f}ms  max stall {stall * 1000:7.1f}ms  "
+        f"drift {reconciler.last_drift}"
+    )
+    service.blocking_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
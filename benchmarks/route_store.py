@@ -0,0 +1,85 @@
+"""
+benchmarks/route_store.py - Memory used by observed routes
+
+Compares keeping a RouteEntity for every route in a table, as TableEntity
+did before, against the compact RouteStore it keeps routes it does not
+manage in. Each run is done in a forked process so its peak memory is
+measured separately.
+
+Run with ``python -m benchmarks.route_store``.
+"""
+
+import argparse
+from ipaddress import IPv4Network
+import os
+import resource
+import time
+
+from routesia.route.entities import RouteEntity, TableEntity
+
+
+class IPRouteProvider:
+    interface_map = {2: "eth0"}
+
+    def get_interface_name_by_index(self, index):
+        return self.interface_map[index]
+
+
+class RouteEvent:
+    "Carries what the route handlers read from an event"
+    def __init__(self, destination, gateway):
+        self.destination = destination
+        self.message = {"proto": 186, "scope": 0}
+        self.attrs = {"RTA_GATEWAY": gateway, "RTA_OIF": 2}
+
+
+def generate_events(count: int):
+    for i in range(count):
+        yield RouteEvent(
+            IPv4Network(((16 << 24) + (i << 8), 24)),
+            f"192.0.2.{1 + i % 4}",
+        )
+
+
+def run_entities(table: TableEntity, count: int):
+    for event in generate_events(count):
+        route = RouteEntity(table.iproute, table, event.destination)
+        route.handle_add_event(event)
+        table.routes[event.destination] = route
+
+
+def run_store(table: TableEntity, count: int):
+    for event in generate_events(count):
+        table.handle_route_add_event(event)
+
+
+def run(name: str, fn, count: int):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    table = TableEntity(IPRouteProvider(), 1000)
+    start = time.perf_counter()
+    fn(table, count)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(
+        f"{name:>8}: {elapsed:7.2f}s {peak / 1024:8.0f}MiB "
+        f"{peak * 1024 / count:8.0f} bytes/route"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory used by observed routes")
+    parser.add_argument("--routes", type=int, default=1000000, help="Number of routes")
+    args = parser.parse_args()
+
+    for name, fn in (("entities", run_entities), ("store", run_store)):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run(name, fn, args.routes)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+benchmarks/rtnetlink.py - Netlink event reader throughput
+
+Compares reading netlink notifications in a dedicated thread, which parses
+each datagram after ``poll()`` and hands the events to the event loop
+through the event queue, against reading them on the event loop itself with
+``add_reader()`` and parsing every waiting datagram per wakeup.
+
+Pre-encoded RTM_NEWROUTE messages are sent over a socket pair so the
+benchmark does not need privileges or touch the kernel routing tables.
+
+Run with ``python -m benchmarks.rtnetlink``.
+"""
+
+import argparse
+import asyncio
+import select
+import socket
+from threading import Thread
+import time
+
+from pyroute2.netlink.rtnl import RTM_NEWROUTE
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.eventqueue import EventQueue
+from routesia.rtnetlink.events import RouteAddEvent
+from routesia.rtnetlink.monitor import NetlinkMonitor
+
+
+def encode_routes(count):
+    messages = []
+    for i in range(count):
+        message = rtmsg()
+        message["family"] = socket.AF_INET
+        message["dst_len"] = 24
+        message["table"] = 254
+        message["attrs"] = [
+            ("RTA_TABLE", 254),
+            ("RTA_DST", f"10.{i >> 8 & 0xff}.{i & 0xff}.0"),
+            ("RTA_OIF", 2),
+        ]
+        message["header"]["type"] = RTM_NEWROUTE
+        message.encode()
+        messages.append(bytes(message.data))
+    return messages
+
+
+def produce(sock, messages, count):
+    for i in range(count):
+        sock.send(messages[i % len(messages)])
+
+
+def consumer(loop, queue, count, done):
+    handled = 0
+
+    def handle_eventqueue():
+        nonlocal handled
+        handled += len(queue.drain())
+        if handled >= count and not done.done():
+            done.set_result(True)
+
+    loop.add_reader(queue, handle_eventqueue)
+
+
+async def run_thread(count, messages):
+    loop = asyncio.get_running_loop()
+    queue = EventQueue(batch=True)
+    done = loop.create_future()
+    consumer(loop, queue, count, done)
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = NetlinkMonitor(sock=receiver)
+    running = True
+
+    def event_thread():
+        poller = select.poll()
+        poller.register(monitor, select.POLLIN)
+        while running:
+            for _ in poller.poll(100):
+                try:
+                    data = receiver.recv(monitor.bufsize)
+                except BlockingIOError:
+                    continue
+                for message in monitor.marshal.parse(data):
+                    queue.put(RouteAddEvent(None, message))
+
+    reader = Thread(target=event_thread)
+    reader.start()
+    producer = Thread(target=produce, args=(sender, messages, count))
+    start = time.perf_counter()
+    producer.start()
+    await done
+    elapsed = time.perf_counter() - start
+    running = False
+    producer.join()
+    reader.join()
+    loop.remove_reader(queue)
+    queue.close()
+    sender.close()
+    monitor.close()
+    return elapsed
+
+
+async def run_loop(count, messages):
+    loop = asyncio.get_running_loop()
+    queue = EventQueue(batch=True)
+    done = loop.create_future()
+    consumer(loop, queue, count, done)
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = NetlinkMonitor(sock=receiver)
+
+    def handle_monitor():
+        for message in monitor.read():
+            queue.put(RouteAddEvent(None, message))
+
+    loop.add_reader(monitor, handle_monitor)
+    producer = Thread(target=produce, args=(sender, messages, count))
+    start = time.perf_counter()
+    producer.start()
+    await done
+    elapsed = time.perf_counter() - start
+    producer.join()
+    loop.remove_reader(monitor)
+    loop.remove_reader(queue)
+    queue.close()
+    sender.close()
+    monitor.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Netlink event reader throughput")
+    parser.add_argument("--events", type=int, default=20000, help="Number of events")
+    args = parser.parse_args()
+
+    messages = encode_routes(1024)
+    for name, fn in (("thread", run_thread), ("loop", run_loop)):
+        elapsed = asyncio.run(fn(args.events, messages))
+        print(f"{name:>10}: {args.events / elapsed:12.0f} events/sec ({elapsed:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
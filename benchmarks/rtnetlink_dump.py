@@ -0,0 +1,118 @@
+"""
+benchmarks/rtnetlink_dump.py - Startup route dump cost
+
+Installs a large table of routes that Routesia does not manage, as a
+routing daemon would, and compares the IPRouteProvider startup dumps
+following all tables against following only the default tables. The latter
+dumps each table and the routes installed with our protocol, filtered by the
+kernel.
+
+Each run starts the provider in a forked process so its peak memory is
+measured separately. Runs in a new network namespace, so it needs
+CAP_SYS_ADMIN but leaves the host untouched.
+
+Run with ``python -m benchmarks.rtnetlink_dump``.
+"""
+
+import argparse
+from ctypes import CDLL, get_errno
+import os
+import resource
+import socket
+import subprocess
+import time
+
+from routesia.rtnetlink.batch import NetlinkBatch, create_socket
+from routesia.rtnetlink.events import RouteEvent
+from routesia.rtnetlink.provider import IPRouteProvider, RT_PROTO
+
+
+CLONE_NEWNET = 0x40000000
+
+# Table and protocol of the routes installed as a routing daemon would
+DAEMON_TABLE = 1000
+DAEMON_PROTO = 186
+
+
+class Service:
+    def __init__(self):
+        self.events = 0
+
+    def publish_event(self, event):
+        self.events += 1
+
+    def has_subscribers(self, event_class):
+        return issubclass(event_class, RouteEvent)
+
+    def register_subscription_change_handler(self, handler):
+        pass
+
+
+def setup_namespace(count: int):
+    libc = CDLL("libc.so.6", use_errno=True)
+    if libc.unshare(CLONE_NEWNET):
+        raise OSError(get_errno(), "Could not create network namespace")
+    for command in (
+        "ip link set lo up",
+        "ip link add bench0 type veth peer name bench1",
+        "ip link set bench0 up",
+        "ip link set bench1 up",
+        "ip addr add 192.0.2.1/24 dev bench0",
+    ):
+        subprocess.run(command.split(), check=True)
+    ifindex = socket.if_nametoindex("bench0")
+
+    sock = create_socket()
+    batch = NetlinkBatch(sock)
+    for i in range(count):
+        batch.route(
+            "add",
+            dst=f"{16 + (i >> 16)}.{i >> 8 & 0xff}.{i & 0xff}.0/24",
+            table=DAEMON_TABLE,
+            proto=DAEMON_PROTO,
+            gateway="192.0.2.2",
+            oif=ifindex,
+        )
+        if len(batch) == 10000:
+            batch.commit()
+    # Some of ours in a table that is not configured
+    for i in range(100):
+        batch.route("add", dst=f"10.0.{i}.0/24", table=DAEMON_TABLE + 1, proto=RT_PROTO, oif=ifindex)
+    batch.commit()
+    sock.close()
+
+
+def run(route_tables) -> None:
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    service = Service()
+    start = time.perf_counter()
+    provider = IPRouteProvider(service)
+    provider.set_route_tables(route_tables)
+    provider.update_kinds()
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    name = "all tables" if route_tables is None else "filtered"
+    print(
+        f"{name:>10}: {elapsed:8.2f}s {peak / 1024:8.0f}MiB "
+        f"{len(provider.kernel_state['route']):9} routes {service.events:9} events"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup route dump cost")
+    parser.add_argument("--routes", type=int, default=1000000, help="Number of routes in the daemon table")
+    args = parser.parse_args()
+
+    setup_namespace(args.routes)
+    for route_tables in (None, {253, 254, 255}):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run(route_tables)
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+
+if __name__ == "__main__":
+    main()
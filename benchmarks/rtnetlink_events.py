@@ -0,0 +1,177 @@
+"""
+benchmarks/rtnetlink_events.py - Route event construction cost
+
+Builds route events from a dump of routes and compares the eager events
+used before, which decoded every attribute and parsed the destination on
+creation, against the current lazy events. Each is measured routing the
+event only, as is done for every event published, and with a subscriber
+reading the destination.
+
+The dump is read from a file written by ``ip route save``, or a dump of
+synthetic routes is generated. Message parsing is common to both and is
+reported separately.
+
+Run with ``python -m benchmarks.rtnetlink_events``.
+"""
+
+import argparse
+import gc
+from ipaddress import ip_network
+import socket
+import struct
+import sys
+import time
+
+from pyroute2.netlink.rtnl import RTM_NEWROUTE
+from pyroute2.netlink.rtnl.marshal import MarshalRtnl
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.rtnetlink.events import IgnoreMessage, RouteAddEvent
+
+
+# Messages per chunk, similar to the messages in a single dump datagram
+CHUNK = 256
+
+
+class EagerRouteEvent:
+    "RouteEvent as it was before attributes were decoded lazily"
+    def __init__(self, iproute, message):
+        self.message = message
+        self.attrs = dict(message["attrs"])
+        if message["family"] not in (socket.AF_INET, socket.AF_INET6):
+            raise IgnoreMessage
+        self.family = message["family"]
+        self.table = message["table"]
+        if "RTA_DST" in self.attrs:
+            self.destination = ip_network(
+                "%s/%s" % (self.attrs["RTA_DST"], message["dst_len"])
+            )
+        else:
+            if message["family"] == socket.AF_INET:
+                self.destination = ip_network("0.0.0.0/%s" % message["dst_len"])
+            else:
+                self.destination = ip_network("::/%s" % message["dst_len"])
+
+    def get_dispatch_key(self):
+        return ("route", self.table, self.destination)
+
+
+def generate_dump(count: int):
+    """
+    Yield chunks of encoded RTM_NEWROUTE messages for ``count`` distinct /24
+    routes. One message is encoded and the destination patched for the rest.
+    """
+    message = rtmsg()
+    message["family"] = socket.AF_INET
+    message["dst_len"] = 24
+    message["table"] = 254
+    message["proto"] = 186
+    message["type"] = 1
+    message["attrs"] = [
+        ("RTA_TABLE", 254),
+        ("RTA_DST", "1.2.3.0"),
+        ("RTA_PRIORITY", 20),
+        ("RTA_GATEWAY", "192.0.2.1"),
+        ("RTA_OIF", 2),
+    ]
+    message["header"]["type"] = RTM_NEWROUTE
+    message.encode()
+    template = bytearray(message.data)
+    offset = template.index(socket.inet_aton("1.2.3.0"))
+    chunk = []
+    for i in range(count):
+        template[offset:offset + 4] = struct.pack(">I", (16 << 24) + (i << 8))
+        chunk.append(bytes(template))
+        if len(chunk) == CHUNK:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def read_dump(path: str):
+    """
+    Yield chunks of messages from a file written by ``ip route save``.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    # The file starts with a 4 byte magic number
+    data = data[4:]
+    offset = 0
+    while offset < len(data):
+        start = offset
+        for _ in range(CHUNK):
+            if offset >= len(data):
+                break
+            offset += struct.unpack_from("=I", data, offset)[0]
+        yield data[start:offset]
+
+
+class Result:
+    def __init__(self, name: str):
+        self.name = name
+        self.events = 0
+        self.dispatch_time = 0.0
+        self.read_time = 0.0
+        self.blocks = 0
+
+
+def measure(event_class, messages, result: Result) -> None:
+    start = time.process_time()
+    for message in messages:
+        event_class(None, message).get_dispatch_key()
+    dispatched = time.process_time()
+    for message in messages:
+        event = event_class(None, message)
+        event.get_dispatch_key()
+        event.destination
+    result.read_time += time.process_time() - dispatched
+    result.dispatch_time += dispatched - start
+
+    # Blocks still allocated by events held in a queue
+    blocks = sys.getallocatedblocks()
+    events = [event_class(None, message) for message in messages]
+    for event in events:
+        event.get_dispatch_key()
+    result.blocks += sys.getallocatedblocks() - blocks - 1
+    result.events += len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route event construction cost")
+    parser.add_argument("--routes", type=int, default=1000000, help="Number of synthetic routes")
+    parser.add_argument("--dump", metavar="PATH", help="Use a dump written by ip route save")
+    args = parser.parse_args()
+
+    # Collections triggered by one implementation would be charged to the
+    # other
+    gc.disable()
+    chunks = read_dump(args.dump) if args.dump else generate_dump(args.routes)
+    marshal = MarshalRtnl()
+    results = [Result("eager"), Result("lazy")]
+    parse_time = 0.0
+    for chunk in chunks:
+        start = time.process_time()
+        messages = []
+        for message in marshal.parse(chunk):
+            if message["family"] in (socket.AF_INET, socket.AF_INET6):
+                # Attribute values are decoded on first access
+                for attr in message["attrs"]:
+                    attr[1]
+                messages.append(message)
+        parse_time += time.process_time() - start
+        measure(EagerRouteEvent, messages, results[0])
+        measure(RouteAddEvent, messages, results[1])
+
+    count = results[0].events
+    print(f"{count} routes, parsed in {parse_time:.2f}s CPU ({parse_time / count * 1e6:.2f}us/route)")
+    print(f"{'':>6} {'dispatch [us]':>14} {'read dst [us]':>14} {'blocks/event':>13}")
+    for result in results:
+        print(
+            f"{result.name:>6} {result.dispatch_time / count * 1e6:14.3f} "
+            f"{result.read_time / count * 1e6:14.3f} {result.blocks / count:13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ routesia/interface/address/entity.py - Address entity
 
 import errno
 from ipaddress import ip_interface
-from pyroute2 import NetlinkError
+import logging
 from pyroute2.netlink.rtnl.ifaddrmsg import IFA_F_NOPREFIXROUTE
 
 from routesia.dhcp.client.events import DHCPv4LeaseAcquired
@@ -12,16 +12,19 @@ from routesia.rtnetlink.events import AddressAddEvent
 from routesia.schema.v1 import address_pb2
 
 
+logger = logging.getLogger("address")
+
+
 class AddressEntity:
-    def __init__(self, ifname, iproute, ifindex=None, config=None):
+    def __init__(self, ifname, iproute, ifindex=None, config=None, batch=None):
         super().__init__()
         self.ifname = ifname
         self.iproute = iproute
         self.config = config
         self.status = address_pb2.Address()
-        self.set_ifindex(ifindex)
+        self.set_ifindex(ifindex, batch)
         self.status.address.interface = self.ifname
-        self.apply()
+        self.apply(batch)
 
     def handle_add(self, event: AddressAddEvent):
         self.status.address.ip = str(event.ip)
@@ -29,35 +32,44 @@ class AddressEntity:
         self.status.address.scope = event.scope
         self.status.state = address_pb2.Address.PRESENT
 
-    def set_ifindex(self, ifindex):
+    def set_ifindex(self, ifindex, batch=None):
         self.ifindex = ifindex
-        self.apply()
+        self.apply(batch)
 
     def handle_remove(self):
         self.status.state = address_pb2.Address.ADDRESS_MISSING
         self.apply()
 
-    def on_config_removed(self):
+    def on_config_removed(self, batch=None):
         self.config = None
-        self.remove()
+        self.remove(batch)
 
-    def on_config_change(self, config):
+    def on_config_change(self, config, batch=None):
         self.config = config
-        self.apply()
+        self.apply(batch)
 
     def update_config(self, config):
         self.config = config
         self.apply()
 
-    def addr(self, *args, **kwargs):
+    def addr(self, *args, batch=None, **kwargs):
         kwargs["index"] = self.ifindex
         if "add" in args:
             kwargs["proto"] = self.iproute.rt_proto
-        try:
-            return self.iproute.iproute.addr(*args, **kwargs)
-        except NetlinkError as e:
-            if e.code != errno.EEXIST:
-                raise
+        if batch is None:
+            with self.iproute.batch() as batch:
+                batch.addr(*args, callback=self.handle_addr_result, **kwargs)
+        else:
+            batch.addr(*args, callback=self.handle_addr_result, **kwargs)
+
+    def handle_addr_result(self, error):
+        "Handle the result of a batched address request"
+        if error is None or error.code == errno.EEXIST:
+            return
+        if error.code == errno.ENODEV:
+            self.set_ifindex(None)
+        else:
+            logger.error(f"Address request on {self.ifname} failed: {error}")
 
     def get_params(self):
         if self.ifindex is None:
@@ -77,7 +89,7 @@ class AddressEntity:
 
         return args
 
-    def apply(self):
+    def apply(self, batch=None):
         if not self.config:
             return
 
@@ -89,18 +101,15 @@ class AddressEntity:
                 self.status.address.SerializeToString()
                 != self.config.SerializeToString()
             ):
-                self.remove()
-                try:
-                    self.addr("add", **self.get_params())
-                except NetlinkError as e:
-                    if e.code == errno.ENODEV:
-                        self.set_ifindex(None)
-
-    def remove(self):
+                self.remove(batch)
+                self.addr("add", batch=batch, **self.get_params())
+
+    def remove(self, batch=None):
         if self.status.address.ip:
             ip = ip_interface(self.status.address.ip)
             self.addr(
                 "remove",
+                batch=batch,
                 index=self.ifindex,
                 address=str(ip.ip),
                 prefixlen=ip.network.prefixlen,
@@ -131,16 +140,12 @@ class DHCPAddressEntity(AddressEntity):
             "flags": IFA_F_NOPREFIXROUTE,
         }
 
-    def apply(self):
+    def apply(self, batch=None):
         if self.ifindex is None:
             self.status.state = address_pb2.Address.INTERFACE_MISSING
         else:
             self.status.state = address_pb2.Address.ADDRESS_MISSING
-            try:
-                self.addr("add", **self.get_params())
-            except NetlinkError as e:
-                if e.code == errno.ENODEV:
-                    self.set_ifindex(None)
+            self.addr("add", batch=batch, **self.get_params())
 
     def handle_dhcp_lease_acquired(self, lease: DHCPv4LeaseAcquired):
         if self.lease.address != lease.address:
@@ -45,12 +45,16 @@ class AddressProvider(Provider):
 
         self.dhcp_addresses: dict[str, DHCPAddressEntity] = {}
 
+        # Interfaces with configured addresses
+        self.configured_interfaces: set[str] = set()
+
         self.config.register_change_handler(self.on_config_change)
 
         self.service.subscribe_event(AddressAddEvent, self.handle_address_add)
         self.service.subscribe_event(AddressRemoveEvent, self.handle_address_remove)
         self.service.subscribe_event(InterfaceAddEvent, self.handle_interface_add)
         self.service.subscribe_event(InterfaceRemoveEvent, self.handle_interface_remove)
+        self.subscribe_configured_interfaces(self.config.data)
         self.service.subscribe_event(DHCPv4LeasePreinit, self.handle_dhcp_lease_preinit)
         self.service.subscribe_event(DHCPv4LeaseAcquired, self.handle_dhcp_lease_acquired)
         self.service.subscribe_event(DHCPv4LeaseLost, self.handle_dhcp_lease_lost)
@@ -61,30 +65,48 @@ class AddressProvider(Provider):
         self.rpc.register("address/config/update", self.rpc_update_address)
         self.rpc.register("address/config/delete", self.rpc_delete_address)
 
+    def subscribe_configured_interfaces(self, config):
+        """
+        Subscribe to the events of the interfaces with configured addresses,
+        which are applied to those addresses.
+        """
+        interfaces = {address.interface for address in config.addresses.address}
+        if interfaces == self.configured_interfaces:
+            return
+        self.configured_interfaces = interfaces
+        for event_class, handler in (
+            (InterfaceAddEvent, self.handle_configured_interface_add),
+            (InterfaceRemoveEvent, self.handle_configured_interface_remove),
+        ):
+            self.service.unsubscribe_event(event_class, handler)
+            self.service.subscribe_event(event_class, handler, ifname=interfaces)
+
     def on_config_change(self, config):
+        self.subscribe_configured_interfaces(config)
         new_addresses = {}
         for address in config.addresses.address:
             new_addresses[(address.interface, address.ip)] = address
         new_address_keys = set(new_addresses.keys())
 
-        # Remove addresses that no longer have a config
-        for key, address in list(self.addresses.items()):
-            if address.config and key not in new_address_keys:
-                address.on_config_removed()
+        with self.iproute.batch() as batch:
+            # Remove addresses that no longer have a config
+            for key, address in list(self.addresses.items()):
+                if address.config and key not in new_address_keys:
+                    address.on_config_removed(batch)
 
-        # Add/update the rest
-        for key in new_address_keys:
-            if key in self.addresses:
-                self.addresses[key].on_config_change(new_addresses[key])
-            else:
-                config = new_addresses[key]
-                if config.interface in self.interfaces:
-                    ifindex = self.interfaces[config.interface].ifindex
+            # Add/update the rest
+            for key in new_address_keys:
+                if key in self.addresses:
+                    self.addresses[key].on_config_change(new_addresses[key], batch)
                 else:
-                    ifindex = None
-                self.addresses[key] = AddressEntity(
-                    config.interface, self.iproute, ifindex, config=config
-                )
+                    config = new_addresses[key]
+                    if config.interface in self.interfaces:
+                        ifindex = self.interfaces[config.interface].ifindex
+                    else:
+                        ifindex = None
+                    self.addresses[key] = AddressEntity(
+                        config.interface, self.iproute, ifindex, config=config, batch=batch
+                    )
 
     def find_config(self, address_event):
         for config in self.config.data.addresses.address:
@@ -118,16 +140,21 @@ class AddressProvider(Provider):
 
     async def handle_interface_add(self, interface_event):
         self.interfaces[interface_event.ifname] = interface_event
-        for address in self.addresses.values():
-            if address.ifname == interface_event.ifname:
-                address.set_ifindex(interface_event.ifindex)
 
     async def handle_interface_remove(self, interface_event):
+        if interface_event.ifname in self.interfaces:
+            del self.interfaces[interface_event.ifname]
+
+    async def handle_configured_interface_add(self, interface_event):
+        with self.iproute.batch() as batch:
+            for address in self.addresses.values():
+                if address.ifname == interface_event.ifname:
+                    address.set_ifindex(interface_event.ifindex, batch)
+
+    async def handle_configured_interface_remove(self, interface_event):
         for address in self.addresses.values():
             if address.ifname == interface_event.ifname:
                 address.set_ifindex(None)
-        if interface_event.ifname in self.interfaces:
-            del self.interfaces[interface_event.ifname]
 
     async def handle_dhcp_lease_preinit(self, event: DHCPv4LeasePreinit):
         if event.address:
@@ -152,15 +179,16 @@ class AddressProvider(Provider):
             del self.dhcp_addresses[event.interface]
 
     def start(self):
-        for config in self.config.data.addresses.address:
-            if (config.interface, config.ip) not in self.addresses:
-                if config.interface in self.interfaces:
-                    ifindex = self.interfaces[config.interface].ifindex
-                else:
-                    ifindex = None
-                self.addresses[(config.interface, config.ip)] = AddressEntity(
-                    config.interface, self.iproute, ifindex=ifindex, config=config,
-                )
+        with self.iproute.batch() as batch:
+            for config in self.config.data.addresses.address:
+                if (config.interface, config.ip) not in self.addresses:
+                    if config.interface in self.interfaces:
+                        ifindex = self.interfaces[config.interface].ifindex
+                    else:
+                        ifindex = None
+                    self.addresses[(config.interface, config.ip)] = AddressEntity(
+                        config.interface, self.iproute, ifindex=ifindex, config=config, batch=batch,
+                    )
 
     async def rpc_list_addresses(self) -> address_pb2.AddressList:
         addresses = address_pb2.AddressList()
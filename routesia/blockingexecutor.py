@@ -0,0 +1,98 @@
+"""
+routesia/blockingexecutor.py - Run blocking calls off the event loop
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Any, Callable
+
+from routesia.eventstats import Histogram
+
+
+class LaneStats:
+    "Statistics for the calls made on a single lane"
+    __slots__ = ("resource", "calls", "exceptions", "pending", "wait", "duration")
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        self.calls = 0
+        self.exceptions = 0
+        # Calls submitted but not yet finished
+        self.pending = 0
+        # Time between submission and the call starting
+        self.wait = Histogram()
+        # Time spent in the call. This is how long the event loop would have
+        # been blocked had the call been made directly.
+        self.duration = Histogram()
+
+    def to_message(self, message) -> None:
+        "Set message parameters from lane statistics"
+        message.resource = self.resource
+        message.calls = self.calls
+        message.exceptions = self.exceptions
+        message.pending = self.pending
+        self.wait.to_message(message.wait)
+        self.duration.to_message(message.duration)
+
+
+class BlockingExecutor:
+    """
+    Runs blocking calls in threads so they do not stall the event loop.
+
+    Each call is made on the lane for a named resource, such as
+    ``"nftables"`` or ``"systemd"``. A lane is a single thread, so calls on
+    the same resource are made one at a time in the order they were
+    submitted, while calls on different resources run in parallel. Lanes are
+    created on first use.
+    """
+    def __init__(self):
+        self.lanes: dict[str, ThreadPoolExecutor] = {}
+        self.stats: dict[str, LaneStats] = {}
+
+    def get_lane(self, resource: str) -> ThreadPoolExecutor:
+        lane = self.lanes.get(resource)
+        if lane is None:
+            lane = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f"Blocking-{resource}"
+            )
+            self.lanes[resource] = lane
+            self.stats[resource] = LaneStats(resource)
+        return lane
+
+    async def run(self, resource: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call ``fn`` with the given arguments on the lane for ``resource`` and
+        return its result.
+        """
+        lane = self.get_lane(resource)
+        stats = self.stats[resource]
+        submitted = time.monotonic()
+
+        def call():
+            start = time.monotonic()
+            stats.wait.record(start - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats.duration.record(time.monotonic() - start)
+
+        stats.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(lane, call)
+        except Exception:
+            stats.exceptions += 1
+            raise
+        finally:
+            stats.pending -= 1
+            stats.calls += 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        for lane in self.lanes.values():
+            lane.shutdown(wait=wait)
+        self.lanes = {}
+
+    def to_message(self, message) -> None:
+        "Set message parameters from lane statistics"
+        for stats in self.stats.values():
+            stats.to_message(message.lane.add())
@@ -1,13 +1,15 @@
 """
 routesia/config/provider.py - Routesia config provider
 """
+import asyncio
 from google.protobuf import text_format
+import inspect
 import logging
 import os
 
 from routesia.schema.v1.config_pb2 import Config, CommitResult
 from routesia.rpc import RPC
-from routesia.service import Provider
+from routesia.service import Provider, Service
 
 
 logger = logging.getLogger("config")
@@ -21,15 +23,19 @@ class InvalidConfig(Exception):
 
 
 class ConfigProvider(Provider):
-    def __init__(self, rpc: RPC, location="/etc/routesia/config"):
+    def __init__(self, service: Service, rpc: RPC, location="/etc/routesia/config"):
+        self.service = service
         self.rpc = rpc
         self.location = location
 
         self.data = Config()
         self.staged_data = Config()
+        # Incremented whenever the staged config is replaced as a whole
+        self.staged_generation = 0
 
         self.init_config_handlers = []
         self.change_handlers = []
+        self.commit_lock = asyncio.Lock()
 
         if not os.path.isdir(self.location):
             os.makedirs(self.location, 0o700)
@@ -65,13 +71,20 @@ class ConfigProvider(Provider):
         self.init_config_handlers.append(handler)
 
     def register_change_handler(self, handler):
+        """
+        Register a handler to be called with the new config when it changes.
+        The handler may be a coroutine function.
+        """
         self.change_handlers.append(handler)
 
-    def call_change_handlers(self):
+    async def call_change_handlers(self):
         success = True
         for handler in self.change_handlers:
             try:
-                handler(self.data)
+                if inspect.iscoroutinefunction(handler):
+                    await handler(self.data)
+                else:
+                    handler(self.data)
             except Exception:
                 logger.exception("Change handler failed (%s)" % handler)
                 success = False
@@ -87,8 +100,11 @@ class ConfigProvider(Provider):
 
     def save_config(self):
         self.version = self.data.system.version
-        with open(self.config_file, "w") as f:
-            f.write(str(self.data))
+        self.write_config(self.config_file, str(self.data))
+
+    def write_config(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
 
     def load_config(self):
         with open(self.config_file) as f:
@@ -102,8 +118,15 @@ class ConfigProvider(Provider):
 
     async def rpc_drop_staged(self) -> Config:
         self.staged_data.CopyFrom(self.data)
+        self.staged_generation += 1
 
     async def rpc_commit(self) -> CommitResult:
+        # Commits wait on change handlers and the file write, so they are
+        # made one at a time
+        async with self.commit_lock:
+            return await self.commit()
+
+    async def commit(self) -> CommitResult:
         result = CommitResult()
 
         if self.data.SerializeToString() == self.staged_data.SerializeToString():
@@ -111,22 +134,26 @@ class ConfigProvider(Provider):
             result.message = "No staged changes."
         else:
             previous_data = self.data
-            self.data = self.staged_data
+            # A copy, so staged changes made while the change handlers run
+            # do not alter the running config
+            self.data = Config()
+            self.data.CopyFrom(self.staged_data)
             self.data.system.version += 1
+            self.staged_data.system.version = self.data.system.version
 
-            result = CommitResult()
-
-            if self.call_change_handlers():
-                self.save_config()
-                self.staged_data = Config()
-                self.staged_data.CopyFrom(self.data)
+            if await self.call_change_handlers():
+                self.version = self.data.system.version
+                await self.service.run_blocking(
+                    "config", self.write_config, self.config_file, str(self.data)
+                )
 
                 result.result_code = CommitResult.COMMIT_SUCCESS
                 result.message = "Committed version %s." % self.data.system.version
             else:
                 # Roll back
                 self.data = previous_data
-                self.call_change_handlers()
+                self.staged_data.system.version = self.data.system.version
+                await self.call_change_handlers()
                 result.result_code = CommitResult.COMMIT_ERROR
                 result.message = "Failed to commit changes. Attempting rollback but the system may be in an unexpected state."
 
@@ -134,3 +161,4 @@ class ConfigProvider(Provider):
 
     def start(self):
         self.staged_data.CopyFrom(self.data)
+        self.staged_generation += 1
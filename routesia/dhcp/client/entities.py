@@ -16,6 +16,7 @@ from routesia.schema.v1.dhcp_client_pb2 import (
     DHCPv4ClientEvent,
     DHCPv4ClientStatus,
 )
+from routesia.rtnetlink.provider import InterfaceDoesNotExist, IPRouteProvider
 from routesia.service import Service
 
 
@@ -23,10 +24,11 @@ logger = logging.getLogger("dhcp-client")
 
 
 class DHCPv4Client:
-    def __init__(self, systemd, config, service: Service):
+    def __init__(self, systemd, config, service: Service, iproute: IPRouteProvider):
         self.systemd = systemd
         self.config = config
         self.service = service
+        self.iproute = iproute
         self.interface = config.interface
         self.status = DHCPv4ClientStatus()
         self.status.interface = self.interface
@@ -51,8 +53,15 @@ class DHCPv4Client:
             else:
                 self.start()
 
+    def get_ifindex(self) -> int | None:
+        try:
+            return self.iproute.get_interface_index_by_name(self.interface)
+        except InterfaceDoesNotExist:
+            return None
+
     async def on_event(self, event: DHCPv4ClientEvent):
         self.status.last_event.CopyFrom(event)
+        ifindex = self.get_ifindex()
 
         routes = []
         for route in event.new.route:
@@ -78,6 +87,7 @@ class DHCPv4Client:
                     interface=self.interface,
                     table=self.config.table,
                     address=alias_ip_address,
+                    ifindex=ifindex,
                 )
             )
         elif event.type in (
@@ -99,6 +109,7 @@ class DHCPv4Client:
                     search_domains=event.new.domain_search,
                     ntp_servers=ntp_servers,
                     server_identifier=event.new.server_identifier,
+                    ifindex=ifindex,
                 )
             )
         elif event.type in (
@@ -121,6 +132,7 @@ class DHCPv4Client:
                     search_domains=event.new.domain_search,
                     ntp_servers=ntp_servers,
                     server_identifier=event.new.server_identifier,
+                    ifindex=ifindex,
                 )
             )
 
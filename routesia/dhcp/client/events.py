@@ -9,7 +9,15 @@ from ipaddress import (
     IPv4Network,
 )
 
-from routesia.event import Event
+from routesia.event import Event, PRIORITY_CONTROL
+
+
+def get_interface_dispatch_key(ifindex: int | None):
+    # Share the lane of the link and address events of the interface, which
+    # are keyed by index
+    if ifindex is None:
+        return None
+    return ("interface", ifindex)
 
 
 @dataclass
@@ -20,13 +28,22 @@ class DHCPv4Route:
 
 @dataclass
 class DHCPv4LeasePreinit(Event):
+    priority = PRIORITY_CONTROL
+
     interface: str
     table: int
     address: IPv4Interface
 
+    ifindex: int | None = None
+
+    def get_dispatch_key(self):
+        return get_interface_dispatch_key(self.ifindex)
+
 
 @dataclass
 class DHCPv4LeaseAcquired(Event):
+    priority = PRIORITY_CONTROL
+
     interface: str
     table: int
     address: IPv4Interface
@@ -39,9 +56,16 @@ class DHCPv4LeaseAcquired(Event):
     ntp_servers: list[IPv4Address]
     server_identifier: IPv4Address
 
+    ifindex: int | None = None
+
+    def get_dispatch_key(self):
+        return get_interface_dispatch_key(self.ifindex)
+
 
 @dataclass
 class DHCPv4LeaseLost(Event):
+    priority = PRIORITY_CONTROL
+
     interface: str
     table: int
     address: IPv4Interface
@@ -53,3 +77,8 @@ class DHCPv4LeaseLost(Event):
     search_domains: list[str]
     ntp_servers: list[IPv4Address]
     server_identifier: IPv4Address
+
+    ifindex: int | None = None
+
+    def get_dispatch_key(self):
+        return get_interface_dispatch_key(self.ifindex)
@@ -9,6 +9,7 @@ from routesia.service import Provider, Service
 from routesia.interface.provider import InterfaceProvider
 from routesia.route.provider import RouteProvider
 from routesia.rpc import RPC
+from routesia.rtnetlink.provider import IPRouteProvider
 from routesia.schema.v1 import dhcp_client_pb2
 from routesia.systemd import SystemdProvider
 
@@ -22,6 +23,7 @@ class DHCPClientProvider(Provider):
         service: Service,
         interface_provider: InterfaceProvider,
         route_provider: RouteProvider,
+        iproute: IPRouteProvider,
     ):
         self.config = config
         self.systemd = systemd
@@ -29,6 +31,7 @@ class DHCPClientProvider(Provider):
         self.service = service
         self.interface_provider = interface_provider
         self.route_provider = route_provider
+        self.iproute = iproute
         self.v4_clients = {}
 
         self.config.register_change_handler(self.on_config_change)
@@ -67,6 +70,7 @@ class DHCPClientProvider(Provider):
                     self.systemd,
                     client_config,
                     self.service,
+                    self.iproute,
                 )
                 self.v4_clients[interface].start()
 
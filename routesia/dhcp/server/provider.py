@@ -16,6 +16,7 @@ from routesia.service import Provider
 from routesia.ipam.provider import IPAMProvider
 from routesia.rpc import RPC
 from routesia.rtnetlink.events import InterfaceAddEvent, InterfaceRemoveEvent
+from routesia.rtnetlink.provider import IPRouteProvider
 from routesia.schema.v1 import dhcp_server_pb2
 from routesia.service import Service
 from routesia.systemd import SystemdProvider
@@ -39,19 +40,22 @@ class DHCPServerProvider(Provider):
         ipam: IPAMProvider,
         systemd: SystemdProvider,
         rpc: RPC,
+        iproute: IPRouteProvider,
     ):
         self.service = service
         self.config = config
         self.ipam = ipam
         self.systemd = systemd
         self.rpc = rpc
+        self.iproute = iproute
 
+        # Configured interfaces that are present
         self.interfaces = set()
+        self.configured_interfaces = set()
 
         self.config.register_change_handler(self.on_config_change)
 
-        self.service.subscribe_event(InterfaceAddEvent, self.handle_interface_add)
-        self.service.subscribe_event(InterfaceRemoveEvent, self.handle_interface_remove)
+        self.subscribe_interfaces(self.config.data)
 
         self.rpc.register("dhcp/server/v4/subnet/leases", self.rpc_v4_subnet_leases)
         self.rpc.register("dhcp/server/v4/config/get", self.rpc_v4_config_get)
@@ -87,46 +91,64 @@ class DHCPServerProvider(Provider):
         self.rpc.register("dhcp/server/v4/config/subnet/relay_address/add", self.rpc_v4_config_subnet_relay_address_add)
         self.rpc.register("dhcp/server/v4/config/subnet/relay_address/delete", self.rpc_v4_config_subnet_relay_address_delete)
 
-    def on_config_change(self, config):
-        self.apply()
-
-    def is_configured_interface(self, interface):
-        "Return True if interface is configured for DHCP"
-        for configured_interface in self.config.data.dhcp.server.v4.interface:
-            if configured_interface == interface:
-                return True
-        return False
+    async def on_config_change(self, config):
+        self.subscribe_interfaces(config)
+        await self.apply()
+
+    def subscribe_interfaces(self, config):
+        """
+        Subscribe to the events of the interfaces configured for DHCP only.
+        Interfaces already present when configured are looked up instead.
+        """
+        interfaces = set(config.dhcp.server.v4.interface)
+        if interfaces == self.configured_interfaces:
+            return
+        added = interfaces - self.configured_interfaces
+        self.configured_interfaces = interfaces
+        self.interfaces = (self.interfaces & interfaces) | {
+            interface
+            for interface in added
+            if interface in self.iproute.interface_name_map
+        }
+        for event_class, handler in (
+            (InterfaceAddEvent, self.handle_interface_add),
+            (InterfaceRemoveEvent, self.handle_interface_remove),
+        ):
+            self.service.unsubscribe_event(event_class, handler)
+            self.service.subscribe_event(event_class, handler, ifname=interfaces)
 
     async def handle_interface_add(self, interface_event):
         self.interfaces.add(interface_event.ifname)
-        if self.is_configured_interface(interface_event.ifname):
-            self.apply()
+        await self.apply()
 
     async def handle_interface_remove(self, interface_event):
-        self.interfaces.remove(interface_event.ifname)
-        if self.is_configured_interface(interface_event.ifname):
-            self.apply()
+        self.interfaces.discard(interface_event.ifname)
+        await self.apply()
 
-    def apply(self):
+    async def apply(self):
         config = self.config.data.dhcp.server
 
         if not config.v4.interface:
-            self.stop()
+            await self.service.run_blocking("systemd", self.stop_unit)
             return
 
         dhcp4_config = DHCP4Config(config, self.ipam, self.interfaces)
+        await self.service.run_blocking(
+            "kea", self.write_config, json.dumps(dhcp4_config.generate(), indent=2)
+        )
 
+        await self.service.run_blocking("systemd", self.start_unit)
+
+    def write_config(self, text):
         temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
-        json.dump(dhcp4_config.generate(), temp, indent=2)
+        temp.write(text)
         temp.flush()
         temp.close()
 
         shutil.move(temp.name, DHCP4_CONF)
 
-        self.start_unit()
-
-    def start(self):
-        self.apply()
+    async def start(self):
+        await self.apply()
 
     def stop(self):
         self.stop_unit()
@@ -175,7 +197,9 @@ class DHCPServerProvider(Provider):
         else:
             raise RPCInvalidArgument(msg.address)
 
-        data = self.server_command("lease4-get-all", subnets=[idx + 1])
+        data = await self.service.run_blocking(
+            "kea", self.server_command, "lease4-get-all", subnets=[idx + 1]
+        )
         leases = dhcp_server_pb2.DHCPv4LeaseList()
         for lease_data in data["arguments"]["leases"]:
             lease = leases.lease.add()
@@ -46,6 +46,7 @@ class AuthoritativeDNSProvider(Provider):
         self.rpc = rpc
 
         self.addresses = set()
+        self.listen_addresses = set()
 
         self.config.register_change_handler(self.on_config_change)
 
@@ -55,71 +56,72 @@ class AuthoritativeDNSProvider(Provider):
         self.rpc.register("dns/authoritative/config/get", self.rpc_config_get)
         self.rpc.register("dns/authoritative/config/update", self.rpc_config_update)
 
-    def on_config_change(self, config):
-        self.apply()
+    async def on_config_change(self, config):
+        self.update_listen_addresses(config)
+        await self.apply()
+
+    def update_listen_addresses(self, config):
+        listen_addresses = set()
+        for listen_address in config.dns.authoritative.listen_address:
+            try:
+                listen_addresses.add(ip_address(listen_address.address))
+            except ValueError:
+                logger.error(f"Invalid listen address {listen_address.address}")
+        self.listen_addresses = listen_addresses
 
     def has_listen_address(self, address):
         "Return True if address is a configured listen address"
-        for listen_address in self.config.data.dns.authoritative.listen_address:
-            if ip_address(listen_address.address) == address:
-                return True
-        return False
+        return address in self.listen_addresses
 
     async def handle_address_add(self, address_event):
         self.addresses.add(address_event.ip.ip)
         if self.has_listen_address(address_event.ip.ip):
-            self.apply()
+            await self.apply()
 
     async def handle_address_remove(self, address_event):
         if address_event.ip.ip in self.addresses:
             self.addresses.remove(address_event.ip.ip)
             if self.has_listen_address(address_event.ip.ip):
-                self.apply()
+                await self.apply()
 
-    def apply(self):
+    async def apply(self):
         config = self.config.data.dns.authoritative
 
         if not config.enabled:
-            self.stop_unit()
+            await self.systemd.stop_unit_async("nsd.service")
             return
 
-        nsd_config = NSDConfig(config, self.addresses)
-
-        temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
-        temp.write(nsd_config.generate())
-        temp.flush()
-        temp.close()
-        os.chmod(temp.name, 0o644)
-
-        shutil.move(temp.name, NSD_CONF)
-
+        files = [(NSD_CONF, NSDConfig(config, self.addresses).generate())]
         for zone in config.zone:
-            zone_config = NSDZoneConfig(zone, self.ipam)
+            files.append(
+                ("%s/%s" % (ZONE_DIR, zone.name), NSDZoneConfig(zone, self.ipam).generate())
+            )
+        await self.service.run_blocking("nsd", self.write_config, files)
+
+        await self.systemd.start_unit_async("nsd.service")
 
+    def write_config(self, files):
+        for path, text in files:
             temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
-            temp.write(zone_config.generate())
+            temp.write(text)
             temp.flush()
             temp.close()
             os.chmod(temp.name, 0o644)
 
-            shutil.move(temp.name, "%s/%s" % (ZONE_DIR, zone.name))
+            shutil.move(temp.name, path)
 
-        self.start_unit()
-
-    def start(self):
+    def setup_server_key(self):
         if not os.path.exists(NSD_SERVER_KEY):
             try:
                 # subprocess.run([NSD_CONTROL_SETUP], check_returncode=True)
                 subprocess.run([NSD_CONTROL_SETUP])
             except subprocess.CalledProcessError:
                 logger.error("nsd-control-setup failed")
-        self.apply()
-
-    def start_unit(self):
-        self.systemd.start_unit("nsd.service")
 
-    def stop_unit(self):
-        self.systemd.stop_unit("nsd.service")
+    async def start(self):
+        self.update_listen_addresses(self.config.data)
+        await self.service.run_blocking("nsd", self.setup_server_key)
+        await self.apply()
 
     async def rpc_config_get(self) -> dns_authoritative_pb2.AuthoritativeDNSConfig:
         return self.config.staged_data.dns.authoritative
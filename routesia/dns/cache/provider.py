@@ -4,6 +4,7 @@ routesia/dns/cache/provider.py - DNS caching with Unbound
 
 import asyncio
 from ipaddress import ip_address
+import logging
 import os
 import shutil
 import tempfile
@@ -24,6 +25,9 @@ from routesia.service import Service
 from routesia.systemd import SystemdProvider
 
 
+logger = logging.getLogger("dns-cache")
+
+
 class DNSCacheProvider(Provider):
     """
     Manages the Unbound caching DNS server.
@@ -49,8 +53,10 @@ class DNSCacheProvider(Provider):
         self.rpc = rpc
 
         self.addresses = set()
+        self.listen_addresses = set()
 
         self.update_timer: asyncio.TimerHandle | None = None
+        self.apply_task: asyncio.Task | None = None
 
         self.config.register_change_handler(self.on_config_change)
 
@@ -60,15 +66,22 @@ class DNSCacheProvider(Provider):
         self.rpc.register("dns/cache/config/get", self.rpc_config_get)
         self.rpc.register("dns/cache/config/update", self.rpc_config_update)
 
-    def on_config_change(self, config):
-        self.apply()
+    async def on_config_change(self, config):
+        self.update_listen_addresses(config)
+        await self.apply()
+
+    def update_listen_addresses(self, config):
+        listen_addresses = set()
+        for listen_address in config.dns.cache.listen_address:
+            try:
+                listen_addresses.add(ip_address(listen_address.address))
+            except ValueError:
+                logger.error(f"Invalid listen address {listen_address.address}")
+        self.listen_addresses = listen_addresses
 
     def has_listen_address(self, address):
         "Return True if address is a configured listen address"
-        for listen_address in self.config.data.dns.cache.listen_address:
-            if ip_address(listen_address.address) == address:
-                return True
-        return False
+        return address in self.listen_addresses
 
     async def handle_address_add(self, address_event):
         if address_event.ip.ip not in self.addresses:
@@ -86,9 +99,13 @@ class DNSCacheProvider(Provider):
         loop = asyncio.get_running_loop()
         if self.update_timer:
             self.update_timer.cancel()
-        self.update_timer = loop.call_later(self.ADDRESS_RESTART_DELAY, self.apply)
+        self.update_timer = loop.call_later(self.ADDRESS_RESTART_DELAY, self.start_apply)
 
-    def apply(self):
+    def start_apply(self):
+        self.update_timer = None
+        self.apply_task = asyncio.get_running_loop().create_task(self.apply())
+
+    async def apply(self):
         if self.update_timer:
             self.update_timer.cancel()
             self.update_timer = None
@@ -96,33 +113,33 @@ class DNSCacheProvider(Provider):
         config = self.config.data.dns.cache
 
         if not config.enabled:
-            self.stop()
+            await self.systemd.stop_unit_async("unbound.service")
             return
 
         local_config = DNSCacheLocalConfig(config, self.ipam, self.addresses)
-
-        temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
-        temp.write(local_config.generate())
-        temp.flush()
-        temp.close()
-
-        shutil.move(temp.name, LOCAL_CONF)
-        os.chmod(LOCAL_CONF, 0o644)
-
         forward_config = DNSCacheForwardConfig(config)
-
-        temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
-        temp.write(forward_config.generate())
-        temp.flush()
-        temp.close()
-
-        shutil.move(temp.name, FORWARD_CONF)
-        os.chmod(FORWARD_CONF, 0o644)
-
-        self.start()
-
-    def start(self):
-        self.systemd.start_unit("unbound.service")
+        await self.service.run_blocking(
+            "unbound",
+            self.write_config,
+            local_config.generate(),
+            forward_config.generate(),
+        )
+
+        await self.start()
+
+    def write_config(self, local_config, forward_config):
+        for path, text in ((LOCAL_CONF, local_config), (FORWARD_CONF, forward_config)):
+            temp = tempfile.NamedTemporaryFile(delete=False, mode="w")
+            temp.write(text)
+            temp.flush()
+            temp.close()
+
+            shutil.move(temp.name, path)
+            os.chmod(path, 0o644)
+
+    async def start(self):
+        self.update_listen_addresses(self.config.data)
+        await self.systemd.start_unit_async("unbound.service")
 
     def stop(self):
         self.systemd.stop_unit("unbound.service")
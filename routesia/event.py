@@ -3,8 +3,47 @@ routesia/event.py - Base event
 """
 
 from dataclasses import dataclass
+from typing import Hashable
+
+
+# Event priorities, highest first. Control events, such as DHCP leases and
+# interface changes, are handled ahead of state events, which are handled
+# ahead of bulk events, such as routes.
+PRIORITY_CONTROL = 0
+PRIORITY_STATE = 1
+PRIORITY_BULK = 2
+
+PRIORITIES = 3
 
 
 @dataclass
 class Event:
-    pass
+    # Set by the service when the event is published
+    __slots__ = ("published_time",)
+
+    # Set on events reporting that the object identified by the coalesce key
+    # no longer exists
+    is_removal = False
+
+    # Priority of the event, one of the PRIORITY_* values
+    priority = PRIORITY_STATE
+
+    def get_dispatch_key(self) -> Hashable:
+        """
+        Return the key of the object this event concerns.
+
+        Events with the same key are handled in the order they were
+        published. Events with different keys may be handled concurrently.
+        The default key of None places the event in a single shared lane.
+        """
+        return None
+
+    def get_coalesce_key(self) -> Hashable:
+        """
+        Return the key of the state this event reports, or None if the event
+        may not be coalesced.
+
+        When coalescing is enabled, successive events with the same key
+        within the coalescing window are replaced by the latest one.
+        """
+        return None
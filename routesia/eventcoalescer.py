@@ -0,0 +1,79 @@
+"""
+routesia/eventcoalescer.py - Coalescing of bursty state events
+"""
+
+import asyncio
+import logging
+from typing import Callable
+
+from routesia.event import Event
+
+
+logger = logging.getLogger("eventcoalescer")
+
+
+class EventCoalescer:
+    """
+    Collapses successive state events for the same object.
+
+    Events with a coalesce key are held for up to ``window`` seconds. Within
+    the window, each event replaces any held event with the same key, so only
+    the latest state is passed on to ``flush_callback``. Nothing is kept for
+    a key once its event is delivered, so a removal is always passed on, as
+    subscribers may know the object from before the window.
+
+    Events without a coalesce key are returned from ``process()`` straight
+    away and are not delayed.
+
+    ``coalesced`` counts the events dropped, and ``cancelled`` counts the
+    held events of objects removed within the window.
+    """
+    def __init__(self, window: float, flush_callback: Callable[[list[Event]], None]):
+        self.window = window
+        self.flush_callback = flush_callback
+        # Latest held event indexed by coalesce key
+        self.held: dict = {}
+        self.timer: asyncio.TimerHandle | None = None
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self.held)
+
+    def process(self, events: list[Event]) -> list[Event]:
+        """
+        Hold coalescable events and return the rest.
+        """
+        passthrough = []
+        held = self.held
+        for event in events:
+            key = event.get_coalesce_key()
+            if key is None:
+                passthrough.append(event)
+                continue
+            previous = held.get(key)
+            if previous is not None:
+                self.coalesced += 1
+                if event.is_removal and not previous.is_removal:
+                    self.cancelled += 1
+            held[key] = event
+        if held and self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return passthrough
+
+    def flush(self) -> None:
+        """
+        Pass on all held events.
+        """
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        events = list(self.held.values())
+        self.held = {}
+        if events:
+            logger.debug(
+                "Flushing %s coalesced events (%s coalesced in total)",
+                len(events),
+                self.coalesced,
+            )
+            self.flush_callback(events)
@@ -0,0 +1,163 @@
+"""
+routesia/eventdispatcher.py - Ordered, bounded concurrency event dispatch
+"""
+
+import asyncio
+from collections import deque
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from routesia.event import Event, PRIORITIES
+
+
+logger = logging.getLogger("eventdispatcher")
+
+
+MISSING = object()
+
+
+class EventDispatcher:
+    """
+    Dispatches events to a handler through per-key lanes.
+
+    Each event is placed in the lane for the key returned by its
+    ``get_dispatch_key()`` method. Events in the same lane are handled
+    strictly in order, while separate lanes run concurrently with at most
+    ``max_tasks`` handlers in flight.
+
+    A lane worker handles at most ``lane_batch`` events before yielding its
+    slot to any other waiting lane, so a busy lane cannot starve the others
+    or the event loop.
+
+    Lanes waiting for a worker are queued by the ``priority`` of the event
+    that made them ready, and workers are given to higher priority lanes
+    first. To keep lower priorities progressing, a waiting lane that has been
+    passed over ``starvation_limit`` times is given the next worker.
+
+    ``pending`` is the number of events queued in lanes but not started. It is
+    used by the owner to apply backpressure, and ``on_progress`` is called
+    whenever a worker finishes so the owner can re-evaluate it.
+    """
+    def __init__(
+        self,
+        handler: Callable[[Event], Awaitable[Any]],
+        max_tasks: int = 64,
+        lane_batch: int = 256,
+        on_progress: Callable[[], None] | None = None,
+        starvation_limit: int = 16,
+    ):
+        self.handler = handler
+        self.max_tasks = max_tasks
+        self.lane_batch = lane_batch
+        self.on_progress = on_progress
+        self.starvation_limit = starvation_limit
+        # Lanes with pending events or a running worker, indexed by key
+        self.lanes: dict[Hashable, deque] = {}
+        # Keys of lanes with pending events that have no worker, indexed by
+        # priority
+        self.ready: list[deque] = [deque() for _ in range(PRIORITIES)]
+        # Number of times each priority has been passed over while waiting
+        self.skipped = [0] * PRIORITIES
+        self.tasks: set[asyncio.Task] = set()
+        self.pending = 0
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Queue an event in its lane, starting a worker if possible.
+        """
+        key = event.get_dispatch_key()
+        lane = self.lanes.get(key)
+        if lane is None:
+            self.lanes[key] = lane = deque()
+            self.ready[event.priority].append(key)
+        lane.append(event)
+        self.pending += 1
+        self.start_workers()
+
+    def dispatch_many(self, events: list[Event]) -> None:
+        """
+        Queue a batch of events, starting workers once for the batch.
+        """
+        lanes = self.lanes
+        ready = self.ready
+        for event in events:
+            key = event.get_dispatch_key()
+            lane = lanes.get(key)
+            if lane is None:
+                lanes[key] = lane = deque()
+                ready[event.priority].append(key)
+            lane.append(event)
+        self.pending += len(events)
+        self.start_workers()
+
+    def pop_ready(self) -> Hashable:
+        """
+        Return the key of the next lane to get a worker, or MISSING if no lane
+        is waiting.
+        """
+        chosen = None
+        for priority, ready in enumerate(self.ready):
+            if not ready:
+                self.skipped[priority] = 0
+            elif chosen is None:
+                chosen = priority
+            else:
+                self.skipped[priority] += 1
+                if self.skipped[priority] > self.starvation_limit:
+                    chosen = priority
+        if chosen is None:
+            return MISSING
+        self.skipped[chosen] = 0
+        return self.ready[chosen].popleft()
+
+    def start_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        while len(self.tasks) < self.max_tasks:
+            key = self.pop_ready()
+            if key is MISSING:
+                return
+            task = loop.create_task(self.run_lane(key))
+            self.tasks.add(task)
+            task.add_done_callback(self.task_done)
+
+    def task_done(self, task: asyncio.Task) -> None:
+        self.tasks.discard(task)
+        if not task.cancelled():
+            self.start_workers()
+        if self.on_progress:
+            self.on_progress()
+
+    async def run_lane(self, key: Hashable) -> None:
+        lane = self.lanes[key]
+        handled = 0
+        try:
+            while lane:
+                if handled == self.lane_batch:
+                    # Give the slot to the next lane. This lane will get a
+                    # new worker when its turn comes.
+                    self.ready[lane[0].priority].append(key)
+                    return
+                event = lane.popleft()
+                self.pending -= 1
+                handled += 1
+                try:
+                    await self.handler(event)
+                except Exception:
+                    logger.exception("Unhandled failure dispatching %s", event)
+            del self.lanes[key]
+        except asyncio.CancelledError:
+            if self.lanes.get(key) is lane:
+                self.pending -= len(lane)
+                del self.lanes[key]
+            raise
+
+    def cancel(self) -> None:
+        """
+        Cancel all running workers and drop pending events.
+        """
+        for task in list(self.tasks):
+            task.cancel()
+        for ready in self.ready:
+            ready.clear()
+        self.lanes.clear()
+        self.pending = 0
@@ -0,0 +1,97 @@
+"""
+routesia/eventlog.py - Event stream recording
+"""
+
+import gzip
+import logging
+import pickle
+import struct
+import threading
+import time
+from typing import Iterator
+
+from routesia.event import Event
+
+
+logger = logging.getLogger("eventlog")
+
+
+MAGIC = b"RSEL\x01"
+
+# Seconds since recording started and payload length
+FRAME_HEADER = struct.Struct("<dI")
+
+
+class EventLogException(Exception):
+    pass
+
+
+class EventRecorder:
+    """
+    Records events to a compact on-disk log.
+
+    The log is a gzip stream starting with a magic string, followed by one
+    frame per event. Each frame holds the time since recording started, the
+    payload length and the pickled event.
+
+    Events are pickled as-is, so event classes holding objects that cannot
+    be pickled must reduce themselves to plain data (see
+    ``RtnetlinkEvent.__getstate__``). Events that fail to pickle are skipped
+    with a warning.
+
+    ``record()`` may be called from any thread.
+    """
+    def __init__(self, path: str, compresslevel: int = 1):
+        self.path = path
+        self.file = gzip.open(path, "wb", compresslevel=compresslevel)
+        self.file.write(MAGIC)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.recorded = 0
+        self.unpicklable = set()
+
+    def record(self, event: Event) -> None:
+        try:
+            payload = pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if event.__class__ not in self.unpicklable:
+                self.unpicklable.add(event.__class__)
+                logger.warning(f"Cannot record events of type {event.__class__.__name__}")
+            return
+        header = FRAME_HEADER.pack(time.monotonic() - self.started, len(payload))
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(header)
+            self.file.write(payload)
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        logger.info(f"Recorded {self.recorded} events to {self.path}")
+
+
+def read_event_log(path: str) -> Iterator[tuple[float, Event]]:
+    """
+    Iterate over the events in a log, yielding (time, event) tuples.
+    """
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise EventLogException(f"{path} is not an event log")
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < FRAME_HEADER.size:
+                # Truncated by an unclean shutdown
+                logger.warning(f"Truncated event log {path}")
+                return
+            timestamp, length = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning(f"Truncated event log {path}")
+                return
+            yield timestamp, pickle.loads(payload)
@@ -19,10 +19,36 @@ class EventQueue:
 
     The use of eventfd allows for simple thread-safety and integration in
     various event loops.
+
+    By default the eventfd is a semaphore, so each ``get()`` consumes exactly
+    one item and the descriptor stays readable while items remain.
+
+    With ``batch`` set the eventfd is a counter instead. It only signals
+    that the queue became non-empty, so producers write to it once per batch
+    rather than once per item, and ``get_many()`` or ``drain()`` empty the
+    queue with a single read.
+
+    With ``priorities`` greater than one, items are put with a priority from
+    0 (highest) to ``priorities - 1`` and are returned highest priority
+    first, in FIFO order within a priority.
     """
-    def __init__(self) -> None:
-        self.dq = deque()
-        self.fd = eventfd(0, EFD_SEMAPHORE | EFD_NONBLOCK)
+    def __init__(self, batch: bool = False, priorities: int = 1) -> None:
+        self.dqs = [deque() for _ in range(priorities)]
+        # The highest priority queue, which is the only one by default
+        self.dq = self.dqs[0]
+        self.batch = batch
+        # Only used in batch mode. Set when the eventfd has been written but
+        # not yet read so producers can skip redundant writes.
+        self.signalled = False
+        flags = EFD_NONBLOCK
+        if not batch:
+            flags |= EFD_SEMAPHORE
+        self.fd = eventfd(0, flags)
+
+    def __len__(self) -> int:
+        if len(self.dqs) == 1:
+            return len(self.dq)
+        return sum(len(dq) for dq in self.dqs)
 
     def fileno(self) -> int:
         return self.fd
@@ -30,10 +56,83 @@ class EventQueue:
     def close(self) -> None:
         os.close(self.fd)
 
-    def put(self, item: Any) -> None:
-        self.dq.append(item)
+    def signal(self) -> None:
         os.write(self.fd, bytearray(ctypes.c_uint64(1)))
 
+    def put(self, item: Any, priority: int = 0) -> None:
+        self.dqs[priority].append(item)
+        if self.batch:
+            # The item is appended before checking the flag and the consumer
+            # clears the flag after reading the eventfd but before draining,
+            # so an item is never left in the queue without a pending signal.
+            if self.signalled:
+                return
+            self.signalled = True
+        self.signal()
+
     def get(self) -> Any:
+        if self.batch:
+            for dq in self.dqs:
+                if dq:
+                    return dq.popleft()
+            raise BlockingIOError
         os.read(self.fd, ctypes.sizeof(ctypes.c_uint64))
-        return self.dq.popleft()
+        for dq in self.dqs:
+            if dq:
+                return dq.popleft()
+
+    def get_many(self, max_items: int | None = None) -> list:
+        """
+        Return up to ``max_items`` items, or all queued items if not given.
+
+        Returns an empty list if the queue is empty.
+        """
+        if not self.batch:
+            items = []
+            while max_items is None or len(items) < max_items:
+                try:
+                    items.append(self.get())
+                except BlockingIOError:
+                    break
+            return items
+
+        # Consume the signal before clearing the flag. Clearing it first
+        # would let a producer signal in between and have that signal
+        # consumed here, leaving the flag set with nothing to wake the
+        # consumer for later items.
+        try:
+            os.read(self.fd, ctypes.sizeof(ctypes.c_uint64))
+        except BlockingIOError:
+            pass
+        self.signalled = False
+
+        # Producers may append concurrently, so only pop the number of items
+        # seen rather than clearing
+        if len(self.dqs) == 1:
+            dq = self.dq
+            if max_items is None or max_items >= len(dq):
+                count = len(dq)
+            else:
+                count = max_items
+            items = [dq.popleft() for _ in range(count)]
+        else:
+            items = []
+            for dq in self.dqs:
+                count = len(dq)
+                if max_items is not None and count > max_items - len(items):
+                    count = max_items - len(items)
+                items.extend([dq.popleft() for _ in range(count)])
+                if max_items is not None and len(items) >= max_items:
+                    break
+
+        if len(self) and not self.signalled:
+            # Leave the descriptor readable for the remainder
+            self.signalled = True
+            self.signal()
+        return items
+
+    def drain(self) -> list:
+        """
+        Return all queued items.
+        """
+        return self.get_many()
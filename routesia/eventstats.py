@@ -0,0 +1,142 @@
+"""
+routesia/eventstats.py - Event bus instrumentation
+"""
+
+from bisect import bisect_left
+import time
+
+
+# Upper bounds of latency buckets in seconds
+LATENCY_BOUNDS = (
+    0.00001,
+    0.00003,
+    0.0001,
+    0.0003,
+    0.001,
+    0.003,
+    0.01,
+    0.03,
+    0.1,
+    0.3,
+    1,
+    3,
+)
+
+# Upper bounds of queue depth buckets
+DEPTH_BOUNDS = (1, 10, 100, 1000, 10000, 100000)
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets.
+
+    ``counts`` has one entry per bound plus a final overflow bucket. A value
+    is counted in the first bucket whose bound is greater than or equal to
+    it. Recording a value does not allocate.
+    """
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: tuple = LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def record(self, value) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_message(self, message) -> None:
+        "Set message parameters from histogram"
+        message.bounds[:] = self.bounds
+        message.counts[:] = self.counts
+        message.count = self.count
+        message.sum = self.sum
+
+
+class EventClassStats:
+    "Statistics for a single event class"
+    __slots__ = ("name", "handled", "dispatch_delay")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.handled = 0
+        self.dispatch_delay = Histogram()
+
+
+class SubscriberStats:
+    "Statistics for a single subscriber of an event class"
+    __slots__ = ("event_class", "subscriber", "calls", "exceptions", "latency")
+
+    def __init__(self, event_class: str, subscriber: str):
+        self.event_class = event_class
+        self.subscriber = subscriber
+        self.calls = 0
+        self.exceptions = 0
+        self.latency = Histogram()
+
+
+def get_subscriber_name(subscriber) -> str:
+    "Return the qualified name of a subscriber callable"
+    return getattr(subscriber, "__qualname__", None) or repr(subscriber)
+
+
+class EventStats:
+    """
+    Records event bus statistics.
+
+    Statistics are keyed by event class and by event class and subscriber.
+    The objects for each key are created the first time it is seen, after
+    which recording only updates counters.
+    """
+    def __init__(self):
+        self.started = time.monotonic()
+        self.published = 0
+        self.max_queue_depth = 0
+        self.queue_depth = Histogram(DEPTH_BOUNDS)
+        # Indexed by event class
+        self.event_classes: dict[type, EventClassStats] = {}
+        # Indexed by (event class, subscriber)
+        self.subscribers: dict[tuple, SubscriberStats] = {}
+
+    def record_queue_depth(self, depth: int) -> None:
+        self.queue_depth.record(depth)
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def get_event_class_stats(self, event_class: type) -> EventClassStats:
+        stats = self.event_classes.get(event_class)
+        if stats is None:
+            stats = EventClassStats(event_class.__qualname__)
+            self.event_classes[event_class] = stats
+        return stats
+
+    def get_subscriber_stats(self, event_class: type, subscriber) -> SubscriberStats:
+        key = (event_class, subscriber)
+        stats = self.subscribers.get(key)
+        if stats is None:
+            stats = SubscriberStats(
+                event_class.__qualname__, get_subscriber_name(subscriber)
+            )
+            self.subscribers[key] = stats
+        return stats
+
+    def to_message(self, message) -> None:
+        "Set message parameters from recorded statistics"
+        message.uptime = time.monotonic() - self.started
+        message.published = self.published
+        message.max_queue_depth = self.max_queue_depth
+        self.queue_depth.to_message(message.queue_depth_histogram)
+        for stats in self.event_classes.values():
+            class_message = message.event_class.add()
+            class_message.event_class = stats.name
+            class_message.handled = stats.handled
+            stats.dispatch_delay.to_message(class_message.dispatch_delay)
+        for stats in self.subscribers.values():
+            subscriber_message = message.subscriber.add()
+            subscriber_message.event_class = stats.event_class
+            subscriber_message.subscriber = stats.subscriber
+            subscriber_message.calls = stats.calls
+            subscriber_message.exceptions = stats.exceptions
+            stats.latency.to_message(subscriber_message.latency)
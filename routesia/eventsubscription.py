@@ -0,0 +1,107 @@
+"""
+routesia/eventsubscription.py - Filtered and indexed event subscriptions
+"""
+
+from typing import Any, Awaitable, Callable
+
+from routesia.event import Event
+
+
+MISSING = object()
+
+
+def key_values(value: Any) -> frozenset:
+    "Return the set of accepted values for a subscription key"
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return frozenset((value,))
+
+
+class Subscription:
+    """
+    A subscriber to an event class.
+
+    ``keys`` maps event attribute names to the value, or set of values, the
+    attribute must have for the subscriber to be called. If ``predicate`` is
+    given, it must also return True for the event.
+    """
+    def __init__(
+        self,
+        seq: int,
+        subscriber: Callable[[Event], Awaitable[Any]],
+        keys: dict[str, Any] | None = None,
+        predicate: Callable[[Event], bool] | None = None,
+    ):
+        self.seq = seq
+        self.subscriber = subscriber
+        self.keys = {attr: key_values(value) for attr, value in (keys or {}).items()}
+        self.predicate = predicate
+
+    @property
+    def index_key(self) -> str | None:
+        "The key attribute used to index this subscription, if any"
+        return next(iter(self.keys), None)
+
+    def matches(self, event: Event, skip: str | None = None) -> bool:
+        """
+        Return True if the event matches all keys and the predicate.
+
+        ``skip`` names a key attribute already matched through an index.
+        """
+        for attr, values in self.keys.items():
+            if attr != skip and getattr(event, attr, MISSING) not in values:
+                return False
+        if self.predicate is not None and not self.predicate(event):
+            return False
+        return True
+
+
+class EventRoute:
+    """
+    Precomputed subscriptions for a single concrete event class.
+
+    Subscriptions without keys are kept in a list. Subscriptions with keys
+    are indexed by the value of their first key attribute, so finding the
+    subscribers for an event is a dictionary lookup per distinct key
+    attribute rather than a scan over all subscribers.
+    """
+    def __init__(self, subscriptions: list[Subscription]):
+        subscriptions = sorted(subscriptions, key=lambda s: s.seq)
+        self.unfiltered = [s for s in subscriptions if s.index_key is None]
+        self.indexes: dict[str, dict[Any, list[Subscription]]] = {}
+        for subscription in subscriptions:
+            attr = subscription.index_key
+            if attr is None:
+                continue
+            index = self.indexes.setdefault(attr, {})
+            for value in subscription.keys[attr]:
+                index.setdefault(value, []).append(subscription)
+        # Subscribers of the common case of no filters at all
+        self.subscribers = None
+        if not self.indexes and all(s.predicate is None for s in self.unfiltered):
+            self.subscribers = [s.subscriber for s in self.unfiltered]
+
+    def get_subscribers(self, event: Event) -> list[Callable[[Event], Awaitable[Any]]]:
+        """
+        Return the subscribers for the event, in subscription order.
+        """
+        if self.subscribers is not None:
+            return self.subscribers
+
+        candidates = [(s, None) for s in self.unfiltered]
+        sources = 1 if candidates else 0
+        for attr, index in self.indexes.items():
+            value = getattr(event, attr, MISSING)
+            if value is MISSING:
+                continue
+            matched = index.get(value)
+            if matched:
+                candidates.extend((s, attr) for s in matched)
+                sources += 1
+        if sources > 1:
+            candidates.sort(key=lambda candidate: candidate[0].seq)
+        return [
+            subscription.subscriber
+            for subscription, skip in candidates
+            if subscription.matches(event, skip)
+        ]
@@ -0,0 +1,58 @@
+"""
+routesia/feature.py - Optional feature loading
+"""
+
+import logging
+
+from routesia.config.provider import ConfigProvider
+from routesia.rpc import RPC
+from routesia.service import Provider, Service
+
+
+logger = logging.getLogger("feature")
+
+
+class FeatureProvider(Provider):
+    """
+    Loads the providers of features that may be disabled in the config, so
+    those of disabled features are neither imported nor started.
+
+    ``features`` holds the dotted path of each provider, the prefix of the
+    RPC methods it registers, and a callable returning whether a config
+    enables it. Providers of features enabled in the running config are
+    loaded on start, and those enabled later once the config is committed.
+    The others are loaded on the first call to one of their methods.
+    """
+    def __init__(self, service: Service, config: ConfigProvider, rpc: RPC, features=()):
+        self.service = service
+        self.config = config
+        self.rpc = rpc
+        self.features = features
+        self.loaded = set()
+
+        self.config.register_change_handler(self.on_config_change)
+
+    async def on_config_change(self, config):
+        for path, prefix, enabled in self.features:
+            if path not in self.loaded and enabled(config):
+                await self.load(path)
+
+    async def start(self):
+        for path, prefix, enabled in self.features:
+            if enabled(self.config.data):
+                await self.load(path)
+            else:
+                logger.info(f"Not loading {path} until configured")
+                self.rpc.register_loader(prefix, self.get_loader(path))
+
+    async def load(self, path: str):
+        if path in self.loaded:
+            return
+        self.loaded.add(path)
+        logger.info(f"Loading {path}")
+        await self.service.load_provider(path)
+
+    def get_loader(self, path: str):
+        async def load():
+            await self.load(path)
+        return load
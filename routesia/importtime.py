@@ -0,0 +1,110 @@
+"""
+routesia/importtime.py - Module import time measurement
+"""
+
+import inspect
+import logging
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger("importtime")
+
+
+class ModuleImportTime:
+    "Time taken to execute a module, with and without its own imports"
+    __slots__ = ("name", "depth", "self_time", "cumulative_time")
+
+    def __init__(self, name: str, depth: int, self_time: float, cumulative_time: float):
+        self.name = name
+        self.depth = depth
+        self.self_time = self_time
+        self.cumulative_time = cumulative_time
+
+
+class ImportTimer:
+    """
+    Measures the time taken to import each module, similar to
+    ``python -X importtime``.
+
+    Once installed, modules found through ``sys.meta_path`` have the
+    execution of their loader timed. Only modules imported after
+    ``install()`` are measured, so it should be installed before importing
+    anything expensive. Builtin and frozen modules are not measured.
+    """
+    def __init__(self):
+        # In the order imports finished
+        self.modules: list[ModuleImportTime] = []
+        self.local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Builtin and frozen importers are classes shared by all their
+        # modules. Other loaders are created per module and can be wrapped.
+        if loader is not None and not inspect.isclass(loader) and hasattr(loader, "exec_module"):
+            loader.exec_module = self.wrap(fullname, loader.exec_module)
+        return spec
+
+    def wrap(self, name: str, exec_module):
+        def timed_exec_module(module):
+            # Each entry is the cumulative time of the imports made so far by
+            # the module being executed at that depth
+            stack = getattr(self.local, "stack", None)
+            if stack is None:
+                stack = self.local.stack = []
+            depth = len(stack)
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.modules.append(ModuleImportTime(name, depth, elapsed - children, elapsed))
+        return timed_exec_module
+
+    @property
+    def total(self) -> float:
+        "Total time spent importing top level modules"
+        return sum(module.cumulative_time for module in self.modules if module.depth == 0)
+
+    def report(self, limit: int | None = None) -> list[str]:
+        """
+        Return report lines for the modules with the highest self time.
+        """
+        modules = sorted(self.modules, key=lambda module: module.self_time, reverse=True)
+        lines = [
+            f"Imported {len(self.modules)} modules in {self.total * 1000:.1f}ms",
+            f"{'self [ms]':>10} {'cumulative [ms]':>16}  module",
+        ]
+        for module in modules[:limit]:
+            lines.append(
+                f"{module.self_time * 1000:10.2f} {module.cumulative_time * 1000:16.2f}  {module.name}"
+            )
+        return lines
+
+    def log(self, limit: int | None = 20) -> None:
+        for line in self.report(limit):
+            logger.info(line)
@@ -10,7 +10,7 @@ import logging
 import paho.mqtt.client as mqtt
 
 from routesia.event import Event
-from routesia.service import Provider
+from routesia.service import Provider, Service
 
 
 logger = logging.getLogger("mqtt")
@@ -23,8 +23,9 @@ class MQTTEvent(Event):
 
 
 class MQTT(Provider):
-    def __init__(self, host='localhost', port=1883, client=mqtt.Client):
+    def __init__(self, service: Service, host='localhost', port=1883, client=mqtt.Client):
         super().__init__()
+        self.service = service
         self.host = host
         self.port = port
         self.subscribers = {}
@@ -82,7 +83,10 @@ class MQTT(Provider):
 
     def on_message(self, client, obj, message):
         logger.debug(f"Received {message.topic}")
-        self.messagequeue.put_nowait(MQTTEvent(message.topic, message.payload))
+        event = MQTTEvent(message.topic, message.payload)
+        if self.service.event_recorder:
+            self.service.event_recorder.record(event)
+        self.messagequeue.put_nowait(event)
 
     def subscribe(self, topic, callback):
         if topic in self.subscribers:
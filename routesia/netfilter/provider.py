@@ -5,7 +5,7 @@ routesia/netfilter/provider.py - Netfilter provider
 import logging
 
 from routesia.config.provider import ConfigProvider
-from routesia.service import Provider
+from routesia.service import Provider, Service
 from routesia.netfilter.config import NetfilterConfig
 from routesia.netfilter.nftables import Nftables
 from routesia.rpc import RPC
@@ -16,7 +16,8 @@ logger = logging.getLogger("netfilter")
 
 
 class NetfilterProvider(Provider):
-    def __init__(self, config: ConfigProvider, rpc: RPC):
+    def __init__(self, service: Service, config: ConfigProvider, rpc: RPC):
+        self.service = service
         self.config = config
         self.rpc = rpc
         self.nft = Nftables()
@@ -27,30 +28,31 @@ class NetfilterProvider(Provider):
         self.rpc.register("netfilter/config/get", self.rpc_config_get)
         self.rpc.register("netfilter/config/update", self.rpc_config_update)
 
-    def on_config_change(self, config):
-        self.apply()
+    async def on_config_change(self, config):
+        await self.apply()
 
-    def apply(self):
+    async def apply(self):
         if not self.config.data.netfilter.enabled:
             if self.applied:
                 # Just disabled
-                self.flush()
+                await self.flush()
             return
 
         logger.info("Applying nftables")
         config = NetfilterConfig(self.config.data.netfilter)
-        self.nft.cmd(str(config))
+        await self.service.run_blocking("nftables", self.nft.cmd, str(config))
         self.applied = True
 
-    def flush(self):
+    async def flush(self):
         logger.info("Flushing nftables")
-        self.nft.cmd("flush ruleset")
+        await self.service.run_blocking("nftables", self.nft.cmd, "flush ruleset")
+        self.applied = False
 
-    def start(self):
-        self.apply()
+    async def start(self):
+        await self.apply()
 
-    def stop(self):
-        self.flush()
+    async def stop(self):
+        await self.flush()
 
     async def rpc_config_get(self) -> netfilter_pb2.NetfilterConfig:
         return self.config.staged_data.netfilter
@@ -8,57 +8,71 @@ import asyncio
 import logging
 import sys
 
-from routesia.address.cli import AddressCLI
-from routesia.cli import CLI
-from routesia.config.cli import ConfigCLI
-from routesia.dhcp.client.cli import DHCPClientCLI
-from routesia.dhcp.server.cli import DHCPServerCLI
-from routesia.dns.authoritative.cli import DNSAuthoritativeCLI
-from routesia.dns.cache.cli import DNSCacheCLI
-from routesia.interface.cli import InterfaceCLI
-from routesia.ipam.cli import IPAMCLI
+from routesia.importtime import ImportTimer
 from routesia.service import Service
-from routesia.mqtt import MQTT
-from routesia.netfilter.cli import NetfilterCLI
-from routesia.rpcclient import RPCClient
-from routesia.route.cli import RouteCLI
-from routesia.schema.registry import SchemaRegistry
+
+
+# Command line providers, indexed by the first word of their commands. When
+# rcl is given a command, only the providers for that command are imported.
+CLI_PROVIDERS = {
+    "address": ("routesia.address.cli.AddressCLI",),
+    "config": ("routesia.config.cli.ConfigCLI",),
+    "dhcp": (
+        "routesia.dhcp.client.cli.DHCPClientCLI",
+        "routesia.dhcp.server.cli.DHCPServerCLI",
+    ),
+    "dns": (
+        "routesia.dns.authoritative.cli.DNSAuthoritativeCLI",
+        "routesia.dns.cache.cli.DNSCacheCLI",
+    ),
+    "interface": ("routesia.interface.cli.InterfaceCLI",),
+    "ipam": ("routesia.ipam.cli.IPAMCLI",),
+    "netfilter": ("routesia.netfilter.cli.NetfilterCLI",),
+    "route": ("routesia.route.cli.RouteCLI",),
+}
 
 
 
 async def run() -> int:
     parser = argparse.ArgumentParser("rcl", description="Routesia command line interface")
     parser.add_argument("--debug", action="store_true", help="Enable debug output")
+    parser.add_argument("--import-time", action="store_true", help="Report the time taken to import each module")
     parser.add_argument("command", help="Command to run", nargs="*")
     args = parser.parse_args()
 
+    import_timer = None
+    if args.import_time:
+        import_timer = ImportTimer()
+        import_timer.install()
+
     if args.debug:
         handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter("[%(levelname)s:%(name)s] %(msg)s"))
+        handler.setFormatter(logging.Formatter("[%(levelname)s:%(name)s] %(message)s"))
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.DEBUG)
         root_logger.addHandler(handler)
 
     service = Service()
-    service.add_provider(AddressCLI)
-    service.add_provider(CLI)
-    service.add_provider(ConfigCLI)
-    service.add_provider(DHCPClientCLI)
-    service.add_provider(DHCPServerCLI)
-    service.add_provider(DNSAuthoritativeCLI)
-    service.add_provider(DNSCacheCLI)
-    service.add_provider(InterfaceCLI)
-    service.add_provider(IPAMCLI)
-    service.add_provider(MQTT)
-    service.add_provider(NetfilterCLI)
-    service.add_provider(RPCClient, prefix="routesia/agent/rpc")
-    service.add_provider(RouteCLI)
-    service.add_provider(SchemaRegistry)
+    service.add_provider("routesia.cli.CLI")
+    command_paths = None
+    if args.command and args.command[0].split():
+        command_paths = CLI_PROVIDERS.get(args.command[0].split()[0])
+    for paths in [command_paths] if command_paths else CLI_PROVIDERS.values():
+        for path in paths:
+            service.add_provider(path)
+    service.add_optional_provider("routesia.mqtt.MQTT")
+    service.add_optional_provider("routesia.rpcclient.RPCClient", prefix="routesia/agent/rpc")
+    service.add_optional_provider("routesia.schema.registry.SchemaRegistry")
 
     await service.start_background()
+    # Imported by the service by now
+    from routesia.cli import CLI
     cli = await service.get_provider(CLI)
     ret = await handle(cli, args)
     await service.stop_background()
+    if import_timer:
+        for line in import_timer.report(20):
+            print(line, file=sys.stderr)
     return ret
 
 
@@ -3,36 +3,99 @@
 # routesia -- Routing system
 #
 
+import argparse
 import asyncio
 import logging
 import os
 import sys
 from systemd.journal import JournalHandler
 
-from routesia.address.provider import AddressProvider
-from routesia.config.provider import ConfigProvider
-from routesia.dhcp.client.provider import DHCPClientProvider
-from routesia.dhcp.server.provider import DHCPServerProvider
-from routesia.dns.authoritative.provider import AuthoritativeDNSProvider
-from routesia.dns.cache.provider import DNSCacheProvider
-from routesia.interface.provider import InterfaceProvider
-from routesia.ipam.provider import IPAMProvider
-from routesia.mqtt import MQTT
-from routesia.netfilter.provider import NetfilterProvider
-from routesia.route.provider import RouteProvider
-from routesia.rpc import RPC
-from routesia.rtnetlink.provider import IPRouteProvider
+from routesia.eventlog import EventRecorder
+from routesia.importtime import ImportTimer
 from routesia.service import Service
-from routesia.schema.registry import SchemaRegistry
-from routesia.systemd import SystemdProvider
+
+
+# Provider modules are only imported when the service loads them. Those in
+# OPTIONAL_PROVIDERS are only imported if another provider requires them.
+PROVIDERS = (
+    "routesia.address.provider.AddressProvider",
+    "routesia.config.provider.ConfigProvider",
+    "routesia.dhcp.client.provider.DHCPClientProvider",
+    "routesia.interface.provider.InterfaceProvider",
+    "routesia.ipam.provider.IPAMProvider",
+    "routesia.route.provider.RouteProvider",
+)
+
+# Providers of features only imported and started once enabled in the
+# config, or once their RPC methods are called to configure them. See
+# FeatureProvider.
+FEATURES = (
+    (
+        "routesia.dhcp.server.provider.DHCPServerProvider",
+        "dhcp/server",
+        lambda config: bool(config.dhcp.server.v4.interface),
+    ),
+    (
+        "routesia.dns.authoritative.provider.AuthoritativeDNSProvider",
+        "dns/authoritative",
+        lambda config: config.dns.authoritative.enabled,
+    ),
+    (
+        "routesia.dns.cache.provider.DNSCacheProvider",
+        "dns/cache",
+        lambda config: config.dns.cache.enabled,
+    ),
+    (
+        "routesia.netfilter.provider.NetfilterProvider",
+        "netfilter",
+        lambda config: config.netfilter.enabled,
+    ),
+)
+
+OPTIONAL_PROVIDERS = (
+    "routesia.mqtt.MQTT",
+    "routesia.schema.registry.SchemaRegistry",
+    "routesia.systemd.SystemdProvider",
+)
 
 
 async def run():
+    parser = argparse.ArgumentParser("routesia", description="Routesia agent")
+    parser.add_argument(
+        "--coalesce-window",
+        type=float,
+        metavar="SECONDS",
+        help="Collapse successive state events for the same object within this window",
+    )
+    parser.add_argument(
+        "--record-events",
+        metavar="PATH",
+        help="Record all events to PATH for later replay with routesia-replay",
+    )
+    parser.add_argument(
+        "--netlink-rcvbuf",
+        type=int,
+        default=8388608,
+        metavar="BYTES",
+        help="Receive buffer size for netlink notifications",
+    )
+    parser.add_argument(
+        "--import-time",
+        action="store_true",
+        help="Log the time taken to import each module once started",
+    )
+    args = parser.parse_args()
+
+    import_timer = None
+    if args.import_time:
+        import_timer = ImportTimer()
+        import_timer.install()
+
     if "JOURNAL_STREAM" in os.environ:
         handler = JournalHandler()
     else:
         handler = logging.StreamHandler(sys.stdout)
-        handler.setFormatter(logging.Formatter("[%(levelname)s:%(name)s] %(msg)s"))
+        handler.setFormatter(logging.Formatter("[%(levelname)s:%(name)s] %(message)s"))
 
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
@@ -47,23 +110,20 @@ async def run():
         with open(sysctl, "w") as f:
             f.write("1")
 
-    service = Service()
-
-    service.add_provider(AddressProvider)
-    service.add_provider(AuthoritativeDNSProvider)
-    service.add_provider(ConfigProvider)
-    service.add_provider(DHCPClientProvider)
-    service.add_provider(DHCPServerProvider)
-    service.add_provider(DNSCacheProvider)
-    service.add_provider(InterfaceProvider)
-    service.add_provider(IPAMProvider)
-    service.add_provider(IPRouteProvider)
-    service.add_provider(MQTT)
-    service.add_provider(NetfilterProvider)
-    service.add_provider(RouteProvider)
-    service.add_provider(RPC, prefix="routesia/agent/rpc")
-    service.add_provider(SchemaRegistry)
-    service.add_provider(SystemdProvider)
+    service = Service(coalesce_window=args.coalesce_window)
+    if args.record_events:
+        service.event_recorder = EventRecorder(args.record_events)
+
+    service.import_timer = import_timer
+    for path in PROVIDERS:
+        service.add_provider(path)
+    service.add_provider("routesia.feature.FeatureProvider", features=FEATURES)
+    for path in OPTIONAL_PROVIDERS:
+        service.add_optional_provider(path)
+    service.add_optional_provider(
+        "routesia.rtnetlink.provider.IPRouteProvider", rcvbuf=args.netlink_rcvbuf
+    )
+    service.add_optional_provider("routesia.rpc.RPC", prefix="routesia/agent/rpc")
 
     logger.info("Starting Routesia")
 
@@ -71,6 +131,9 @@ async def run():
         await service.run()
     except KeyboardInterrupt:
         logger.info("Exiting on keyboard interrupt")
+    finally:
+        if service.event_recorder:
+            service.event_recorder.close()
 
 def main():
     try:
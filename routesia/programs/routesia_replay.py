@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+#
+# routesia-replay -- Replay a recorded event log
+#
+
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+import time
+
+from routesia.address.provider import AddressProvider
+from routesia.config.provider import ConfigProvider
+from routesia.eventlog import read_event_log
+from routesia.interface.provider import InterfaceProvider
+from routesia.ipam.provider import IPAMProvider
+from routesia.mqtt import MQTT, MQTTEvent
+from routesia.route.provider import RouteProvider
+from routesia.rpc import RPC
+from routesia.rtnetlink.batch import NetlinkBatch
+from routesia.rtnetlink.provider import DUMPS, IPRouteProvider, RT_PROTO
+from routesia.schema.registry import SchemaRegistry
+from routesia.service import Service
+from routesia.systemd import SystemdProvider
+
+
+logger = logging.getLogger("replay")
+
+
+class NullIPRoute:
+    """
+    Stands in for pyroute2's IPRoute. All requests succeed and return
+    nothing.
+    """
+    def __init__(self):
+        self.requests = 0
+
+    def __getattr__(self, name):
+        def request(*args, **kwargs):
+            self.requests += 1
+            return []
+        return request
+
+
+class NullNetlinkBatch(NetlinkBatch):
+    """
+    NetlinkBatch that counts its requests on a NullIPRoute instead of
+    sending them. All requests succeed.
+    """
+    def __init__(self, iproute: NullIPRoute):
+        super().__init__(None)
+        self.iproute = iproute
+
+    def commit(self):
+        requests = self.requests
+        self.requests = []
+        for request in requests:
+            self.iproute.requests += 1
+            if request.callback:
+                request.callback(None)
+        return []
+
+    def send_blackholes(self, command, destinations, table, proto):
+        for _ in destinations:
+            self.iproute.requests += 1
+        return []
+
+
+class ReplayIPRouteProvider(IPRouteProvider):
+    """
+    IPRouteProvider that never touches the kernel. Interface maps are
+    updated from replayed events.
+    """
+    def __init__(self, service: Service):
+        self.service = service
+        self.iproute = NullIPRoute()
+        self.rt_proto = RT_PROTO
+        self.interface_map = {}
+        self.interface_name_map = {}
+        self.kernel_state = {kind: {} for kind, _, _, _ in DUMPS}
+        self.kinds = set()
+        self.route_tables = None
+
+    @classmethod
+    def get_provider_class(cls):
+        return IPRouteProvider
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def batch(self):
+        return NullNetlinkBatch(self.iproute)
+
+    def bulk_batch(self):
+        return NullNetlinkBatch(self.iproute)
+
+    def dump_nexthops(self):
+        return iter(())
+
+    def dump_own_routes(self):
+        return iter(())
+
+    def replay_event(self, event):
+        self.publish(event)
+
+
+class ReplaySystemdProvider(SystemdProvider):
+    "SystemdProvider that does not talk to systemd"
+    def __init__(self, service: Service):
+        self.service = service
+        self.units = {}
+
+    @classmethod
+    def get_provider_class(cls):
+        return SystemdProvider
+
+    def start_unit(self, unit):
+        self.units[unit] = True
+
+    def stop_unit(self, unit):
+        self.units[unit] = False
+
+
+class NullMQTTClient:
+    "MQTT client that connects immediately and discards published messages"
+    def connect(self, host, port=1883, keepalive=60, bind_address=""):
+        self.on_connect(self, None, 0, 0)
+
+    def subscribe(self, topic, qos=0):
+        pass
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        pass
+
+    def loop_misc(self) -> int:
+        return 0
+
+
+def is_idle(service: Service, mqtt: MQTT) -> bool:
+    coalescer = service.event_coalescer
+    return not (
+        len(service.eventqueue)
+        or service.event_dispatcher.pending
+        or service.event_dispatcher.tasks
+        or (coalescer and len(coalescer))
+        or not mqtt.messagequeue.empty()
+    )
+
+
+async def wait_idle(service: Service, mqtt: MQTT):
+    while not is_idle(service, mqtt):
+        await asyncio.sleep(0)
+
+
+async def replay(args) -> int:
+    logger.info(f"Loading {args.log}")
+    events = [event for _, event in read_event_log(args.log)]
+    logger.info(f"Loaded {len(events)} events")
+
+    service = Service(coalesce_window=args.coalesce_window)
+    service.add_provider(AddressProvider)
+    service.add_provider(ConfigProvider, location=args.config or tempfile.mkdtemp())
+    service.add_provider(InterfaceProvider)
+    service.add_provider(IPAMProvider)
+    service.add_provider(ReplayIPRouteProvider)
+    service.add_provider(MQTT, client=NullMQTTClient)
+    service.add_provider(RouteProvider)
+    service.add_provider(RPC, prefix="routesia/agent/rpc")
+    service.add_provider(SchemaRegistry)
+    service.add_provider(ReplaySystemdProvider)
+
+    await service.start_background()
+    await service.wait_start()
+
+    iproute = await service.get_provider(IPRouteProvider)
+    mqtt = await service.get_provider(MQTT)
+
+    start = time.perf_counter()
+    for i, event in enumerate(events, 1):
+        if isinstance(event, MQTTEvent):
+            mqtt.messagequeue.put_nowait(event)
+        else:
+            iproute.replay_event(event)
+        if i % args.chunk == 0:
+            await wait_idle(service, mqtt)
+    await wait_idle(service, mqtt)
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {len(events)} events in {elapsed:.3f}s ({len(events) / elapsed:.0f} events/sec)")
+    print(f"Kernel requests: {iproute.iproute.requests}")
+    print("Slowest subscribers by total time:")
+    subscribers = sorted(
+        service.event_stats.subscribers.values(),
+        key=lambda stats: stats.latency.sum,
+        reverse=True,
+    )
+    for stats in subscribers[:args.top]:
+        print(
+            f"  {stats.latency.sum:9.3f}s {stats.calls:9} calls "
+            f"{stats.exceptions:6} exceptions  {stats.event_class} -> {stats.subscriber}"
+        )
+
+    await service.stop_background()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        "routesia-replay",
+        description="Replay a recorded event log against stub kernel and systemd providers",
+    )
+    parser.add_argument("log", help="Event log recorded with routesia --record-events")
+    parser.add_argument("--config", help="Config directory. Defaults to an empty config")
+    parser.add_argument("--chunk", type=int, default=10000, help="Events to publish before waiting for the service to catch up")
+    parser.add_argument("--coalesce-window", type=float, metavar="SECONDS", help="Enable event coalescing")
+    parser.add_argument("--top", type=int, default=10, help="Number of subscribers to report")
+    parser.add_argument("--debug", action="store_true", help="Enable debug output")
+    args = parser.parse_args()
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("[%(levelname)s:%(name)s] %(message)s"))
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG if args.debug else logging.INFO)
+    root_logger.addHandler(handler)
+
+    try:
+        sys.exit(asyncio.run(replay(args)))
+    except KeyboardInterrupt:
+        pass
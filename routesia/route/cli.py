@@ -27,16 +27,34 @@ class RouteCLI(Provider):
         self.cli.add_argument_completer("destination", self.complete_destination)
         self.cli.add_argument_completer("nexthop-gateway", self.complete_nexthop_gateway)
         self.cli.add_argument_completer("nexthop-interface", self.complete_nexthop_interface)
+        self.cli.add_argument_completer("nexthop-group", self.complete_nexthop_group)
+        self.cli.add_argument_completer("prefix-list", self.complete_prefix_list)
 
         self.cli.add_command("route show @table!system-table", self.show_route)
         self.cli.add_command("route table show", self.show_table)
+        self.cli.add_command("route lookup *address! @table!system-table @kernel", self.lookup)
+        self.cli.add_command("route reconcile run", self.reconcile)
+        self.cli.add_command("route reconcile stats", self.show_reconcile_stats)
+        self.cli.add_command("route prefix-list show", self.show_prefix_lists)
+        self.cli.add_command("route prefix-list reload @prefix-list", self.reload_prefix_list)
         self.cli.add_command("route config table add :table! :name", self.add_table)
         self.cli.add_command("route config table update :table @name", self.update_table)
         self.cli.add_command("route config table delete :table", self.delete_table)
-        self.cli.add_command("route config route add :destination @table @gateway @interface @hops", self.add_route)
+        self.cli.add_command("route config table dampening set :table @penalty @suppress-threshold @reuse-threshold @half-life @max-suppress-time @hold-down", self.set_table_dampening)
+        self.cli.add_command("route config table dampening disable :table", self.disable_table_dampening)
+        self.cli.add_command("route config table blackhole add :table :prefix-list", self.add_table_blackhole)
+        self.cli.add_command("route config table blackhole delete :table :prefix-list", self.delete_table_blackhole)
+        self.cli.add_command("route config prefix-list add :prefix-list! :path", self.add_prefix_list)
+        self.cli.add_command("route config prefix-list update :prefix-list :path", self.update_prefix_list)
+        self.cli.add_command("route config prefix-list delete :prefix-list", self.delete_prefix_list)
+        self.cli.add_command("route config route add :destination @table @gateway @interface @hops @nexthop-group", self.add_route)
         self.cli.add_command("route config route delete @destination @table", self.delete_route)
         self.cli.add_command("route config route nexthop add @destination @table @gateway @interface @hops", self.add_nexthop)
         self.cli.add_command("route config route nexthop delete @destination @table @gateway @interface", self.delete_nexthop)
+        self.cli.add_command("route config nexthop-group add :nexthop-group!", self.add_nexthop_group)
+        self.cli.add_command("route config nexthop-group delete :nexthop-group", self.delete_nexthop_group)
+        self.cli.add_command("route config nexthop-group nexthop add :nexthop-group @gateway @interface @hops", self.add_nexthop_group_nexthop)
+        self.cli.add_command("route config nexthop-group nexthop delete :nexthop-group @gateway @interface", self.delete_nexthop_group_nexthop)
 
     async def complete_system_table(self):
         completions = []
@@ -64,6 +82,19 @@ class RouteCLI(Provider):
     async def show_table(self):
         return await self.rpc.request("route/table/list")
 
+    async def lookup(self, address: list[str], table: UInt32 = 0, kernel: bool = False):
+        request = route_pb2.RouteLookupRequest()
+        request.address.extend(address)
+        request.table_id = table
+        request.kernel = kernel
+        return await self.rpc.request("route/lookup", request)
+
+    async def reconcile(self):
+        return await self.rpc.request("route/reconcile/run")
+
+    async def show_reconcile_stats(self):
+        return await self.rpc.request("route/reconcile/stats")
+
     async def add_table(self, table: UInt32, name: str | None = None):
         table_config = route_pb2.RouteTableConfig()
         table_config.id = table
@@ -102,6 +133,90 @@ class RouteCLI(Provider):
         table_config.id = table
         await self.rpc.request("route/config/table/delete", table_config)
 
+    async def get_table_config(self, table: UInt32) -> route_pb2.RouteTableConfig:
+        config = await self.rpc.request("route/config/get")
+        for table_config in config.table:
+            if table_config.id == table:
+                return table_config
+        raise InvalidArgument("Table %s does not exist" % table)
+
+    async def set_table_dampening(
+        self,
+        table: UInt32,
+        penalty: UInt32 | None = None,
+        suppress_threshold: UInt32 | None = None,
+        reuse_threshold: UInt32 | None = None,
+        half_life: UInt32 | None = None,
+        max_suppress_time: UInt32 | None = None,
+        hold_down: UInt32 | None = None,
+    ):
+        table_config = await self.get_table_config(table)
+        dampening = table_config.dampening
+        dampening.enabled = True
+        if penalty is not None:
+            dampening.penalty = penalty
+        if suppress_threshold is not None:
+            dampening.suppress_threshold = suppress_threshold
+        if reuse_threshold is not None:
+            dampening.reuse_threshold = reuse_threshold
+        if half_life is not None:
+            dampening.half_life = half_life
+        if max_suppress_time is not None:
+            dampening.max_suppress_time = max_suppress_time
+        if hold_down is not None:
+            dampening.hold_down = hold_down
+        await self.rpc.request("route/config/table/update", table_config)
+
+    async def disable_table_dampening(self, table: UInt32):
+        table_config = await self.get_table_config(table)
+        table_config.dampening.enabled = False
+        await self.rpc.request("route/config/table/update", table_config)
+
+    async def add_table_blackhole(self, table: UInt32, prefix_list: str):
+        table_config = route_pb2.RouteTableConfig()
+        table_config.id = table
+        table_config.blackhole_list.append(prefix_list)
+        await self.rpc.request("route/config/table/blackhole_list/add", table_config)
+
+    async def delete_table_blackhole(self, table: UInt32, prefix_list: str):
+        table_config = route_pb2.RouteTableConfig()
+        table_config.id = table
+        table_config.blackhole_list.append(prefix_list)
+        await self.rpc.request("route/config/table/blackhole_list/delete", table_config)
+
+    async def complete_prefix_list(self):
+        completions = []
+        config = await self.rpc.request("route/config/get")
+        for prefix_list in config.prefix_list:
+            completions.append(prefix_list.name)
+        return completions
+
+    async def show_prefix_lists(self):
+        return await self.rpc.request("route/prefix_list/list")
+
+    async def reload_prefix_list(self, prefix_list: str | None = None):
+        prefix_list_config = route_pb2.RoutePrefixListConfig()
+        if prefix_list is not None:
+            prefix_list_config.name = prefix_list
+        return await self.rpc.request("route/prefix_list/reload", prefix_list_config)
+
+    async def add_prefix_list(self, prefix_list: str, path: str):
+        prefix_list_config = route_pb2.RoutePrefixListConfig()
+        prefix_list_config.name = prefix_list
+        prefix_list_config.path = path
+        await self.rpc.request("route/config/prefix_list/add", prefix_list_config)
+
+    async def update_prefix_list(self, prefix_list: str, path: str):
+        prefix_list_config = route_pb2.RoutePrefixListConfig()
+        prefix_list_config.name = prefix_list
+        prefix_list_config.path = path
+        await self.rpc.request("route/config/prefix_list/update", prefix_list_config)
+
+    async def delete_prefix_list(self, prefix_list: str):
+        prefix_list_config = route_pb2.RoutePrefixListConfig()
+        prefix_list_config.name = prefix_list
+        await self.rpc.request("route/config/prefix_list/delete", prefix_list_config)
+
     async def complete_interface(self):
         completions = []
         interfaces = await self.rpc.request("interface/config/list")
@@ -116,18 +231,24 @@ class RouteCLI(Provider):
         gateway: IPv4Address | IPv6Address | None = None,
         interface: str | None = None,
         hops: UInt32 | None = None,
+        nexthop_group: UInt32 | None = None,
     ):
         table_config = route_pb2.RouteTableConfig()
         table_config.id = table
         route = table_config.route.add()
         route.destination = str(destination)
-        nexthop = route.nexthop.add()
-        if gateway is not None:
-            nexthop.gateway = str(gateway)
-        if interface is not None:
-            nexthop.interface = interface
-        if hops is not None:
-            nexthop.hops = hops
+        if nexthop_group is not None:
+            if gateway is not None or interface is not None or hops is not None:
+                raise InvalidArgument("Nexthop group cannot be given with nexthop arguments")
+            route.nexthop_group = nexthop_group
+        else:
+            nexthop = route.nexthop.add()
+            if gateway is not None:
+                nexthop.gateway = str(gateway)
+            if interface is not None:
+                nexthop.interface = interface
+            if hops is not None:
+                nexthop.hops = hops
         await self.rpc.request("route/config/route/add", table_config)
 
     async def complete_destination(self, table: UInt32 = DEFAULT_TABLE):
@@ -248,3 +369,63 @@ class RouteCLI(Provider):
             break
 
         await self.rpc.request("route/config/route/update", table_config)
+
+    async def complete_nexthop_group(self):
+        completions = []
+        config = await self.rpc.request("route/config/get")
+        for group in config.nexthop_group:
+            completions.append(str(group.id))
+        return completions
+
+    async def add_nexthop_group(self, nexthop_group: UInt32):
+        group = route_pb2.RouteNextHopGroupConfig()
+        group.id = nexthop_group
+        await self.rpc.request("route/config/nexthop_group/add", group)
+
+    async def delete_nexthop_group(self, nexthop_group: UInt32):
+        group = route_pb2.RouteNextHopGroupConfig()
+        group.id = nexthop_group
+        await self.rpc.request("route/config/nexthop_group/delete", group)
+
+    async def add_nexthop_group_nexthop(
+        self,
+        nexthop_group: UInt32,
+        gateway: IPv4Address | IPv6Address | None = None,
+        interface: str | None = None,
+        hops: UInt32 | None = None,
+    ):
+        group = route_pb2.RouteNextHopGroupConfig()
+        group.id = nexthop_group
+        group = await self.rpc.request("route/config/nexthop_group/get", group)
+
+        nexthop = group.nexthop.add()
+        if gateway is not None:
+            nexthop.gateway = str(gateway)
+        if interface is not None:
+            nexthop.interface = interface
+        if hops is not None:
+            nexthop.hops = hops
+        await self.rpc.request("route/config/nexthop_group/update", group)
+
+    async def delete_nexthop_group_nexthop(
+        self,
+        nexthop_group: UInt32,
+        gateway: IPv4Address | IPv6Address | None = None,
+        interface: str | None = None,
+    ):
+        group = route_pb2.RouteNextHopGroupConfig()
+        group.id = nexthop_group
+        group = await self.rpc.request("route/config/nexthop_group/get", group)
+
+        if gateway is not None:
+            gateway = str(gateway)
+
+        for i, nexthop in enumerate(group.nexthop):
+            if gateway is not None and nexthop.gateway != gateway:
+                continue
+            if interface is not None and nexthop.interface != interface:
+                continue
+            del group.nexthop[i]
+            break
+
+        await self.rpc.request("route/config/nexthop_group/update", group)
@@ -0,0 +1,181 @@
+"""
+routesia/route/dampening.py - Route flap dampening
+"""
+
+import asyncio
+from ipaddress import IPv4Network, IPv6Network
+import logging
+from math import log2
+import time
+from typing import Callable
+
+from routesia.schema.v1.route_pb2 import RouteDampeningConfig, RouteDampeningState
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_PENALTY = 1000
+DEFAULT_SUPPRESS_THRESHOLD = 2000
+DEFAULT_REUSE_THRESHOLD = 750
+DEFAULT_HALF_LIFE = 15
+
+
+class FlapHistory:
+    "Withdrawals of a route to a destination"
+    __slots__ = ("penalty", "updated", "flaps", "suppressed", "held_until", "released")
+
+    def __init__(self):
+        # Penalty as of the time it was updated
+        self.penalty = 0.0
+        self.updated = 0.0
+        self.flaps = 0
+        self.suppressed = False
+        self.held_until = 0.0
+        # Whether the route has been applied since it was last held back
+        self.released = True
+
+
+class RouteDampening:
+    """
+    Flap dampening of the routes in a table, as BGP does.
+
+    ``withdrawn()`` is called each time a route is withdrawn by an event.
+    While ``is_held()`` returns True for a destination, routes to it are not
+    installed. Once they may be again, ``reuse_callback`` is called with the
+    destination so they can be applied. Histories are forgotten once their
+    penalty has decayed below half the reuse threshold.
+    """
+    def __init__(
+        self,
+        reuse_callback: Callable[[IPv4Network | IPv6Network], None],
+        config: RouteDampeningConfig | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.reuse_callback = reuse_callback
+        self.clock = clock
+        self.histories: dict[IPv4Network | IPv6Network, FlapHistory] = {}
+        self.timers: dict[IPv4Network | IPv6Network, asyncio.TimerHandle] = {}
+        self.configure(config if config is not None else RouteDampeningConfig())
+
+    def configure(self, config: RouteDampeningConfig) -> None:
+        self.enabled = config.enabled
+        self.penalty = config.penalty or DEFAULT_PENALTY
+        self.suppress_threshold = config.suppress_threshold or DEFAULT_SUPPRESS_THRESHOLD
+        self.reuse_threshold = config.reuse_threshold or DEFAULT_REUSE_THRESHOLD
+        self.half_life = config.half_life or DEFAULT_HALF_LIFE
+        max_suppress_time = config.max_suppress_time or 4 * self.half_life
+        # A route is never suppressed for longer than the maximum, so the
+        # penalty is capped at what decays to the reuse threshold in that time
+        self.ceiling = self.reuse_threshold * 2 ** (max_suppress_time / self.half_life)
+        self.hold_down = config.hold_down
+        if not self.enabled:
+            self.clear()
+
+    def clear(self) -> None:
+        "Forget all histories, releasing the routes held back"
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers = {}
+        histories = self.histories
+        self.histories = {}
+        for destination, history in histories.items():
+            if not history.released:
+                self.reuse_callback(destination)
+
+    def get_penalty(self, history: FlapHistory, now: float) -> float:
+        return history.penalty * 2 ** ((history.updated - now) / self.half_life)
+
+    def withdrawn(self, destination: IPv4Network | IPv6Network) -> None:
+        "Record that a route to ``destination`` was withdrawn"
+        if not self.enabled:
+            return
+        now = self.clock()
+        history = self.histories.get(destination)
+        if history is None:
+            history = self.histories[destination] = FlapHistory()
+        history.penalty = min(self.get_penalty(history, now) + self.penalty, self.ceiling)
+        history.updated = now
+        history.flaps += 1
+        history.held_until = now + self.hold_down
+        if history.penalty >= self.suppress_threshold and not history.suppressed:
+            logger.warning(
+                "Suppressing flapping route %s after %d withdrawals"
+                % (destination, history.flaps)
+            )
+            history.suppressed = True
+        history.released = not (history.suppressed or self.hold_down)
+        self.schedule(destination, history, now)
+
+    def is_held(self, destination: IPv4Network | IPv6Network) -> bool:
+        "Return whether routes to ``destination`` are to be kept withdrawn"
+        if not self.histories:
+            # Hashing networks is not free and this is asked for every route
+            return False
+        history = self.histories.get(destination)
+        if history is None:
+            return False
+        return self.update(destination, history, self.clock())
+
+    def update(self, destination, history: FlapHistory, now: float) -> bool:
+        "Reuse the route if its penalty has decayed. Returns whether it is held."
+        if history.suppressed and self.get_penalty(history, now) < self.reuse_threshold:
+            logger.info("Reusing route %s" % destination)
+            history.suppressed = False
+        return history.suppressed or now < history.held_until
+
+    def get_wake_time(self, history: FlapHistory) -> float:
+        "Return when the route is reused if held, or its history is forgotten if not"
+        if history.suppressed:
+            reused = history.updated + self.half_life * log2(
+                history.penalty / self.reuse_threshold
+            )
+            return max(reused, history.held_until)
+        if not history.released:
+            return history.held_until
+        return history.updated + self.half_life * log2(
+            max(history.penalty / (self.reuse_threshold / 2), 1)
+        )
+
+    def schedule(self, destination, history: FlapHistory, now: float) -> None:
+        timer = self.timers.pop(destination, None)
+        if timer is not None:
+            timer.cancel()
+        self.timers[destination] = asyncio.get_running_loop().call_later(
+            max(self.get_wake_time(history) - now, 0), self.wake, destination
+        )
+
+    def wake(self, destination: IPv4Network | IPv6Network) -> None:
+        self.timers.pop(destination, None)
+        history = self.histories.get(destination)
+        if history is None:
+            return
+        now = self.clock()
+        if self.update(destination, history, now):
+            self.schedule(destination, history, now)
+            return
+        if not history.released:
+            history.released = True
+            self.reuse_callback(destination)
+        if self.get_penalty(history, now) < self.reuse_threshold / 2:
+            del self.histories[destination]
+        else:
+            self.schedule(destination, history, now)
+
+    def to_message(
+        self, destination: IPv4Network | IPv6Network, message: RouteDampeningState
+    ) -> None:
+        "Set message parameters from the history of a destination, if any"
+        if not self.histories:
+            return
+        history = self.histories.get(destination)
+        if history is None:
+            return
+        now = self.clock()
+        held = self.update(destination, history, now)
+        message.penalty = self.get_penalty(history, now)
+        message.flaps = history.flaps
+        message.suppressed = history.suppressed
+        message.held_down = now < history.held_until
+        if held:
+            message.reuse_in = max(self.get_wake_time(history) - now, 0)
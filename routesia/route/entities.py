@@ -2,6 +2,7 @@
 routesia/route/route.py - Route support
 """
 
+from functools import lru_cache
 from ipaddress import (
     IPv4Address,
     IPv4Network,
@@ -13,7 +14,10 @@ from ipaddress import (
 import logging
 
 from routesia.dhcp.client.events import DHCPv4LeasePreinit
-from routesia.schema.v1.route_pb2 import RouteState
+from routesia.route.dampening import RouteDampening
+from routesia.route.store import RouteStore, get_route_nexthops, set_state_nexthops
+from routesia.route.trie import GatewayIndex, RouteIndex
+from routesia.schema.v1.route_pb2 import RouteLookupResult, RouteState, RouteStateList
 
 
 logger = logging.getLogger(__name__)
@@ -28,8 +32,18 @@ RT_SCOPE_HOST = 254
 RT_SCOPE_NOWHERE = 255
 
 
+@lru_cache(maxsize=65536)
+def parse_destination(destination: str) -> IPv4Network | IPv6Network:
+    return ip_network(destination)
+
+
+@lru_cache(maxsize=65536)
+def parse_address(address: str) -> IPv4Address | IPv6Address:
+    return ip_address(address)
+
+
 class TableEntity:
-    def __init__(self, iproute, id, name=None, config=None):
+    def __init__(self, iproute, id, name=None, config=None, nexthop_groups=None):
         super().__init__()
         self.config = config
         self.iproute = iproute
@@ -37,37 +51,121 @@ class TableEntity:
         self.name = name
         if self.config and self.config.name:
             self.name = self.config.name
+        # Configured routes. Others present in the kernel are kept in the
+        # observed store.
         self.routes = {}
+        self.observed = RouteStore(id)
+        # Nexthops of every route present, configured or not
+        self.index = RouteIndex()
+        # Configured routes by the gateways they depend on
+        self.dependencies = GatewayIndex()
+        # Nexthop groups by ID, shared by all tables
+        self.nexthop_groups = nexthop_groups if nexthop_groups is not None else {}
+        # Destinations of configured routes by the nexthop group they use
+        self.group_routes: dict[int, set] = {}
         self.dhcp_routes: dict[
             str, dict[IPv4Address | IPv6Address, DHCPRouteEntity]
         ] = {}
         self.interfaces = set()
+        # Serialized config and entity of each configured route as of the
+        # last apply, by destination as given in the config
+        self.applied_configs: dict[str, tuple[bytes, RouteEntity]] = {}
+        self.dampening = RouteDampening(
+            self.handle_route_reuse, config.dampening if config else None
+        )
 
     def handle_config_change(self, config):
         self.config = config
+        self.dampening.configure(config.dampening)
         self.apply()
 
     def apply(self):
-        configured_destinations = []
-
+        """
+        Apply the routes added, changed or removed since the last apply.
+        Unchanged routes are only given the new config message.
+        """
+        applied_configs = {}
+        changed = []
         for route_config in self.config.route:
-            destination = ip_network(route_config.destination)
-            configured_destinations.append(destination)
-            if destination not in self.routes:
-                self.routes[destination] = RouteEntity(self.iproute, self, destination)
-            self.routes[destination].handle_config_change(route_config)
+            key = route_config.destination
+            data = route_config.SerializeToString(deterministic=True)
+            applied = self.applied_configs.get(key)
+            if applied is not None and applied[0] == data:
+                route = applied[1]
+                route.config = route_config
+            else:
+                destination = parse_destination(key)
+                route = self.routes.get(destination)
+                if route is None:
+                    route = self.routes[destination] = self.create_route(destination)
+                changed.append((route, route_config))
+            applied_configs[key] = (data, route)
+        changed_routes = {route for route, _ in changed}
+        removed = [
+            route
+            for key, (_, route) in self.applied_configs.items()
+            if key not in applied_configs and route not in changed_routes
+        ]
+        self.applied_configs = applied_configs
+
+        if not changed and not removed:
+            return
 
-        for destination, route in self.routes.items():
-            if destination not in configured_destinations and route.config:
-                route.handle_config_remove()
+        with self.iproute.batch() as batch:
+            for route in removed:
+                route.handle_config_remove(batch)
+
+            for route, route_config in changed:
+                route.handle_config_change(route_config, batch)
+
+    def create_route(self, destination):
+        "Create the entity of a route, taking its state from the observed store"
+        route = RouteEntity(self.iproute, self, destination)
+        state = self.observed.pop_state(destination)
+        if state is not None:
+            route.state = state
+        return route
+
+    def set_route_gateways(self, route, gateways: set):
+        "Record the gateways a configured route depends on"
+        for gateway in route.gateways - gateways:
+            self.dependencies.remove(gateway, route.destination)
+        for gateway in gateways - route.gateways:
+            self.dependencies.add(gateway, route.destination)
+        route.gateways = gateways
+
+    def set_route_group(self, route, group_id: int):
+        "Record the nexthop group a configured route uses"
+        if route.nexthop_group:
+            destinations = self.group_routes[route.nexthop_group]
+            destinations.discard(route.destination)
+            if not destinations:
+                del self.group_routes[route.nexthop_group]
+        if group_id:
+            self.group_routes.setdefault(group_id, set()).add(route.destination)
+        route.nexthop_group = group_id
+
+    def apply_group_routes(self, group_id: int, batch):
+        "Apply the routes using a nexthop group after it changed"
+        for destination in self.group_routes.get(group_id, ()):
+            route = self.routes[destination]
+            if route.insertable:
+                route.apply(batch)
+            elif route.route_args and "nh_id" not in route.route_args:
+                # Routes using the group object are removed with it by the
+                # kernel, but not those carrying its members
+                route.remove(batch)
+
+    def get_dependents(self, destination):
+        "Return the configured routes with a gateway within ``destination``"
+        return [
+            self.routes[dependent]
+            for dependent in dict.fromkeys(self.dependencies.dependents(destination))
+        ]
 
     def find_route_config(self, event):
-        if not self.config:
-            return None
-        for route_config in self.config.route:
-            if ip_network(route_config.destination) == event.destination:
-                return route_config
-        return None
+        route = self.routes.get(event.destination)
+        return route.config if route else None
 
     def nexthop_accessible(self, nexthop):
         """
@@ -77,15 +175,13 @@ class TableEntity:
             # Interface route
             return nexthop.interface in self.interfaces
 
-        gateway = ip_address(nexthop.gateway)
+        gateway = parse_address(nexthop.gateway)
 
-        for destination, route in self.routes.items():
-            if gateway not in destination:
-                continue
-            for candidate in route.state.nexthop:
-                if not candidate.interface:
+        for _, nexthops in self.index.covering(gateway):
+            for _, interface in nexthops:
+                if not interface:
                     continue
-                if nexthop.interface and candidate.interface != nexthop.interface:
+                if nexthop.interface and interface != nexthop.interface:
                     continue
                 return True
         return False
@@ -94,20 +190,41 @@ class TableEntity:
         """
         Returns True if the gateway is accessible
         """
-        for destination, route in self.routes.items():
-            if gateway not in destination:
-                continue
-            for candidate in route.state.nexthop:
-                if not candidate.interface:
-                    continue
-                return True
-        return False
+        return self.get_gateway_interface(gateway) is not None
+
+    def get_gateway_interface(self, gateway: IPv4Address | IPv6Address) -> str | None:
+        "Return the interface of the most specific route to the gateway"
+        for _, nexthops in self.index.covering(gateway):
+            for _, interface in nexthops:
+                if interface:
+                    return interface
+        return None
+
+    def handle_route_reuse(self, destination):
+        "Apply the routes to a destination that dampening held back"
+        routes = []
+        if destination in self.routes:
+            routes.append(self.routes[destination])
+        for dhcp_routes in self.dhcp_routes.values():
+            if destination in dhcp_routes:
+                routes.append(dhcp_routes[destination])
+        with self.iproute.batch() as batch:
+            for route in routes:
+                route.apply(batch)
+
+    def get_managed_routes(self) -> list:
+        "Return the configured and DHCP routes of the table"
+        routes = list(self.routes.values())
+        for dhcp_routes in self.dhcp_routes.values():
+            routes.extend(dhcp_routes.values())
+        return routes
 
     def handle_dhcp_lease_preinit(self, event: DHCPv4LeasePreinit):
         if event.address and event.interface in self.dhcp_routes:
             if event.address.network in self.dhcp_routes[event.interface]:
                 route = self.dhcp_routes[event.interface][event.address.network]
-                route.remove()
+                with self.iproute.batch() as batch:
+                    route.remove(batch)
                 del self.dhcp_routes[event.interface][event.address.network]
                 if not self.dhcp_routes[event.interface]:
                     del self.dhcp_routes[event.interface]
@@ -126,65 +243,130 @@ class TableEntity:
         for route in event.routes:
             new.add((route.destination, route.gateway))
 
-        for destination, _ in existing - new:
-            route = self.dhcp_routes[event.interface].pop(destination)
-            route.remove()
-
-        for destination, gateway in new - existing:
-            logger.info(f"Adding DHCP route {destination} via {gateway or event.interface}")
-            self.dhcp_routes[event.interface][destination] = DHCPRouteEntity(
-                self.iproute,
-                self,
-                event.interface,
-                destination,
-                gateway,
-                event.address.ip,
-            )
-            self.dhcp_routes[event.interface][destination].apply()
+        with self.iproute.batch() as batch:
+            for destination, _ in existing - new:
+                route = self.dhcp_routes[event.interface].pop(destination)
+                route.remove(batch)
+
+            for destination, gateway in new - existing:
+                logger.info(f"Adding DHCP route {destination} via {gateway or event.interface}")
+                self.dhcp_routes[event.interface][destination] = DHCPRouteEntity(
+                    self.iproute,
+                    self,
+                    event.interface,
+                    destination,
+                    gateway,
+                    event.address.ip,
+                )
+                self.dhcp_routes[event.interface][destination].apply(batch)
 
     def handle_dhcp_lease_lost(self, event: DHCPv4LeasePreinit):
         if event.interface in self.dhcp_routes:
-            for route in self.dhcp_routes[event.interface].values():
-                route.remove()
+            with self.iproute.batch() as batch:
+                for route in self.dhcp_routes[event.interface].values():
+                    if route.route_args:
+                        self.dampening.withdrawn(route.destination)
+                    route.remove(batch)
             del self.dhcp_routes[event.interface]
 
     def handle_route_add_event(self, event):
-        if event.destination not in self.routes:
-            self.routes[event.destination] = RouteEntity(
-                self.iproute, self, event.destination
+        destination = event.destination
+        nexthops = get_route_nexthops(self.iproute, event, self.nexthop_groups)
+        self.index.add(destination, nexthops)
+        if destination in self.routes:
+            self.routes[destination].handle_add_event(event)
+        else:
+            self.observed.add(
+                destination,
+                event.message["proto"],
+                event.message["scope"],
+                event.attrs.get("RTA_PREFSRC", ""),
+                nexthops,
             )
-        self.routes[event.destination].handle_add_event(event)
 
         # Check for dependent routes since they may be insertable now
-        for route in self.routes.values():
-            if route.config and not route.state.present:
-                for nexthop in route.config.nexthop:
-                    if (
-                        nexthop.gateway
-                        and ip_address(nexthop.gateway) in event.destination
-                    ):
-                        route.apply()
+        dependents = [
+            route
+            for route in self.get_dependents(destination)
+            if not route.state.present
+        ]
+        if dependents:
+            with self.iproute.batch() as batch:
+                for route in dependents:
+                    route.apply(batch)
 
     def handle_route_remove_event(self, event):
-        if event.destination in self.routes:
-            route = self.routes[event.destination]
-            route.handle_remove_event()
-            if not route.config:
-                del self.routes[event.destination]
+        self.index.remove(event.destination)
+        with self.iproute.batch() as batch:
+            if event.destination in self.routes:
+                route = self.routes[event.destination]
+                if route.route_args:
+                    # Removed by the kernel rather than by us
+                    self.dampening.withdrawn(event.destination)
+                route.handle_remove_event(batch)
+                if not route.config:
+                    del self.routes[event.destination]
+            else:
+                self.observed.remove(event.destination)
+
+            # Withdraw dependent routes whose gateway is no longer
+            # reachable. Their removal events withdraw the routes that
+            # depend on them in turn.
+            for route in self.get_dependents(event.destination):
+                if route.route_args and not route.insertable:
+                    logger.info(
+                        "Withdrawing route %s in table %s since its gateway is unreachable"
+                        % (route.destination, self.id)
+                    )
+                    self.dampening.withdrawn(route.destination)
+                    route.remove(batch)
 
     def handle_interface_add(self, event):
         self.interfaces.add(event.ifname)
 
         # Check for dependent routes since they may be insertable now
-        for route in self.routes.values():
-            if route.config and not route.state.present:
-                for nexthop in route.config.nexthop:
-                    if not nexthop.gateway and nexthop.interface == event.ifname:
-                        route.apply()
+        with self.iproute.batch() as batch:
+            for route in self.routes.values():
+                if route.config and not route.state.present:
+                    for nexthop in route.config.nexthop:
+                        if not nexthop.gateway and nexthop.interface == event.ifname:
+                            route.apply(batch)
 
     def handle_interface_remove(self, event):
         self.interfaces.remove(event.ifname)
 
+    def to_message(self, message: RouteStateList):
+        "Add the state of all routes in the table to ``message``"
+        for route in self.routes.values():
+            route.to_message(message.route.add())
+        # Routes that have flapped are listed with their dampening state
+        # even when withdrawn
+        dampened = [
+            destination
+            for destination in self.dampening.histories
+            if destination not in self.routes
+        ]
+        message.route.extend(self.observed.states(exclude=dampened))
+        for destination in dampened:
+            state = self.observed.get_state(destination)
+            if state is None:
+                state = RouteState()
+                state.table_id = self.id
+                state.destination = str(destination)
+            self.dampening.to_message(destination, state.dampening)
+            message.route.append(state)
+
+    def lookup(self, address: IPv4Address | IPv6Address, result: RouteLookupResult) -> None:
+        "Set ``result`` to the most specific route present to ``address``"
+        result.address = str(address)
+        result.table_id = self.id
+        match = self.index.lookup(address)
+        if match is not None:
+            destination, nexthops = match
+            result.found = True
+            result.destination = str(destination)
+            set_state_nexthops(result, nexthops)
+
 
 class RouteEntity:
     def __init__(self, iproute, table: TableEntity, destination):
@@ -197,6 +379,10 @@ class RouteEntity:
         self.carrier = False
         self.state = RouteState()
         self.route_args = None
+        # Gateways of the configured nexthops
+        self.gateways = set()
+        # Configured nexthop group
+        self.nexthop_group = 0
 
     def handle_add_event(self, event):
         self.state.present = True
@@ -206,56 +392,61 @@ class RouteEntity:
         self.state.scope = event.message["scope"]
         if "RTA_PREFSRC" in event.attrs:
             self.state.preferred_source = event.attrs["RTA_PREFSRC"]
-        del self.state.nexthop[:]
-        if "RTA_GATEWAY" in event.attrs or "RTA_OIF" in event.attrs:
-            nexthop = self.state.nexthop.add()
-            if "RTA_GATEWAY" in event.attrs:
-                nexthop.gateway = event.attrs["RTA_GATEWAY"]
-            if "RTA_OIF" in event.attrs:
-                nexthop.interface = self.iproute.get_interface_name_by_index(
-                    event.attrs["RTA_OIF"]
-                )
-        elif "RTA_MULTIPATH" in event.attrs:
-            for message in event.attrs["RTA_MULTIPATH"]:
-                attrs = dict(message["attrs"])
-                nexthop = self.state.nexthop.add()
-                nexthop.interface = self.iproute.get_interface_name_by_index(
-                    message["oif"]
-                )
-                if "RTA_GATEWAY" in attrs:
-                    nexthop.gateway = attrs["RTA_GATEWAY"]
+        self.state.nexthop_group = event.attrs.get("RTA_NH_ID", 0)
+        set_state_nexthops(
+            self.state,
+            get_route_nexthops(self.iproute, event, self.table.nexthop_groups),
+        )
 
         logger.debug("Route %s added in table %s" % (self.destination, self.table.id))
 
-    def handle_remove_event(self):
+    def handle_remove_event(self, batch):
         logger.debug(
             "Route %s removed from table %s" % (self.destination, self.table.id)
         )
         self.state.Clear()
-        self.apply()
+        self.apply(batch)
 
-    def handle_config_change(self, config):
+    def handle_config_change(self, config, batch):
         logger.debug("New route config in table %s:\n%s" % (self.table.id, config))
         self.config = config
-        self.apply()
+        self.table.set_route_gateways(
+            self,
+            {ip_address(nexthop.gateway) for nexthop in config.nexthop if nexthop.gateway},
+        )
+        self.table.set_route_group(self, config.nexthop_group)
+        self.apply(batch)
+
+    def replace(self, kwargs, batch):
+        """
+        Install the route described by ``kwargs``. The request is queued in
+        ``batch`` and the route is recorded once the kernel accepts it.
+        """
+        def handle_result(error):
+            if error is None:
+                self.route_args = kwargs
+            else:
+                logger.error(
+                    "Failed to apply route %s in table %s: %s"
+                    % (self.destination, self.table.id, error)
+                )
 
-    def remove(self):
+        batch.route("replace", callback=handle_result, **kwargs)
+
+    def remove(self, batch):
         if self.route_args:
-            self.iproute.iproute.route("delete", **self.route_args)
+            batch.route("delete", **self.route_args)
             self.route_args = None
 
-    def handle_config_remove(self):
+    def handle_config_remove(self, batch):
         logger.debug(
             "Removed config for route %s in table %s"
             % (self.destination, self.table.id)
         )
         self.config = None
-        self.remove()
-
-    def link(self, *args, **kwargs):
-        if "add" not in args:
-            kwargs["index"] = self.ifindex
-        return self.iproute.iproute.link(*args, **kwargs)
+        self.table.set_route_gateways(self, set())
+        self.table.set_route_group(self, 0)
+        self.remove(batch)
 
     @property
     def insertable(self):
@@ -264,71 +455,96 @@ class RouteEntity:
         """
         if self.config is None:
             return False
+        if self.table.dampening.is_held(self.destination):
+            return False
+        if self.config.nexthop_group:
+            group = self.table.nexthop_groups.get(self.config.nexthop_group)
+            return group is not None and group.get_route_args() is not None
         for nexthop in self.config.nexthop:
             if not self.table.nexthop_accessible(nexthop):
                 return False
         return True
 
-    def apply(self):
+    def get_route_args(self) -> dict | None:
+        """
+        Return the arguments to install the configured route with, or None
+        if it cannot be.
+        """
+        kwargs = {
+            "table": self.table.id,
+            "dst": str(self.destination),
+            "proto": PROTO_ID,
+        }
+        if self.config.nexthop_group:
+            kwargs.update(self.table.nexthop_groups[self.config.nexthop_group].get_route_args())
+        elif len(self.config.nexthop) == 1:
+            nexthop = self.config.nexthop[0]
+            if nexthop.gateway:
+                kwargs["gateway"] = nexthop.gateway
+            if nexthop.interface:
+                if nexthop.interface not in self.iproute.interface_name_map:
+                    logger.warning(
+                        "Unknown interface %s in route %s. Not applying."
+                        % (nexthop.interface, self.destination)
+                    )
+                    return None
+                kwargs["oif"] = self.iproute.interface_name_map[nexthop.interface]
+        elif self.config.nexthop:
+            multipath = []
+            for nexthop in self.config.nexthop:
+                nexthop_args = {}
+                if nexthop.gateway:
+                    nexthop_args["gateway"] = nexthop.gateway
+                if nexthop.interface:
+                    if nexthop.interface not in self.iproute.interface_name_map:
+                        logger.warning(
+                            "Unknown interface %s in multipath route. Skipping."
+                            % nexthop.interface
+                        )
+                        continue
+                    nexthop_args["oif"] = self.iproute.interface_name_map[
+                        nexthop.interface
+                    ]
+                multipath.append(nexthop_args)
+            if not multipath:
+                logger.warning(
+                    "No valid multipath nexthops in route %s. Not applying."
+                    % self.destination
+                )
+                return None
+            kwargs["multipath"] = multipath
+        return kwargs
+
+    def apply(self, batch):
         if not self.insertable:
             return
 
-        if self.config:
-            if self.state.nexthop != self.config.nexthop:
-                kwargs = {
-                    "table": self.table.id,
-                    "dst": str(self.destination),
-                    "proto": PROTO_ID,
-                }
-                if self.config.nexthop:
-                    if len(self.config.nexthop) == 1:
-                        nexthop = self.config.nexthop[0]
-                        if nexthop.gateway:
-                            kwargs["gateway"] = nexthop.gateway
-                        if nexthop.interface:
-                            if nexthop.interface not in self.iproute.interface_name_map:
-                                logger.warning(
-                                    "Unknown interface %s in route %s. Not applying."
-                                    % (nexthop.interface, self.destination)
-                                )
-                                return
-                            kwargs["oif"] = self.iproute.interface_name_map[
-                                nexthop.interface
-                            ]
-                    else:
-                        multipath = []
-                        for nexthop in self.config.nexthop:
-                            nexthop_args = {}
-                            if nexthop.gateway:
-                                nexthop_args["gateway"] = nexthop.gateway
-                            if nexthop.interface:
-                                if (
-                                    nexthop.interface
-                                    not in self.iproute.interface_name_map
-                                ):
-                                    logger.warning(
-                                        "Unknown interface %s in multipath route. Skipping."
-                                        % nexthop.interface
-                                    )
-                                    continue
-                                nexthop_args["oif"] = self.iproute.interface_name_map[
-                                    nexthop.interface
-                                ]
-                            multipath.append(nexthop_args)
-                        if not multipath:
-                            logger.warning(
-                                "No valid multipath nexthops in route %s. Not applying."
-                                % self.destination
-                            )
-                            return
-                        kwargs["multipath"] = multipath
-
-                self.iproute.iproute.route("replace", **kwargs)
-                self.route_args = kwargs
+        if self.config.nexthop_group:
+            kwargs = self.get_route_args()
+            if "nh_id" in kwargs:
+                if self.state.nexthop_group == kwargs["nh_id"]:
+                    return
+            # Carrying the members of a group the kernel rejected
+            elif self.state.present and kwargs == self.route_args:
+                return
+        elif self.state.nexthop == self.config.nexthop:
+            return
+        else:
+            kwargs = self.get_route_args()
+        if kwargs is not None:
+            self.replace(kwargs, batch)
 
     def to_message(self, message):
         "Set message parameters from entity state"
         message.CopyFrom(self.state)
+        # Also given for routes that are not present
+        message.table_id = self.table.id
+        message.destination = str(self.destination)
+        # The nexthops of a group change without the route changing
+        group = self.table.nexthop_groups.get(self.state.nexthop_group)
+        if group is not None:
+            set_state_nexthops(message, group.nexthops)
+        self.table.dampening.to_message(self.destination, message.dampening)
 
 
 class DHCPRouteEntity(RouteEntity):
@@ -351,19 +567,20 @@ class DHCPRouteEntity(RouteEntity):
         """
         Returns whether the route can be inserted
         """
+        if self.table.dampening.is_held(self.destination):
+            return False
         if self.gateway:
             return self.table.gateway_accessible(self.gateway)
         return True
 
-    def apply(self):
-        if not self.insertable:
-            return
-
+    def get_route_args(self) -> dict | None:
         kwargs = {
             "table": self.table.id,
             "dst": str(self.destination),
             "proto": PROTO_ID,
         }
+        if self.interface not in self.iproute.interface_name_map:
+            return None
         kwargs["oif"] = self.iproute.interface_name_map[self.interface]
         if self.gateway:
             kwargs["gateway"] = str(self.gateway)
@@ -371,9 +588,14 @@ class DHCPRouteEntity(RouteEntity):
 
         if not self.gateway:
             kwargs["scope"] = RT_SCOPE_LINK
+        return kwargs
 
-        self.iproute.iproute.route("replace", **kwargs)
-        self.route_args = kwargs
+    def apply(self, batch):
+        if not self.insertable:
+            return
+        kwargs = self.get_route_args()
+        if kwargs is not None:
+            self.replace(kwargs, batch)
 
     def to_message(self, message):
         "Set message parameters from entity state"
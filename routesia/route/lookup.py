@@ -0,0 +1,49 @@
+"""
+routesia/route/lookup.py - Route lookups
+"""
+
+import errno
+import os
+
+from pyroute2 import NetlinkError
+
+from routesia.route.entities import parse_destination
+from routesia.route.store import get_attrs_nexthops, set_state_nexthops
+from routesia.rtnetlink.dump import get_route_destination, get_route_table
+from routesia.schema.v1.route_pb2 import RouteLookupResult
+
+
+# Lookups that match a route which discards packets fail with the error the
+# packets would get rather than returning the route
+KERNEL_ERRORS = {
+    errno.EINVAL: "Matched a blackhole route",
+    errno.EHOSTUNREACH: "Matched an unreachable route",
+    errno.EACCES: "Matched a prohibit route",
+}
+
+
+def set_kernel_result(
+    iproute, result: RouteLookupResult, reply: dict | NetlinkError, nexthop_groups=None
+) -> None:
+    """
+    Set the kernel lookup of ``result`` from the reply to it, a route
+    summary or the error of the lookup, and whether the kernel matched the
+    same route as found in the table.
+    """
+    kernel = result.kernel
+    if isinstance(reply, NetlinkError):
+        kernel.error = KERNEL_ERRORS.get(reply.code) or os.strerror(reply.code)
+        # Which blackhole route matched is not given
+        result.kernel_match = result.blackhole and reply.code == errno.EINVAL
+        return
+    kernel.table_id = get_route_table(reply)
+    kernel.destination = get_route_destination(reply)
+    kernel.type = reply["type"]
+    set_state_nexthops(
+        kernel, get_attrs_nexthops(iproute, dict(reply["attrs"]), nexthop_groups)
+    )
+    result.kernel_match = (
+        result.found
+        and kernel.table_id == result.table_id
+        and parse_destination(kernel.destination) == parse_destination(result.destination)
+    )
@@ -0,0 +1,203 @@
+"""
+routesia/route/nexthop.py - Kernel nexthop groups
+"""
+
+from ipaddress import ip_address
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+# Nexthop objects of group members are given IDs from here up so they do
+# not clash with configured group IDs
+MEMBER_ID_BASE = 0x10000000
+
+
+class NexthopGroupEntity:
+    """
+    A configured nexthop group, installed as a kernel nexthop group object
+    with a nexthop object for each member.
+
+    Routes using the group refer to it by ID, so changing its members
+    changes all of them with one request. Members with an unreachable
+    gateway or a missing interface are left out. The kernel does not allow
+    empty groups, so the group is removed while no member is usable, which
+    removes its routes. They are applied again once it is installed.
+
+    The state of the group follows the kernel's replies to its requests.
+    Member objects only join the group once the kernel has accepted them,
+    so the group is applied again after they are installed. If the kernel
+    rejects the group, its routes carry the usable members as multipath
+    nexthops instead until it is accepted.
+    """
+    def __init__(self, iproute, table, config, member_ids):
+        self.iproute = iproute
+        # Table the gateways are reached through
+        self.table = table
+        self.config = config
+        self.id = config.id
+        self.member_ids = member_ids
+        # Member object ID by gateway and interface
+        self.members: dict[tuple[str, str], int] = {}
+        # Interface index of each member object in the kernel
+        self.installed_members: dict[int, int] = {}
+        # Whether member objects were requested by the last apply, so the
+        # group must be applied again once they are acknowledged
+        self.members_pending = False
+        # Member ID and weight of each member in the kernel group
+        self.active: tuple[tuple[int, int], ...] = ()
+        # Gateway and interface of each member in the kernel group
+        self.nexthops: tuple[tuple[str, str], ...] = ()
+        # Multipath nexthops of the usable members while the kernel rejects
+        # the group
+        self.multipath: tuple[dict, ...] = ()
+        # Member gateways as indexed by the provider
+        self.indexed_gateways: set = set()
+
+    @property
+    def installed(self) -> bool:
+        return bool(self.active)
+
+    @property
+    def gateways(self) -> set:
+        return {
+            ip_address(nexthop.gateway) for nexthop in self.config.nexthop if nexthop.gateway
+        }
+
+    def get_member_id(self, gateway: str, interface: str) -> int:
+        key = (gateway, interface)
+        if key not in self.members:
+            self.members[key] = next(self.member_ids)
+        return self.members[key]
+
+    def get_route_args(self) -> dict | None:
+        """
+        Return the arguments routes using the group are installed with, or
+        None if it has no usable members.
+        """
+        if self.multipath:
+            return {"multipath": list(self.multipath)}
+        if self.installed:
+            return {"nh_id": self.id}
+        return None
+
+    def apply(self, batch) -> None:
+        """
+        Queue the requests to install the group with its usable members. The
+        group is updated as the kernel replies to them.
+
+        Members whose objects are requested are left out of the group until
+        the kernel accepts them, which ``members_pending`` tells.
+        """
+        active = []
+        nexthops = []
+        multipath = []
+        pending = False
+        for nexthop in self.config.nexthop:
+            # Nexthop objects must have an interface
+            interface = nexthop.interface
+            if not interface:
+                if not nexthop.gateway:
+                    continue
+                interface = self.table.get_gateway_interface(ip_address(nexthop.gateway))
+            elif not self.table.nexthop_accessible(nexthop):
+                continue
+            if interface not in self.iproute.interface_name_map:
+                continue
+            ifindex = self.iproute.interface_name_map[interface]
+            id = self.get_member_id(nexthop.gateway, nexthop.interface)
+            nexthop_args = {"oif": ifindex, "hops": nexthop.hops}
+            if nexthop.gateway:
+                nexthop_args["gateway"] = nexthop.gateway
+            multipath.append(nexthop_args)
+            if self.installed_members.get(id) != ifindex:
+                kwargs = {"id": id, "oif": ifindex, "proto": self.iproute.rt_proto}
+                if nexthop.gateway:
+                    kwargs["gateway"] = nexthop.gateway
+                batch.nexthop(
+                    "replace", callback=self.get_member_callback(id, ifindex), **kwargs
+                )
+                pending = True
+                continue
+            active.append((id, nexthop.hops + 1))
+            nexthops.append((nexthop.gateway, interface))
+        active = tuple(active)
+        self.members_pending = pending
+
+        # Without accepted members, the group is left as it is until the
+        # requested ones are installed
+        if (active or not pending) and (active != self.active or self.multipath):
+            if active:
+                logger.info("Setting nexthop group %s to %s" % (self.id, nexthops))
+                batch.nexthop(
+                    "replace",
+                    callback=self.get_group_callback(active, tuple(nexthops), tuple(multipath)),
+                    id=self.id,
+                    group=active,
+                    proto=self.iproute.rt_proto,
+                )
+            else:
+                logger.warning("No usable nexthops in group %s. Removing." % self.id)
+                if self.installed:
+                    batch.nexthop("delete", callback=self.handle_group_remove, id=self.id)
+                else:
+                    self.multipath = ()
+
+        # Remove members no longer configured
+        configured = {(nexthop.gateway, nexthop.interface) for nexthop in self.config.nexthop}
+        for key in list(self.members):
+            if key not in configured:
+                id = self.members.pop(key)
+                if self.installed_members.pop(id, None) is not None:
+                    batch.nexthop("delete", id=id)
+
+    def get_member_callback(self, id: int, ifindex: int):
+        "Return the callback for the reply to installing a member object"
+        def handle_result(error):
+            if error is None:
+                self.installed_members[id] = ifindex
+            else:
+                logger.error("Failed to install nexthop %s of group %s: %s" % (id, self.id, error))
+                self.installed_members.pop(id, None)
+
+        return handle_result
+
+    def get_group_callback(self, active, nexthops, multipath):
+        "Return the callback for the reply to installing the group object"
+        def handle_result(error):
+            if error is None:
+                self.active = active
+                self.nexthops = nexthops
+                self.multipath = ()
+            else:
+                logger.error(
+                    "Failed to install nexthop group %s: %s. Using multipath routes."
+                    % (self.id, error)
+                )
+                self.multipath = multipath
+
+        return handle_result
+
+    def handle_group_remove(self, error) -> None:
+        if error is not None:
+            logger.error("Failed to remove nexthop group %s: %s" % (self.id, error))
+        self.active = ()
+        self.nexthops = ()
+        self.multipath = ()
+
+    def handle_interface_remove(self, ifindex: int) -> None:
+        "Forget members the kernel removed with their interface"
+        for id, member_ifindex in list(self.installed_members.items()):
+            if member_ifindex == ifindex:
+                del self.installed_members[id]
+
+    def remove(self, batch) -> None:
+        if self.installed:
+            batch.nexthop("delete", id=self.id)
+        for id in self.installed_members:
+            batch.nexthop("delete", id=id)
+        self.active = ()
+        self.nexthops = ()
+        self.multipath = ()
+        self.installed_members = {}
@@ -0,0 +1,492 @@
+"""
+routesia/route/prefixlist.py - Prefix lists and the blackhole routes made from them
+"""
+
+import asyncio
+import errno
+from ipaddress import IPv4Address, IPv6Address
+import logging
+import os
+import socket
+import time
+
+from routesia.rtnetlink.batch import RTN_BLACKHOLE
+from routesia.rtnetlink.dump import get_route_destination, get_route_table
+from routesia.schema.v1.route_pb2 import (
+    RouteBlackholeState,
+    RoutePrefixListState,
+    RouteLookupResult,
+    RoutePrefixListStateList,
+    RouteTableConfigList,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+FAMILY_BITS = {socket.AF_INET: 32, socket.AF_INET6: 128}
+
+# Invalid lines logged for each load. The rest are only counted.
+MAX_INVALID_LOGGED = 10
+
+
+def parse_prefix(text: str) -> tuple[int, int, int]:
+    """
+    Return the family, network as an integer and prefix length of a prefix
+    or of an address, taken as a host prefix. Host bits are cleared. Raises
+    ValueError if invalid.
+    """
+    address, _, prefixlen = text.partition("/")
+    family = socket.AF_INET6 if ":" in address else socket.AF_INET
+    try:
+        network = int.from_bytes(socket.inet_pton(family, address), "big")
+    except OSError:
+        raise ValueError(f"Invalid address {address}")
+    bits = FAMILY_BITS[family]
+    prefixlen = int(prefixlen) if prefixlen else bits
+    if not 0 <= prefixlen <= bits:
+        raise ValueError(f"Invalid prefix length {prefixlen}")
+    host_bits = bits - prefixlen
+    return family, network >> host_bits << host_bits, prefixlen
+
+
+def read_prefixes(lines, name: str = "") -> tuple[dict[int, list[int]], int, int]:
+    """
+    Parse the prefixes in ``lines``. Blank lines and those starting with #
+    or ; are skipped, as is anything after the prefix on a line.
+
+    Returns the prefixes of each family, each packed into an int as the
+    network shifted left by 8 bits and or'd with the prefix length, the
+    number of prefixes read and the number of lines that could not be
+    parsed. Packed prefixes sort by network and then by prefix length, and
+    sorting ints is much faster than sorting tuples.
+    """
+    networks = {family: [] for family in FAMILY_BITS}
+    entries = 0
+    invalid = 0
+    for number, line in enumerate(lines, 1):
+        fields = line.split(None, 1)
+        if not fields or fields[0][0] in "#;":
+            continue
+        try:
+            family, network, prefixlen = parse_prefix(fields[0])
+        except ValueError as e:
+            invalid += 1
+            if invalid <= MAX_INVALID_LOGGED:
+                logger.warning(f"Skipping line {number} of prefix list {name}: {e}")
+            continue
+        networks[family].append(network << 8 | prefixlen)
+        entries += 1
+    if invalid > MAX_INVALID_LOGGED:
+        logger.warning(f"Skipped {invalid} invalid lines of prefix list {name}")
+    return networks, entries, invalid
+
+
+def aggregate(networks: list[int], bits: int) -> list[int]:
+    """
+    Return the fewest prefixes covering the same addresses as ``networks``,
+    packed prefixes of one family as from ``read_prefixes()``, in order.
+
+    Once sorted, a prefix is covered by one before it only if it is covered
+    by the last one kept. Each prefix kept is merged with the last one if
+    they are the two halves of a shorter prefix, and the result in turn.
+    """
+    aggregated = []
+    last = None
+    last_prefixlen = 0
+    for packed in sorted(networks):
+        network = packed >> 8
+        prefixlen = packed & 0xff
+        if last is not None:
+            host_bits = bits - last_prefixlen
+            if network >> host_bits == last >> host_bits:
+                continue
+        while prefixlen and last is not None:
+            size = 1 << (bits - prefixlen)
+            if last_prefixlen != prefixlen or last & size or last + size != network:
+                break
+            aggregated.pop()
+            network = last
+            prefixlen -= 1
+            if aggregated:
+                last = aggregated[-1] >> 8
+                last_prefixlen = aggregated[-1] & 0xff
+            else:
+                last = None
+        aggregated.append(network << 8 | prefixlen)
+        last = network
+        last_prefixlen = prefixlen
+    return aggregated
+
+
+def format_prefixes(family: int, networks: list[int]) -> list[str]:
+    "Return packed prefixes as the kernel's route dumps give them"
+    size = FAMILY_BITS[family] // 8
+    ntop = socket.inet_ntop
+    return [
+        f"{ntop(family, (packed >> 8).to_bytes(size, 'big'))}/{packed & 0xff}"
+        for packed in networks
+    ]
+
+
+def aggregate_prefixes(networks: dict[int, list]) -> tuple[dict[int, list], frozenset[str]]:
+    "Return the aggregated networks of each family and the prefixes they make"
+    aggregated = {}
+    prefixes = []
+    for family, family_networks in networks.items():
+        aggregated[family] = aggregate(family_networks, FAMILY_BITS[family])
+        prefixes.extend(format_prefixes(family, aggregated[family]))
+    return aggregated, frozenset(prefixes)
+
+
+def get_file_stat(path: str) -> tuple:
+    "Return what tells whether a file has changed"
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def load_prefix_file(path: str, name: str = ""):
+    """
+    Read and aggregate the prefix list in the file at ``path``. Returns the
+    file stat, the aggregated networks and prefixes, and the numbers of
+    prefixes read and invalid lines.
+    """
+    with open(path) as f:
+        stat = get_file_stat(path)
+        networks, entries, invalid = read_prefixes(f, name)
+    aggregated, prefixes = aggregate_prefixes(networks)
+    return stat, aggregated, prefixes, entries, invalid
+
+
+def combine_prefix_lists(prefix_lists: list["PrefixList"]) -> frozenset[str]:
+    "Return the aggregated prefixes of all of ``prefix_lists``"
+    if len(prefix_lists) == 1:
+        return prefix_lists[0].prefixes
+    networks = {family: [] for family in FAMILY_BITS}
+    for prefix_list in prefix_lists:
+        for family, family_networks in prefix_list.networks.items():
+            networks[family].extend(family_networks)
+    return aggregate_prefixes(networks)[1]
+
+
+def read_installed_blackholes(messages) -> dict[int, set[str]]:
+    "Return the destinations of the blackhole routes in route summaries by table"
+    blackholes = {}
+    for message in messages:
+        if message["type"] == RTN_BLACKHOLE:
+            table = get_route_table(message)
+            if table not in blackholes:
+                blackholes[table] = set()
+            blackholes[table].add(get_route_destination(message))
+    return blackholes
+
+
+def update_blackholes(batch, table: int, proto: int, installed, wanted: frozenset[str]):
+    """
+    Install blackhole routes in ``table`` to the ``wanted`` destinations not
+    ``installed`` and delete those to the ``installed`` destinations not
+    wanted. Routes are added before deleting those they may replace so no
+    address is let through in between.
+
+    Returns the destinations installed afterwards and the numbers of routes
+    added, deleted and failed.
+    """
+    added = wanted - installed
+    deleted = installed - wanted
+    failed_adds = batch.send_blackholes("replace", added, table, proto)
+    failed_deletes = batch.send_blackholes("delete", deleted, table, proto)
+    # Deleted by someone else already
+    failed_deletes = [
+        (destination, error)
+        for destination, error in failed_deletes
+        if error.code != errno.ESRCH
+    ]
+    for destination, error in (failed_adds + failed_deletes)[:MAX_INVALID_LOGGED]:
+        logger.error(f"Blackhole route {destination} in table {table} failed: {error}")
+    if not failed_adds and not failed_deletes:
+        return wanted, len(added), len(deleted), 0
+    installed = set(installed)
+    installed.difference_update(deleted)
+    installed.update(added)
+    installed.difference_update(destination for destination, _ in failed_adds)
+    installed.update(destination for destination, _ in failed_deletes)
+    return (
+        frozenset(installed),
+        len(added) - len(failed_adds),
+        len(deleted) - len(failed_deletes),
+        len(failed_adds) + len(failed_deletes),
+    )
+
+
+class PrefixList:
+    "A named list of prefixes loaded from a file"
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.stat = None
+        # Aggregated packed prefixes by family
+        self.networks: dict[int, list] = {}
+        self.prefixes: frozenset[str] = frozenset()
+        self.loaded = False
+        self.entries = 0
+        self.invalid = 0
+        self.error = ""
+        self.last_load_duration = 0.0
+
+    async def load(self, service, force: bool = False) -> bool:
+        """
+        Load the file in a thread if it has changed since the last load or
+        ``force`` is set. Returns whether it was loaded.
+
+        If the file cannot be read, the prefixes of the last load are kept.
+        """
+        start = time.perf_counter()
+        try:
+            if not force and self.loaded:
+                stat = await service.run_blocking("route-prefix-list", get_file_stat, self.path)
+                if stat == self.stat:
+                    return False
+            (
+                self.stat,
+                self.networks,
+                self.prefixes,
+                self.entries,
+                self.invalid,
+            ) = await service.run_blocking(
+                "route-prefix-list", load_prefix_file, self.path, self.name
+            )
+        except (OSError, UnicodeDecodeError) as e:
+            logger.error(f"Could not load prefix list {self.name}: {e}")
+            self.error = str(e)
+            return False
+        self.loaded = True
+        self.error = ""
+        self.last_load_duration = time.perf_counter() - start
+        logger.info(
+            f"Loaded prefix list {self.name} with {self.entries} prefixes, "
+            f"aggregated to {len(self.prefixes)}, in {self.last_load_duration:.3f}s"
+        )
+        return True
+
+    def to_message(self, message: RoutePrefixListState) -> None:
+        message.name = self.name
+        message.path = self.path
+        message.loaded = self.loaded
+        message.entries = self.entries
+        message.invalid = self.invalid
+        message.prefixes = len(self.prefixes)
+        message.last_load_duration = self.last_load_duration
+        message.error = self.error
+
+
+class TableBlackholes:
+    "Blackhole routes of a table"
+    def __init__(self, table_id: int):
+        self.table_id = table_id
+        # Names of the prefix lists blackholed
+        self.prefix_lists: tuple[str, ...] = ()
+        # Prefixes of the lists as of when ``wanted`` was made from them
+        self.sources: tuple[frozenset[str], ...] = ()
+        self.wanted: frozenset[str] = frozenset()
+        self.installed: frozenset[str] = frozenset()
+        self.added = 0
+        self.deleted = 0
+        self.failed = 0
+        self.last_apply_duration = 0.0
+
+    def to_message(self, message: RouteBlackholeState) -> None:
+        message.table_id = self.table_id
+        message.prefix_list.extend(self.prefix_lists)
+        message.installed = len(self.installed)
+        message.added = self.added
+        message.deleted = self.deleted
+        message.failed = self.failed
+        message.last_apply_duration = self.last_apply_duration
+
+
+class BlackholeRoutes:
+    """
+    Installs blackhole routes to the prefixes of the prefix lists each
+    table references.
+
+    Lists are read and aggregated in a thread, and only when their file has
+    changed. Only the difference between the prefixes wanted in a table and
+    the routes installed is applied, in large batches sent in a thread on
+    the bulk socket. The routes installed are learned from a dump on the
+    first run, so a restart does not install them all again.
+
+    These routes are not followed as events. ``reconcile()`` compares them
+    with a dump instead.
+
+    Runs are made when triggered, such as after a config change, or by
+    ``reload()``.
+    """
+    def __init__(self, service, iproute):
+        self.service = service
+        self.iproute = iproute
+        self.prefix_lists: dict[str, PrefixList] = {}
+        self.tables: dict[int, TableBlackholes] = {}
+        self.synced = False
+        self.triggered = asyncio.Event()
+        self.lock = asyncio.Lock()
+
+    def configure(self, config: RouteTableConfigList) -> None:
+        "Take the prefix lists and the tables' references to them from the config"
+        prefix_lists = {}
+        for list_config in config.prefix_list:
+            prefix_list = self.prefix_lists.get(list_config.name)
+            if prefix_list is None or prefix_list.path != list_config.path:
+                prefix_list = PrefixList(list_config.name, list_config.path)
+            prefix_lists[list_config.name] = prefix_list
+        self.prefix_lists = prefix_lists
+
+        referenced = {}
+        for table_config in config.table:
+            if table_config.blackhole_list:
+                referenced[table_config.id] = tuple(table_config.blackhole_list)
+        for table_id in referenced.keys() - self.tables.keys():
+            self.tables[table_id] = TableBlackholes(table_id)
+        for table_id, table in self.tables.items():
+            table.prefix_lists = referenced.get(table_id, ())
+        self.trigger()
+
+    def trigger(self) -> None:
+        "Run as soon as possible"
+        self.triggered.set()
+
+    async def main(self):
+        try:
+            while True:
+                await self.triggered.wait()
+                self.triggered.clear()
+                try:
+                    await self.run()
+                except Exception:
+                    logger.exception("Applying blackhole routes failed")
+        except asyncio.CancelledError:
+            pass
+
+    async def reload(self, names=None) -> None:
+        "Load the prefix lists named, or all of them, and apply any changes"
+        await self.run(reload=set(self.prefix_lists) if names is None else set(names))
+
+    async def run(self, reload: set[str] = frozenset()) -> None:
+        """
+        Load the prefix lists that have changed, or are in ``reload``, and
+        apply the resulting changes to each table.
+        """
+        async with self.lock:
+            if not self.synced:
+                installed = await self.service.run_blocking(
+                    "route-blackhole",
+                    read_installed_blackholes,
+                    self.iproute.dump_own_routes(),
+                )
+                for table_id, destinations in installed.items():
+                    if table_id not in self.tables:
+                        self.tables[table_id] = TableBlackholes(table_id)
+                    self.tables[table_id].installed = frozenset(destinations)
+                self.synced = True
+
+            for prefix_list in list(self.prefix_lists.values()):
+                await prefix_list.load(self.service, force=prefix_list.name in reload)
+
+            for table in list(self.tables.values()):
+                prefix_lists = []
+                for name in table.prefix_lists:
+                    if name not in self.prefix_lists:
+                        logger.warning(
+                            f"Table {table.table_id} references unknown prefix list {name}"
+                        )
+                        continue
+                    prefix_lists.append(self.prefix_lists[name])
+                sources = tuple(prefix_list.prefixes for prefix_list in prefix_lists)
+                if len(sources) != len(table.sources) or any(
+                    source is not previous for source, previous in zip(sources, table.sources)
+                ):
+                    table.sources = sources
+                    if prefix_lists:
+                        table.wanted = await self.service.run_blocking(
+                            "route-blackhole", combine_prefix_lists, prefix_lists
+                        )
+                    else:
+                        table.wanted = frozenset()
+                if table.wanted is table.installed:
+                    continue
+                await self.apply(table, table.installed, table.wanted)
+
+    async def apply(self, table: TableBlackholes, installed, wanted: frozenset[str]) -> None:
+        "Change the routes ``installed`` in ``table`` to those ``wanted``"
+        start = time.perf_counter()
+        table.installed, table.added, table.deleted, table.failed = await self.service.run_blocking(
+            "route-blackhole",
+            update_blackholes,
+            self.iproute.bulk_batch(),
+            table.table_id,
+            self.iproute.rt_proto,
+            installed,
+            wanted,
+        )
+        table.last_apply_duration = time.perf_counter() - start
+        if table.added or table.deleted:
+            logger.info(
+                f"Added {table.added} and deleted {table.deleted} blackhole routes "
+                f"in table {table.table_id} in {table.last_apply_duration:.3f}s"
+            )
+
+    async def reconcile(self, installed: dict[int, set[str]]) -> tuple[int, int]:
+        """
+        Fix the blackhole routes found ``installed`` by a dump where they
+        differ from those we installed. Returns the numbers that were missing
+        and stale.
+        """
+        missing = 0
+        stale = 0
+        async with self.lock:
+            if not self.synced:
+                return 0, 0
+            for table_id in installed.keys() | self.tables.keys():
+                table = self.tables.get(table_id)
+                if table is None:
+                    table = self.tables[table_id] = TableBlackholes(table_id)
+                found = installed.get(table_id, frozenset())
+                if len(found) == len(table.installed) and found == table.installed:
+                    continue
+                await self.apply(table, found, table.installed)
+                missing += table.added
+                stale += table.deleted
+        return missing, stale
+
+    def lookup(
+        self, table_id: int, address: IPv4Address | IPv6Address, result: RouteLookupResult
+    ) -> None:
+        """
+        Set ``result`` to the blackhole route installed in table ``table_id``
+        to ``address`` if it is more specific than the route found already.
+        Destinations are kept as strings, so each prefix length is tried in
+        turn.
+        """
+        table = self.tables.get(table_id)
+        if table is None or not table.installed:
+            return
+        shortest = int(result.destination.rpartition("/")[2]) + 1 if result.found else 0
+        family = socket.AF_INET6 if address.version == 6 else socket.AF_INET
+        bits = FAMILY_BITS[family]
+        key = int(address)
+        for prefixlen in range(bits, shortest - 1, -1):
+            host_bits = bits - prefixlen
+            network = (key >> host_bits << host_bits).to_bytes(bits // 8, "big")
+            destination = f"{socket.inet_ntop(family, network)}/{prefixlen}"
+            if destination in table.installed:
+                result.found = True
+                result.destination = destination
+                del result.nexthop[:]
+                result.blackhole = True
+                return
+
+    def to_message(self, message: RoutePrefixListStateList) -> None:
+        "Set message parameters from the prefix lists and blackhole routes"
+        for prefix_list in self.prefix_lists.values():
+            prefix_list.to_message(message.prefix_list.add())
+        for table in self.tables.values():
+            table.to_message(message.blackhole.add())
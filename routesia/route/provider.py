@@ -2,7 +2,8 @@
 routesia/route/provider.py - Route support
 """
 
-from ipaddress import ip_network
+import asyncio
+import itertools
 import logging
 
 from routesia.config.provider import ConfigProvider
@@ -18,7 +19,12 @@ from routesia.rtnetlink.events import (
     InterfaceAddEvent,
     InterfaceRemoveEvent,
 )
-from routesia.route.entities import TableEntity
+from routesia.route.entities import TableEntity, parse_address, parse_destination
+from routesia.route.lookup import set_kernel_result
+from routesia.route.nexthop import MEMBER_ID_BASE, NexthopGroupEntity
+from routesia.route.prefixlist import BlackholeRoutes
+from routesia.route.reconcile import RouteReconciler
+from routesia.route.trie import GatewayIndex
 from routesia.schema.v1 import route_pb2
 
 
@@ -44,13 +50,30 @@ class RouteProvider(Provider):
         self.iproute = iproute
         self.config = config
         self.rpc = rpc
+        self.nexthop_groups: dict[int, NexthopGroupEntity] = {}
+        self.member_ids = itertools.count(MEMBER_ID_BASE)
+        # Nexthop group IDs by the gateways of their members
+        self.group_gateways = GatewayIndex()
         self.tables = {}
+        # Position of each route in the staged tables by destination, and the
+        # generation of the staged config it was built from
+        self.staged_routes: dict[int, dict] = {}
+        self.staged_generation = None
         for id, name in DEFAULT_TABLES.items():
-            self.tables[id] = TableEntity(self.iproute, id, name)
+            self.tables[id] = TableEntity(
+                self.iproute, id, name, nexthop_groups=self.nexthop_groups
+            )
+        self.blackholes = BlackholeRoutes(self.service, self.iproute)
+        self.reconciler = RouteReconciler(
+            self.service, self.iproute, self.tables, blackholes=self.blackholes
+        )
 
         self.config.register_init_config_handler(self.init_config)
         self.config.register_change_handler(self.handle_config_change)
 
+        # Set before the initial dump so only these tables are dumped
+        self.iproute.set_route_tables(self.get_route_tables())
+
         self.service.subscribe_event(RouteAddEvent, self.handle_route_add)
         self.service.subscribe_event(RouteRemoveEvent, self.handle_route_remove)
         self.service.subscribe_event(InterfaceAddEvent, self.handle_interface_add)
@@ -61,6 +84,7 @@ class RouteProvider(Provider):
 
         self.rpc.register("route/list", self.rpc_list_routes)
         self.rpc.register("route/table/list", self.rpc_list_tables)
+        self.rpc.register("route/lookup", self.rpc_lookup_routes)
         self.rpc.register("route/config/get", self.rpc_get_config)
         self.rpc.register("route/config/table/add", self.rpc_add_table)
         self.rpc.register("route/config/table/update", self.rpc_update_table)
@@ -69,6 +93,19 @@ class RouteProvider(Provider):
         self.rpc.register("route/config/route/add", self.rpc_add_route)
         self.rpc.register("route/config/route/update", self.rpc_update_route)
         self.rpc.register("route/config/route/delete", self.rpc_delete_route)
+        self.rpc.register("route/config/nexthop_group/get", self.rpc_get_nexthop_group)
+        self.rpc.register("route/config/nexthop_group/add", self.rpc_add_nexthop_group)
+        self.rpc.register("route/config/nexthop_group/update", self.rpc_update_nexthop_group)
+        self.rpc.register("route/config/nexthop_group/delete", self.rpc_delete_nexthop_group)
+        self.rpc.register("route/config/table/blackhole_list/add", self.rpc_add_blackhole_list)
+        self.rpc.register("route/config/table/blackhole_list/delete", self.rpc_delete_blackhole_list)
+        self.rpc.register("route/config/prefix_list/add", self.rpc_add_prefix_list)
+        self.rpc.register("route/config/prefix_list/update", self.rpc_update_prefix_list)
+        self.rpc.register("route/config/prefix_list/delete", self.rpc_delete_prefix_list)
+        self.rpc.register("route/reconcile/run", self.rpc_reconcile)
+        self.rpc.register("route/reconcile/stats", self.rpc_reconcile_stats)
+        self.rpc.register("route/prefix_list/list", self.rpc_list_prefix_lists)
+        self.rpc.register("route/prefix_list/reload", self.rpc_reload_prefix_list)
 
     def init_config(self, config):
         # Set the default tables. These are always present
@@ -85,36 +122,166 @@ class RouteProvider(Provider):
             if table_config.id == table_id:
                 return table_config
 
+    def get_route_tables(self):
+        "Return the IDs of the tables to follow"
+        return set(DEFAULT_TABLES) | {table.id for table in self.config.data.route.table}
+
     def configure(self):
+        self.iproute.set_route_tables(self.get_route_tables())
         route_module_config = self.config.data.route
+
+        # Groups are installed before the routes using them and removed
+        # after
+        group_args = self.get_group_route_args()
+        with self.iproute.batch() as batch:
+            removed = self.configure_nexthop_groups(route_module_config, batch)
+        self.apply_pending_nexthop_groups(self.nexthop_groups.values())
+
         for table_config in route_module_config.table:
             if table_config.id not in self.tables:
                 self.tables[table_config.id] = TableEntity(
-                    self.iproute, table_config.id, config=table_config
+                    self.iproute,
+                    table_config.id,
+                    config=table_config,
+                    nexthop_groups=self.nexthop_groups,
                 )
             self.tables[table_config.id].handle_config_change(table_config)
+        self.blackholes.configure(route_module_config)
+
+        self.apply_group_routes(self.get_changed_groups(group_args))
+        if removed:
+            with self.iproute.batch() as batch:
+                for group in removed:
+                    group.remove(batch)
+
+    def configure_nexthop_groups(self, config, batch):
+        """
+        Apply the nexthop group config. Returns the groups that were removed
+        from the config.
+        """
+        configured = set()
+        for group_config in config.nexthop_group:
+            configured.add(group_config.id)
+            group = self.nexthop_groups.get(group_config.id)
+            if group is None:
+                group = NexthopGroupEntity(
+                    self.iproute, self.tables[254], group_config, self.member_ids
+                )
+                self.nexthop_groups[group_config.id] = group
+            self.set_group_gateways(group, set())
+            group.config = group_config
+            self.set_group_gateways(group, group.gateways)
+            group.apply(batch)
+
+        removed = []
+        for id in list(self.nexthop_groups):
+            if id not in configured:
+                group = self.nexthop_groups.pop(id)
+                self.set_group_gateways(group, set())
+                removed.append(group)
+        return removed
+
+    def set_group_gateways(self, group: NexthopGroupEntity, gateways: set):
+        "Record the gateways of a nexthop group's members"
+        for gateway in group.indexed_gateways - gateways:
+            self.group_gateways.remove(gateway, group.id)
+        for gateway in gateways - group.indexed_gateways:
+            self.group_gateways.add(gateway, group.id)
+        group.indexed_gateways = gateways
+
+    def get_group_route_args(self) -> dict:
+        "Return the arguments routes using each nexthop group are installed with"
+        return {id: group.get_route_args() for id, group in self.nexthop_groups.items()}
+
+    def get_changed_groups(self, group_args: dict) -> list:
+        """
+        Return the IDs of the nexthop groups whose routes are installed
+        differently than with ``group_args``
+        """
+        return [
+            id
+            for id, args in self.get_group_route_args().items()
+            if args != group_args.get(id)
+        ]
+
+    def apply_nexthop_groups(self, groups):
+        "Apply nexthop groups after a change in the reachability of members"
+        group_args = self.get_group_route_args()
+        with self.iproute.batch() as batch:
+            for group in groups:
+                group.apply(batch)
+        self.apply_pending_nexthop_groups(groups)
+        self.apply_group_routes(self.get_changed_groups(group_args))
+
+    def apply_pending_nexthop_groups(self, groups):
+        "Apply nexthop groups again to add the member objects just installed"
+        groups = [group for group in groups if group.members_pending]
+        if groups:
+            with self.iproute.batch() as batch:
+                for group in groups:
+                    group.apply(batch)
+
+    def apply_group_routes(self, group_ids):
+        "Apply the routes using nexthop groups that changed"
+        if not group_ids:
+            return
+        with self.iproute.batch() as batch:
+            for table in self.tables.values():
+                for group_id in group_ids:
+                    table.apply_group_routes(group_id, batch)
+
+    def update_nexthop_groups(self, destination):
+        "Apply the nexthop groups with a member gateway within ``destination``"
+        groups = [
+            self.nexthop_groups[id]
+            for id in dict.fromkeys(self.group_gateways.dependents(destination))
+        ]
+        if groups:
+            self.apply_nexthop_groups(groups)
+
+    def remove_stale_nexthops(self):
+        "Remove nexthop objects we installed that are no longer used"
+        used = set(self.nexthop_groups)
+        for group in self.nexthop_groups.values():
+            used.update(group.members.values())
+        with self.iproute.batch() as batch:
+            for message in self.iproute.dump_nexthops():
+                id = message.get_attr("NHA_ID")
+                if message["protocol"] == self.iproute.rt_proto and id not in used:
+                    batch.nexthop("delete", id=id)
 
     async def handle_route_add(self, event):
-        table_id = event.message["table"]
+        table_id = event.table
         if table_id not in self.tables:
             self.tables[table_id] = TableEntity(
-                self.iproute, table_id, config=self.find_table_config(event)
+                self.iproute,
+                table_id,
+                config=self.find_table_config(event),
+                nexthop_groups=self.nexthop_groups,
             )
         self.tables[table_id].handle_route_add_event(event)
+        if table_id == 254:
+            self.update_nexthop_groups(event.destination)
 
     async def handle_route_remove(self, event):
-        table_id = event.message["table"]
+        table_id = event.table
         if table_id not in self.tables:
             return
         self.tables[table_id].handle_route_remove_event(event)
+        if table_id == 254:
+            self.update_nexthop_groups(event.destination)
 
     async def handle_interface_add(self, event):
         for table in self.tables.values():
             table.handle_interface_add(event)
+        self.apply_nexthop_groups(self.nexthop_groups.values())
 
     async def handle_interface_remove(self, event):
         for table in self.tables.values():
             table.handle_interface_remove(event)
+        for group in self.nexthop_groups.values():
+            group.handle_interface_remove(event.ifindex)
+        self.apply_nexthop_groups(self.nexthop_groups.values())
 
     async def handle_dhcp_lease_preinit(self, event: DHCPv4LeasePreinit):
         table = self.tables.get(table) if event.table else self.tables[254]
@@ -130,13 +297,15 @@ class RouteProvider(Provider):
 
     def start(self):
         self.configure()
+        self.remove_stale_nexthops()
+
+    async def main(self):
+        await asyncio.gather(self.reconciler.main(), self.blackholes.main())
 
     async def rpc_list_routes(self) -> route_pb2.RouteStateList:
         routes = route_pb2.RouteStateList()
         for table in self.tables.values():
-            for route in table.routes.values():
-                route_msg = routes.route.add()
-                route.to_message(route_msg)
+            table.to_message(routes)
         return routes
 
     async def rpc_list_tables(self) -> route_pb2.RouteTableConfigList:
@@ -147,6 +316,36 @@ class RouteProvider(Provider):
             table_msg.name = table.name
         return tables
 
+    async def rpc_lookup_routes(
+        self, msg: route_pb2.RouteLookupRequest
+    ) -> route_pb2.RouteLookupResultList:
+        table_id = msg.table_id or 254
+        table = self.tables.get(table_id)
+        if table is None:
+            raise RPCInvalidArgument(f"Table id {table_id} does not exist")
+        addresses = []
+        for address in msg.address:
+            try:
+                addresses.append(parse_address(address))
+            except ValueError:
+                raise RPCInvalidArgument(f"Invalid address {address}")
+
+        results = route_pb2.RouteLookupResultList()
+        for address in addresses:
+            result = results.result.add()
+            table.lookup(address, result)
+            # Blackhole routes from prefix lists are not followed
+            self.blackholes.lookup(table_id, address, result)
+        if msg.kernel:
+            replies = await self.service.run_blocking(
+                "route-lookup",
+                list,
+                self.iproute.lookup_routes([str(address) for address in addresses]),
+            )
+            for result, (_, reply) in zip(results.result, replies):
+                set_kernel_result(self.iproute, result, reply, self.nexthop_groups)
+        return results
+
     async def rpc_get_config(self) -> route_pb2.RouteTableConfigList:
         return self.config.staged_data.route
 
@@ -168,6 +367,8 @@ class RouteProvider(Provider):
         for table in self.config.staged_data.route.table:
             if table.id == msg.id:
                 table.name = msg.name
+                if msg.HasField("dampening"):
+                    table.dampening.CopyFrom(msg.dampening)
                 return
 
     async def rpc_delete_table(self, msg: route_pb2.RouteTableConfig) -> None:
@@ -178,6 +379,7 @@ class RouteProvider(Provider):
         for i, table in enumerate(self.config.staged_data.route.table):
             if table.id == msg.id:
                 del self.config.staged_data.route.table[i]
+                self.staged_routes.pop(msg.id, None)
                 return
 
     def get_table(self, id, name):
@@ -199,51 +401,185 @@ class RouteProvider(Provider):
                 return table
         raise RPCInvalidArgument(f"Table id {id} does not exist")
 
+    def find_staged_route(self, table, destination) -> int | None:
+        """
+        Return the position of the route to ``destination`` in a staged
+        table, or None if there is none. The table is only scanned if it is
+        not indexed yet or the index turns out to be out of date.
+        """
+        if self.staged_generation != self.config.staged_generation:
+            self.staged_routes = {}
+            self.staged_generation = self.config.staged_generation
+        routes = self.staged_routes.get(table.id)
+        if routes is not None:
+            i = routes.get(destination)
+            if i is None:
+                if len(routes) == len(table.route):
+                    return None
+            elif (
+                i < len(table.route)
+                and parse_destination(table.route[i].destination) == destination
+            ):
+                return i
+        routes = {
+            parse_destination(route.destination): i
+            for i, route in enumerate(table.route)
+        }
+        self.staged_routes[table.id] = routes
+        return routes.get(destination)
+
     async def rpc_get_route(
         self, msg: route_pb2.RouteTableConfig
     ) -> route_pb2.RouteTableConfig:
         table = self.get_table(msg.id, msg.name)
 
-        destination = ip_network(msg.route[0].destination)
+        destination = parse_destination(msg.route[0].destination)
 
-        for route in table.route:
-            if ip_network(route.destination) == destination:
-                route_table = route_pb2.RouteTableConfig()
-                route_table.id = table.id
-                route_table.name = table.name
-                route_route = route_table.route.add()
-                route_route.CopyFrom(route)
-                return route_table
-        raise RPCInvalidArgument(f"Route {destination} does not exist")
+        i = self.find_staged_route(table, destination)
+        if i is None:
+            raise RPCInvalidArgument(f"Route {destination} does not exist")
+        route_table = route_pb2.RouteTableConfig()
+        route_table.id = table.id
+        route_table.name = table.name
+        route_route = route_table.route.add()
+        route_route.CopyFrom(table.route[i])
+        return route_table
 
     async def rpc_add_route(self, msg: route_pb2.RouteTableConfig) -> None:
         table = self.get_table(msg.id, msg.name)
 
-        destination = ip_network(msg.route[0].destination)
+        destination = parse_destination(msg.route[0].destination)
 
-        for route in table.route:
-            if ip_network(route.destination) == destination:
-                raise RPCInvalidArgument(f"Route {destination} exists")
+        if self.find_staged_route(table, destination) is not None:
+            raise RPCInvalidArgument(f"Route {destination} exists")
 
         route = table.route.add()
         route.CopyFrom(msg.route[0])
+        self.staged_routes[table.id][destination] = len(table.route) - 1
 
     async def rpc_update_route(self, msg: route_pb2.RouteTableConfig) -> None:
         table = self.get_table(msg.id, msg.name)
 
-        destination = ip_network(msg.route[0].destination)
+        destination = parse_destination(msg.route[0].destination)
 
-        for route in table.route:
-            if ip_network(route.destination) == destination:
-                route.CopyFrom(msg.route[0])
-                return
+        i = self.find_staged_route(table, destination)
+        if i is not None:
+            table.route[i].CopyFrom(msg.route[0])
 
     async def rpc_delete_route(self, msg: route_pb2.RouteTableConfig) -> None:
         table = self.get_table(msg.id, msg.name)
 
-        destination = ip_network(msg.route[0].destination)
+        destination = parse_destination(msg.route[0].destination)
+
+        i = self.find_staged_route(table, destination)
+        if i is not None:
+            del table.route[i]
+            routes = self.staged_routes[table.id]
+            del routes[destination]
+            for other, j in routes.items():
+                if j > i:
+                    routes[other] = j - 1
+
+    def find_nexthop_group(self, id):
+        for group in self.config.staged_data.route.nexthop_group:
+            if group.id == id:
+                return group
+        raise RPCInvalidArgument(f"Nexthop group {id} does not exist")
+
+    async def rpc_get_nexthop_group(
+        self, msg: route_pb2.RouteNextHopGroupConfig
+    ) -> route_pb2.RouteNextHopGroupConfig:
+        return self.find_nexthop_group(msg.id)
+
+    async def rpc_add_nexthop_group(self, msg: route_pb2.RouteNextHopGroupConfig) -> None:
+        if not msg.id:
+            raise RPCInvalidArgument("Nexthop group id not specified")
+        if msg.id >= MEMBER_ID_BASE:
+            raise RPCInvalidArgument(f"Nexthop group id must be below {MEMBER_ID_BASE}")
+        for group in self.config.staged_data.route.nexthop_group:
+            if group.id == msg.id:
+                raise RPCInvalidArgument(f"Nexthop group {msg.id} exists")
+
+        group = self.config.staged_data.route.nexthop_group.add()
+        group.CopyFrom(msg)
+
+    async def rpc_update_nexthop_group(self, msg: route_pb2.RouteNextHopGroupConfig) -> None:
+        self.find_nexthop_group(msg.id).CopyFrom(msg)
+
+    async def rpc_delete_nexthop_group(self, msg: route_pb2.RouteNextHopGroupConfig) -> None:
+        for i, group in enumerate(self.config.staged_data.route.nexthop_group):
+            if group.id == msg.id:
+                del self.config.staged_data.route.nexthop_group[i]
+                return
+
+    async def rpc_reconcile(self) -> route_pb2.RouteReconcileStats:
+        await self.reconciler.run()
+        return await self.rpc_reconcile_stats()
+
+    async def rpc_reconcile_stats(self) -> route_pb2.RouteReconcileStats:
+        stats = route_pb2.RouteReconcileStats()
+        self.reconciler.to_message(stats)
+        return stats
+
+    async def rpc_add_blackhole_list(self, msg: route_pb2.RouteTableConfig) -> None:
+        table = self.get_table(msg.id, msg.name)
+        name = msg.blackhole_list[0]
+        self.find_prefix_list(name)
+        if name in table.blackhole_list:
+            raise RPCInvalidArgument(f"Prefix list {name} is already blackholed")
+        table.blackhole_list.append(name)
+
+    async def rpc_delete_blackhole_list(self, msg: route_pb2.RouteTableConfig) -> None:
+        table = self.get_table(msg.id, msg.name)
+        for i, name in enumerate(table.blackhole_list):
+            if name == msg.blackhole_list[0]:
+                del table.blackhole_list[i]
+                return
+
+    def find_prefix_list(self, name):
+        for prefix_list in self.config.staged_data.route.prefix_list:
+            if prefix_list.name == name:
+                return prefix_list
+        raise RPCInvalidArgument(f"Prefix list {name} does not exist")
+
+    async def rpc_add_prefix_list(self, msg: route_pb2.RoutePrefixListConfig) -> None:
+        if not msg.name:
+            raise RPCInvalidArgument("Prefix list name not specified")
+        if not msg.path:
+            raise RPCInvalidArgument("Prefix list path not specified")
+        for prefix_list in self.config.staged_data.route.prefix_list:
+            if prefix_list.name == msg.name:
+                raise RPCInvalidArgument(f"Prefix list {msg.name} exists")
+
+        prefix_list = self.config.staged_data.route.prefix_list.add()
+        prefix_list.CopyFrom(msg)
 
-        for i, route in enumerate(table.route):
-            if ip_network(route.destination) == destination:
-                del table.route[i]
+    async def rpc_update_prefix_list(self, msg: route_pb2.RoutePrefixListConfig) -> None:
+        self.find_prefix_list(msg.name).CopyFrom(msg)
+
+    async def rpc_delete_prefix_list(self, msg: route_pb2.RoutePrefixListConfig) -> None:
+        for table in self.config.staged_data.route.table:
+            if msg.name in table.blackhole_list:
+                raise RPCInvalidArgument(
+                    f"Prefix list {msg.name} is blackholed in table {table.id}"
+                )
+        for i, prefix_list in enumerate(self.config.staged_data.route.prefix_list):
+            if prefix_list.name == msg.name:
+                del self.config.staged_data.route.prefix_list[i]
                 return
+
+    async def rpc_list_prefix_lists(self) -> route_pb2.RoutePrefixListStateList:
+        states = route_pb2.RoutePrefixListStateList()
+        self.blackholes.to_message(states)
+        return states
+
+    async def rpc_reload_prefix_list(
+        self, msg: route_pb2.RoutePrefixListConfig
+    ) -> route_pb2.RoutePrefixListStateList:
+        if msg.name:
+            if msg.name not in self.blackholes.prefix_lists:
+                raise RPCInvalidArgument(f"Prefix list {msg.name} does not exist")
+            await self.blackholes.reload([msg.name])
+        else:
+            await self.blackholes.reload()
+        return await self.rpc_list_prefix_lists()
@@ -0,0 +1,319 @@
+"""
+routesia/route/reconcile.py - Reconciliation of installed routes
+"""
+
+import asyncio
+import errno
+import logging
+import time
+from typing import NamedTuple
+
+from routesia.route.entities import parse_address
+from routesia.rtnetlink.batch import RTN_BLACKHOLE
+from routesia.rtnetlink.dump import get_route_destination, get_route_table
+from routesia.schema.v1.route_pb2 import RouteReconcileStats
+
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds between runs
+RECONCILE_INTERVAL = 300
+
+# Routes compared before yielding to the event loop
+RECONCILE_CHUNK = 2000
+
+# Fixes sent in a batch before yielding to the event loop. The kernel takes
+# a while over each when tables are large.
+RECONCILE_BATCH = 256
+
+
+class InstalledRoute(NamedTuple):
+    "A route installed with our protocol, as found in a kernel dump"
+    table: int
+    destination: str
+    priority: int | None
+    nh_id: int
+    gateway: str | None
+    oif: int | None
+    prefsrc: str | None
+    # (gateway, oif) of each nexthop
+    multipath: tuple
+
+    @classmethod
+    def from_message(cls, message) -> "InstalledRoute":
+        attrs = dict(message["attrs"])
+        return cls(
+            get_route_table(message),
+            get_route_destination(message),
+            attrs.get("RTA_PRIORITY"),
+            attrs.get("RTA_NH_ID", 0),
+            attrs.get("RTA_GATEWAY"),
+            attrs.get("RTA_OIF"),
+            attrs.get("RTA_PREFSRC"),
+            tuple(
+                (dict(nexthop["attrs"]).get("RTA_GATEWAY"), nexthop["oif"])
+                for nexthop in attrs.get("RTA_MULTIPATH", ())
+            ),
+        )
+
+    @property
+    def default_priority(self) -> bool:
+        "Whether the route has the priority given to routes installed without one"
+        if self.priority is None:
+            return True
+        return self.priority == (1024 if ":" in self.destination else 0)
+
+    def get_delete_args(self, proto: int) -> dict:
+        kwargs = {"table": self.table, "dst": self.destination, "proto": proto}
+        if self.priority is not None:
+            kwargs["priority"] = self.priority
+        return kwargs
+
+
+def read_installed_routes(messages) -> tuple[dict[tuple, tuple[tuple, ...]], dict[int, set[str]]]:
+    """
+    Return the routes in ``messages`` by table and destination, and the
+    destinations of the blackhole routes by table.
+
+    This is run in a thread along with the dump so only the compact routes
+    are handed back to the event loop. They are kept as plain tuples, which
+    the garbage collector stops tracking, rather than ``InstalledRoute``s,
+    which it does not. Otherwise holding a large dump during a run sets off
+    full collections.
+    """
+    routes = {}
+    blackholes = {}
+    for message in messages:
+        if message["type"] == RTN_BLACKHOLE:
+            table = get_route_table(message)
+            if table not in blackholes:
+                blackholes[table] = set()
+            blackholes[table].add(get_route_destination(message))
+            continue
+        route = InstalledRoute.from_message(message)
+        key = (route.table, route.destination)
+        routes[key] = routes.get(key, ()) + (tuple(route),)
+    return routes, blackholes
+
+
+def same_address(a: str | None, b: str | None) -> bool:
+    "Return whether two addresses are the same, either being empty or None if not set"
+    if a == b:
+        return True
+    if not a or not b:
+        return not a and not b
+    return parse_address(a) == parse_address(b)
+
+
+def route_matches(kwargs: dict, route: InstalledRoute) -> bool:
+    """
+    Return whether ``route`` is as it would be installed with ``kwargs``.
+    Interfaces are only compared where they are given.
+    """
+    if kwargs.get("nh_id", 0) != route.nh_id:
+        return False
+    if route.nh_id:
+        # The nexthops of the group are reconciled with the group
+        return True
+    if "multipath" in kwargs:
+        if len(kwargs["multipath"]) != len(route.multipath):
+            return False
+        for nexthop_args, (gateway, oif) in zip(kwargs["multipath"], route.multipath):
+            if not same_address(nexthop_args.get("gateway"), gateway):
+                return False
+            if "oif" in nexthop_args and nexthop_args["oif"] != oif:
+                return False
+        return True
+    if route.multipath:
+        return False
+    if not same_address(kwargs.get("gateway"), route.gateway):
+        return False
+    if "oif" in kwargs and kwargs["oif"] != route.oif:
+        return False
+    if "prefsrc" in kwargs and not same_address(kwargs["prefsrc"], route.prefsrc):
+        return False
+    return True
+
+
+class RouteReconciler:
+    """
+    Brings the routes installed with our protocol in line with those we
+    want installed, in case they were changed behind our back or events
+    were lost.
+
+    The kernel is dumped for our protocol in a thread. Each configured and
+    DHCP route that can be inserted is compared with it and those missing
+    or changed are replaced. Installed routes that are not wanted are
+    deleted. Routes are compared and fixes sent in chunks, with the event
+    loop yielded to between them, so a large table does not stall event
+    handling.
+
+    Blackhole routes made from prefix lists are compared as sets by
+    ``blackholes``, if given, and are otherwise left alone.
+
+    Runs are made every ``interval`` seconds or when triggered.
+    """
+    def __init__(
+        self,
+        service,
+        iproute,
+        tables: dict,
+        interval: float = RECONCILE_INTERVAL,
+        blackholes=None,
+    ):
+        self.service = service
+        self.iproute = iproute
+        self.tables = tables
+        self.blackholes = blackholes
+        self.interval = interval
+        self.triggered = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.runs = 0
+        self.checked = 0
+        self.missing = 0
+        self.changed = 0
+        self.stale = 0
+        self.failed = 0
+        self.last_drift = 0
+        self.last_duration = 0.0
+
+    def trigger(self) -> None:
+        "Run as soon as possible"
+        self.triggered.set()
+
+    async def main(self):
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self.triggered.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.triggered.clear()
+                try:
+                    await self.run()
+                except Exception:
+                    logger.exception("Route reconciliation failed")
+        except asyncio.CancelledError:
+            pass
+
+    async def run(self) -> None:
+        "Compare the installed routes with those wanted and fix any drift"
+        async with self.lock:
+            start = time.perf_counter()
+            installed, blackholes = await self.service.run_blocking(
+                "route-reconcile",
+                read_installed_routes,
+                self.iproute.dump_own_routes(),
+            )
+            drift = 0
+            checked = 0
+            batch = self.iproute.batch()
+            for table in list(self.tables.values()):
+                for route in table.get_managed_routes():
+                    drift += self.reconcile_route(route, installed, batch)
+                    checked += 1
+                    if checked % RECONCILE_CHUNK == 0 or len(batch) >= RECONCILE_BATCH:
+                        self.commit(batch)
+                        await asyncio.sleep(0)
+
+            # What is left is not wanted
+            for routes in installed.values():
+                for route in routes:
+                    route = InstalledRoute._make(route)
+                    logger.info(
+                        "Deleting stale route %s in table %s"
+                        % (route.destination, route.table)
+                    )
+                    batch.route("delete", **route.get_delete_args(self.iproute.rt_proto))
+                    self.stale += 1
+                    drift += 1
+                    if len(batch) >= RECONCILE_BATCH:
+                        self.commit(batch)
+                        await asyncio.sleep(0)
+            self.commit(batch)
+
+            if self.blackholes is not None:
+                missing, stale = await self.blackholes.reconcile(blackholes)
+                self.missing += missing
+                self.stale += stale
+                drift += missing + stale
+
+            self.runs += 1
+            self.last_drift = drift
+            self.last_duration = time.perf_counter() - start
+            if drift:
+                logger.warning(
+                    "Fixed %d drifted routes in %.3fs" % (drift, self.last_duration)
+                )
+
+    def reconcile_route(self, route, installed: dict, batch) -> int:
+        """
+        Compare a route with those installed, queueing fixes in ``batch``.
+        Returns the number of routes that drifted.
+        """
+        # The route may have changed since the run started
+        if not route.insertable:
+            return 0
+        kwargs = route.get_route_args()
+        if kwargs is None:
+            return 0
+        self.checked += 1
+        found = [
+            InstalledRoute._make(other)
+            for other in installed.pop((kwargs["table"], kwargs["dst"]), ())
+        ]
+        # The route found that is kept, either as is or replaced
+        kept = None
+        for other in found:
+            if route_matches(kwargs, other):
+                kept = other
+                if route.route_args is None:
+                    # So it is deleted when no longer wanted
+                    route.route_args = kwargs
+                break
+        drift = 0
+        if kept is None:
+            if found:
+                logger.info(
+                    "Replacing changed route %s in table %s"
+                    % (kwargs["dst"], kwargs["table"])
+                )
+                self.changed += 1
+                # Installing the route replaces the one with the same
+                # priority
+                for other in found:
+                    if other.default_priority:
+                        kept = other
+                        break
+            else:
+                logger.info(
+                    "Adding missing route %s in table %s"
+                    % (kwargs["dst"], kwargs["table"])
+                )
+                self.missing += 1
+            route.replace(kwargs, batch)
+            drift += 1
+        for other in found:
+            if other is not kept:
+                batch.route("delete", **other.get_delete_args(self.iproute.rt_proto))
+                self.stale += 1
+                drift += 1
+        return drift
+
+    def commit(self, batch) -> None:
+        for error in batch.commit():
+            # Deleted by someone else since the dump
+            if error.code != errno.ESRCH:
+                self.failed += 1
+
+    def to_message(self, message: RouteReconcileStats) -> None:
+        "Set message parameters from reconciliation statistics"
+        message.runs = self.runs
+        message.checked = self.checked
+        message.missing = self.missing
+        message.changed = self.changed
+        message.stale = self.stale
+        message.failed = self.failed
+        message.last_drift = self.last_drift
+        message.last_duration = self.last_duration
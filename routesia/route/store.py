@@ -0,0 +1,178 @@
+"""
+routesia/route/store.py - Compact store of observed routes
+"""
+
+from array import array
+from ipaddress import IPv4Network, IPv6Network, ip_network
+
+from routesia.schema.v1.route_pb2 import RouteState
+
+
+def get_route_nexthops(iproute, event, nexthop_groups=None) -> tuple:
+    """
+    Return the nexthops of a route event as a tuple of (gateway, interface)
+    pairs, with empty strings for those not given.
+
+    Routes using a nexthop object only carry its ID unless the kernel is in
+    nexthop compatibility mode. The nexthops of those using one of
+    ``nexthop_groups`` are taken from the group.
+    """
+    return get_attrs_nexthops(iproute, event.attrs, nexthop_groups)
+
+
+def get_attrs_nexthops(iproute, attrs: dict, nexthop_groups=None) -> tuple:
+    "Like ``get_route_nexthops()``, but from the attributes of a route message"
+    if "RTA_GATEWAY" in attrs or "RTA_OIF" in attrs:
+        interface = ""
+        if "RTA_OIF" in attrs:
+            interface = iproute.get_interface_name_by_index(attrs["RTA_OIF"])
+        return ((attrs.get("RTA_GATEWAY", ""), interface),)
+    if "RTA_MULTIPATH" in attrs:
+        nexthops = []
+        for message in attrs["RTA_MULTIPATH"]:
+            nexthop_attrs = dict(message["attrs"])
+            nexthops.append(
+                (
+                    nexthop_attrs.get("RTA_GATEWAY", ""),
+                    iproute.get_interface_name_by_index(message["oif"]),
+                )
+            )
+        return tuple(nexthops)
+    if "RTA_NH_ID" in attrs and nexthop_groups:
+        group = nexthop_groups.get(attrs["RTA_NH_ID"])
+        if group is not None:
+            return group.nexthops
+    return ()
+
+
+def set_state_nexthops(state: RouteState, nexthops: tuple) -> None:
+    "Set the nexthops of ``state`` from (gateway, interface) pairs"
+    del state.nexthop[:]
+    for gateway, interface in nexthops:
+        nexthop = state.nexthop.add()
+        if gateway:
+            nexthop.gateway = gateway
+        if interface:
+            nexthop.interface = interface
+
+
+def pack_destination(destination: IPv4Network | IPv6Network) -> bytes:
+    # The length tells the families apart
+    return destination.network_address.packed + bytes((destination.prefixlen,))
+
+
+def unpack_destination(key: bytes) -> IPv4Network | IPv6Network:
+    return ip_network((key[:-1], key[-1]))
+
+
+class RouteStore:
+    """
+    Routes in a table that are observed in the kernel but not managed by
+    Routesia.
+
+    A large table can hold millions of these, so they are not kept as
+    entities. Each route takes a slot in a set of arrays, found by its
+    packed destination. Nexthops and preferred source are interned since
+    most routes share them. ``RouteState`` messages are built on demand.
+    """
+    def __init__(self, table_id: int):
+        self.table_id = table_id
+        # Packed destination to slot
+        self.slots: dict[bytes, int] = {}
+        self.protocols = array("B")
+        self.scopes = array("B")
+        # Interned (preferred source, nexthops) of each slot
+        self.info: list[tuple | None] = []
+        self.free_slots: list[int] = []
+        self.interned: dict[tuple, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, destination: IPv4Network | IPv6Network) -> bool:
+        return pack_destination(destination) in self.slots
+
+    def __iter__(self):
+        for key in self.slots:
+            yield unpack_destination(key)
+
+    def add(
+        self,
+        destination: IPv4Network | IPv6Network,
+        protocol: int,
+        scope: int,
+        preferred_source: str,
+        nexthops: tuple,
+    ) -> None:
+        "Add a route or replace the one with the same destination"
+        key = pack_destination(destination)
+        info = (preferred_source, nexthops)
+        info = self.interned.setdefault(info, info)
+        slot = self.slots.get(key)
+        if slot is not None:
+            self.protocols[slot] = protocol
+            self.scopes[slot] = scope
+            self.info[slot] = info
+            return
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.protocols[slot] = protocol
+            self.scopes[slot] = scope
+            self.info[slot] = info
+        else:
+            slot = len(self.info)
+            self.protocols.append(protocol)
+            self.scopes.append(scope)
+            self.info.append(info)
+        self.slots[key] = slot
+
+    def remove(self, destination: IPv4Network | IPv6Network) -> bool:
+        "Remove a route. Returns whether it was present."
+        key = pack_destination(destination)
+        slot = self.slots.pop(key, None)
+        if slot is None:
+            return False
+        self.info[slot] = None
+        self.free_slots.append(slot)
+        return True
+
+    def get_nexthops(self, destination: IPv4Network | IPv6Network) -> tuple | None:
+        slot = self.slots.get(pack_destination(destination))
+        if slot is None:
+            return None
+        return self.info[slot][1]
+
+    def get_state(self, destination: IPv4Network | IPv6Network) -> RouteState | None:
+        "Return the state of a route, or None if not present"
+        key = pack_destination(destination)
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        return self.build_state(key, slot)
+
+    def pop_state(self, destination: IPv4Network | IPv6Network) -> RouteState | None:
+        "Remove a route and return its state, or None if not present"
+        state = self.get_state(destination)
+        if state is not None:
+            self.remove(destination)
+        return state
+
+    def build_state(self, key: bytes, slot: int) -> RouteState:
+        preferred_source, nexthops = self.info[slot]
+        state = RouteState()
+        state.present = True
+        state.table_id = self.table_id
+        state.destination = str(unpack_destination(key))
+        state.protocol = self.protocols[slot]
+        state.scope = self.scopes[slot]
+        if preferred_source:
+            state.preferred_source = preferred_source
+        set_state_nexthops(state, nexthops)
+        return state
+
+    def states(self, exclude=()):
+        "Yield the state of every route but those to destinations in ``exclude``"
+        excluded = {pack_destination(destination) for destination in exclude}
+        for key, slot in self.slots.items():
+            if key not in excluded:
+                yield self.build_state(key, slot)
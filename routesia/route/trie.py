@@ -0,0 +1,383 @@
+"""
+routesia/route/trie.py - Longest prefix match index
+"""
+
+from array import array
+from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network
+
+
+NO_NODE = -1
+
+
+class PrefixTrie:
+    """
+    Path compressed binary trie of prefixes of ``bits`` long addresses.
+
+    Nodes are kept in arrays rather than objects since a table can hold
+    millions of prefixes. Node 0 is the root, the zero length prefix. Other
+    nodes either hold a prefix with a value or branch where two prefixes
+    diverge. Removed nodes are reused.
+
+    Prefixes are given as the address as an integer and a prefix length.
+    """
+    def __init__(self, bits: int):
+        self.bits = bits
+        # IPv4 keys fit in the array. IPv6 keys are kept as ints.
+        self.keys = array("Q", [0]) if bits <= 64 else [0]
+        self.lengths = array("B", [0])
+        # Two children per node, indexed by the next bit
+        self.children = array("i", [NO_NODE, NO_NODE])
+        self.values = [None]
+        self.free_nodes = []
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def new_node(self, key: int, length: int, value) -> int:
+        if self.free_nodes:
+            node = self.free_nodes.pop()
+            self.keys[node] = key
+            self.lengths[node] = length
+            self.children[2 * node] = NO_NODE
+            self.children[2 * node + 1] = NO_NODE
+            self.values[node] = value
+            return node
+        self.keys.append(key)
+        self.lengths.append(length)
+        self.children.append(NO_NODE)
+        self.children.append(NO_NODE)
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def bit(self, key: int, position: int) -> int:
+        "Return bit ``position`` of ``key``, counting from the most significant"
+        return (key >> (self.bits - 1 - position)) & 1
+
+    def mask(self, key: int, length: int) -> int:
+        shift = self.bits - length
+        return key >> shift << shift
+
+    def insert(self, key: int, length: int, value) -> None:
+        "Set the value of a prefix, adding it if not present"
+        bits = self.bits
+        keys = self.keys
+        lengths = self.lengths
+        children = self.children
+        key = self.mask(key, length)
+        node = 0
+        while True:
+            if lengths[node] == length:
+                if self.values[node] is None:
+                    self.count += 1
+                self.values[node] = value
+                return
+            slot = 2 * node + self.bit(key, lengths[node])
+            child = children[slot]
+            if child == NO_NODE:
+                children[slot] = self.new_node(key, length, value)
+                self.count += 1
+                return
+            child_length = lengths[child]
+            common = bits - (key ^ keys[child]).bit_length()
+            if common >= min(child_length, length):
+                if child_length <= length:
+                    node = child
+                    continue
+                # The new prefix contains the child
+                new = self.new_node(key, length, value)
+                children[2 * new + self.bit(keys[child], length)] = child
+                children[slot] = new
+                self.count += 1
+                return
+            # The prefixes diverge, so branch where they do
+            branch = self.new_node(self.mask(key, common), common, None)
+            leaf = self.new_node(key, length, value)
+            children[2 * branch + self.bit(keys[child], common)] = child
+            children[2 * branch + self.bit(key, common)] = leaf
+            children[slot] = branch
+            self.count += 1
+            return
+
+    def load(self, prefixes) -> None:
+        """
+        Add prefixes to an empty trie in bulk. ``prefixes`` yields the key,
+        length and value of each, with the key masked to the length, sorted
+        by key and then length.
+
+        Each prefix is attached to the rightmost path of the trie so far
+        rather than found from the root, which is several times faster than
+        inserting them one by one.
+        """
+        bits = self.bits
+        keys = self.keys
+        lengths = self.lengths
+        children = self.children
+        values = self.values
+        new_node = self.new_node
+        # Nodes from the root to the last prefix added
+        path = [0]
+        for key, length, value in prefixes:
+            node = path[-1]
+            while lengths[node] > length or key >> (bits - lengths[node]) << (bits - lengths[node]) != keys[node]:
+                path.pop()
+                node = path[-1]
+            if lengths[node] == length:
+                if values[node] is None:
+                    self.count += 1
+                values[node] = value
+                continue
+            slot = 2 * node + ((key >> (bits - 1 - lengths[node])) & 1)
+            child = children[slot]
+            leaf = new_node(key, length, value)
+            self.count += 1
+            if child == NO_NODE:
+                children[slot] = leaf
+            else:
+                # The child sorts first so the new prefix takes the one bit
+                common = bits - (key ^ keys[child]).bit_length()
+                branch = new_node(self.mask(key, common), common, None)
+                children[2 * branch] = child
+                children[2 * branch + 1] = leaf
+                children[slot] = branch
+                path.append(branch)
+            path.append(leaf)
+
+    def remove(self, key: int, length: int) -> bool:
+        "Remove a prefix. Returns whether it was present."
+        keys = self.keys
+        lengths = self.lengths
+        children = self.children
+        key = self.mask(key, length)
+        # Slots that link to each node on the path
+        path = []
+        node = 0
+        while lengths[node] < length:
+            slot = 2 * node + self.bit(key, lengths[node])
+            child = children[slot]
+            if child == NO_NODE or self.mask(key, lengths[child]) != keys[child] or lengths[child] > length:
+                return False
+            path.append(slot)
+            node = child
+        if lengths[node] != length or keys[node] != key or self.values[node] is None:
+            return False
+        self.values[node] = None
+        self.count -= 1
+        # Drop nodes that no longer hold a prefix or branch. Removing a leaf
+        # may leave its parent branching to a single child.
+        while node != 0 and self.values[node] is None:
+            left, right = children[2 * node], children[2 * node + 1]
+            if left != NO_NODE and right != NO_NODE:
+                break
+            slot = path.pop()
+            children[slot] = right if left == NO_NODE else left
+            self.free_nodes.append(node)
+            if left != NO_NODE or right != NO_NODE:
+                break
+            node = slot // 2
+        return True
+
+    def get(self, key: int, length: int):
+        "Return the value of a prefix, or None if not present"
+        for node_key, node_length, value in self.covering(key):
+            if node_length == length:
+                return value
+            if node_length < length:
+                break
+        return None
+
+    def covering(self, key: int):
+        """
+        Yield the key, length and value of each prefix containing ``key``,
+        longest first.
+        """
+        keys = self.keys
+        lengths = self.lengths
+        children = self.children
+        values = self.values
+        bits = self.bits
+        matches = []
+        node = 0
+        while True:
+            if values[node] is not None:
+                matches.append(node)
+            length = lengths[node]
+            if length == bits:
+                break
+            child = children[2 * node + ((key >> (bits - 1 - length)) & 1)]
+            if child == NO_NODE:
+                break
+            shift = bits - lengths[child]
+            if key >> shift << shift != keys[child]:
+                break
+            node = child
+        for node in reversed(matches):
+            yield keys[node], lengths[node], values[node]
+
+    def lookup(self, key: int):
+        """
+        Return the key, length and value of the longest prefix containing
+        ``key``, or None.
+        """
+        for match in self.covering(key):
+            return match
+        return None
+
+    def within(self, key: int, length: int):
+        "Yield the key, length and value of each prefix within the given one"
+        keys = self.keys
+        lengths = self.lengths
+        children = self.children
+        key = self.mask(key, length)
+        node = 0
+        while lengths[node] < length:
+            child = children[2 * node + self.bit(key, lengths[node])]
+            if child == NO_NODE:
+                return
+            if lengths[child] >= length:
+                if self.mask(keys[child], length) != key:
+                    return
+            elif self.mask(key, lengths[child]) != keys[child]:
+                return
+            node = child
+        yield from self.iter_from(node)
+
+    def iter_from(self, node: int):
+        "Yield the key, length and value of each prefix below ``node``"
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.values[node] is not None:
+                yield self.keys[node], self.lengths[node], self.values[node]
+            for child in (self.children[2 * node + 1], self.children[2 * node]):
+                if child != NO_NODE:
+                    stack.append(child)
+
+    def __iter__(self):
+        "Yield the key, length and value of each prefix"
+        return self.iter_from(0)
+
+
+
+class RouteIndex:
+    """
+    Longest prefix match index of the routes present in a table and their
+    nexthops, with a trie for each address family.
+
+    Changes are kept aside until the next lookup and then applied together.
+    The routes dumped at startup are thus loaded in bulk rather than
+    inserted one by one.
+    """
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+        # Changes not yet applied for each family, by prefix as the key
+        # shifted left by 8 bits and or'ed with the length, which sorts like
+        # the prefix. Removals are None.
+        self.pending = {4: {}, 6: {}}
+        self.interned: dict[tuple, tuple] = {}
+
+    def __len__(self) -> int:
+        for version in self.tries:
+            self.flush(version)
+        return sum(len(trie) for trie in self.tries.values())
+
+    def add(self, destination: IPv4Network | IPv6Network, nexthops: tuple) -> None:
+        nexthops = self.interned.setdefault(nexthops, nexthops)
+        prefix = int(destination.network_address) << 8 | destination.prefixlen
+        self.pending[destination.version][prefix] = nexthops
+
+    def remove(self, destination: IPv4Network | IPv6Network) -> bool:
+        trie = self.tries[destination.version]
+        pending = self.pending[destination.version]
+        key = int(destination.network_address)
+        if not pending:
+            return trie.remove(key, destination.prefixlen)
+        prefix = key << 8 | destination.prefixlen
+        if prefix in pending:
+            present = pending[prefix] is not None
+        else:
+            present = trie.get(key, destination.prefixlen) is not None
+        if present:
+            pending[prefix] = None
+        return present
+
+    def flush(self, version: int) -> None:
+        """
+        Apply the pending changes for an address family. The trie is
+        rebuilt in bulk if there are at least as many changes as routes in
+        it.
+        """
+        pending = self.pending[version]
+        if not pending:
+            return
+        trie = self.tries[version]
+        if len(pending) < len(trie):
+            for prefix, nexthops in pending.items():
+                if nexthops is None:
+                    trie.remove(prefix >> 8, prefix & 0xff)
+                else:
+                    trie.insert(prefix >> 8, prefix & 0xff, nexthops)
+        else:
+            prefixes = {key << 8 | length: nexthops for key, length, nexthops in trie}
+            prefixes.update(pending)
+            trie = self.tries[version] = PrefixTrie(trie.bits)
+            trie.load(
+                (prefix >> 8, prefix & 0xff, prefixes[prefix])
+                for prefix in sorted(prefixes)
+                if prefixes[prefix] is not None
+            )
+        pending.clear()
+
+    def covering(self, address: IPv4Address | IPv6Address):
+        """
+        Yield the destination and nexthops of each route containing
+        ``address``, most specific first.
+        """
+        self.flush(address.version)
+        network_class = IPv4Network if address.version == 4 else IPv6Network
+        for key, length, nexthops in self.tries[address.version].covering(int(address)):
+            yield network_class((key, length)), nexthops
+
+    def lookup(self, address: IPv4Address | IPv6Address):
+        """
+        Return the destination and nexthops of the most specific route
+        containing ``address``, or None.
+        """
+        for match in self.covering(address):
+            return match
+        return None
+
+
+class GatewayIndex:
+    """
+    What depends on each gateway, such as the destinations of the routes
+    via it, so those with a gateway within a route can be found without
+    walking all of them.
+    """
+    def __init__(self):
+        self.tries = {4: PrefixTrie(32), 6: PrefixTrie(128)}
+
+    def add(self, gateway: IPv4Address | IPv6Address, dependent) -> None:
+        trie = self.tries[gateway.version]
+        key = int(gateway)
+        dependents = trie.get(key, trie.bits)
+        if dependents is None:
+            dependents = set()
+            trie.insert(key, trie.bits, dependents)
+        dependents.add(dependent)
+
+    def remove(self, gateway: IPv4Address | IPv6Address, dependent) -> None:
+        trie = self.tries[gateway.version]
+        key = int(gateway)
+        dependents = trie.get(key, trie.bits)
+        if dependents is None:
+            return
+        dependents.discard(dependent)
+        if not dependents:
+            trie.remove(key, trie.bits)
+
+    def dependents(self, network: IPv4Network | IPv6Network):
+        "Yield what depends on each gateway within ``network``"
+        trie = self.tries[network.version]
+        for _, _, dependents in trie.within(int(network.network_address), network.prefixlen):
+            yield from dependents
@@ -2,14 +2,15 @@
 routesia/rpc.py - RPC implementation using MQTT and protobuf
 """
 
+import asyncio
 from google.protobuf.message import DecodeError
 import inspect
 import logging
 
 from routesia.mqtt import MQTT
-from routesia.schema.v1 import rpc_pb2
+from routesia.schema.v1 import event_pb2, rpc_pb2, service_pb2
 from routesia.schema.registry import SchemaRegistry
-from routesia.service import Provider
+from routesia.service import Provider, Service
 
 
 logger = logging.getLogger("rpc")
@@ -53,18 +54,35 @@ class RPC(Provider):
     The handler may have a single parameter. If the parameter exists and a
     message was sent with the request, the instance will be passed to the
     handler as the parameter.
+
+    The provider itself registers ``service/event/stats``, which returns the
+    event bus statistics of the service, ``service/startup/timeline``, which
+    returns the provider startup timeline, and ``service/blocking/stats``,
+    which returns statistics for blocking calls made off the event loop.
+
+    Methods may instead be registered on demand, using
+    ``register_loader()``.
     """
-    def __init__(self, mqtt: MQTT, schema_registry: SchemaRegistry, prefix="rpc"):
+    def __init__(self, mqtt: MQTT, schema_registry: SchemaRegistry, service: Service, prefix="rpc"):
         super().__init__()
         self.prefix = prefix
         self.mqtt = mqtt
         self.schema_registry = schema_registry
+        self.service = service
         self.handlers = {}
+        # Called before handling the first request for an unregistered method
+        # under each prefix, and the tasks awaiting them
+        self.loaders = {}
+        self.loader_tasks = {}
 
         self.response_prefix = f"{self.prefix}/response"
 
         self.mqtt.subscribe(f"{self.prefix}/request", self.handle_request)
 
+        self.register("service/event/stats", self.rpc_event_stats)
+        self.register("service/startup/timeline", self.rpc_startup_timeline)
+        self.register("service/blocking/stats", self.rpc_blocking_stats)
+
     def register(self, method: str, handler: callable):
         """
         Register an RPC handler for the given topic.
@@ -83,6 +101,28 @@ class RPC(Provider):
         method = method.lstrip('/')
         self.handlers[method] = handler
 
+    def register_loader(self, prefix: str, loader: callable):
+        """
+        Register a coroutine function to be awaited before handling the first
+        request for a method under ``prefix`` that is not registered. It is
+        expected to register the methods, such as by loading the provider
+        they belong to.
+        """
+        self.loaders[prefix.strip('/')] = loader
+
+    async def load_method(self, method: str):
+        "Await the loader registered for a prefix of ``method``, if any"
+        for prefix, loader in self.loaders.items():
+            if method.startswith(f"{prefix}/"):
+                # Requests arriving while loading wait for the same task
+                if prefix not in self.loader_tasks:
+                    self.loader_tasks[prefix] = asyncio.ensure_future(loader())
+                try:
+                    await self.loader_tasks[prefix]
+                except Exception:
+                    logger.exception(f"Loading methods under {prefix} failed")
+                return
+
     def send_response(self, request: rpc_pb2.RPCRequest, response: rpc_pb2.RPCResponse):
         response.request_id = request.request_id
         self.mqtt.publish(f"{self.response_prefix}/{request.client_id}", payload=response.SerializeToString())
@@ -99,6 +139,8 @@ class RPC(Provider):
             return
 
         logger.debug(f"Received request: {request.method}")
+        if request.method not in self.handlers:
+            await self.load_method(request.method)
         if request.method not in self.handlers:
             response.response_code = rpc_pb2.RPCResponse.NO_SUCH_METHOD
             response.error_detail = f"Method {request.method} does not exist"
@@ -141,3 +183,26 @@ class RPC(Provider):
             response.response.Pack(result)
 
         self.send_response(request, response)
+
+    async def rpc_event_stats(self) -> event_pb2.EventStats:
+        stats = event_pb2.EventStats()
+        self.service.event_stats.to_message(stats)
+        stats.queue_depth = len(self.service.eventqueue)
+        stats.dispatch_pending = self.service.event_dispatcher.pending
+        stats.dispatch_tasks = len(self.service.event_dispatcher.tasks)
+        coalescer = self.service.event_coalescer
+        if coalescer:
+            stats.coalesce_held = len(coalescer)
+            stats.coalesced = coalescer.coalesced
+            stats.coalesce_cancelled = coalescer.cancelled
+        return stats
+
+    async def rpc_startup_timeline(self) -> service_pb2.StartupTimeline:
+        timeline = service_pb2.StartupTimeline()
+        self.service.startup_timeline.to_message(timeline)
+        return timeline
+
+    async def rpc_blocking_stats(self) -> service_pb2.BlockingStats:
+        stats = service_pb2.BlockingStats()
+        self.service.blocking_executor.to_message(stats)
+        return stats
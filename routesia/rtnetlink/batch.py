@@ -0,0 +1,485 @@
+"""
+routesia/rtnetlink/batch.py - Batched rtnetlink requests
+"""
+
+import errno
+from functools import lru_cache
+from ipaddress import ip_address, ip_network
+import itertools
+import logging
+import socket
+import struct
+from typing import Callable, Iterable, Iterator
+
+from pyroute2 import NetlinkError
+from pyroute2.netlink import (
+    NLM_F_ACK,
+    NLM_F_CREATE,
+    NLM_F_EXCL,
+    NLM_F_REPLACE,
+    NLM_F_REQUEST,
+    NLMSG_ERROR,
+)
+from pyroute2.netlink.rtnl import (
+    RTM_DELADDR,
+    RTM_DELROUTE,
+    RTM_NEWADDR,
+    RTM_NEWROUTE,
+)
+from pyroute2.netlink.rtnl.ifaddrmsg import ifaddrmsg
+
+
+from routesia.rtnetlink.events import RT_TABLE_COMPAT
+from routesia.rtnetlink.messages import (
+    RTM_DELNEXTHOP,
+    RTM_NEWNEXTHOP,
+    nhmsg,
+    pack_nexthop_group,
+    rtmsg,
+)
+from routesia.rtnetlink.monitor import SO_RCVBUFFORCE, SOL_NETLINK
+
+
+logger = logging.getLogger("rtnetlink")
+
+
+# Acknowledgements carry only the header of the request instead of all of it
+NETLINK_CAP_ACK = 10
+# Dump requests are checked strictly and their filters applied by the kernel
+NETLINK_GET_STRICT_CHK = 12
+
+# Length, type, flags, sequence number and port ID
+NLMSG_HEADER = struct.Struct("=IHHII")
+NLMSG_ERROR_CODE = struct.Struct("=i")
+NLMSG_SEQUENCE_NUMBER = struct.Struct("=I")
+NLMSG_SEQUENCE_NUMBER_OFFSET = 8
+
+RTN_UNICAST = 1
+RTN_BLACKHOLE = 6
+RT_SCOPE_UNIVERSE = 0
+RT_SCOPE_NOWHERE = 255
+
+# Header, then family, destination and source lengths, TOS, table, protocol,
+# scope, type and flags, then RTA_TABLE and the header of RTA_DST
+BLACKHOLE_ROUTE = struct.Struct("=IHHIIBBBBBBBBIHHIHH")
+BLACKHOLE_DST_LEN_OFFSET = 17
+NLMSG_FLAGS = struct.Struct("=H")
+NLMSG_FLAGS_OFFSET = 6
+RTA_DST = 1
+RTA_TABLE = 15
+
+COMMAND_FLAGS = {
+    "add": NLM_F_CREATE | NLM_F_EXCL,
+    "replace": NLM_F_CREATE | NLM_F_REPLACE,
+    "delete": 0,
+    "remove": 0,
+}
+
+
+class NetlinkBatchException(Exception):
+    pass
+
+
+@lru_cache(maxsize=256)
+def get_blackhole_header(command: str, family: int, table: int, proto: int) -> bytes:
+    """
+    Return a blackhole route request for ``command`` up to the destination
+    address, with a destination length of zero and no acknowledgement
+    asked for.
+    """
+    if command not in COMMAND_FLAGS:
+        raise NetlinkBatchException(f"Unknown command {command}")
+    address_size = 4 if family == socket.AF_INET else 16
+    if command in ("delete", "remove"):
+        msg_type = RTM_DELROUTE
+        scope = RT_SCOPE_NOWHERE
+    else:
+        msg_type = RTM_NEWROUTE
+        scope = RT_SCOPE_UNIVERSE
+    return BLACKHOLE_ROUTE.pack(
+        BLACKHOLE_ROUTE.size + address_size,
+        msg_type,
+        NLM_F_REQUEST | COMMAND_FLAGS[command],
+        0,
+        0,
+        family,
+        0,
+        0,
+        0,
+        table if table < 256 else RT_TABLE_COMPAT,
+        proto,
+        scope,
+        RTN_BLACKHOLE,
+        0,
+        8,
+        RTA_TABLE,
+        table,
+        4 + address_size,
+        RTA_DST,
+    )
+
+
+def create_socket(rcvbuf: int = 8388608, timeout: float = 10.0) -> socket.socket:
+    """
+    Return a NETLINK_ROUTE socket for sending batches and filtered dumps.
+
+    Each request in a write is acknowledged separately, so the receive
+    buffer must hold many acknowledgements. It is forced past the system
+    limit where permitted. A ``timeout`` of 0 makes it non-blocking.
+    """
+    sock = socket.socket(
+        socket.AF_NETLINK,
+        socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+        socket.NETLINK_ROUTE,
+    )
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, rcvbuf)
+    except PermissionError:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    # Both are optional and only missing on old kernels
+    for option in (NETLINK_CAP_ACK, NETLINK_GET_STRICT_CHK):
+        try:
+            sock.setsockopt(SOL_NETLINK, option, 1)
+        except OSError:
+            pass
+    sock.bind((0, 0))
+    sock.settimeout(timeout)
+    return sock
+
+
+class NetlinkRequest:
+    __slots__ = ("message", "callback")
+
+    def __init__(self, message, callback: Callable[[NetlinkError | None], None] | None):
+        self.message = message
+        self.callback = callback
+
+
+class NetlinkBatch:
+    """
+    Queues route and address requests and sends them together.
+
+    Requests are made with ``route()`` and ``addr()``, which take the same
+    commands and arguments as the pyroute2 ``IPRoute`` methods for the
+    arguments used here, and ``nexthop()``. Nothing is sent until ``commit()``, which writes
+    the requests in as few writes of up to ``max_write`` bytes as possible,
+    each followed by reading the acknowledgements for that write. The kernel
+    handles the requests in order.
+
+    The result of each request is passed to its ``callback``, None on
+    success or the NetlinkError otherwise. Errors of requests without a
+    callback are logged.
+
+    Blackhole routes, which come in the hundreds of thousands from prefix
+    lists, are instead sent right away with ``send_blackholes()``.
+
+    Used as a context manager, the batch is committed on exit unless an
+    exception was raised.
+
+    Batches sharing a socket should share ``sequence_numbers`` so stale
+    acknowledgements are never mistaken for their own. The kernel handles a
+    write before it returns, so all acknowledgements for it are waiting once
+    it does. Any dropped because the receive buffer overflowed are reported
+    as ENOBUFS errors. On a non-blocking socket, ``commit()`` therefore never
+    waits, and may be called on the event loop.
+    """
+    def __init__(
+        self,
+        sock: socket.socket,
+        sequence_numbers: Iterator[int] | None = None,
+        max_write: int = 65536,
+    ):
+        self.sock = sock
+        self.sequence_numbers = sequence_numbers or itertools.count(1)
+        self.max_write = max_write
+        self.requests: list[NetlinkRequest] = []
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def add(self, message, command: str, callback=None) -> None:
+        if command not in COMMAND_FLAGS:
+            raise NetlinkBatchException(f"Unknown command {command}")
+        message["header"]["flags"] = NLM_F_REQUEST | NLM_F_ACK | COMMAND_FLAGS[command]
+        self.requests.append(NetlinkRequest(message, callback))
+
+    def route(self, command: str, callback=None, **kwargs) -> None:
+        """
+        Queue a route request. ``command`` is one of ``add``, ``replace`` or
+        ``delete``.
+        """
+        destination = ip_network(kwargs.pop("dst"))
+        table = kwargs.pop("table", 254)
+        message = rtmsg()
+        message["header"]["type"] = RTM_DELROUTE if command in ("delete", "remove") else RTM_NEWROUTE
+        message["family"] = socket.AF_INET if destination.version == 4 else socket.AF_INET6
+        message["dst_len"] = destination.prefixlen
+        message["table"] = table if table < 256 else RT_TABLE_COMPAT
+        message["proto"] = kwargs.pop("proto", 0)
+        if message["header"]["type"] == RTM_DELROUTE:
+            message["scope"] = kwargs.pop("scope", RT_SCOPE_NOWHERE)
+            message["type"] = kwargs.pop("type", 0)
+        else:
+            message["scope"] = kwargs.pop("scope", RT_SCOPE_UNIVERSE)
+            message["type"] = kwargs.pop("type", RTN_UNICAST)
+        attrs = [
+            ("RTA_TABLE", table),
+            ("RTA_DST", str(destination.network_address)),
+        ]
+        for name, attr in (
+            ("gateway", "RTA_GATEWAY"),
+            ("oif", "RTA_OIF"),
+            ("prefsrc", "RTA_PREFSRC"),
+            ("priority", "RTA_PRIORITY"),
+            ("nh_id", "RTA_NH_ID"),
+        ):
+            if name in kwargs:
+                attrs.append((attr, kwargs.pop(name)))
+        if "multipath" in kwargs:
+            nexthops = []
+            for nexthop in kwargs.pop("multipath"):
+                nexthop_attrs = []
+                if "gateway" in nexthop:
+                    nexthop_attrs.append(("RTA_GATEWAY", nexthop["gateway"]))
+                nexthops.append(
+                    {
+                        "oif": nexthop.get("oif", 0),
+                        "hops": nexthop.get("hops", 0),
+                        "flags": 0,
+                        "attrs": nexthop_attrs,
+                    }
+                )
+            attrs.append(("RTA_MULTIPATH", nexthops))
+        if kwargs:
+            raise NetlinkBatchException(f"Unsupported route arguments {', '.join(kwargs)}")
+        message["attrs"] = attrs
+        self.add(message, command, callback)
+
+    def nexthop(self, command: str, callback=None, **kwargs) -> None:
+        """
+        Queue a nexthop object request. ``command`` is one of ``add``,
+        ``replace`` or ``delete``.
+
+        Objects are given by ``id`` and either ``gateway`` and ``oif`` or
+        ``group``, a list of (nexthop ID, weight) pairs.
+        """
+        message = nhmsg()
+        attrs = [("NHA_ID", kwargs.pop("id"))]
+        message["family"] = socket.AF_UNSPEC
+        if command in ("delete", "remove"):
+            message["header"]["type"] = RTM_DELNEXTHOP
+        else:
+            message["header"]["type"] = RTM_NEWNEXTHOP
+            message["protocol"] = kwargs.pop("proto", 0)
+            if "group" in kwargs:
+                attrs.append(("NHA_GROUP", pack_nexthop_group(kwargs.pop("group"))))
+            else:
+                # Nexthops other than groups must have a family
+                message["family"] = kwargs.pop("family", socket.AF_INET)
+                if "gateway" in kwargs:
+                    gateway = ip_address(kwargs.pop("gateway"))
+                    message["family"] = socket.AF_INET if gateway.version == 4 else socket.AF_INET6
+                    attrs.append(("NHA_GATEWAY", gateway.packed))
+                if "oif" in kwargs:
+                    attrs.append(("NHA_OIF", kwargs.pop("oif")))
+        if kwargs:
+            raise NetlinkBatchException(f"Unsupported nexthop arguments {', '.join(kwargs)}")
+        message["attrs"] = attrs
+        self.add(message, command, callback)
+
+    def addr(self, command: str, callback=None, **kwargs) -> None:
+        """
+        Queue an address request. ``command`` is one of ``add``, ``replace``,
+        ``delete`` or ``remove``.
+        """
+        address = kwargs.pop("address")
+        local = kwargs.pop("local", address)
+        flags = kwargs.pop("flags", 0)
+        message = ifaddrmsg()
+        message["header"]["type"] = RTM_DELADDR if command in ("delete", "remove") else RTM_NEWADDR
+        message["family"] = socket.AF_INET if ip_address(address).version == 4 else socket.AF_INET6
+        message["prefixlen"] = kwargs.pop("prefixlen")
+        message["index"] = kwargs.pop("index")
+        message["scope"] = kwargs.pop("scope", RT_SCOPE_UNIVERSE)
+        # Flags beyond the header field are only accepted in IFA_FLAGS
+        message["flags"] = flags & 0xff
+        attrs = [("IFA_LOCAL", local), ("IFA_ADDRESS", address)]
+        if flags > 0xff:
+            attrs.append(("IFA_FLAGS", flags))
+        if "proto" in kwargs:
+            attrs.append(("IFA_PROTO", kwargs.pop("proto")))
+        if kwargs:
+            raise NetlinkBatchException(f"Unsupported address arguments {', '.join(kwargs)}")
+        message["attrs"] = attrs
+        self.add(message, command, callback)
+
+    def commit(self) -> list[NetlinkError]:
+        """
+        Send all queued requests and return the errors of those that failed.
+        """
+        requests = self.requests
+        self.requests = []
+        errors = []
+        start = 0
+        while start < len(requests):
+            pending = {}
+            chunk = []
+            size = 0
+            end = start
+            while end < len(requests):
+                message = requests[end].message
+                message.encode()
+                # The encode buffer may be longer than the message
+                data = message.data[:message["header"]["length"]]
+                if chunk and size + len(data) > self.max_write:
+                    break
+                sequence_number = next(self.sequence_numbers)
+                NLMSG_SEQUENCE_NUMBER.pack_into(data, NLMSG_SEQUENCE_NUMBER_OFFSET, sequence_number)
+                chunk.append(data)
+                size += len(data)
+                pending[sequence_number] = requests[end]
+                end += 1
+            self.sock.send(b"".join(chunk))
+            for request, error in self.receive_acks(pending):
+                if error is not None:
+                    errors.append(error)
+                if request.callback:
+                    try:
+                        request.callback(error)
+                    except Exception:
+                        logger.exception("Unhandled failure in netlink request callback")
+                elif error is not None:
+                    logger.error(f"Netlink request failed: {error}")
+            start = end
+        return errors
+
+    def receive_acks(self, pending: dict):
+        "Yield each request in ``pending`` with its error, or None"
+        timeout = self.sock.gettimeout()
+        try:
+            while pending:
+                try:
+                    data = self.sock.recv(65536)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    # Read what is left without waiting for acknowledgements
+                    # that will never come
+                    self.sock.setblocking(False)
+                    continue
+                offset = 0
+                while offset + NLMSG_HEADER.size <= len(data):
+                    length, msg_type, _, sequence_number, _ = NLMSG_HEADER.unpack_from(data, offset)
+                    if length < NLMSG_HEADER.size:
+                        break
+                    if msg_type == NLMSG_ERROR and sequence_number in pending:
+                        code = NLMSG_ERROR_CODE.unpack_from(data, offset + NLMSG_HEADER.size)[0]
+                        request = pending.pop(sequence_number)
+                        yield request, NetlinkError(-code) if code else None
+                    offset += (length + 3) & ~3
+        finally:
+            self.sock.settimeout(timeout)
+        for request in pending.values():
+            yield request, NetlinkError(errno.ENOBUFS)
+
+    def send_blackholes(
+        self, command: str, destinations: Iterable[str], table: int, proto: int
+    ) -> list[tuple[str, NetlinkError]]:
+        """
+        Send a blackhole route request for each of ``destinations``, given
+        as an address and prefix length, and return those that failed with
+        their errors. ``command`` is one of ``replace`` or ``delete``.
+        Queued requests are not sent.
+
+        Messages are packed directly rather than built with pyroute2, and
+        only the last of each write asks for an acknowledgement, so the
+        kernel only replies to the others if they fail. This is many times
+        faster than queueing each with ``route()``.
+        """
+        headers = {
+            family: get_blackhole_header(command, family, table, proto)
+            for family in (socket.AF_INET, socket.AF_INET6)
+        }
+        failed = []
+        chunk = []
+        sent = []
+        size = 0
+        for destination in destinations:
+            address, dst_len = destination.split("/")
+            family = socket.AF_INET6 if ":" in address else socket.AF_INET
+            data = bytearray(headers[family])
+            data[BLACKHOLE_DST_LEN_OFFSET] = int(dst_len)
+            data += socket.inet_pton(family, address)
+            if size + len(data) > self.max_write:
+                failed.extend(self.send_unacknowledged(chunk, sent))
+                chunk = []
+                sent = []
+                size = 0
+            chunk.append(data)
+            sent.append(destination)
+            size += len(data)
+        if chunk:
+            failed.extend(self.send_unacknowledged(chunk, sent))
+        return failed
+
+    def send_unacknowledged(self, chunk: list[bytearray], items: list) -> list[tuple]:
+        """
+        Send requests that do not ask for an acknowledgement in one write
+        and return the item of each that failed with its error.
+
+        The last request is acknowledged regardless, so the replies to all
+        before it are known to have arrived once it is. If replies were
+        dropped, those not known to have failed are reported as ENOBUFS.
+        """
+        first = next(self.sequence_numbers)
+        NLMSG_SEQUENCE_NUMBER.pack_into(chunk[0], NLMSG_SEQUENCE_NUMBER_OFFSET, first)
+        for data in itertools.islice(chunk, 1, None):
+            NLMSG_SEQUENCE_NUMBER.pack_into(
+                data, NLMSG_SEQUENCE_NUMBER_OFFSET, next(self.sequence_numbers)
+            )
+        last = first + len(chunk) - 1
+        flags = NLMSG_FLAGS.unpack_from(chunk[-1], NLMSG_FLAGS_OFFSET)[0]
+        NLMSG_FLAGS.pack_into(chunk[-1], NLMSG_FLAGS_OFFSET, flags | NLM_F_ACK)
+        self.sock.send(b"".join(chunk))
+
+        failed = {}
+        acknowledged = False
+        timeout = self.sock.gettimeout()
+        try:
+            while not acknowledged:
+                try:
+                    data = self.sock.recv(65536)
+                except BlockingIOError:
+                    break
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    self.sock.setblocking(False)
+                    continue
+                offset = 0
+                while offset + NLMSG_HEADER.size <= len(data):
+                    length, msg_type, _, sequence_number, _ = NLMSG_HEADER.unpack_from(data, offset)
+                    if length < NLMSG_HEADER.size:
+                        break
+                    if msg_type == NLMSG_ERROR and first <= sequence_number <= last:
+                        code = NLMSG_ERROR_CODE.unpack_from(data, offset + NLMSG_HEADER.size)[0]
+                        if code:
+                            failed[sequence_number - first] = NetlinkError(-code)
+                        if sequence_number == last:
+                            acknowledged = True
+                    offset += (length + 3) & ~3
+        finally:
+            self.sock.settimeout(timeout)
+        if not acknowledged:
+            for i in range(len(items)):
+                failed.setdefault(i, NetlinkError(errno.ENOBUFS))
+        return [(items[i], error) for i, error in failed.items()]
@@ -0,0 +1,327 @@
+"""
+routesia/rtnetlink/dump.py - Filtered rtnetlink dumps
+"""
+
+import errno
+import socket
+import struct
+from typing import Iterator
+
+from pyroute2 import NetlinkError
+from pyroute2.netlink import NLM_F_DUMP, NLM_F_REQUEST, NLMSG_DONE, NLMSG_ERROR
+from pyroute2.netlink.rtnl import RTM_GETROUTE, RTM_NEWROUTE
+
+from routesia.rtnetlink.batch import NLMSG_ERROR_CODE, NLMSG_HEADER
+from routesia.rtnetlink.events import RT_TABLE_COMPAT
+from routesia.rtnetlink.messages import RTM_GETNEXTHOP, Marshal, drop_routes, nhmsg, rtmsg
+
+
+# Dump replies are at most a few pages each
+DUMP_BUFSIZE = 262144
+
+# Family, destination and source lengths, TOS, table, protocol, scope, type
+# and flags
+RTMSG = struct.Struct("=BBBBBBBBI")
+# Length and type
+RTA_HEADER = struct.Struct("=HH")
+# Length, flags, hops and interface index
+RTNEXTHOP = struct.Struct("=HBBi")
+U32 = struct.Struct("=I")
+NLA_TYPE_MASK = 0x3fff
+
+# Route attributes decoded in summaries
+ADDRESS_ATTRS = {1: "RTA_DST", 5: "RTA_GATEWAY", 7: "RTA_PREFSRC"}
+U32_ATTRS = {4: "RTA_OIF", 6: "RTA_PRIORITY", 15: "RTA_TABLE", 30: "RTA_NH_ID"}
+RTA_MULTIPATH = 9
+RTA_DST = 1
+
+# Header, then family, destination and source lengths, TOS, table, protocol,
+# scope, type and flags, then the header of RTA_DST
+LOOKUP_REQUEST = struct.Struct("=IHHIIBBBBBBBBIHH")
+RTM_F_LOOKUP_TABLE = 0x1000
+RTM_F_FIB_MATCH = 0x2000
+# IPv4 reports the main table unless asked for the one matched. Strict
+# checking rejects asking for IPv6, which reports it regardless.
+LOOKUP_FLAGS = {
+    socket.AF_INET: RTM_F_FIB_MATCH | RTM_F_LOOKUP_TABLE,
+    socket.AF_INET6: RTM_F_FIB_MATCH,
+}
+
+
+def get_route_table(message) -> int:
+    "Return the table of a route message"
+    if message["table"] == RT_TABLE_COMPAT:
+        for attr in message["attrs"]:
+            if attr[0] == "RTA_TABLE":
+                return attr[1]
+    return message["table"]
+
+
+def get_route_destination(message) -> str:
+    "Return the destination of a route summary as an address and prefix length"
+    for attr in message["attrs"]:
+        if attr[0] == "RTA_DST":
+            return f"{attr[1]}/{message['dst_len']}"
+    return "0.0.0.0/0" if message["family"] == socket.AF_INET else "::/0"
+
+
+def decode_route_attrs(data: bytes, offset: int, end: int) -> list:
+    "Return the summary attributes between ``offset`` and ``end``"
+    attrs = []
+    while offset + RTA_HEADER.size <= end:
+        length, attr_type = RTA_HEADER.unpack_from(data, offset)
+        if length < RTA_HEADER.size:
+            break
+        attr_type &= NLA_TYPE_MASK
+        start = offset + RTA_HEADER.size
+        if attr_type in ADDRESS_ATTRS:
+            value = data[start:offset + length]
+            family = socket.AF_INET if len(value) == 4 else socket.AF_INET6
+            attrs.append((ADDRESS_ATTRS[attr_type], socket.inet_ntop(family, value)))
+        elif attr_type in U32_ATTRS:
+            attrs.append((U32_ATTRS[attr_type], U32.unpack_from(data, start)[0]))
+        elif attr_type == RTA_MULTIPATH:
+            attrs.append(("RTA_MULTIPATH", decode_multipath(data, start, offset + length)))
+        offset += (length + 3) & ~3
+    return attrs
+
+
+def decode_multipath(data: bytes, offset: int, end: int) -> list:
+    nexthops = []
+    while offset + RTNEXTHOP.size <= end:
+        length, flags, hops, oif = RTNEXTHOP.unpack_from(data, offset)
+        if length < RTNEXTHOP.size:
+            break
+        nexthops.append(
+            {
+                "flags": flags,
+                "hops": hops,
+                "oif": oif,
+                "attrs": decode_route_attrs(data, offset + RTNEXTHOP.size, offset + length),
+            }
+        )
+        offset += (length + 3) & ~3
+    return nexthops
+
+
+def decode_route_summary(data: bytes, offset: int, end: int) -> dict:
+    """
+    Decode the route message between ``offset`` and ``end`` into a dict
+    shaped like the pyroute2 message, with only the attributes needed to
+    compare routes. This is much faster than decoding all of it.
+    """
+    family, dst_len, _, _, table, proto, scope, route_type, flags = RTMSG.unpack_from(
+        data, offset
+    )
+    return {
+        "family": family,
+        "dst_len": dst_len,
+        "table": table,
+        "proto": proto,
+        "scope": scope,
+        "type": route_type,
+        "flags": flags,
+        "attrs": decode_route_attrs(data, offset + RTMSG.size, end),
+    }
+
+
+def send_dump_request(sock: socket.socket, message, sequence_number: int) -> None:
+    message["header"]["flags"] = NLM_F_REQUEST | NLM_F_DUMP
+    message["header"]["sequence_number"] = sequence_number
+    message.encode()
+    sock.send(message.data[:message["header"]["length"]])
+
+
+def get_route_dump_request(table: int | None, proto: int | None):
+    message = rtmsg()
+    message["header"]["type"] = RTM_GETROUTE
+    message["family"] = socket.AF_UNSPEC
+    attrs = []
+    if table is not None:
+        message["table"] = table if table < 256 else RT_TABLE_COMPAT
+        attrs.append(("RTA_TABLE", table))
+    if proto is not None:
+        message["proto"] = proto
+    message["attrs"] = attrs
+    return message
+
+
+def dump(
+    sock: socket.socket,
+    message,
+    sequence_number: int,
+    ignored_routes: set[tuple[int, int]] | None = None,
+) -> Iterator:
+    """
+    Send the dump request ``message`` and yield the messages returned,
+    without route messages with a (protocol, type) in ``ignored_routes``.
+    """
+    send_dump_request(sock, message, sequence_number)
+    marshal = Marshal()
+    while True:
+        data = sock.recv(DUMP_BUFSIZE)
+        if ignored_routes:
+            data = drop_routes(data, ignored_routes)
+        for reply in marshal.parse(data):
+            header = reply["header"]
+            if header["sequence_number"] != sequence_number:
+                continue
+            if header["type"] == NLMSG_DONE:
+                return
+            if header["type"] == NLMSG_ERROR:
+                raise header.get("error") or NetlinkError(0)
+            yield reply
+
+
+def dump_routes(
+    sock: socket.socket,
+    sequence_number: int,
+    table: int | None = None,
+    proto: int | None = None,
+    ignored_routes: set[tuple[int, int]] | None = None,
+) -> Iterator:
+    """
+    Yield the routes of all families in ``table`` and with protocol
+    ``proto``, or in all tables and with any protocol if not given. Routes
+    with a (protocol, type) in ``ignored_routes`` are skipped.
+
+    The filters are applied by the kernel if the socket has
+    NETLINK_GET_STRICT_CHK set, which avoids encoding and parsing routes
+    that are not wanted. Kernels without it send every route, so the
+    filters are also applied here.
+    """
+    message = get_route_dump_request(table, proto)
+    for reply in dump(sock, message, sequence_number, ignored_routes):
+        if table is not None and get_route_table(reply) != table:
+            continue
+        if proto is not None and reply["proto"] != proto:
+            continue
+        yield reply
+
+
+def dump_route_summaries(
+    sock: socket.socket,
+    sequence_number: int,
+    table: int | None = None,
+    proto: int | None = None,
+) -> Iterator[dict]:
+    """
+    Like ``dump_routes()``, but yield route summaries from
+    ``decode_route_summary()`` rather than full messages.
+    """
+    send_dump_request(sock, get_route_dump_request(table, proto), sequence_number)
+    while True:
+        data = sock.recv(DUMP_BUFSIZE)
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, msg_type, _, reply_sequence_number, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                break
+            start = offset + NLMSG_HEADER.size
+            end = offset + length
+            offset += (length + 3) & ~3
+            if reply_sequence_number != sequence_number:
+                continue
+            if msg_type == NLMSG_DONE:
+                return
+            if msg_type == NLMSG_ERROR:
+                raise NetlinkError(-NLMSG_ERROR_CODE.unpack_from(data, start)[0])
+            if msg_type != RTM_NEWROUTE:
+                continue
+            route = decode_route_summary(data, start, end)
+            if table is not None and get_route_table(route) != table:
+                continue
+            if proto is not None and route["proto"] != proto:
+                continue
+            yield route
+
+
+def get_route_lookup_request(address: str, sequence_number: int) -> bytes:
+    family = socket.AF_INET6 if ":" in address else socket.AF_INET
+    packed = socket.inet_pton(family, address)
+    return LOOKUP_REQUEST.pack(
+        LOOKUP_REQUEST.size + len(packed),
+        RTM_GETROUTE,
+        NLM_F_REQUEST,
+        sequence_number,
+        0,
+        family,
+        len(packed) * 8,
+        0,
+        0,
+        0,
+        0,
+        0,
+        0,
+        LOOKUP_FLAGS[family],
+        RTA_HEADER.size + len(packed),
+        RTA_DST,
+    ) + packed
+
+
+def lookup_routes(
+    sock: socket.socket, addresses: list[str], max_write: int = 65536
+) -> Iterator[tuple[str, dict | NetlinkError]]:
+    """
+    Yield each of ``addresses`` with the summary of the route the kernel
+    matches for it, or the NetlinkError of the lookup, such as
+    ENETUNREACH if there is none. The kernel chooses the table by its
+    policy rules.
+
+    RTM_F_FIB_MATCH has the kernel return the route matched rather than a
+    host route to the address. Requests are sent in as few writes of up to
+    ``max_write`` bytes as possible, each followed by reading its replies.
+    """
+    start = 0
+    while start < len(addresses):
+        chunk = []
+        size = 0
+        end = start
+        while end < len(addresses):
+            # Sequence numbers start at 1
+            data = get_route_lookup_request(addresses[end], end + 1)
+            if chunk and size + len(data) > max_write:
+                break
+            chunk.append(data)
+            size += len(data)
+            end += 1
+        sock.send(b"".join(chunk))
+
+        replies = {}
+        while len(replies) < end - start:
+            data = sock.recv(DUMP_BUFSIZE)
+            offset = 0
+            while offset + NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, sequence_number, _ = NLMSG_HEADER.unpack_from(data, offset)
+                if length < NLMSG_HEADER.size:
+                    break
+                message_start = offset + NLMSG_HEADER.size
+                message_end = offset + length
+                offset += (length + 3) & ~3
+                if not start < sequence_number <= end:
+                    continue
+                if msg_type == NLMSG_ERROR:
+                    replies[sequence_number] = NetlinkError(
+                        -NLMSG_ERROR_CODE.unpack_from(data, message_start)[0]
+                    )
+                elif msg_type == RTM_NEWROUTE:
+                    replies[sequence_number] = decode_route_summary(
+                        data, message_start, message_end
+                    )
+        for sequence_number in range(start + 1, end + 1):
+            yield addresses[sequence_number - 1], replies[sequence_number]
+        start = end
+
+
+def dump_nexthops(sock: socket.socket, sequence_number: int) -> Iterator:
+    """
+    Yield all nexthop objects. Kernels without them have none.
+    """
+    message = nhmsg()
+    message["header"]["type"] = RTM_GETNEXTHOP
+    message["family"] = socket.AF_UNSPEC
+    try:
+        yield from dump(sock, message, sequence_number)
+    except NetlinkError as e:
+        if e.code != errno.EOPNOTSUPP:
+            raise
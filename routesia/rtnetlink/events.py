@@ -2,103 +2,266 @@
 routesia/rtnetlink/events.py - netlink events
 """
 
+from functools import lru_cache
 from ipaddress import ip_interface, ip_network
+from pyroute2.netlink import nla_slot
+from pyroute2.netlink.rtnl import (
+    RTNLGRP_IPV4_IFADDR,
+    RTNLGRP_IPV4_ROUTE,
+    RTNLGRP_IPV6_IFADDR,
+    RTNLGRP_IPV6_ROUTE,
+    RTNLGRP_LINK,
+    RTNLGRP_NEIGH,
+)
 import socket
 
-from routesia.event import Event
+from routesia.event import Event, PRIORITY_BULK, PRIORITY_CONTROL
+
+
+# Set in the header of routes in tables that do not fit in it. The table is
+# given by RTA_TABLE instead.
+RT_TABLE_COMPAT = 252
 
 
 class IgnoreMessage(Exception):
     pass
 
 
+def to_plain(value):
+    """
+    Convert netlink messages and attributes to plain dicts, lists and tuples.
+    """
+    if isinstance(value, nla_slot):
+        return (value[0], to_plain(value[1]))
+    if isinstance(value, dict):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+@lru_cache(maxsize=65536)
+def parse_interface(address: str, prefixlen: int):
+    return ip_interface(f"{address}/{prefixlen}")
+
+
+@lru_cache(maxsize=65536)
+def parse_network(address: str, prefixlen: int):
+    return ip_network(f"{address}/{prefixlen}")
+
+
 class RtnetlinkEvent(Event):
+    """
+    Base of events built from rtnetlink messages.
+
+    Events are created for every message received, so they only decode what
+    is needed to route them. The attribute dict and parsed addresses are
+    built on first access and cached.
+    """
+    __slots__ = ("message", "_attrs")
+
+    # Multicast groups notifying changes reported by the event
+    groups = ()
+
     def __init__(self, iproute, message):
         self.message = message
-        self.attrs = dict(message["attrs"])
+        self._attrs = None
+
+    @property
+    def attrs(self) -> dict:
+        if self._attrs is None:
+            self._attrs = dict(self.message["attrs"])
+        return self._attrs
+
+    def get_attr(self, name, default=None):
+        """
+        Return the value of the attribute ``name``. Scans the message rather
+        than building the attribute dict.
+        """
+        if self._attrs is not None:
+            return self._attrs.get(name, default)
+        for attr in self.message["attrs"]:
+            if attr[0] == name:
+                return attr[1]
+        return default
+
+    def __getstate__(self):
+        # Netlink messages refer to their parser, so store plain data when
+        # pickling. The result supports the same item access. Cached values
+        # are rebuilt on demand.
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if not name.startswith("_") and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        state["message"] = to_plain(self.message)
+        return state
+
+    def __setstate__(self, state):
+        for cls in type(self).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name.startswith("_"):
+                    setattr(self, name, None)
+        for name, value in state.items():
+            # Logs recorded before events were slotted hold decoded values
+            # which are now properties
+            if not isinstance(getattr(type(self), name, None), property):
+                setattr(self, name, value)
 
 
 class InterfaceEvent(RtnetlinkEvent):
+    __slots__ = ("ifindex", "iftype", "ifname")
+
+    priority = PRIORITY_CONTROL
+    groups = (RTNLGRP_LINK,)
+
     def __init__(self, iproute, message):
         super().__init__(iproute, message)
         self.ifindex = message["index"]
         self.iftype = message["ifi_type"]
-        self.ifname = self.attrs["IFLA_IFNAME"]
-        self.kind = self.attrs.get("IFLA_KIND", None)
+        self.ifname = self.get_attr("IFLA_IFNAME")
+
+    @property
+    def kind(self):
+        return self.get_attr("IFLA_KIND")
+
+    def get_dispatch_key(self):
+        # By index rather than name so the events either side of a rename
+        # stay in the same lane, as they are coalesced together
+        return self.get_coalesce_key()
+
+    def get_coalesce_key(self):
+        return ("interface", self.ifindex)
 
 
 class InterfaceAddEvent(InterfaceEvent):
-    pass
+    __slots__ = ()
 
 
 class InterfaceRemoveEvent(InterfaceEvent):
-    pass
+    __slots__ = ()
+
+    is_removal = True
 
 
 class AddressEvent(RtnetlinkEvent):
+    __slots__ = ("ifindex", "ifname", "family", "scope")
+
+    groups = (RTNLGRP_IPV4_IFADDR, RTNLGRP_IPV6_IFADDR)
+
     def __init__(self, iproute, message):
         super().__init__(iproute, message)
         self.ifindex = message["index"]
         self.ifname = iproute.get_interface_name_by_index(self.ifindex)
-        self.peer = None
-        if "IFA_LOCAL" in self.attrs:
-            self.ip = ip_interface(
-                "%s/%s" % (self.attrs["IFA_LOCAL"], message["prefixlen"])
-            )
-            if self.attrs["IFA_LOCAL"] != self.attrs["IFA_ADDRESS"]:
-                self.peer = ip_interface(
-                    "%s/%s" % (self.attrs["IFA_ADDRESS"], message["prefixlen"])
-                )
-        else:
-            self.ip = ip_interface(
-                "%s/%s" % (self.attrs["IFA_ADDRESS"], message["prefixlen"])
-            )
+        self.family = message["family"]
         self.scope = message['scope']
 
+    @property
+    def local(self):
+        "The local address, or IFA_ADDRESS if there is none"
+        return self.get_attr("IFA_LOCAL") or self.get_attr("IFA_ADDRESS")
+
+    @property
+    def ip(self):
+        return parse_interface(self.local, self.message["prefixlen"])
+
+    @property
+    def peer(self):
+        local = self.get_attr("IFA_LOCAL")
+        address = self.get_attr("IFA_ADDRESS")
+        if local is None or local == address:
+            return None
+        return parse_interface(address, self.message["prefixlen"])
+
+    def get_dispatch_key(self):
+        # Share the interface lane so address events stay ordered with the
+        # link events for the same interface
+        return ("interface", self.ifindex)
+
+    def get_coalesce_key(self):
+        return ("address", self.ifindex, self.local, self.message["prefixlen"])
+
 
 class AddressAddEvent(AddressEvent):
-    pass
+    __slots__ = ()
 
 
 class AddressRemoveEvent(AddressEvent):
-    pass
+    __slots__ = ()
+
+    is_removal = True
 
 
 class RouteEvent(RtnetlinkEvent):
+    __slots__ = ("family", "table")
+
+    priority = PRIORITY_BULK
+    groups = (RTNLGRP_IPV4_ROUTE, RTNLGRP_IPV6_ROUTE)
+
     def __init__(self, iproute, message):
         super().__init__(iproute, message)
         if message["family"] not in (socket.AF_INET, socket.AF_INET6):
             raise IgnoreMessage
-        if "RTA_DST" in self.attrs:
-            self.destination = ip_network(
-                "%s/%s" % (self.attrs["RTA_DST"], message["dst_len"])
-            )
-        else:
-            if message["family"] == socket.AF_INET:
-                self.destination = ip_network("0.0.0.0/%s" % message["dst_len"])
-            else:
-                self.destination = ip_network("::/%s" % message["dst_len"])
+        self.family = message["family"]
+        self.table = message["table"]
+        if self.table == RT_TABLE_COMPAT:
+            self.table = self.get_attr("RTA_TABLE", self.table)
+
+    @property
+    def destination(self):
+        address = self.get_attr("RTA_DST")
+        if address is None:
+            address = "0.0.0.0" if self.family == socket.AF_INET else "::"
+        return parse_network(address, self.message["dst_len"])
+
+    def get_dispatch_key(self):
+        return self.get_coalesce_key()
+
+    def get_coalesce_key(self):
+        # Built from the raw destination so routing an event does not parse
+        # it
+        return (
+            "route",
+            self.table,
+            self.family,
+            self.get_attr("RTA_DST"),
+            self.message["dst_len"],
+            self.get_attr("RTA_PRIORITY", 0),
+            self.message["tos"],
+        )
 
 
 class RouteAddEvent(RouteEvent):
-    pass
+    __slots__ = ()
 
 
 class RouteRemoveEvent(RouteEvent):
-    pass
+    __slots__ = ()
+
+    is_removal = True
 
 
 class NeighbourEvent(RtnetlinkEvent):
-    def __init__(self, iproute, message):
-        super().__init__(iproute, message)
+    __slots__ = ()
+
+    priority = PRIORITY_BULK
+    groups = (RTNLGRP_NEIGH,)
+
+    def get_dispatch_key(self):
+        return ("neighbour", self.message["ifindex"])
+
+    def get_coalesce_key(self):
+        return ("neighbour", self.message["ifindex"], self.get_attr("NDA_DST"))
 
 
 class NeighbourAddEvent(NeighbourEvent):
-    pass
+    __slots__ = ()
 
 
 class NeighbourRemoveEvent(NeighbourEvent):
-    pass
+    __slots__ = ()
+
+    is_removal = True
 
 
 ROUTE_EVENT_MAP = {
@@ -0,0 +1,119 @@
+"""
+routesia/rtnetlink/messages.py - rtnetlink messages missing from pyroute2
+"""
+
+import struct
+
+from pyroute2.netlink import nlmsg
+from pyroute2.netlink.rtnl import RTM_DELROUTE, RTM_GETROUTE, RTM_NEWROUTE
+from pyroute2.netlink.rtnl.marshal import MarshalRtnl
+from pyroute2.netlink.rtnl.rtmsg import rtmsg as pyroute2_rtmsg
+
+
+RTM_NEWNEXTHOP = 104
+RTM_DELNEXTHOP = 105
+RTM_GETNEXTHOP = 106
+
+# Multicast group of nexthop object changes
+RTNLGRP_NEXTHOP = 32
+
+# Nexthop ID and weight - 1 of each member of a nexthop group
+NEXTHOP_GROUP_MEMBER = struct.Struct("=IBxH")
+
+# Length and type of a message header
+NLMSG_LENGTH_TYPE = struct.Struct("=IH")
+NLMSG_HEADER_SIZE = 16
+# Offsets of the protocol and type of a route message
+RTMSG_PROTOCOL_OFFSET = NLMSG_HEADER_SIZE + 5
+RTMSG_TYPE_OFFSET = NLMSG_HEADER_SIZE + 7
+RTMSG_SIZE = 12
+
+
+class rtmsg(pyroute2_rtmsg):
+    "Route message that also decodes the nexthop object of the route"
+
+    nla_map = pyroute2_rtmsg.nla_map + (
+        ('RTA_PAD', 'hex'),
+        ('RTA_UID', 'uint32'),
+        ('RTA_TTL_PROPAGATE', 'uint8'),
+        ('RTA_IP_PROTO', 'uint8'),
+        ('RTA_SPORT', 'be16'),
+        ('RTA_DPORT', 'be16'),
+        ('RTA_NH_ID', 'uint32'),
+    )
+
+
+class nhmsg(nlmsg):
+    "Nexthop object message"
+
+    fields = (
+        ('family', 'B'),
+        ('scope', 'B'),
+        ('protocol', 'B'),
+        ('reserved', 'B'),
+        ('flags', 'I'),
+    )
+
+    nla_map = (
+        (0, 'NHA_UNSPEC', 'none'),
+        (1, 'NHA_ID', 'uint32'),
+        (2, 'NHA_GROUP', 'cdata'),
+        (3, 'NHA_GROUP_TYPE', 'uint16'),
+        (4, 'NHA_BLACKHOLE', 'flag'),
+        (5, 'NHA_OIF', 'uint32'),
+        (6, 'NHA_GATEWAY', 'cdata'),
+    )
+
+
+def pack_nexthop_group(members) -> bytes:
+    "Return NHA_GROUP for (nexthop ID, weight) pairs"
+    return b"".join(NEXTHOP_GROUP_MEMBER.pack(id, weight - 1, 0) for id, weight in members)
+
+
+def unpack_nexthop_group(data: bytes) -> list[tuple[int, int]]:
+    "Return the (nexthop ID, weight) pairs of NHA_GROUP"
+    return [
+        (id, weight + 1)
+        for id, weight, _ in NEXTHOP_GROUP_MEMBER.iter_unpack(data)
+    ]
+
+
+def drop_routes(data: bytes, ignored: set[tuple[int, int]]) -> bytes:
+    """
+    Return ``data`` without the route messages with a (protocol, type) in
+    ``ignored``. Reading these from the raw messages is much cheaper than
+    parsing routes only to throw them away.
+    """
+    kept = []
+    # Start of the messages not yet dropped
+    start = 0
+    offset = 0
+    while offset + NLMSG_HEADER_SIZE <= len(data):
+        length, msg_type = NLMSG_LENGTH_TYPE.unpack_from(data, offset)
+        if length < NLMSG_HEADER_SIZE:
+            break
+        end = offset + ((length + 3) & ~3)
+        if (
+            (msg_type == RTM_NEWROUTE or msg_type == RTM_DELROUTE)
+            and length >= NLMSG_HEADER_SIZE + RTMSG_SIZE
+            and (data[offset + RTMSG_PROTOCOL_OFFSET], data[offset + RTMSG_TYPE_OFFSET]) in ignored
+        ):
+            if start < offset:
+                kept.append(data[start:offset])
+            start = end
+        offset = end
+    if not start:
+        return data
+    kept.append(data[start:])
+    return b"".join(kept)
+
+
+class Marshal(MarshalRtnl):
+    "Parses route messages with nexthop objects and nexthop messages"
+
+    msg_map = dict(MarshalRtnl.msg_map)
+    for message_type in (RTM_NEWROUTE, RTM_DELROUTE, RTM_GETROUTE):
+        msg_map[message_type] = rtmsg
+    for message_type in (RTM_NEWNEXTHOP, RTM_DELNEXTHOP, RTM_GETNEXTHOP):
+        msg_map[message_type] = nhmsg
+    del message_type
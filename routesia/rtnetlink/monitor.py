@@ -0,0 +1,138 @@
+"""
+routesia/rtnetlink/monitor.py - Non-blocking rtnetlink multicast reader
+"""
+
+import errno
+import socket
+
+from typing import Iterable
+
+from routesia.rtnetlink.messages import Marshal, drop_routes
+
+
+# Not exposed by the socket module. Sets the receive buffer beyond
+# net.core.rmem_max but requires CAP_NET_ADMIN.
+SO_RCVBUFFORCE = 33
+
+SOL_NETLINK = 270
+NETLINK_ADD_MEMBERSHIP = 1
+NETLINK_DROP_MEMBERSHIP = 2
+
+
+class NetlinkMonitor:
+    """
+    Receives rtnetlink multicast messages on a non-blocking socket.
+
+    The socket is meant to be registered with the event loop using
+    ``add_reader()``. Each call to ``read()`` receives every datagram
+    available, up to ``max_reads``, and returns the parsed messages, so a
+    burst of notifications is handled in a single wakeup.
+
+    The socket receives the multicast ``groups`` it is a member of, given as
+    RTNLGRP values. Membership can be changed at any time with
+    ``set_groups()``.
+
+    If notifications arrive faster than they are read, the socket buffer
+    overflows and the kernel drops them, which is reported by the next
+    receive failing with ENOBUFS. ``read()`` then sets ``overflowed`` and
+    stops. The owner should clear the flag and dump the kernel state again.
+    A large ``rcvbuf`` makes this less likely. It is forced past the system
+    limit where permitted.
+
+    Route messages with a (protocol, type) in ``ignored_routes`` are
+    dropped before they are parsed.
+
+    ``sock`` may be given to read from an existing socket instead, such as
+    one end of a socket pair in tests and benchmarks.
+    """
+    def __init__(
+        self,
+        groups: Iterable[int] = (),
+        rcvbuf: int = 8388608,
+        bufsize: int = 65536,
+        max_reads: int = 64,
+        sock: socket.socket | None = None,
+        ignored_routes: Iterable[tuple[int, int]] = (),
+    ):
+        if sock is None:
+            sock = socket.socket(
+                socket.AF_NETLINK,
+                socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC,
+                socket.NETLINK_ROUTE,
+            )
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, rcvbuf)
+            except PermissionError:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+            sock.bind((0, 0))
+        else:
+            sock.setblocking(False)
+        self.sock = sock
+        self.groups: set[int] = set()
+        self.set_groups(groups)
+        self.bufsize = bufsize
+        self.max_reads = max_reads
+        self.marshal = Marshal()
+        self.ignored_routes = set(ignored_routes)
+        self.overflowed = False
+        # Number of times notifications were dropped
+        self.overflows = 0
+
+    def set_groups(self, groups: Iterable[int]) -> None:
+        "Join and leave multicast groups so the socket is a member of ``groups``"
+        groups = set(groups)
+        for group in sorted(groups - self.groups):
+            self.sock.setsockopt(SOL_NETLINK, NETLINK_ADD_MEMBERSHIP, group)
+        for group in sorted(self.groups - groups):
+            self.sock.setsockopt(SOL_NETLINK, NETLINK_DROP_MEMBERSHIP, group)
+        self.groups = groups
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def read(self) -> list:
+        """
+        Return the messages from all datagrams waiting on the socket.
+        """
+        messages = []
+        recv = self.sock.recv
+        parse = self.marshal.parse
+        bufsize = self.bufsize
+        ignored_routes = self.ignored_routes
+        for _ in range(self.max_reads):
+            try:
+                data = recv(bufsize)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                self.overflowed = True
+                self.overflows += 1
+                break
+            if ignored_routes:
+                data = drop_routes(data, ignored_routes)
+                if not data:
+                    continue
+            messages.extend(parse(data))
+        return messages
+
+    def discard(self) -> int:
+        """
+        Drop all datagrams waiting on the socket and return how many there
+        were.
+        """
+        count = 0
+        while True:
+            try:
+                self.sock.recv(self.bufsize)
+            except BlockingIOError:
+                return count
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                continue
+            count += 1
+
+    def close(self) -> None:
+        self.sock.close()
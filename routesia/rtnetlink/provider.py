@@ -2,24 +2,42 @@
 routesia/rtnetlink/provider.py - IPRoute provider
 """
 
+import asyncio
+import itertools
 import logging
+import socket
+import struct
+from typing import Iterable
+
 from pyroute2 import IPRoute
-import select
-from threading import Thread
+from pyroute2.netlink.rtnl.rtmsg import rtmsg_base
 
 from routesia.service import Provider
 from routesia.service import Service
 from routesia.rtnetlink.events import (
+    RT_TABLE_COMPAT,
     InterfaceAddEvent,
     InterfaceRemoveEvent,
     AddressAddEvent,
     AddressRemoveEvent,
     RouteAddEvent,
+    RouteEvent,
     RouteRemoveEvent,
     NeighbourAddEvent,
     NeighbourRemoveEvent,
     IgnoreMessage,
+    to_plain,
+)
+from routesia.rtnetlink.batch import RTN_BLACKHOLE, NetlinkBatch, create_socket
+from routesia.rtnetlink.dump import (
+    dump_nexthops,
+    dump_route_summaries,
+    dump_routes,
+    get_route_table,
+    lookup_routes,
 )
+from routesia.rtnetlink.messages import NLMSG_HEADER_SIZE, RTMSG_SIZE
+from routesia.rtnetlink.monitor import NetlinkMonitor
 
 
 logger = logging.getLogger("rtnetlink")
@@ -27,6 +45,11 @@ logger = logging.getLogger("rtnetlink")
 
 RT_PROTO = 52
 
+# Routes not followed, by (protocol, type). Blackhole routes installed from
+# prefix lists may number in the hundreds of thousands and are tracked by
+# their owner instead.
+IGNORED_ROUTES = {(RT_PROTO, RTN_BLACKHOLE)}
+
 
 ROUTE_EVENT_MAP = {
     'RTM_NEWLINK': InterfaceAddEvent,
@@ -40,6 +63,113 @@ ROUTE_EVENT_MAP = {
 }
 
 
+# Object types in the order they must be dumped, with the IPRoute request
+# that dumps them and their add and remove event classes
+DUMPS = (
+    ('interface', 'get_links', InterfaceAddEvent, InterfaceRemoveEvent),
+    ('address', 'get_addr', AddressAddEvent, AddressRemoveEvent),
+    ('neighbour', 'get_neighbours', NeighbourAddEvent, NeighbourRemoveEvent),
+    ('route', 'get_routes', RouteAddEvent, RouteRemoveEvent),
+)
+
+# Object type of each event class
+EVENT_KINDS = {
+    event_class: kind
+    for kind, _, add_class, remove_class in DUMPS
+    for event_class in (add_class, remove_class)
+}
+
+
+# Message fields and attributes that change without the object changing,
+# such as counters and timestamps
+VOLATILE_FIELDS = {
+    'header',
+    'event',
+    'change',
+    'IFLA_STATS',
+    'IFLA_STATS64',
+    'IFLA_AF_SPEC',
+    'IFA_CACHEINFO',
+    'RTA_CACHEINFO',
+    'NDA_CACHEINFO',
+    'NDA_PROBES',
+}
+
+
+RTA_HEADER = struct.Struct("=HH")
+# Type of RTA_CACHEINFO, the only volatile route attribute
+RTA_CACHEINFO = 12
+
+
+def get_route_fingerprint(data: bytes, offset: int, end: int) -> int:
+    "Return the fingerprint of the raw route message between ``offset`` and ``end``"
+    start = offset + NLMSG_HEADER_SIZE
+    offset = start + RTMSG_SIZE
+    while offset + RTA_HEADER.size <= end:
+        length, attr_type = RTA_HEADER.unpack_from(data, offset)
+        if length < RTA_HEADER.size:
+            break
+        next_offset = offset + ((length + 3) & ~3)
+        if attr_type == RTA_CACHEINFO:
+            return hash(data[start:offset] + data[next_offset:end])
+        offset = next_offset
+    return hash(data[start:end])
+
+
+# Table, priority, TOS, family and prefix length of a route in its key in
+# kernel_state, followed by its packed destination
+ROUTE_KEY = struct.Struct("=IIBBB")
+
+
+def get_route_key(event: RouteEvent) -> bytes:
+    """
+    Return the key of a route in ``kernel_state``. Routes to the same
+    destination are told apart by their table, priority and TOS, as the
+    kernel does.
+    """
+    key = ROUTE_KEY.pack(
+        event.table,
+        event.get_attr('RTA_PRIORITY', 0),
+        event.message['tos'],
+        event.family,
+        event.message['dst_len'],
+    )
+    destination = event.get_attr('RTA_DST')
+    if destination is None:
+        return key
+    return key + socket.inet_pton(event.family, destination)
+
+
+def get_route_state(fingerprint: int, proto: int) -> int:
+    "Return the state of a route in ``kernel_state``, its fingerprint and protocol"
+    return fingerprint << 8 | proto
+
+
+def get_fingerprint(message) -> int:
+    """
+    Return a hash of a message that ignores volatile fields, so messages
+    for an object compare equal unless it changed.
+
+    Route messages received from the kernel are hashed from their raw data,
+    which is many times faster than going through their decoded fields.
+    """
+    if isinstance(message, rtmsg_base) and message.data is not None:
+        return get_route_fingerprint(
+            message.data, message.offset, message.offset + message['header']['length']
+        )
+    fields = [
+        (name, value)
+        for name, value in message.items()
+        if name != 'attrs' and name not in VOLATILE_FIELDS
+    ]
+    attrs = [
+        (name, value)
+        for name, value in message['attrs']
+        if name not in VOLATILE_FIELDS
+    ]
+    return hash(repr(to_plain(sorted(fields)) + to_plain(attrs)))
+
+
 class IPRouteException(Exception):
     pass
 
@@ -49,7 +179,31 @@ class InterfaceDoesNotExist(IPRouteException):
 
 
 class IPRouteProvider(Provider):
-    def __init__(self, service: Service):
+    """
+    Publishes events for the kernel's links, addresses, neighbours and
+    routes, starting with a dump of each and then following multicast
+    notifications.
+
+    The fingerprint of the last message published for each object is kept
+    in ``kernel_state``. If notifications are lost because the monitor
+    socket overflowed, every object type is dumped again in a thread and
+    only the differences against ``kernel_state`` are published, so
+    subscribers see the same events they would have had the notifications
+    arrived. Notifications wait on the monitor socket meanwhile.
+
+    Only object types with subscribers are dumped and followed, and the
+    multicast groups joined are updated as subscriptions change. Interfaces
+    are always followed since the interface maps depend on them.
+
+    Routes may be limited to some tables with ``set_route_tables()``. Routes
+    installed with our protocol are followed in every table regardless.
+    Their dumps are filtered by the kernel. Blackhole routes installed with
+    our protocol are never followed and are dropped before parsing.
+
+    Route and address changes made in bulk should be queued in a ``batch()``
+    so they are sent together.
+    """
+    def __init__(self, service: Service, rcvbuf: int = 8388608):
         self.service = service
         self.iproute = IPRoute()
         self.rt_proto = RT_PROTO
@@ -57,81 +211,435 @@ class IPRouteProvider(Provider):
         self.interface_map = {}
         # Name to ifindex map
         self.interface_name_map = {}
-        self.thread = Thread(
-            target=self.event_thread,
-            name='IProuteEventThread',
-            kwargs={
-                'service': self.service,
-            },
-            daemon=True,
-        )
+        # State of each object as last published, indexed by object type.
+        # Routes, which may number in the millions, are indexed by their
+        # packed key from get_route_key() and their state is an int from
+        # get_route_state(). Other objects are indexed by the coalesce key
+        # of their events and their state is the fingerprint and message of
+        # the last one.
+        self.kernel_state = {kind: {} for kind, _, _, _ in DUMPS}
+        self.resyncs = 0
+        self.resync_task = None
+        # Object types requested to be resynchronised by the resync task
+        self.resync_kinds: set[str] = set()
+        # Object types currently followed. Set when started.
+        self.kinds: set[str] = set()
+        self.kinds_update_pending = False
+        self.monitor = NetlinkMonitor(rcvbuf=rcvbuf, ignored_routes=IGNORED_ROUTES)
+        self.rcvbuf = rcvbuf
+        # Tables whose routes are followed, or None for all of them
+        self.route_tables: set[int] | None = None
+        # Socket for filtered dumps. Created on first use.
+        self.request_socket = None
+        # Non-blocking socket for batches. Created on first use.
+        self.batch_socket = None
+        # Socket for bulk batches. Created on first use.
+        self.bulk_socket = None
+        self.sequence_numbers = itertools.count(1)
+        self.bulk_sequence_numbers = itertools.count(1)
+        self.service.register_subscription_change_handler(self.handle_subscription_change)
 
     def start(self):
-        self.thread.start()
+        # Notifications received during the initial dumps wait on the
+        # monitor socket until the dumps are published
+        asyncio.get_running_loop().add_reader(self.monitor, self.handle_monitor)
+        self.update_kinds()
+
+    def get_subscribed_kinds(self) -> set[str]:
+        "Return the object types that have subscribers"
+        kinds = {'interface'}
+        for kind, _, add_class, remove_class in DUMPS:
+            if self.service.has_subscribers(add_class) or self.service.has_subscribers(remove_class):
+                kinds.add(kind)
+        return kinds
+
+    def handle_subscription_change(self):
+        # Providers subscribe in bulk, so update once they are done
+        if self.kinds and not self.kinds_update_pending:
+            self.kinds_update_pending = True
+            asyncio.get_running_loop().call_soon(self.update_kinds)
+
+    def update_kinds(self):
+        """
+        Follow the object types that have subscribers, dumping any that were
+        not followed before.
+        """
+        self.kinds_update_pending = False
+        kinds = self.get_subscribed_kinds()
+        added = kinds - self.kinds
+        removed = self.kinds - kinds
+        if not added and not removed:
+            return
+        groups = set()
+        for kind, _, add_class, _ in DUMPS:
+            if kind in kinds:
+                groups.update(add_class.groups)
+        # Join before dumping so no change is missed in between
+        self.monitor.set_groups(groups)
+        self.kinds = kinds
+        for kind in removed:
+            logger.info(f"No longer following {kind} changes")
+            self.kernel_state[kind].clear()
         # This order is important
-        self.get_interfaces()
-        self.get_addresses()
-        self.get_neighbours()
-        self.get_routes()
-
-    def event_thread(self, service: Service):
-        with IPRoute() as iproute:
-            iproute.bind()
-
-            poller = select.poll()
-
-            poller.register(iproute, select.POLLIN)
-
-            while True:
-                events = poller.poll()
-                for event in events:
-                    if event[0] == iproute.fileno():
-                        for message in iproute.get():
-                            if message['event'] in ROUTE_EVENT_MAP:
-                                try:
-                                    event = ROUTE_EVENT_MAP[message['event']](
-                                        self, message)
-                                except IgnoreMessage:
-                                    continue
-
-                                # Update interface map if necessary
-                                if message['event'] == 'RTM_NEWLINK':
-                                    self.interface_map[event.ifindex] = event.ifname
-                                    self.interface_name_map[event.ifname] = event.ifindex
-                                elif message['event'] == 'RTM_DELLINK':
-                                    pass
-                                    # TODO: Delayed remove in case other events occur
-                                    # if event.ifindex in self.interface_map:
-                                    #     del self.interface_map[event.ifindex]
-
-                                service.publish_event(event)
-                            else:
-                                logging.warning("Unhandled event %s" % message['event'])
-
-    def get_interfaces(self):
-        for message in self.iproute.get_links():
-            event = InterfaceAddEvent(self, message)
+        for kind, request, add_class, _ in DUMPS:
+            if kind in added:
+                logger.info(f"Following {kind} changes")
+                self.dump(kind, request, add_class)
+
+    def set_route_tables(self, tables: Iterable[int] | None):
+        """
+        Follow only the routes in ``tables``, or in all tables if None,
+        besides those installed with our protocol.
+
+        Routes in tables that are no longer followed are forgotten without
+        publishing their removal since they still exist. Tables newly
+        followed are dumped by a resync if routes are already being followed,
+        so the dump is made in a thread.
+        """
+        tables = None if tables is None else set(tables)
+        if tables == self.route_tables:
+            return
+        self.route_tables = tables
+        if 'route' not in self.kinds:
+            return
+        state = self.kernel_state['route']
+        for key, route_state in list(state.items()):
+            if not self.follows_table(ROUTE_KEY.unpack_from(key)[0], route_state & 0xff):
+                del state[key]
+        self.request_resync({'route'})
+
+    def stop(self):
+        if self.resync_task is not None:
+            self.resync_task.cancel()
+            self.resync_task = None
+        asyncio.get_running_loop().remove_reader(self.monitor)
+        self.monitor.close()
+        for sock in (self.request_socket, self.batch_socket, self.bulk_socket):
+            if sock is not None:
+                sock.close()
+        self.request_socket = None
+        self.batch_socket = None
+        self.bulk_socket = None
+
+    def get_request_socket(self):
+        """
+        Return the socket for filtered dumps. It is separate from pyroute2's
+        so replies are not mixed with other requests.
+        """
+        if self.request_socket is None:
+            self.request_socket = create_socket(rcvbuf=self.rcvbuf)
+        return self.request_socket
+
+    def get_batch_socket(self):
+        """
+        Return the socket for batches. Batches are committed on the event
+        loop, so it is non-blocking. See ``NetlinkBatch``.
+        """
+        if self.batch_socket is None:
+            self.batch_socket = create_socket(rcvbuf=self.rcvbuf, timeout=0)
+        return self.batch_socket
+
+    def batch(self) -> NetlinkBatch:
+        "Return a new batch of route and address requests"
+        return NetlinkBatch(self.get_batch_socket(), self.sequence_numbers)
+
+    def bulk_batch(self) -> NetlinkBatch:
+        """
+        Return a new batch on the bulk socket. These are meant for the many
+        requests of ``send_blackholes()``, made in a thread, all in the same
+        thread lane, while other batches are sent on the batch socket.
+        """
+        if self.bulk_socket is None:
+            self.bulk_socket = create_socket(rcvbuf=self.rcvbuf)
+        return NetlinkBatch(self.bulk_socket, self.bulk_sequence_numbers)
+
+    def dump_routes(self, table: int | None = None, proto: int | None = None, sock=None):
+        """
+        Yield the followed routes in ``table`` with protocol ``proto`` if
+        given. The dump is made on ``sock`` if given, or else on the request
+        socket.
+        """
+        return dump_routes(
+            sock or self.get_request_socket(),
+            next(self.sequence_numbers),
+            table=table,
+            proto=proto,
+            ignored_routes=IGNORED_ROUTES,
+        )
+
+    def dump_nexthops(self):
+        "Yield all nexthop objects"
+        return dump_nexthops(self.get_request_socket(), next(self.sequence_numbers))
+
+    def dump_own_routes(self):
+        """
+        Yield summaries of the routes installed with our protocol in all
+        tables. See ``decode_route_summary()``.
+
+        The dump is made on a socket of its own, so it may be iterated in
+        another thread while batches are sent on the batch socket.
+        """
+        sock = create_socket(rcvbuf=self.rcvbuf)
+        try:
+            yield from dump_route_summaries(sock, 1, proto=self.rt_proto)
+        finally:
+            sock.close()
+
+    def lookup_routes(self, addresses: list[str]):
+        """
+        Yield each of ``addresses`` with the summary of the route the kernel
+        matches for it, or the NetlinkError of the lookup. See
+        ``lookup_routes()`` in ``routesia.rtnetlink.dump``.
+
+        Like ``dump_own_routes()``, this uses a socket of its own so it may
+        be iterated in another thread.
+        """
+        sock = create_socket(rcvbuf=self.rcvbuf)
+        try:
+            yield from lookup_routes(sock, addresses)
+        finally:
+            sock.close()
+
+    def get_routes(self, sock=None):
+        """
+        Yield the routes in followed tables and all routes we installed.
+        Filtered dumps are made on ``sock`` if given.
+        """
+        if self.route_tables is None:
+            for message in self.iproute.get_routes():
+                if (message['proto'], message['type']) not in IGNORED_ROUTES:
+                    yield message
+            return
+        for table in sorted(self.route_tables):
+            yield from self.dump_routes(table=table, sock=sock)
+        for message in self.dump_routes(proto=self.rt_proto, sock=sock):
+            # Already dumped with their table
+            if get_route_table(message) not in self.route_tables:
+                yield message
+
+    def get_dump(self, kind: str, request: str, sock=None):
+        """
+        Return the messages of a dump of object type ``kind``. Filtered
+        route dumps are made on ``sock`` if given.
+        """
+        if kind == 'route':
+            return self.get_routes(sock)
+        return getattr(self.iproute, request)()
+
+    def follows_table(self, table: int, proto: int) -> bool:
+        "Return whether routes in ``table`` with protocol ``proto`` are followed"
+        return (
+            self.route_tables is None
+            or table in self.route_tables
+            or proto == self.rt_proto
+        )
+
+    def follows_route(self, event: RouteEvent) -> bool:
+        return self.follows_table(event.table, event.message['proto'])
+
+    def handle_monitor(self):
+        for message in self.monitor.read():
+            self.handle_message(message)
+        if self.monitor.overflowed:
+            self.monitor.overflowed = False
+            logger.warning("Netlink notifications were lost. Resynchronising")
+            # Read again once resynchronised
+            asyncio.get_running_loop().remove_reader(self.monitor)
+            self.request_resync(self.kinds)
+
+    def request_resync(self, kinds: Iterable[str]):
+        """
+        Resynchronise object types ``kinds`` in a task. If a resync is
+        already running, they are resynchronised again once it is done.
+        """
+        self.resync_kinds.update(kinds)
+        if self.resync_task is None:
+            self.resync_task = asyncio.get_running_loop().create_task(self.resync())
+
+    def handle_message(self, message):
+        event_class = ROUTE_EVENT_MAP.get(message['event'])
+        if event_class is None:
+            logger.warning("Unhandled event %s" % message['event'])
+            return
+        if EVENT_KINDS[event_class] not in self.kinds:
+            # Sent before the group was left
+            return
+        try:
+            event = event_class(self, message)
+        except IgnoreMessage:
+            return
+        if isinstance(event, RouteEvent) and not self.follows_route(event):
+            return
+        self.publish(event)
+
+    def publish(self, event, fingerprint: int | None = None):
+        """
+        Record the kernel state reported by ``event`` and publish it.
+        ``fingerprint`` is that of its message if already known.
+        """
+        state = self.kernel_state[EVENT_KINDS[type(event)]]
+        key = self.get_state_key(event)
+        if event.is_removal:
+            state.pop(key, None)
+        else:
+            if fingerprint is None:
+                fingerprint = get_fingerprint(event.message)
+            if isinstance(event, RouteEvent):
+                state[key] = get_route_state(fingerprint, event.message['proto'])
+            else:
+                state[key] = (fingerprint, event.message)
+
+        # Update interface map if necessary
+        if isinstance(event, InterfaceAddEvent):
             self.interface_map[event.ifindex] = event.ifname
             self.interface_name_map[event.ifname] = event.ifindex
-            self.service.publish_event(event)
-
-    def get_addresses(self):
-        for message in self.iproute.get_addr():
-            self.service.publish_event(
-                AddressAddEvent(self, message)
-            )
-
-    def get_neighbours(self):
-        for message in self.iproute.get_neighbours():
-            self.service.publish_event(
-                NeighbourAddEvent(self, message)
-            )
-
-    def get_routes(self):
-        for message in self.iproute.get_routes():
-            self.service.publish_event(
-                RouteAddEvent(self, message)
-            )
+        elif isinstance(event, InterfaceRemoveEvent):
+            pass
+            # TODO: Delayed remove in case other events occur
+            # if event.ifindex in self.interface_map:
+            #     del self.interface_map[event.ifindex]
+
+        self.service.publish_event(event)
+
+    def get_state_key(self, event):
+        "Return the key of the object reported by ``event`` in ``kernel_state``"
+        if isinstance(event, RouteEvent):
+            return get_route_key(event)
+        return event.get_coalesce_key()
+
+    def dump(self, kind: str, request: str, event_class):
+        for message in self.get_dump(kind, request):
+            try:
+                self.publish(event_class(self, message))
+            except (IgnoreMessage, InterfaceDoesNotExist):
+                pass
+
+    async def resync(self):
+        """
+        Dump the followed object types requested with ``request_resync()``,
+        or all of them if none were, and publish the differences against
+        the last known state.
+
+        Objects that are new or changed get an add event and objects that no
+        longer exist get a remove event. Removals are published after all
+        additions, in reverse dependency order.
+
+        The dumps are compared in a thread, on a socket of their own.
+        Notifications arriving meanwhile are read once the differences are
+        published, since they may be newer than the dumps.
+        """
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(self.monitor)
+        self.resyncs += 1
+        kinds = self.resync_kinds or self.kinds
+        if kinds >= self.kinds:
+            # Notifications still waiting predate the dump and would undo it
+            self.monitor.discard()
+        else:
+            # Those of the other types are not dumped again, so handle them
+            # before the dump
+            for message in self.monitor.read():
+                self.handle_message(message)
+        sock = create_socket(rcvbuf=self.rcvbuf)
+        try:
+            while kinds:
+                # Those requested meanwhile are resynchronised in another pass
+                self.resync_kinds = set()
+                changed = 0
+                removals = []
+                for kind, request, add_class, remove_class in DUMPS:
+                    if kind not in kinds or kind not in self.kinds:
+                        continue
+                    kind_changed, seen = await self.service.run_blocking(
+                        "rtnetlink", self.compare, kind, request, add_class, sock
+                    )
+                    changed += len(kind_changed)
+                    removals.append(self.apply_changes(kind, kind_changed, seen, remove_class))
+                for events in reversed(removals):
+                    for event in events:
+                        self.publish(event)
+                logger.info(
+                    f"Resynchronised with {changed} changed and "
+                    f"{sum(len(events) for events in removals)} removed objects"
+                )
+                kinds = self.resync_kinds
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Resynchronisation failed")
+        finally:
+            sock.close()
+        self.resync_task = None
+        loop.add_reader(self.monitor, self.handle_monitor)
+
+    def compare(self, kind: str, request: str, add_class, sock=None):
+        """
+        Dump object type ``kind`` and return the add events of the objects
+        that are new or changed since last published, with the fingerprints
+        of their messages, and the keys of all objects dumped.
+
+        ``kernel_state`` is only read, so this may be called in another
+        thread while nothing is published.
+        """
+        state = self.kernel_state[kind]
+        changed = []
+        seen = set()
+        for message in self.get_dump(kind, request, sock):
+            try:
+                event = add_class(self, message)
+            except (IgnoreMessage, InterfaceDoesNotExist):
+                # Such as an address of an interface just removed
+                continue
+            key = self.get_state_key(event)
+            seen.add(key)
+            fingerprint = get_fingerprint(message)
+            previous = state.get(key)
+            if isinstance(event, RouteEvent):
+                if previous != get_route_state(fingerprint, message['proto']):
+                    changed.append((event, fingerprint))
+            elif previous is None or previous[0] != fingerprint:
+                changed.append((event, fingerprint))
+        return changed, seen
+
+    def apply_changes(self, kind: str, changed: list, seen: set, remove_class) -> list:
+        """
+        Publish the add events of objects of type ``kind`` found changed by
+        ``compare()`` and return the remove events of those not ``seen``,
+        which are left to the caller to publish.
+        """
+        for event, fingerprint in changed:
+            self.publish(event, fingerprint)
+        state = self.kernel_state[kind]
+        return [
+            self.get_remove_event(remove_class, key, state[key])
+            for key in state.keys() - seen
+        ]
+
+    def get_remove_event(self, remove_class, key, state):
+        """
+        Return the remove event of an object in ``kernel_state`` given its
+        key and state. Route remove events are built from them.
+        """
+        if remove_class is not RouteRemoveEvent:
+            return remove_class(self, state[1])
+        table, priority, tos, family, dst_len = ROUTE_KEY.unpack_from(key)
+        attrs = [('RTA_TABLE', table)]
+        if len(key) > ROUTE_KEY.size:
+            attrs.append(('RTA_DST', socket.inet_ntop(family, key[ROUTE_KEY.size:])))
+        if priority:
+            attrs.append(('RTA_PRIORITY', priority))
+        return RouteRemoveEvent(
+            self,
+            {
+                'event': 'RTM_DELROUTE',
+                'family': family,
+                'dst_len': dst_len,
+                'tos': tos,
+                'table': table if table < 256 else RT_TABLE_COMPAT,
+                'proto': state & 0xff,
+                'attrs': attrs,
+            },
+        )
 
     def get_interface_name_by_index(self, index):
         try:
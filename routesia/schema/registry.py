@@ -2,6 +2,7 @@
 routesia/schema/registry.py - Schema message registry
 """
 
+from google.protobuf import descriptor_pool, message_factory
 from google.protobuf.message import Message
 import importlib
 import inspect
@@ -16,10 +17,18 @@ class SchemaRegistryException(Exception):
 
 
 class SchemaRegistry(Provider):
+    """
+    Maps protobuf type names to message classes.
+
+    Schema modules are not imported up front. Types are looked up in the
+    default descriptor pool, which holds every schema module imported so
+    far. Only when a type is not found there is the whole schema package
+    imported.
+    """
     def __init__(self):
         super().__init__()
         self.types = {}
-        self.load_schema_package(routesia.schema.v1)
+        self.schema_loaded = False
 
     def load_schema_package(self, package):
         for module_info in pkgutil.iter_modules(package.__path__):
@@ -32,8 +41,23 @@ class SchemaRegistry(Provider):
             if inspect.isclass(cls) and issubclass(cls, Message):
                 self.types[f"{module.DESCRIPTOR.package}.{cls.DESCRIPTOR.name}"] = cls
 
-    def get_message_type_from_type_name(self, type_name):
+    def find_message_type(self, type_name):
+        "Return the message class of an imported schema module, or None"
         try:
-            return self.types[type_name]
+            descriptor = descriptor_pool.Default().FindMessageTypeByName(type_name)
         except KeyError:
+            return None
+        return message_factory.GetMessageClass(descriptor)
+
+    def get_message_type_from_type_name(self, type_name):
+        if type_name in self.types:
+            return self.types[type_name]
+        message_type = self.find_message_type(type_name)
+        if message_type is None and not self.schema_loaded:
+            self.load_schema_package(routesia.schema.v1)
+            self.schema_loaded = True
+            message_type = self.types.get(type_name)
+        if message_type is None:
             raise SchemaRegistryException(f"Unknown type {type_name}")
+        self.types[type_name] = message_type
+        return message_type
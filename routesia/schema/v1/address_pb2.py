@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/address.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n routesia/schema/v1/address.proto\x12\x10routesia.address\"K\n\rAddressConfig\x12\x11\n\tinterface\x18\x01 \x01(\t\x12\n\n\x02ip\x18\x02 \x01(\t\x12\x0c\n\x04peer\x18\x03 \x01(\t\x12\r\n\x05scope\x18\x04 \x01(\r\"E\n\x11\x41\x64\x64ressConfigList\x12\x30\n\x07\x61\x64\x64ress\x18\x01 \x03(\x0b\x32\x1f.routesia.address.AddressConfig\"\xbb\x01\n\x07\x41\x64\x64ress\x12\x30\n\x07\x61\x64\x64ress\x18\x01 \x01(\x0b\x32\x1f.routesia.address.AddressConfig\x12\x35\n\x05state\x18\x02 \x01(\x0e\x32&.routesia.address.Address.AddressState\"G\n\x0c\x41\x64\x64ressState\x12\x0b\n\x07PRESENT\x10\x00\x12\x15\n\x11INTERFACE_MISSING\x10\x01\x12\x13\n\x0f\x41\x44\x44RESS_MISSING\x10\x02\"9\n\x0b\x41\x64\x64ressList\x12*\n\x07\x61\x64\x64ress\x18\x01 \x03(\x0b\x32\x19.routesia.address.Addressb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.address_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _ADDRESSCONFIG._serialized_start=54
+  _ADDRESSCONFIG._serialized_end=129
+  _ADDRESSCONFIGLIST._serialized_start=131
+  _ADDRESSCONFIGLIST._serialized_end=200
+  _ADDRESS._serialized_start=203
+  _ADDRESS._serialized_end=390
+  _ADDRESS_ADDRESSSTATE._serialized_start=319
+  _ADDRESS_ADDRESSSTATE._serialized_end=390
+  _ADDRESSLIST._serialized_start=392
+  _ADDRESSLIST._serialized_end=449
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/config.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from routesia.schema.v1 import address_pb2 as routesia_dot_schema_dot_v1_dot_address__pb2
+from routesia.schema.v1 import dhcp_pb2 as routesia_dot_schema_dot_v1_dot_dhcp__pb2
+from routesia.schema.v1 import dns_pb2 as routesia_dot_schema_dot_v1_dot_dns__pb2
+from routesia.schema.v1 import interface_pb2 as routesia_dot_schema_dot_v1_dot_interface__pb2
+from routesia.schema.v1 import ipam_pb2 as routesia_dot_schema_dot_v1_dot_ipam__pb2
+from routesia.schema.v1 import netfilter_pb2 as routesia_dot_schema_dot_v1_dot_netfilter__pb2
+from routesia.schema.v1 import route_pb2 as routesia_dot_schema_dot_v1_dot_route__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1froutesia/schema/v1/config.proto\x12\x0froutesia.config\x1a routesia/schema/v1/address.proto\x1a\x1droutesia/schema/v1/dhcp.proto\x1a\x1croutesia/schema/v1/dns.proto\x1a\"routesia/schema/v1/interface.proto\x1a\x1droutesia/schema/v1/ipam.proto\x1a\"routesia/schema/v1/netfilter.proto\x1a\x1eroutesia/schema/v1/route.proto\"\xbd\x03\n\x06\x43onfig\x12.\n\x06system\x18\x01 \x01(\x0b\x32\x1e.routesia.config.Config.System\x12\'\n\x04ipam\x18\x02 \x01(\x0b\x32\x19.routesia.ipam.IPAMConfig\x12;\n\ninterfaces\x18\x03 \x01(\x0b\x32\'.routesia.interface.InterfaceConfigList\x12\x36\n\taddresses\x18\x04 \x01(\x0b\x32#.routesia.address.AddressConfigList\x12\x33\n\x05route\x18\x05 \x01(\x0b\x32$.routesia.route.RouteTableConfigList\x12\x36\n\tnetfilter\x18\x06 \x01(\x0b\x32#.routesia.netfilter.NetfilterConfig\x12\'\n\x04\x64hcp\x18\x07 \x01(\x0b\x32\x19.routesia.dhcp.DHCPConfig\x12$\n\x03\x64ns\x18\x08 \x01(\x0b\x32\x17.routesia.dns.DNSConfig\x1a)\n\x06System\x12\x0e\n\x06schema\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\x03\"\xb4\x01\n\x0c\x43ommitResult\x12\x43\n\x0bresult_code\x18\x01 \x01(\x0e\x32..routesia.config.CommitResult.CommitResultCode\x12\x0f\n\x07message\x18\x02 \x01(\t\"N\n\x10\x43ommitResultCode\x12\x12\n\x0e\x43OMMIT_SUCCESS\x10\x00\x12\x14\n\x10\x43OMMIT_UNCHANGED\x10\x01\x12\x10\n\x0c\x43OMMIT_ERROR\x10\x02\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.config_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _CONFIG._serialized_start=283
+  _CONFIG._serialized_end=728
+  _CONFIG_SYSTEM._serialized_start=687
+  _CONFIG_SYSTEM._serialized_end=728
+  _COMMITRESULT._serialized_start=731
+  _COMMITRESULT._serialized_end=911
+  _COMMITRESULT_COMMITRESULTCODE._serialized_start=833
+  _COMMITRESULT_COMMITRESULTCODE._serialized_end=911
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dhcp_client.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n$routesia/schema/v1/dhcp_client.proto\x12\rroutesia.dhcp\"6\n\x12\x44HCPv4ClientConfig\x12\x11\n\tinterface\x18\x01 \x01(\t\x12\r\n\x05table\x18\x02 \x01(\r\"A\n\x10\x44HCPClientConfig\x12-\n\x02v4\x18\x01 \x03(\x0b\x32!.routesia.dhcp.DHCPv4ClientConfig\">\n\x16\x44HCPv4ClientEventRoute\x12\x13\n\x0b\x64\x65stination\x18\x01 \x01(\t\x12\x0f\n\x07gateway\x18\x02 \x01(\t\"\xfc\x01\n\x1b\x44HCPv4ClientEventParameters\x12\x12\n\nip_address\x18\x01 \x01(\t\x12\x0b\n\x03mtu\x18\x02 \x01(\r\x12\x34\n\x05route\x18\x03 \x03(\x0b\x32%.routesia.dhcp.DHCPv4ClientEventRoute\x12\x0f\n\x07gateway\x18\x04 \x03(\t\x12\x15\n\rdomain_search\x18\x05 \x03(\t\x12\x13\n\x0b\x64omain_name\x18\x06 \x01(\t\x12\x1a\n\x12\x64omain_name_server\x18\x07 \x03(\t\x12\x12\n\nntp_server\x18\x08 \x03(\t\x12\x19\n\x11server_identifier\x18\t \x01(\t\"\xf4\x01\n\x11\x44HCPv4ClientEvent\x12\x11\n\tinterface\x18\x01 \x01(\t\x12\x30\n\x04type\x18\x02 \x01(\x0e\x32\".routesia.dhcp.DHCPClientEventType\x12\x0e\n\x06medium\x18\x03 \x01(\t\x12\x18\n\x10\x61lias_ip_address\x18\x04 \x01(\t\x12\x37\n\x03new\x18\x05 \x01(\x0b\x32*.routesia.dhcp.DHCPv4ClientEventParameters\x12\x37\n\x03old\x18\x06 \x01(\x0b\x32*.routesia.dhcp.DHCPv4ClientEventParameters\"]\n\x12\x44HCPv4ClientStatus\x12\x11\n\tinterface\x18\x01 \x01(\t\x12\x34\n\nlast_event\x18\x02 \x01(\x0b\x32 .routesia.dhcp.DHCPv4ClientEvent\"K\n\x16\x44HCPv4ClientStatusList\x12\x31\n\x06\x63lient\x18\x01 \x03(\x0b\x32!.routesia.dhcp.DHCPv4ClientStatus*\x96\x01\n\x13\x44HCPClientEventType\x12\n\n\x06MEDIUM\x10\x00\x12\x0b\n\x07PREINIT\x10\x01\x12\t\n\x05\x42OUND\x10\x02\x12\t\n\x05RENEW\x10\x03\x12\n\n\x06REBIND\x10\x04\x12\n\n\x06REBOOT\x10\x05\x12\n\n\x06\x45XPIRE\x10\x06\x12\x08\n\x04\x46\x41IL\x10\x07\x12\x08\n\x04STOP\x10\x08\x12\x0b\n\x07RELEASE\x10\t\x12\x0b\n\x07TIMEOUT\x10\nb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dhcp_client_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _DHCPCLIENTEVENTTYPE._serialized_start=917
+  _DHCPCLIENTEVENTTYPE._serialized_end=1067
+  _DHCPV4CLIENTCONFIG._serialized_start=55
+  _DHCPV4CLIENTCONFIG._serialized_end=109
+  _DHCPCLIENTCONFIG._serialized_start=111
+  _DHCPCLIENTCONFIG._serialized_end=176
+  _DHCPV4CLIENTEVENTROUTE._serialized_start=178
+  _DHCPV4CLIENTEVENTROUTE._serialized_end=240
+  _DHCPV4CLIENTEVENTPARAMETERS._serialized_start=243
+  _DHCPV4CLIENTEVENTPARAMETERS._serialized_end=495
+  _DHCPV4CLIENTEVENT._serialized_start=498
+  _DHCPV4CLIENTEVENT._serialized_end=742
+  _DHCPV4CLIENTSTATUS._serialized_start=744
+  _DHCPV4CLIENTSTATUS._serialized_end=837
+  _DHCPV4CLIENTSTATUSLIST._serialized_start=839
+  _DHCPV4CLIENTSTATUSLIST._serialized_end=914
+# @@protoc_insertion_point(module_scope)
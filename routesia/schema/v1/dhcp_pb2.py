@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dhcp.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from routesia.schema.v1 import dhcp_server_pb2 as routesia_dot_schema_dot_v1_dot_dhcp__server__pb2
+from routesia.schema.v1 import dhcp_client_pb2 as routesia_dot_schema_dot_v1_dot_dhcp__client__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1droutesia/schema/v1/dhcp.proto\x12\rroutesia.dhcp\x1a$routesia/schema/v1/dhcp_server.proto\x1a$routesia/schema/v1/dhcp_client.proto\"n\n\nDHCPConfig\x12/\n\x06server\x18\x01 \x01(\x0b\x32\x1f.routesia.dhcp.DHCPServerConfig\x12/\n\x06\x63lient\x18\x02 \x01(\x0b\x32\x1f.routesia.dhcp.DHCPClientConfigb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dhcp_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _DHCPCONFIG._serialized_start=124
+  _DHCPCONFIG._serialized_end=234
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dhcp_server.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n$routesia/schema/v1/dhcp_server.proto\x12\rroutesia.dhcp\"\x85\x01\n\x10OptionDefinition\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x63ode\x18\x02 \x01(\r\x12\r\n\x05space\x18\x03 \x01(\t\x12\x0c\n\x04type\x18\x04 \x01(\t\x12\r\n\x05\x61rray\x18\x05 \x01(\x08\x12\x14\n\x0crecord_types\x18\x06 \x01(\t\x12\x13\n\x0b\x65ncapsulate\x18\x07 \x01(\t\"6\n\nOptionData\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x63ode\x18\x02 \x01(\r\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\t\";\n\x0bReservation\x12\x18\n\x10hardware_address\x18\x01 \x01(\t\x12\x12\n\nip_address\x18\x02 \x01(\t\"\xa5\x01\n\x0b\x43lientClass\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04test\x18\x02 \x01(\t\x12\x13\n\x0bnext_server\x18\x03 \x01(\t\x12:\n\x11option_definition\x18\x04 \x03(\x0b\x32\x1f.routesia.dhcp.OptionDefinition\x12)\n\x06option\x18\x05 \x03(\x0b\x32\x19.routesia.dhcp.OptionData\"\xc7\x01\n\x0c\x44HCPv4Subnet\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\t\x12\x10\n\x08use_ipam\x18\x02 \x01(\x08\x12\x13\n\x0bnext_server\x18\x03 \x01(\t\x12\x0c\n\x04pool\x18\x04 \x03(\t\x12)\n\x06option\x18\x05 \x03(\x0b\x32\x19.routesia.dhcp.OptionData\x12/\n\x0breservation\x18\x06 \x03(\x0b\x32\x1a.routesia.dhcp.Reservation\x12\x15\n\rrelay_address\x18\x07 \x03(\t\"\xbf\x02\n\x0c\x44HCPv4Server\x12\x11\n\tinterface\x18\x01 \x03(\t\x12\x13\n\x0brenew_timer\x18\x02 \x01(\r\x12\x14\n\x0crebind_timer\x18\x03 \x01(\r\x12\x16\n\x0evalid_lifetime\x18\x04 \x01(\r\x12\x13\n\x0bnext_server\x18\x05 \x01(\t\x12:\n\x11option_definition\x18\x06 \x03(\x0b\x32\x1f.routesia.dhcp.OptionDefinition\x12\x30\n\x0c\x63lient_class\x18\x07 \x03(\x0b\x32\x1a.routesia.dhcp.ClientClass\x12)\n\x06option\x18\x08 \x03(\x0b\x32\x19.routesia.dhcp.OptionData\x12+\n\x06subnet\x18\t \x03(\x0b\x32\x1b.routesia.dhcp.DHCPv4Subnet\";\n\x10\x44HCPServerConfig\x12\'\n\x02v4\x18\x01 \x01(\x0b\x32\x1b.routesia.dhcp.DHCPv4Server\"\x8e\x02\n\x0b\x44HCPv4Lease\x12\x18\n\x10hardware_address\x18\x01 \x01(\t\x12\x12\n\nip_address\x18\x02 \x01(\t\x12\x16\n\x0evalid_lifetime\x18\x03 \x01(\r\x12%\n\x1d\x63lient_last_transmission_time\x18\x04 \x01(\x04\x12\x10\n\x08hostname\x18\x05 \x01(\t\x12:\n\x05state\x18\x06 \x01(\x0e\x32+.routesia.dhcp.DHCPv4Lease.DHCPv4LeaseState\"D\n\x10\x44HCPv4LeaseState\x12\x0b\n\x07\x44\x45\x46\x41ULT\x10\x00\x12\x0c\n\x08\x44\x45\x43LINED\x10\x01\x12\x15\n\x11\x45XPIRED_RECLAIMED\x10\x02\"<\n\x0f\x44HCPv4LeaseList\x12)\n\x05lease\x18\x01 \x03(\x0b\x32\x1a.routesia.dhcp.DHCPv4Leaseb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dhcp_server_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _OPTIONDEFINITION._serialized_start=56
+  _OPTIONDEFINITION._serialized_end=189
+  _OPTIONDATA._serialized_start=191
+  _OPTIONDATA._serialized_end=245
+  _RESERVATION._serialized_start=247
+  _RESERVATION._serialized_end=306
+  _CLIENTCLASS._serialized_start=309
+  _CLIENTCLASS._serialized_end=474
+  _DHCPV4SUBNET._serialized_start=477
+  _DHCPV4SUBNET._serialized_end=676
+  _DHCPV4SERVER._serialized_start=679
+  _DHCPV4SERVER._serialized_end=998
+  _DHCPSERVERCONFIG._serialized_start=1000
+  _DHCPSERVERCONFIG._serialized_end=1059
+  _DHCPV4LEASE._serialized_start=1062
+  _DHCPV4LEASE._serialized_end=1332
+  _DHCPV4LEASE_DHCPV4LEASESTATE._serialized_start=1264
+  _DHCPV4LEASE_DHCPV4LEASESTATE._serialized_end=1332
+  _DHCPV4LEASELIST._serialized_start=1334
+  _DHCPV4LEASELIST._serialized_end=1394
+# @@protoc_insertion_point(module_scope)
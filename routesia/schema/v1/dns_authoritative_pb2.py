@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dns_authoritative.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n*routesia/schema/v1/dns_authoritative.proto\x12\x0croutesia.dns\">\n\x1d\x41uthoritativeDNSListenAddress\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\"S\n\x1a\x41uthoritativeDNSZoneRecord\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04type\x18\x02 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\t\x12\x0b\n\x03ttl\x18\x04 \x01(\r\"\x8f\x02\n\x14\x41uthoritativeDNSZone\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x65mail\x18\x02 \x01(\t\x12\x0b\n\x03ttl\x18\x03 \x01(\r\x12\x0f\n\x07refresh\x18\x04 \x01(\r\x12\r\n\x05retry\x18\x05 \x01(\r\x12\x0e\n\x06\x65xpire\x18\x06 \x01(\r\x12\x13\n\x0bminimum_ttl\x18\x07 \x01(\r\x12\x10\n\x08use_ipam\x18\x08 \x01(\x08\x12\x14\n\x0cipam_network\x18\t \x03(\t\x12\x0e\n\x06notify\x18\n \x03(\t\x12\x16\n\x0e\x61llow_transfer\x18\x0b \x03(\t\x12\x38\n\x06record\x18\x0c \x03(\x0b\x32(.routesia.dns.AuthoritativeDNSZoneRecord\"\xb1\x01\n\x16\x41uthoritativeDNSConfig\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12\x0f\n\x07servers\x18\x02 \x01(\r\x12\x43\n\x0elisten_address\x18\x03 \x03(\x0b\x32+.routesia.dns.AuthoritativeDNSListenAddress\x12\x30\n\x04zone\x18\x04 \x03(\x0b\x32\".routesia.dns.AuthoritativeDNSZoneb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dns_authoritative_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _AUTHORITATIVEDNSLISTENADDRESS._serialized_start=60
+  _AUTHORITATIVEDNSLISTENADDRESS._serialized_end=122
+  _AUTHORITATIVEDNSZONERECORD._serialized_start=124
+  _AUTHORITATIVEDNSZONERECORD._serialized_end=207
+  _AUTHORITATIVEDNSZONE._serialized_start=210
+  _AUTHORITATIVEDNSZONE._serialized_end=481
+  _AUTHORITATIVEDNSCONFIG._serialized_start=484
+  _AUTHORITATIVEDNSCONFIG._serialized_end=661
+# @@protoc_insertion_point(module_scope)
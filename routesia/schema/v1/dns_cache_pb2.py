@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dns_cache.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\"routesia/schema/v1/dns_cache.proto\x12\x0croutesia.dns\"6\n\x15\x44NSCacheListenAddress\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\"\xb8\x02\n\x19\x44NSCacheAccessControlRule\x12\x10\n\x08priority\x18\x01 \x01(\r\x12\x0f\n\x07network\x18\x02 \x01(\t\x12W\n\x06\x61\x63tion\x18\x03 \x01(\x0e\x32G.routesia.dns.DNSCacheAccessControlRule.DNSCacheAccessControlRuleAction\"\x9e\x01\n\x1f\x44NSCacheAccessControlRuleAction\x12\x08\n\x04\x44\x45NY\x10\x00\x12\n\n\x06REFUSE\x10\x01\x12\t\n\x05\x41LLOW\x10\x02\x12\x1f\n\x1b\x41LLOW_SET_RECURSION_DESIRED\x10\x03\x12\x0f\n\x0b\x41LLOW_SNOOP\x10\x04\x12\x12\n\x0e\x44\x45NY_NON_LOCAL\x10\x05\x12\x14\n\x10REFUSE_NON_LOCAL\x10\x06\"\xb4\x01\n\x11\x44NSCacheLocalData\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x43\n\x04type\x18\x02 \x01(\x0e\x32\x35.routesia.dns.DNSCacheLocalData.DNSCacheLocalDataType\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\t\x12\x0b\n\x03ttl\x18\x04 \x01(\r\"1\n\x15\x44NSCacheLocalDataType\x12\x05\n\x01\x41\x10\x00\x12\x08\n\x04\x41\x41\x41\x41\x10\x01\x12\x07\n\x03TXT\x10\x02\"\xc4\x03\n\x11\x44NSCacheLocalZone\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x43\n\x04type\x18\x02 \x01(\x0e\x32\x35.routesia.dns.DNSCacheLocalZone.DNSCacheLocalZoneType\x12\x0b\n\x03ttl\x18\x03 \x01(\r\x12\x10\n\x08use_ipam\x18\x04 \x01(\x08\x12\x14\n\x0cipam_network\x18\x05 \x03(\t\x12\x33\n\nlocal_data\x18\x06 \x03(\x0b\x32\x1f.routesia.dns.DNSCacheLocalData\"\xf1\x01\n\x15\x44NSCacheLocalZoneType\x12\x0f\n\x0bTRANSPARENT\x10\x00\x12\x14\n\x10TYPE_TRANSPARENT\x10\x01\x12\x0c\n\x08REDIRECT\x10\x02\x12\n\n\x06INFORM\x10\x03\x12\x0f\n\x0bINFORM_DENY\x10\x04\x12\x13\n\x0fINFORM_REDIRECT\x10\x05\x12\x08\n\x04\x44\x45NY\x10\x06\x12\n\n\x06REFUSE\x10\x07\x12\x16\n\x12\x41LWAYS_TRANSPARENT\x10\x08\x12\x11\n\rALWAYS_REFUSE\x10\t\x12\x13\n\x0f\x41LWAYS_NXDOMAIN\x10\n\x12\x0b\n\x07NO_VIEW\x10\x0b\x12\x0e\n\nNO_DEFAULT\x10\x0c\"I\n\x1a\x44NSCacheForwardZoneAddress\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\x12\x0c\n\x04host\x18\x03 \x01(\t\"{\n\x13\x44NSCacheForwardZone\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x13\n\x0b\x66orward_tls\x18\x02 \x01(\x08\x12\x41\n\x0f\x66orward_address\x18\x03 \x03(\x0b\x32(.routesia.dns.DNSCacheForwardZoneAddress\"\xb5\x02\n\x0e\x44NSCacheConfig\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12\x14\n\x0ctls_upstream\x18\x02 \x01(\x08\x12\x0b\n\x03ttl\x18\x03 \x01(\r\x12;\n\x0elisten_address\x18\x04 \x03(\x0b\x32#.routesia.dns.DNSCacheListenAddress\x12\x44\n\x13\x61\x63\x63\x65ss_control_rule\x18\x05 \x03(\x0b\x32\'.routesia.dns.DNSCacheAccessControlRule\x12\x37\n\x0c\x66orward_zone\x18\x06 \x03(\x0b\x32!.routesia.dns.DNSCacheForwardZone\x12\x33\n\nlocal_zone\x18\x07 \x03(\x0b\x32\x1f.routesia.dns.DNSCacheLocalZoneb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dns_cache_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _DNSCACHELISTENADDRESS._serialized_start=52
+  _DNSCACHELISTENADDRESS._serialized_end=106
+  _DNSCACHEACCESSCONTROLRULE._serialized_start=109
+  _DNSCACHEACCESSCONTROLRULE._serialized_end=421
+  _DNSCACHEACCESSCONTROLRULE_DNSCACHEACCESSCONTROLRULEACTION._serialized_start=263
+  _DNSCACHEACCESSCONTROLRULE_DNSCACHEACCESSCONTROLRULEACTION._serialized_end=421
+  _DNSCACHELOCALDATA._serialized_start=424
+  _DNSCACHELOCALDATA._serialized_end=604
+  _DNSCACHELOCALDATA_DNSCACHELOCALDATATYPE._serialized_start=555
+  _DNSCACHELOCALDATA_DNSCACHELOCALDATATYPE._serialized_end=604
+  _DNSCACHELOCALZONE._serialized_start=607
+  _DNSCACHELOCALZONE._serialized_end=1059
+  _DNSCACHELOCALZONE_DNSCACHELOCALZONETYPE._serialized_start=818
+  _DNSCACHELOCALZONE_DNSCACHELOCALZONETYPE._serialized_end=1059
+  _DNSCACHEFORWARDZONEADDRESS._serialized_start=1061
+  _DNSCACHEFORWARDZONEADDRESS._serialized_end=1134
+  _DNSCACHEFORWARDZONE._serialized_start=1136
+  _DNSCACHEFORWARDZONE._serialized_end=1259
+  _DNSCACHECONFIG._serialized_start=1262
+  _DNSCACHECONFIG._serialized_end=1571
+# @@protoc_insertion_point(module_scope)
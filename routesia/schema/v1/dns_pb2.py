@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/dns.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from routesia.schema.v1 import dns_authoritative_pb2 as routesia_dot_schema_dot_v1_dot_dns__authoritative__pb2
+from routesia.schema.v1 import dns_cache_pb2 as routesia_dot_schema_dot_v1_dot_dns__cache__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1croutesia/schema/v1/dns.proto\x12\x0croutesia.dns\x1a*routesia/schema/v1/dns_authoritative.proto\x1a\"routesia/schema/v1/dns_cache.proto\"u\n\tDNSConfig\x12;\n\rauthoritative\x18\x01 \x01(\x0b\x32$.routesia.dns.AuthoritativeDNSConfig\x12+\n\x05\x63\x61\x63he\x18\x02 \x01(\x0b\x32\x1c.routesia.dns.DNSCacheConfigb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.dns_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _DNSCONFIG._serialized_start=126
+  _DNSCONFIG._serialized_end=243
+# @@protoc_insertion_point(module_scope)
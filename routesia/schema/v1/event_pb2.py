@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/event.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1eroutesia/schema/v1/event.proto\x12\x0eroutesia.event\"G\n\tHistogram\x12\x0e\n\x06\x62ounds\x18\x01 \x03(\x01\x12\x0e\n\x06\x63ounts\x18\x02 \x03(\x04\x12\r\n\x05\x63ount\x18\x03 \x01(\x04\x12\x0b\n\x03sum\x18\x04 \x01(\x01\"j\n\x0f\x45ventClassStats\x12\x13\n\x0b\x65vent_class\x18\x01 \x01(\t\x12\x0f\n\x07handled\x18\x02 \x01(\x04\x12\x31\n\x0e\x64ispatch_delay\x18\x03 \x01(\x0b\x32\x19.routesia.event.Histogram\"\x89\x01\n\x0fSubscriberStats\x12\x13\n\x0b\x65vent_class\x18\x01 \x01(\t\x12\x12\n\nsubscriber\x18\x02 \x01(\t\x12\r\n\x05\x63\x61lls\x18\x03 \x01(\x04\x12\x12\n\nexceptions\x18\x04 \x01(\x04\x12*\n\x07latency\x18\x05 \x01(\x0b\x32\x19.routesia.event.Histogram\"\xfa\x02\n\nEventStats\x12\x0e\n\x06uptime\x18\x01 \x01(\x01\x12\x11\n\tpublished\x18\x02 \x01(\x04\x12\x13\n\x0bqueue_depth\x18\x03 \x01(\x04\x12\x17\n\x0fmax_queue_depth\x18\x04 \x01(\x04\x12\x38\n\x15queue_depth_histogram\x18\x05 \x01(\x0b\x32\x19.routesia.event.Histogram\x12\x18\n\x10\x64ispatch_pending\x18\x06 \x01(\x04\x12\x16\n\x0e\x64ispatch_tasks\x18\x07 \x01(\x04\x12\x15\n\rcoalesce_held\x18\x08 \x01(\x04\x12\x11\n\tcoalesced\x18\t \x01(\x04\x12\x1a\n\x12\x63oalesce_cancelled\x18\n \x01(\x04\x12\x34\n\x0b\x65vent_class\x18\x0b \x03(\x0b\x32\x1f.routesia.event.EventClassStats\x12\x33\n\nsubscriber\x18\x0c \x03(\x0b\x32\x1f.routesia.event.SubscriberStatsb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.event_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _HISTOGRAM._serialized_start=50
+  _HISTOGRAM._serialized_end=121
+  _EVENTCLASSSTATS._serialized_start=123
+  _EVENTCLASSSTATS._serialized_end=229
+  _SUBSCRIBERSTATS._serialized_start=232
+  _SUBSCRIBERSTATS._serialized_end=369
+  _EVENTSTATS._serialized_start=372
+  _EVENTSTATS._serialized_end=750
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/interface.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\"routesia/schema/v1/interface.proto\x12\x12routesia.interface\"\x96\x02\n\rInterfaceLink\x12\n\n\x02up\x18\x01 \x01(\x08\x12\r\n\x05noarp\x18\x02 \x01(\x08\x12\x12\n\ntxqueuelen\x18\x03 \x01(\r\x12\x0b\n\x03mtu\x18\x04 \x01(\r\x12\x0f\n\x07\x61\x64\x64ress\x18\x05 \x01(\t\x12\x11\n\tbroadcast\x18\x06 \x01(\t\x12\x0e\n\x06master\x18\x07 \x01(\t\x12\x42\n\x0b\x61\x64\x64rgenmode\x18\x08 \x01(\x0e\x32-.routesia.interface.InterfaceLink.AddrGenMode\x12\r\n\x05token\x18\t \x01(\t\"B\n\x0b\x41\x64\x64rGenMode\x12\t\n\x05\x45UI64\x10\x00\x12\x08\n\x04NONE\x10\x01\x12\x12\n\x0eSTABLE_PRIVACY\x10\x02\x12\n\n\x06RANDOM\x10\x03\"\xb5\x01\n\x15\x42ridgeInterfaceConfig\x12\x13\n\x0b\x61geing_time\x18\x01 \x01(\r\x12\x15\n\rforward_delay\x18\x02 \x01(\r\x12\x12\n\nhello_time\x18\x03 \x01(\r\x12\x0f\n\x07max_age\x18\x04 \x01(\r\x12\x0b\n\x03stp\x18\x05 \x01(\x08\x12\x10\n\x08priority\x18\x06 \x01(\x05\x12\x16\n\x0evlan_filtering\x18\x07 \x01(\x08\x12\x14\n\x0c\x64\x65\x66\x61ult_pvid\x18\x08 \x01(\x05\"L\n\x13VLANInterfaceConfig\x12\r\n\x05trunk\x18\x01 \x01(\t\x12\n\n\x02id\x18\x02 \x01(\r\x12\x0c\n\x04gvrp\x18\x03 \x01(\x08\x12\x0c\n\x04mvrp\x18\x04 \x01(\x08\"@\n\x12SITInterfaceConfig\x12\x0e\n\x06remote\x18\x01 \x01(\t\x12\r\n\x05local\x18\x02 \x01(\t\x12\x0b\n\x03ttl\x18\x03 \x01(\r\"@\n\x13VXLANEndpointConfig\x12\x0e\n\x06remote\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\x12\x0b\n\x03vni\x18\x03 \x01(\r\"\xba\x01\n\x14VXLANInterfaceConfig\x12\x0c\n\x04port\x18\x01 \x01(\r\x12\r\n\x05group\x18\x02 \x01(\t\x12\x0e\n\x06remote\x18\x03 \x01(\t\x12\r\n\x05local\x18\x04 \x01(\t\x12\x11\n\tinterface\x18\x05 \x01(\t\x12\x0b\n\x03ttl\x18\x06 \x01(\r\x12\x0b\n\x03vni\x18\x07 \x01(\r\x12\x39\n\x08\x65ndpoint\x18\t \x03(\x0b\x32\'.routesia.interface.VXLANEndpointConfig\"\xe1\x02\n\x0fInterfaceConfig\x12\x0c\n\x04name\x18\x01 \x01(\t\x12/\n\x04type\x18\x02 \x01(\x0e\x32!.routesia.interface.InterfaceType\x12/\n\x04link\x18\x03 \x01(\x0b\x32!.routesia.interface.InterfaceLink\x12\x39\n\x06\x62ridge\x18\x64 \x01(\x0b\x32).routesia.interface.BridgeInterfaceConfig\x12\x35\n\x04vlan\x18\x65 \x01(\x0b\x32\'.routesia.interface.VLANInterfaceConfig\x12\x33\n\x03sit\x18\x66 \x01(\x0b\x32&.routesia.interface.SITInterfaceConfig\x12\x37\n\x05vxlan\x18g \x01(\x0b\x32(.routesia.interface.VXLANInterfaceConfig\"M\n\x13InterfaceConfigList\x12\x36\n\tinterface\x18\x01 \x03(\x0b\x32#.routesia.interface.InterfaceConfig\"\x7f\n\tInterface\x12\x0c\n\x04name\x18\x01 \x01(\t\x12/\n\x04link\x18\x02 \x01(\x0b\x32!.routesia.interface.InterfaceLink\x12\x33\n\x06\x63onfig\x18\x03 \x01(\x0b\x32#.routesia.interface.InterfaceConfig\"A\n\rInterfaceList\x12\x30\n\tinterface\x18\x01 \x03(\x0b\x32\x1d.routesia.interface.Interface*d\n\rInterfaceType\x12\r\n\tUNDEFINED\x10\x00\x12\x0c\n\x08LOOPBACK\x10\x01\x12\x0c\n\x08\x45THERNET\x10\x02\x12\n\n\x06\x42RIDGE\x10\x03\x12\x08\n\x04VLAN\x10\x04\x12\x07\n\x03SIT\x10\x05\x12\t\n\x05VXLAN\x10\x06\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.interface_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _INTERFACETYPE._serialized_start=1553
+  _INTERFACETYPE._serialized_end=1653
+  _INTERFACELINK._serialized_start=59
+  _INTERFACELINK._serialized_end=337
+  _INTERFACELINK_ADDRGENMODE._serialized_start=271
+  _INTERFACELINK_ADDRGENMODE._serialized_end=337
+  _BRIDGEINTERFACECONFIG._serialized_start=340
+  _BRIDGEINTERFACECONFIG._serialized_end=521
+  _VLANINTERFACECONFIG._serialized_start=523
+  _VLANINTERFACECONFIG._serialized_end=599
+  _SITINTERFACECONFIG._serialized_start=601
+  _SITINTERFACECONFIG._serialized_end=665
+  _VXLANENDPOINTCONFIG._serialized_start=667
+  _VXLANENDPOINTCONFIG._serialized_end=731
+  _VXLANINTERFACECONFIG._serialized_start=734
+  _VXLANINTERFACECONFIG._serialized_end=920
+  _INTERFACECONFIG._serialized_start=923
+  _INTERFACECONFIG._serialized_end=1276
+  _INTERFACECONFIGLIST._serialized_start=1278
+  _INTERFACECONFIGLIST._serialized_end=1355
+  _INTERFACE._serialized_start=1357
+  _INTERFACE._serialized_end=1484
+  _INTERFACELIST._serialized_start=1486
+  _INTERFACELIST._serialized_end=1551
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/ipam.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1droutesia/schema/v1/ipam.proto\x12\rroutesia.ipam\"Q\n\x04Host\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05\x61lias\x18\x02 \x03(\t\x12\x18\n\x10hardware_address\x18\x03 \x01(\t\x12\x12\n\nip_address\x18\x04 \x03(\t\"/\n\nIPAMConfig\x12!\n\x04host\x18\x01 \x03(\x0b\x32\x13.routesia.ipam.Hostb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.ipam_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _HOST._serialized_start=48
+  _HOST._serialized_end=129
+  _IPAMCONFIG._serialized_start=131
+  _IPAMCONFIG._serialized_end=178
+# @@protoc_insertion_point(module_scope)
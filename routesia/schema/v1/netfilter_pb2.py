@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/netfilter.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\"routesia/schema/v1/netfilter.proto\x12\x12routesia.netfilter\"\'\n\x04Zone\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x11\n\tinterface\x18\x02 \x03(\t\"s\n\x10IPForwardPortMap\x12\x37\n\x08protocol\x18\x01 \x01(\x0e\x32%.routesia.netfilter.IPForwardProtocol\x12\x0c\n\x04port\x18\x02 \x01(\t\x12\x18\n\x10\x64\x65stination_port\x18\x03 \x01(\t\"X\n\tIPForward\x12\x13\n\x0b\x64\x65stination\x18\x01 \x01(\t\x12\x36\n\x08port_map\x18\x02 \x03(\x0b\x32$.routesia.netfilter.IPForwardPortMap\"R\n\nMasquerade\x12\x11\n\tinterface\x18\x01 \x01(\t\x12\x31\n\nip_forward\x18\x02 \x03(\x0b\x32\x1d.routesia.netfilter.IPForward\"P\n\x07IPMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x10\n\x08protocol\x18\x02 \x03(\t\x12\x0e\n\x06source\x18\x03 \x03(\t\x12\x13\n\x0b\x64\x65stination\x18\x04 \x03(\t\"Q\n\x08IP6Match\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x10\n\x08protocol\x18\x02 \x03(\t\x12\x0e\n\x06source\x18\x03 \x03(\t\x12\x13\n\x0b\x64\x65stination\x18\x04 \x03(\t\"?\n\x08TCPMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x0e\n\x06source\x18\x02 \x03(\t\x12\x13\n\x0b\x64\x65stination\x18\x03 \x03(\t\"?\n\x08UDPMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x0e\n\x06source\x18\x02 \x03(\t\x12\x13\n\x0b\x64\x65stination\x18\x03 \x03(\t\"7\n\tICMPMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x0c\n\x04type\x18\x02 \x03(\t\x12\x0c\n\x04\x63ode\x18\x03 \x03(\r\"8\n\nICMP6Match\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x0c\n\x04type\x18\x02 \x03(\t\x12\x0c\n\x04\x63ode\x18\x03 \x03(\r\"(\n\x07\x43TMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\r\n\x05state\x18\x02 \x03(\t\"`\n\tMetaMatch\x12\x0e\n\x06negate\x18\x01 \x01(\x08\x12\x17\n\x0finput_interface\x18\x02 \x03(\t\x12\x18\n\x10output_interface\x18\x03 \x03(\t\x12\x10\n\x08protocol\x18\x04 \x03(\t\"\xfa\x03\n\x04Rule\x12\x13\n\x0b\x64\x65scription\x18\x01 \x01(\t\x12\x13\n\x0bsource_zone\x18\x02 \x03(\t\x12\x18\n\x10\x64\x65stination_zone\x18\x03 \x03(\t\x12\'\n\x02ip\x18\n \x03(\x0b\x32\x1b.routesia.netfilter.IPMatch\x12)\n\x03ip6\x18\x0b \x03(\x0b\x32\x1c.routesia.netfilter.IP6Match\x12)\n\x03tcp\x18\x0c \x03(\x0b\x32\x1c.routesia.netfilter.TCPMatch\x12)\n\x03udp\x18\r \x03(\x0b\x32\x1c.routesia.netfilter.UDPMatch\x12+\n\x04icmp\x18\x0e \x03(\x0b\x32\x1d.routesia.netfilter.ICMPMatch\x12-\n\x05icmp6\x18\x0f \x03(\x0b\x32\x1e.routesia.netfilter.ICMP6Match\x12\'\n\x02\x63t\x18\x10 \x03(\x0b\x32\x1b.routesia.netfilter.CTMatch\x12+\n\x04meta\x18\x11 \x03(\x0b\x32\x1d.routesia.netfilter.MetaMatch\x12\x31\n\x07verdict\x18\x64 \x01(\x0e\x32 .routesia.netfilter.Rule.Verdict\"\x1f\n\x07Verdict\x12\n\n\x06\x41\x43\x43\x45PT\x10\x00\x12\x08\n\x04\x44ROP\x10\x01\"[\n\x05Input\x12*\n\x06policy\x18\x01 \x01(\x0e\x32\x1a.routesia.netfilter.Policy\x12&\n\x04rule\x18\x02 \x03(\x0b\x32\x18.routesia.netfilter.Rule\"]\n\x07\x46orward\x12*\n\x06policy\x18\x01 \x01(\x0e\x32\x1a.routesia.netfilter.Policy\x12&\n\x04rule\x18\x02 \x03(\x0b\x32\x18.routesia.netfilter.Rule\"\xd6\x01\n\x0fNetfilterConfig\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12&\n\x04zone\x18\x02 \x03(\x0b\x32\x18.routesia.netfilter.Zone\x12\x32\n\nmasquerade\x18\x03 \x03(\x0b\x32\x1e.routesia.netfilter.Masquerade\x12(\n\x05input\x18\x04 \x01(\x0b\x32\x19.routesia.netfilter.Input\x12,\n\x07\x66orward\x18\x05 \x01(\x0b\x32\x1b.routesia.netfilter.Forward*/\n\x11IPForwardProtocol\x12\x07\n\x03TCP\x10\x00\x12\x07\n\x03UDP\x10\x01\x12\x08\n\x04SCTP\x10\x02*\x1e\n\x06Policy\x12\n\n\x06\x41\x43\x43\x45PT\x10\x00\x12\x08\n\x04\x44ROP\x10\x01\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.netfilter_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _IPFORWARDPROTOCOL._serialized_start=1854
+  _IPFORWARDPROTOCOL._serialized_end=1901
+  _POLICY._serialized_start=1903
+  _POLICY._serialized_end=1933
+  _ZONE._serialized_start=58
+  _ZONE._serialized_end=97
+  _IPFORWARDPORTMAP._serialized_start=99
+  _IPFORWARDPORTMAP._serialized_end=214
+  _IPFORWARD._serialized_start=216
+  _IPFORWARD._serialized_end=304
+  _MASQUERADE._serialized_start=306
+  _MASQUERADE._serialized_end=388
+  _IPMATCH._serialized_start=390
+  _IPMATCH._serialized_end=470
+  _IP6MATCH._serialized_start=472
+  _IP6MATCH._serialized_end=553
+  _TCPMATCH._serialized_start=555
+  _TCPMATCH._serialized_end=618
+  _UDPMATCH._serialized_start=620
+  _UDPMATCH._serialized_end=683
+  _ICMPMATCH._serialized_start=685
+  _ICMPMATCH._serialized_end=740
+  _ICMP6MATCH._serialized_start=742
+  _ICMP6MATCH._serialized_end=798
+  _CTMATCH._serialized_start=800
+  _CTMATCH._serialized_end=840
+  _METAMATCH._serialized_start=842
+  _METAMATCH._serialized_end=938
+  _RULE._serialized_start=941
+  _RULE._serialized_end=1447
+  _RULE_VERDICT._serialized_start=1416
+  _RULE_VERDICT._serialized_end=1447
+  _INPUT._serialized_start=1449
+  _INPUT._serialized_end=1540
+  _FORWARD._serialized_start=1542
+  _FORWARD._serialized_end=1635
+  _NETFILTERCONFIG._serialized_start=1638
+  _NETFILTERCONFIG._serialized_end=1852
+# @@protoc_insertion_point(module_scope)
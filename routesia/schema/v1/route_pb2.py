@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/route.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1eroutesia/schema/v1/route.proto\x12\x0eroutesia.route\"@\n\x0cRouteNextHop\x12\x0f\n\x07gateway\x18\x01 \x01(\t\x12\x11\n\tinterface\x18\x02 \x01(\t\x12\x0c\n\x04hops\x18\x03 \x01(\r\"h\n\x0bRouteConfig\x12\x13\n\x0b\x64\x65stination\x18\x01 \x01(\t\x12-\n\x07nexthop\x18\x02 \x03(\x0b\x32\x1c.routesia.route.RouteNextHop\x12\x15\n\rnexthop_group\x18\x03 \x01(\r\"T\n\x17RouteNextHopGroupConfig\x12\n\n\x02id\x18\x01 \x01(\r\x12-\n\x07nexthop\x18\x02 \x03(\x0b\x32\x1c.routesia.route.RouteNextHop\"\xae\x01\n\x14RouteDampeningConfig\x12\x0f\n\x07\x65nabled\x18\x01 \x01(\x08\x12\x0f\n\x07penalty\x18\x02 \x01(\r\x12\x1a\n\x12suppress_threshold\x18\x03 \x01(\r\x12\x17\n\x0freuse_threshold\x18\x04 \x01(\r\x12\x11\n\thalf_life\x18\x05 \x01(\r\x12\x19\n\x11max_suppress_time\x18\x06 \x01(\r\x12\x11\n\thold_down\x18\x07 \x01(\r\"\xa9\x01\n\x10RouteTableConfig\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\n\n\x02id\x18\x02 \x01(\r\x12*\n\x05route\x18\x03 \x03(\x0b\x32\x1b.routesia.route.RouteConfig\x12\x37\n\tdampening\x18\x04 \x01(\x0b\x32$.routesia.route.RouteDampeningConfig\x12\x16\n\x0e\x62lackhole_list\x18\x05 \x03(\t\"3\n\x15RoutePrefixListConfig\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\"\xc3\x01\n\x14RouteTableConfigList\x12/\n\x05table\x18\x01 \x03(\x0b\x32 .routesia.route.RouteTableConfig\x12>\n\rnexthop_group\x18\x02 \x03(\x0b\x32\'.routesia.route.RouteNextHopGroupConfig\x12:\n\x0bprefix_list\x18\x03 \x03(\x0b\x32%.routesia.route.RoutePrefixListConfig\"\x8e\x02\n\nRouteState\x12\x0f\n\x07present\x18\x01 \x01(\x08\x12\x0f\n\x07\x64ynamic\x18\x02 \x01(\x08\x12\x10\n\x08table_id\x18\x03 \x01(\r\x12\x13\n\x0b\x64\x65stination\x18\x04 \x01(\t\x12\x10\n\x08protocol\x18\x05 \x01(\r\x12\r\n\x05scope\x18\x06 \x01(\r\x12\x18\n\x10preferred_source\x18\x07 \x01(\t\x12-\n\x07nexthop\x18\x08 \x03(\x0b\x32\x1c.routesia.route.RouteNextHop\x12\x15\n\rnexthop_group\x18\t \x01(\r\x12\x36\n\tdampening\x18\n \x01(\x0b\x32#.routesia.route.RouteDampeningState\"n\n\x13RouteDampeningState\x12\x0f\n\x07penalty\x18\x01 \x01(\x01\x12\r\n\x05\x66laps\x18\x02 \x01(\r\x12\x12\n\nsuppressed\x18\x03 \x01(\x08\x12\x11\n\theld_down\x18\x04 \x01(\x08\x12\x10\n\x08reuse_in\x18\x05 \x01(\x01\";\n\x0eRouteStateList\x12)\n\x05route\x18\x01 \x03(\x0b\x32\x1a.routesia.route.RouteState\"\xa0\x01\n\x13RouteReconcileStats\x12\x0c\n\x04runs\x18\x01 \x01(\x04\x12\x0f\n\x07\x63hecked\x18\x02 \x01(\x04\x12\x0f\n\x07missing\x18\x03 \x01(\x04\x12\x0f\n\x07\x63hanged\x18\x04 \x01(\x04\x12\r\n\x05stale\x18\x05 \x01(\x04\x12\x0e\n\x06\x66\x61iled\x18\x06 \x01(\x04\x12\x12\n\nlast_drift\x18\x07 \x01(\x04\x12\x15\n\rlast_duration\x18\x08 \x01(\x01\"\xa1\x01\n\x14RoutePrefixListState\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04path\x18\x02 \x01(\t\x12\x0e\n\x06loaded\x18\x03 \x01(\x08\x12\x0f\n\x07\x65ntries\x18\x04 \x01(\x04\x12\x0f\n\x07invalid\x18\x05 \x01(\x04\x12\x10\n\x08prefixes\x18\x06 \x01(\x04\x12\x1a\n\x12last_load_duration\x18\x07 \x01(\x01\x12\r\n\x05\x65rror\x18\x08 \x01(\t\"\x9c\x01\n\x13RouteBlackholeState\x12\x10\n\x08table_id\x18\x01 \x01(\r\x12\x13\n\x0bprefix_list\x18\x02 \x03(\t\x12\x11\n\tinstalled\x18\x03 \x01(\x04\x12\r\n\x05\x61\x64\x64\x65\x64\x18\x04 \x01(\x04\x12\x0f\n\x07\x64\x65leted\x18\x05 \x01(\x04\x12\x0e\n\x06\x66\x61iled\x18\x06 \x01(\x04\x12\x1b\n\x13last_apply_duration\x18\x07 \x01(\x01\"\x8d\x01\n\x18RoutePrefixListStateList\x12\x39\n\x0bprefix_list\x18\x01 \x03(\x0b\x32$.routesia.route.RoutePrefixListState\x12\x36\n\tblackhole\x18\x02 \x03(\x0b\x32#.routesia.route.RouteBlackholeState\"G\n\x12RouteLookupRequest\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x03(\t\x12\x10\n\x08table_id\x18\x02 \x01(\r\x12\x0e\n\x06kernel\x18\x03 \x01(\x08\"\x8c\x01\n\x17RouteLookupKernelResult\x12\x10\n\x08table_id\x18\x01 \x01(\r\x12\x13\n\x0b\x64\x65stination\x18\x02 \x01(\t\x12\x0c\n\x04type\x18\x03 \x01(\r\x12-\n\x07nexthop\x18\x04 \x03(\x0b\x32\x1c.routesia.route.RouteNextHop\x12\r\n\x05\x65rror\x18\x05 \x01(\t\"\xeb\x01\n\x11RouteLookupResult\x12\x0f\n\x07\x61\x64\x64ress\x18\x01 \x01(\t\x12\r\n\x05\x66ound\x18\x02 \x01(\x08\x12\x10\n\x08table_id\x18\x03 \x01(\r\x12\x13\n\x0b\x64\x65stination\x18\x04 \x01(\t\x12-\n\x07nexthop\x18\x05 \x03(\x0b\x32\x1c.routesia.route.RouteNextHop\x12\x37\n\x06kernel\x18\x06 \x01(\x0b\x32\'.routesia.route.RouteLookupKernelResult\x12\x14\n\x0ckernel_match\x18\x07 \x01(\x08\x12\x11\n\tblackhole\x18\x08 \x01(\x08\"J\n\x15RouteLookupResultList\x12\x31\n\x06result\x18\x01 \x03(\x0b\x32!.routesia.route.RouteLookupResultb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.route_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _ROUTENEXTHOP._serialized_start=50
+  _ROUTENEXTHOP._serialized_end=114
+  _ROUTECONFIG._serialized_start=116
+  _ROUTECONFIG._serialized_end=220
+  _ROUTENEXTHOPGROUPCONFIG._serialized_start=222
+  _ROUTENEXTHOPGROUPCONFIG._serialized_end=306
+  _ROUTEDAMPENINGCONFIG._serialized_start=309
+  _ROUTEDAMPENINGCONFIG._serialized_end=483
+  _ROUTETABLECONFIG._serialized_start=486
+  _ROUTETABLECONFIG._serialized_end=655
+  _ROUTEPREFIXLISTCONFIG._serialized_start=657
+  _ROUTEPREFIXLISTCONFIG._serialized_end=708
+  _ROUTETABLECONFIGLIST._serialized_start=711
+  _ROUTETABLECONFIGLIST._serialized_end=906
+  _ROUTESTATE._serialized_start=909
+  _ROUTESTATE._serialized_end=1179
+  _ROUTEDAMPENINGSTATE._serialized_start=1181
+  _ROUTEDAMPENINGSTATE._serialized_end=1291
+  _ROUTESTATELIST._serialized_start=1293
+  _ROUTESTATELIST._serialized_end=1352
+  _ROUTERECONCILESTATS._serialized_start=1355
+  _ROUTERECONCILESTATS._serialized_end=1515
+  _ROUTEPREFIXLISTSTATE._serialized_start=1518
+  _ROUTEPREFIXLISTSTATE._serialized_end=1679
+  _ROUTEBLACKHOLESTATE._serialized_start=1682
+  _ROUTEBLACKHOLESTATE._serialized_end=1838
+  _ROUTEPREFIXLISTSTATELIST._serialized_start=1841
+  _ROUTEPREFIXLISTSTATELIST._serialized_end=1982
+  _ROUTELOOKUPREQUEST._serialized_start=1984
+  _ROUTELOOKUPREQUEST._serialized_end=2055
+  _ROUTELOOKUPKERNELRESULT._serialized_start=2058
+  _ROUTELOOKUPKERNELRESULT._serialized_end=2198
+  _ROUTELOOKUPRESULT._serialized_start=2201
+  _ROUTELOOKUPRESULT._serialized_end=2436
+  _ROUTELOOKUPRESULTLIST._serialized_start=2438
+  _ROUTELOOKUPRESULTLIST._serialized_end=2512
+# @@protoc_insertion_point(module_scope)
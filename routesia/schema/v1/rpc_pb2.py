@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/rpc.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from google.protobuf import any_pb2 as google_dot_protobuf_dot_any__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x1croutesia/schema/v1/rpc.proto\x12\x0croutesia.rpc\x1a\x19google/protobuf/any.proto\"k\n\nRPCRequest\x12\x11\n\tclient_id\x18\x01 \x01(\t\x12\x12\n\nrequest_id\x18\x02 \x01(\x04\x12\x0e\n\x06method\x18\x03 \x01(\t\x12&\n\x08\x61rgument\x18\x04 \x01(\x0b\x32\x14.google.protobuf.Any\"\x91\x02\n\x0bRPCResponse\x12\x12\n\nrequest_id\x18\x01 \x01(\x04\x12=\n\rresponse_code\x18\x02 \x01(\x0e\x32&.routesia.rpc.RPCResponse.ResponseCode\x12&\n\x08response\x18\x03 \x01(\x0b\x32\x14.google.protobuf.Any\x12\x14\n\x0c\x65rror_detail\x18\x04 \x01(\t\"q\n\x0cResponseCode\x12\x0b\n\x07SUCCESS\x10\x00\x12\x15\n\x11UNSPECIFIED_ERROR\x10\x01\x12\x12\n\x0eNO_SUCH_METHOD\x10\x02\x12\x13\n\x0fINVALID_REQUEST\x10\x03\x12\x14\n\x10INVALID_ARGUMENT\x10\x04\x62\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.rpc_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _RPCREQUEST._serialized_start=73
+  _RPCREQUEST._serialized_end=180
+  _RPCRESPONSE._serialized_start=183
+  _RPCRESPONSE._serialized_end=456
+  _RPCRESPONSE_RESPONSECODE._serialized_start=343
+  _RPCRESPONSE_RESPONSECODE._serialized_end=456
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: routesia/schema/v1/service.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from routesia.schema.v1 import event_pb2 as routesia_dot_schema_dot_v1_dot_event__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n routesia/schema/v1/service.proto\x12\x10routesia.service\x1a\x1eroutesia/schema/v1/event.proto\"\xa6\x02\n\x10ProviderTimeline\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x14\n\x0c\x64\x65pendencies\x18\x02 \x03(\t\x12\x17\n\ninit_start\x18\x03 \x01(\x01H\x00\x88\x01\x01\x12\x15\n\x08init_end\x18\x04 \x01(\x01H\x01\x88\x01\x01\x12\x18\n\x0bstart_start\x18\x05 \x01(\x01H\x02\x88\x01\x01\x12\x16\n\tstart_end\x18\x06 \x01(\x01H\x03\x88\x01\x01\x12\x18\n\x0b\x66irst_event\x18\x07 \x01(\x01H\x04\x88\x01\x01\x12\x18\n\x0bimport_time\x18\x08 \x01(\x01H\x05\x88\x01\x01\x42\r\n\x0b_init_startB\x0b\n\t_init_endB\x0e\n\x0c_start_startB\x0c\n\n_start_endB\x0e\n\x0c_first_eventB\x0e\n\x0c_import_time\"e\n\x0fStartupTimeline\x12\x12\n\x05ready\x18\x01 \x01(\x01H\x00\x88\x01\x01\x12\x34\n\x08provider\x18\x02 \x03(\x0b\x32\".routesia.service.ProviderTimelineB\x08\n\x06_ready\"\xaf\x01\n\x11\x42lockingLaneStats\x12\x10\n\x08resource\x18\x01 \x01(\t\x12\r\n\x05\x63\x61lls\x18\x02 \x01(\x04\x12\x12\n\nexceptions\x18\x03 \x01(\x04\x12\x0f\n\x07pending\x18\x04 \x01(\x04\x12\'\n\x04wait\x18\x05 \x01(\x0b\x32\x19.routesia.event.Histogram\x12+\n\x08\x64uration\x18\x06 \x01(\x0b\x32\x19.routesia.event.Histogram\"B\n\rBlockingStats\x12\x31\n\x04lane\x18\x01 \x03(\x0b\x32#.routesia.service.BlockingLaneStatsb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'routesia.schema.v1.service_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+
+  DESCRIPTOR._options = None
+  _PROVIDERTIMELINE._serialized_start=87
+  _PROVIDERTIMELINE._serialized_end=381
+  _STARTUPTIMELINE._serialized_start=383
+  _STARTUPTIMELINE._serialized_end=484
+  _BLOCKINGLANESTATS._serialized_start=487
+  _BLOCKINGLANESTATS._serialized_end=662
+  _BLOCKINGSTATS._serialized_start=664
+  _BLOCKINGSTATS._serialized_end=730
+# @@protoc_insertion_point(module_scope)
@@ -3,14 +3,23 @@ routesia/service.py - Main code for a service
 """
 
 import asyncio
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from contextlib import suppress
+import importlib
 import inspect
 import logging
 import systemd.daemon
+import threading
+import time
 
-from routesia.event import Event
+from routesia.blockingexecutor import BlockingExecutor
+from routesia.event import Event, PRIORITIES
+from routesia.eventcoalescer import EventCoalescer
+from routesia.eventdispatcher import EventDispatcher
 from routesia.eventqueue import EventQueue
+from routesia.eventstats import EventStats
+from routesia.eventsubscription import EventRoute, Subscription
+from routesia.startuptimeline import StartupTimeline
 
 
 class ServiceException(Exception):
@@ -32,6 +41,23 @@ class ProviderDependencyLoop(ServiceException):
 logger = logging.getLogger("service")
 
 
+def get_class_path(cls) -> str:
+    "Return the dotted path of a class"
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def import_class(path: str) -> type:
+    "Import a class given its dotted path"
+    module_name, _, class_name = path.rpartition(".")
+    if not module_name:
+        raise InvalidProvider(f"{path} is not a dotted path")
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, class_name)
+    except AttributeError:
+        raise InvalidProvider(f"{module_name} has no class {class_name}")
+
+
 class Provider:
     """
     Base class for providers.
@@ -50,9 +76,11 @@ class Provider:
     the order in which providers are initialised.
 
     Each Provider may implement ``start()`` or ``stop()`` methods which will
-    be executed before and after the main loop, respectively. The ``start()``
-    methods are executed in the same order as the providers are initialized
-    and the ``stop()`` methods are executed in the reverse order.
+    be executed before and after the main loop, respectively. A provider's
+    ``start()`` is only executed once those of all providers it depends on
+    have completed, so coroutine ``start()`` methods of independent providers
+    run concurrently. The ``stop()`` methods are executed in the reverse
+    order of initialization.
 
     For testing, it is sometimes useful to replace the implementation of a
     provider with a different or modified one. To make the replacement class
@@ -106,8 +134,26 @@ class Service(Provider):
         service.add_provider(MyProvider)
         service.add_provider(AnotherProvider)
         asyncio.run(service.run())
+
+    Published events are handled through an ``EventDispatcher``. Events for
+    the same object are handled in order and at most ``max_event_tasks``
+    handlers run concurrently. When more than ``max_pending_events`` are
+    waiting, publishers in other threads block until the backlog drains.
+
+    If ``coalesce_window`` is given, successive state events for the same
+    object within that many seconds are collapsed into the latest one by an
+    ``EventCoalescer`` before being dispatched.
+
+    Providers should not make blocking calls, such as D-Bus requests or
+    nftables commands, on the event loop. ``run_blocking()`` makes them in a
+    thread dedicated to the resource being used.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        max_event_tasks: int = 64,
+        max_pending_events: int = 65536,
+        coalesce_window: float | None = None,
+    ):
         # Indexed by class, value is kwargs
         self.provider_classes = {
             self.__class__: {},
@@ -119,27 +165,95 @@ class Service(Provider):
         }
         # Provider instances, indexed by class, value is instance
         self.providers = OrderedDict()
+        # Providers added by dotted path and not yet imported. Value is
+        # kwargs
+        self.provider_paths: dict[str, dict] = {}
+        # Providers only imported if another provider requires them, indexed
+        # by dotted path. Value is kwargs
+        self.optional_provider_paths: dict[str, dict] = {}
+        # Seconds taken to import each provider added by path, indexed by
+        # provider class
+        self.provider_import_times: dict[type, float] = {}
+        # Set to an ImportTimer to log module import times once started
+        self.import_timer = None
+        # Provider classes each provider requires, indexed by provider class
+        self.provider_dependencies: dict[type, list[type]] = {}
+        # Tasks running or having run the start() of each provider, indexed
+        # by provider class
+        self.provider_start_tasks: dict[type, asyncio.Task] = {}
+        self.startup_timeline = StartupTimeline()
+        self.blocking_executor = BlockingExecutor()
 
         self.main_loop = None
+        self.main_thread_id = None
         self.main_future = None
         self.main_task: asyncio.Task | None = None
         self.started = False
-        self.event_registry = {}
-        self.eventqueue = EventQueue()
-        self.event_tasks = []
+        # Subscriptions indexed by the subscribed event class
+        self.event_registry: dict[type, list[Subscription]] = {}
+        self.subscription_seq = 0
+        # Called with no arguments whenever subscriptions change
+        self.subscription_change_handlers = []
+        # Precomputed subscribers indexed by concrete event class. Rebuilt on
+        # demand after subscriptions change.
+        self.event_dispatch_table: dict[type, EventRoute] = {}
+        # Events are queued by priority so control events are handled ahead
+        # of bulk events
+        self.eventqueue = EventQueue(batch=True, priorities=PRIORITIES)
+        self.eventqueue_paused = False
+        self.max_pending_events = max_pending_events
+        # Set while the event queue has room. Used to throttle publishers in
+        # other threads.
+        self.event_capacity = threading.Event()
+        self.event_capacity.set()
+        self.event_dispatcher = EventDispatcher(
+            self.handle_event,
+            max_tasks=max_event_tasks,
+            on_progress=self.handle_event_progress,
+        )
+        self.event_stats = EventStats()
+        # Set to an EventRecorder to record published events
+        self.event_recorder = None
+        self.event_coalescer = None
+        if coalesce_window:
+            self.event_coalescer = EventCoalescer(
+                coalesce_window, self.event_dispatcher.dispatch_many
+            )
 
     def add_provider(self, cls, **kwargs):
         """
         Add a provider class.
 
+        The class may be given by its dotted path, such as
+        ``"routesia.route.provider.RouteProvider"``, in which case its module
+        is not imported until providers are loaded.
+
         If any keyword arguments are given, they are passed to the provider on
         initialization.
         """
-        if not issubclass(cls, Provider):
+        if isinstance(cls, str):
+            self.provider_paths[cls] = kwargs
+            return
+        if not inspect.isclass(cls) or not issubclass(cls, Provider):
             raise InvalidProvider
         self.provider_class_map[cls.get_provider_class()] = cls
         self.provider_classes[cls] = kwargs
 
+    def add_optional_provider(self, path: str, **kwargs):
+        """
+        Add a provider class by dotted path. Unlike ``add_provider()``, the
+        module is only imported and the provider only loaded if another
+        provider requires it.
+        """
+        self.optional_provider_paths[path] = kwargs
+
+    def import_provider(self, path: str, **kwargs):
+        "Import and add a provider class given its dotted path"
+        start = time.monotonic()
+        cls = import_class(path)
+        self.add_provider(cls, **kwargs)
+        self.provider_import_times[cls.get_provider_class()] = time.monotonic() - start
+
     def exec(self, fn, **kwargs):
         """
         Execuite callable fn with context and providers. If an argument is
@@ -158,9 +272,27 @@ class Service(Provider):
                 kwargs[arg] = self.providers[cls]
         return fn(**kwargs)
 
+    def get_provider_dependencies(self, provider) -> list[type]:
+        """
+        Return the provider classes required by ``provider``, according to the
+        ``__init__`` annotations of the class that implements it.
+        """
+        dependencies = []
+        for requirement in self.provider_class_map[provider].__init__.__annotations__.values():
+            if inspect.isclass(requirement) and issubclass(requirement, Provider):
+                path = get_class_path(requirement)
+                if requirement not in self.provider_class_map and path in self.optional_provider_paths:
+                    self.import_provider(path, **self.optional_provider_paths.pop(path))
+                if requirement not in self.provider_class_map:
+                    raise ProviderDependencyMissing(f"Provider {provider.get_name()} requires {requirement.__name__} but it is not available")
+                if requirement not in dependencies:
+                    dependencies.append(requirement)
+        return dependencies
+
     async def load_providers(self):
         """
-        Load providers in order, according to their __init__ annotations.
+        Load providers in dependency order, according to their __init__
+        annotations.
 
         This can be executed multiple times to progressively load providers
         """
@@ -168,29 +300,72 @@ class Service(Provider):
         if self.__class__ not in self.providers:
             self.providers[self.get_provider_class()] = self
 
-        pending_providers = list(set(self.provider_class_map.keys()) - set(self.providers.keys()))
-
-        while pending_providers:
-            len_pending = len(pending_providers)
-            for provider in pending_providers:
-                resolved = True
-                for requirement in provider.__init__.__annotations__.values():
-                    if not issubclass(requirement, Provider):
-                        continue
-                    if requirement not in self.provider_class_map:
-                        raise ProviderDependencyMissing(f"Provider {provider.__class__.__name__} requires {requirement.__name__} but it is not available")
-                    if requirement not in self.providers:
-                        # Try again next iteration
-                        resolved = False
-                if resolved:
-                    self.providers[provider] = self.exec(
-                        self.provider_class_map[provider],
-                        **self.provider_classes[provider],
-                    )
-                    pending_providers.remove(provider)
-            if len_pending == len(pending_providers):
-                provider_names = ", ".join([provider.get_name() for provider in pending_providers])
-                raise ProviderDependencyLoop(f"Provider dependency loop detected among {provider_names}")
+        provider_paths = self.provider_paths
+        self.provider_paths = {}
+        for path, kwargs in provider_paths.items():
+            self.import_provider(path, **kwargs)
+
+        pending_providers = [
+            provider for provider in self.provider_class_map
+            if provider not in self.providers
+        ]
+
+        # Number of unloaded dependencies of each pending provider, and the
+        # providers waiting on each. Optional providers are added to the
+        # pending list as they are found to be required.
+        unresolved = {}
+        dependents = {provider: [] for provider in pending_providers}
+        i = 0
+        while i < len(pending_providers):
+            provider = pending_providers[i]
+            i += 1
+            dependencies = self.get_provider_dependencies(provider)
+            self.provider_dependencies[provider] = dependencies
+            unresolved[provider] = 0
+            for requirement in dependencies:
+                if requirement not in self.providers:
+                    if requirement not in dependents:
+                        pending_providers.append(requirement)
+                        dependents[requirement] = []
+                    unresolved[provider] += 1
+                    dependents[requirement].append(provider)
+
+        ready = deque(provider for provider in pending_providers if not unresolved[provider])
+        while ready:
+            provider = ready.popleft()
+            provider_class = self.provider_class_map[provider]
+            timeline = self.startup_timeline.add_provider(
+                provider, self.provider_dependencies[provider]
+            )
+            timeline.import_time = self.provider_import_times.get(provider)
+            timeline.init_start = self.startup_timeline.now()
+            self.providers[provider] = self.exec(
+                provider_class,
+                **self.provider_classes[provider_class],
+            )
+            timeline.init_end = self.startup_timeline.now()
+            for dependent in dependents[provider]:
+                unresolved[dependent] -= 1
+                if not unresolved[dependent]:
+                    ready.append(dependent)
+
+        unloaded = [provider for provider in pending_providers if provider not in self.providers]
+        if unloaded:
+            provider_names = ", ".join([provider.get_name() for provider in unloaded])
+            raise ProviderDependencyLoop(f"Provider dependency loop detected among {provider_names}")
+
+    async def load_provider(self, path: str, **kwargs):
+        """
+        Import, load and start a provider given its dotted path, along with
+        any optional providers it requires. This allows providers to be
+        added once the service is running.
+
+        Providers added this way must not have a ``main()``, since the main
+        loop is already running.
+        """
+        self.add_provider(path, **kwargs)
+        await self.load_providers()
+        await self.start_providers()
 
     async def get_provider(self, cls):
         """
@@ -198,14 +373,47 @@ class Service(Provider):
         """
         return self.providers[cls]
 
+    async def start_provider(self, provider_class, provider, dependencies: list[asyncio.Task]):
+        if dependencies:
+            await asyncio.gather(*dependencies)
+        logger.debug(f"Starting {provider.get_name()} provider")
+        timeline = self.startup_timeline.providers.get(provider_class)
+        if timeline:
+            timeline.start_start = self.startup_timeline.now()
+        if inspect.iscoroutinefunction(provider.start):
+            await provider.start()
+        else:
+            provider.start()
+        if timeline:
+            timeline.start_end = self.startup_timeline.now()
+
     async def start_providers(self):
-        for provider in self.providers.values():
-            if provider != self:
-                logger.debug(f"Starting {provider.get_name()} provider")
-                if inspect.iscoroutinefunction(provider.start):
-                    await provider.start()
-                else:
-                    provider.start()
+        """
+        Start providers once the providers they depend on have started.
+        Providers already started, or starting, are skipped.
+        """
+        start_tasks = self.provider_start_tasks
+        tasks = {}
+        for provider_class, provider in self.providers.items():
+            if provider == self or provider_class in start_tasks:
+                continue
+            # Providers are stored in dependency order, so the tasks of any
+            # dependencies already exist
+            dependencies = [
+                start_tasks[requirement]
+                for requirement in self.provider_dependencies.get(provider_class, ())
+                if requirement in start_tasks
+            ]
+            tasks[provider_class] = start_tasks[provider_class] = asyncio.create_task(
+                self.start_provider(provider_class, provider, dependencies),
+                name=f"Start {provider.get_name()}",
+            )
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
 
     async def stop_providers(self):
         for provider in reversed(self.providers.values()):
@@ -215,6 +423,16 @@ class Service(Provider):
                     await provider.stop()
                 else:
                     provider.stop()
+        self.blocking_executor.shutdown()
+
+    async def run_blocking(self, resource: str, fn, *args, **kwargs):
+        """
+        Call the blocking callable ``fn`` in a thread and return its result.
+
+        Calls with the same ``resource`` are made one at a time in submission
+        order. See ``BlockingExecutor``.
+        """
+        return await self.blocking_executor.run(resource, fn, *args, **kwargs)
 
     async def wait_start(self):
         if self.started:
@@ -233,6 +451,17 @@ class Service(Provider):
 
         systemd.daemon.notify("READY=1")
         self.started = True
+        self.startup_timeline.set_ready(
+            self.providers,
+            [
+                subscription.subscriber
+                for subscriptions in self.event_registry.values()
+                for subscription in subscriptions
+            ],
+        )
+        self.startup_timeline.log()
+        if self.import_timer:
+            self.import_timer.log()
         if self.main_future:
             self.main_future.set_result(True)
 
@@ -260,12 +489,14 @@ class Service(Provider):
         return ret
 
     async def stop(self):
-        for task in self.event_tasks:
-            task.cancel()
+        if self.event_coalescer and self.event_coalescer.timer:
+            self.event_coalescer.timer.cancel()
+        self.event_dispatcher.cancel()
 
     async def run(self) -> int:
         "Run the service"
         self.main_loop = asyncio.get_running_loop()
+        self.main_thread_id = threading.get_ident()
         await self.load_providers()
         return await self.service_main()
 
@@ -274,6 +505,7 @@ class Service(Provider):
         Run providers in a background task
         """
         self.main_loop = asyncio.get_running_loop()
+        self.main_thread_id = threading.get_ident()
         await self.load_providers()
         self.main_task = self.main_loop.create_task(self.service_main())
 
@@ -287,39 +519,151 @@ class Service(Provider):
                 await self.main_task
             self.main_task = None
 
-    def subscribe_event(self, event_class, subscriber):
-        """Subscribe to an event. The subscriber must be a callable taking a
-        single parameter for the event instance."""
+    def subscribe_event(self, event_class, subscriber, predicate=None, **keys):
+        """
+        Subscribe to an event. The subscriber must be a callable taking a
+        single parameter for the event instance.
+
+        The subscriber receives events of ``event_class`` and its subclasses.
+        Any keyword arguments restrict it to events with those attribute
+        values, given as a single value or a set of values. For example::
+
+            service.subscribe_event(RouteEvent, handler, table={254, 100})
+
+        Keyed subscriptions are indexed, so filtering does not scan all
+        subscribers. If ``predicate`` is given, it is called with the event
+        after the keys match and must return True for the subscriber to be
+        called.
+        """
+        subscription = Subscription(
+            self.subscription_seq, subscriber, keys=keys, predicate=predicate
+        )
+        self.subscription_seq += 1
         if event_class in self.event_registry:
-            self.event_registry[event_class].append(subscriber)
+            self.event_registry[event_class].append(subscription)
         else:
-            self.event_registry[event_class] = [subscriber]
+            self.event_registry[event_class] = [subscription]
+        self.event_dispatch_table.clear()
+        self.call_subscription_change_handlers()
+
+    def unsubscribe_event(self, event_class, subscriber):
+        "Remove all subscriptions of subscriber to event_class"
+        if event_class not in self.event_registry:
+            return
+        self.event_registry[event_class] = [
+            subscription
+            for subscription in self.event_registry[event_class]
+            if subscription.subscriber != subscriber
+        ]
+        if not self.event_registry[event_class]:
+            del self.event_registry[event_class]
+        self.event_dispatch_table.clear()
+        self.call_subscription_change_handlers()
+
+    def has_subscribers(self, event_class) -> bool:
+        "Return True if any subscription receives events of ``event_class``"
+        return any(cls in self.event_registry for cls in event_class.__mro__)
+
+    def register_subscription_change_handler(self, handler):
+        """
+        Register a handler to be called with no arguments whenever a
+        subscription is added or removed.
+        """
+        self.subscription_change_handlers.append(handler)
+
+    def call_subscription_change_handlers(self):
+        for handler in self.subscription_change_handlers:
+            handler()
+
+    def get_event_route(self, event_class) -> EventRoute:
+        "Return the precomputed subscriptions for a concrete event class"
+        route = self.event_dispatch_table.get(event_class)
+        if route is None:
+            subscriptions = []
+            for cls in event_class.__mro__:
+                subscriptions.extend(self.event_registry.get(cls, ()))
+            route = EventRoute(subscriptions)
+            self.event_dispatch_table[event_class] = route
+        return route
 
     def publish_event(self, event: Event):
-        "Publish an event to listening providers"
-        logger.debug(f"Publishing event: {event}")
-        self.eventqueue.put(event)
+        """
+        Publish an event to listening providers.
 
-    def handle_eventqueue(self):
-        while True:
-            try:
-                event = self.eventqueue.get()
-            except BlockingIOError:
-                break
-            task = self.main_loop.create_task(self.handle_event(event))
-            self.event_tasks.append(task)
+        This may be called from any thread. If the backlog is full, callers
+        outside the main thread block until there is room. The main thread is
+        never blocked.
+        """
+        logger.debug("Publishing event: %s", event)
+        event.published_time = time.monotonic()
+        self.event_stats.published += 1
+        if self.event_recorder:
+            self.event_recorder.record(event)
+        if (
+            len(self.eventqueue) >= self.max_pending_events
+            and threading.get_ident() != self.main_thread_id
+        ):
+            self.wait_event_capacity()
+        self.eventqueue.put(event, event.priority)
+
+    def wait_event_capacity(self):
+        "Block the calling thread until the event queue has room"
+        self.event_capacity.clear()
+        while len(self.eventqueue) >= self.max_pending_events:
+            # Poll in case the main thread set the flag before it was cleared
+            self.event_capacity.wait(0.1)
 
-        # Clean up old tasks
-        for task in self.event_tasks.copy():
-            if task.done():
-                self.event_tasks.remove(task)
+    def handle_eventqueue(self):
+        """
+        Drain the event queue into the dispatcher in a single wakeup.
+        """
+        room = self.max_pending_events - self.event_dispatcher.pending
+        if self.event_coalescer:
+            room -= len(self.event_coalescer)
+        if room <= 0:
+            # Stop reading until the dispatcher catches up
+            self.main_loop.remove_reader(self.eventqueue)
+            self.eventqueue_paused = True
+            return
+        self.event_stats.record_queue_depth(len(self.eventqueue))
+        events = self.eventqueue.get_many(room)
+        if len(self.eventqueue) < self.max_pending_events:
+            self.event_capacity.set()
+        if self.event_coalescer:
+            events = self.event_coalescer.process(events)
+        if events:
+            self.event_dispatcher.dispatch_many(events)
+
+    def handle_event_progress(self):
+        "Resume reading events once the dispatcher backlog has halved"
+        if (
+            self.eventqueue_paused
+            and self.event_dispatcher.pending < self.max_pending_events // 2
+        ):
+            self.eventqueue_paused = False
+            self.main_loop.add_reader(self.eventqueue, self.handle_eventqueue)
 
     async def handle_event(self, event):
         "Handle an event. Only called in the main thread"
-        logger.debug(f"Handling event: {event}")
-        if event.__class__ in self.event_registry:
-            for subscriber in self.event_registry[event.__class__]:
-                try:
-                    await subscriber(event)
-                except Exception:
-                    logger.exception("Failure in event handler for %s" % event)
+        logger.debug("Handling event: %s", event)
+        event_class = event.__class__
+        event_stats = self.event_stats
+        class_stats = event_stats.get_event_class_stats(event_class)
+        class_stats.handled += 1
+        published_time = getattr(event, "published_time", None)
+        if published_time is not None:
+            class_stats.dispatch_delay.record(time.monotonic() - published_time)
+
+        startup_timeline = self.startup_timeline
+        for subscriber in self.get_event_route(event_class).get_subscribers(event):
+            if startup_timeline.awaiting_event:
+                startup_timeline.record_event(subscriber)
+            subscriber_stats = event_stats.get_subscriber_stats(event_class, subscriber)
+            start = time.monotonic()
+            try:
+                await subscriber(event)
+            except Exception:
+                subscriber_stats.exceptions += 1
+                logger.exception("Failure in event handler for %s" % event)
+            subscriber_stats.calls += 1
+            subscriber_stats.latency.record(time.monotonic() - start)
@@ -0,0 +1,122 @@
+"""
+routesia/startuptimeline.py - Provider startup timeline
+"""
+
+import logging
+import time
+
+
+logger = logging.getLogger("service")
+
+
+class ProviderTimeline:
+    """
+    Startup times of a single provider in seconds since the service was
+    created. Times that have not been reached yet are None.
+
+    ``import_time`` is the number of seconds taken to import the provider, if
+    it was added by dotted path.
+    """
+    __slots__ = (
+        "name",
+        "dependencies",
+        "import_time",
+        "init_start",
+        "init_end",
+        "start_start",
+        "start_end",
+        "first_event",
+    )
+
+    def __init__(self, name: str, dependencies: list[str]):
+        self.name = name
+        self.dependencies = dependencies
+        self.import_time = None
+        self.init_start = None
+        self.init_end = None
+        self.start_start = None
+        self.start_end = None
+        self.first_event = None
+
+
+class StartupTimeline:
+    """
+    Records when each provider is initialized, started and handles its first
+    event.
+    """
+    def __init__(self):
+        self.created = time.monotonic()
+        self.ready = None
+        # Indexed by provider class
+        self.providers: dict[type, ProviderTimeline] = {}
+        # Providers that subscribe to events but have not handled one yet,
+        # indexed by the id of the provider instance
+        self.awaiting_event: dict[int, ProviderTimeline] = {}
+
+    def now(self) -> float:
+        return time.monotonic() - self.created
+
+    def add_provider(self, provider_class: type, dependencies: list[type]) -> ProviderTimeline:
+        timeline = ProviderTimeline(
+            provider_class.get_name(),
+            [dependency.get_name() for dependency in dependencies],
+        )
+        self.providers[provider_class] = timeline
+        return timeline
+
+    def set_ready(self, providers: dict, subscribers: list) -> None:
+        """
+        Mark the service as ready.
+
+        ``providers`` maps provider classes to instances. Providers owning any
+        of ``subscribers`` have the time of their first event recorded.
+        """
+        self.ready = self.now()
+        owners = {id(getattr(subscriber, "__self__", None)) for subscriber in subscribers}
+        for provider_class, provider in providers.items():
+            timeline = self.providers.get(provider_class)
+            if timeline is not None and id(provider) in owners:
+                self.awaiting_event[id(provider)] = timeline
+
+    def record_event(self, subscriber) -> None:
+        "Record an event handled by ``subscriber``"
+        timeline = self.awaiting_event.pop(id(getattr(subscriber, "__self__", None)), None)
+        if timeline is not None:
+            timeline.first_event = self.now()
+
+    def log(self) -> None:
+        for timeline in self.providers.values():
+            imported = ""
+            if timeline.import_time is not None:
+                imported = f"import {format_time(timeline.import_time)}, "
+            logger.info(
+                f"{timeline.name}: {imported}init {format_time(timeline.init_start)}-{format_time(timeline.init_end)}, "
+                f"start {format_time(timeline.start_start)}-{format_time(timeline.start_end)}"
+            )
+        logger.info(f"Ready after {format_time(self.ready)}")
+
+    def to_message(self, message) -> None:
+        "Set message parameters from the timeline"
+        if self.ready is not None:
+            message.ready = self.ready
+        for timeline in self.providers.values():
+            provider_message = message.provider.add()
+            provider_message.name = timeline.name
+            provider_message.dependencies[:] = timeline.dependencies
+            for field in (
+                "import_time",
+                "init_start",
+                "init_end",
+                "start_start",
+                "start_end",
+                "first_event",
+            ):
+                value = getattr(timeline, field)
+                if value is not None:
+                    setattr(provider_message, field, value)
+
+
+def format_time(value: float | None) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.3f}s"
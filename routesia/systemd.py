@@ -4,14 +4,22 @@ routesia/systemd/provider.py - SystemD support
 import dbus
 import logging
 
-from routesia.service import Provider
+from routesia.service import Provider, Service
 
 
 logger = logging.getLogger("systemd")
 
 
 class SystemdProvider(Provider):
-    def __init__(self):
+    """
+    Controls systemd units over D-Bus.
+
+    D-Bus calls block, so handlers running on the event loop should use the
+    ``_async`` variants, which make the call on the ``"systemd"`` blocking
+    lane.
+    """
+    def __init__(self, service: Service):
+        self.service = service
         self.bus = dbus.SystemBus()
         self.systemd1 = self.bus.get_object('org.freedesktop.systemd1', '/org/freedesktop/systemd1')
         self.manager = dbus.Interface(self.systemd1, 'org.freedesktop.systemd1.Manager')
@@ -23,3 +31,9 @@ class SystemdProvider(Provider):
     def stop_unit(self, unit):
         logger.info(f"Stopping unit {unit}")
         self.manager.StopUnit(unit, "replace")
+
+    async def start_unit_async(self, unit):
+        await self.service.run_blocking("systemd", self.start_unit, unit)
+
+    async def stop_unit_async(self, unit):
+        await self.service.run_blocking("systemd", self.stop_unit, unit)
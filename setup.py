@@ -5,12 +5,13 @@ from routesia import VERSION
 setup(
     name='routesia',
     description='Configuration system for Linux-based routers',
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     entry_points={
         "console_scripts": [
             "rcl = routesia.programs.rcl:main",
             "routesia = routesia.programs.routesia_agent:main",
             "routesia-dhcpv4-event = routesia.programs.routesia_dhcpv4_event:main",
+            "routesia-replay = routesia.programs.routesia_replay:main",
         ],
     },
     version=VERSION,
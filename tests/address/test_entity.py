@@ -2,6 +2,7 @@
 tests/address/test_entity.py
 """
 
+import errno
 import ipaddress
 import pytest
 
@@ -9,33 +10,6 @@ from routesia.address.entity import AddressEntity
 from routesia.schema.v1 import address_pb2
 
 
-class FakeIPRoute:
-    def __init__(self):
-        self.addresses = []
-
-    def addr(self, cmd, **kwargs):
-        if cmd == "add":
-            self.addresses.append(kwargs)
-        elif cmd == "remove":
-            for address in self.addresses:
-                if (
-                    address["index"] == kwargs["index"] and
-                    address["address"] == kwargs["address"] and
-                    address["prefixlen"] == kwargs["prefixlen"]
-                ):
-                    self.addresses.remove(address)
-                    break
-
-
-class FakeIPRouteProvider:
-    def __init__(self):
-        self.iproute = FakeIPRoute()
-        self.rt_proto = 42
-
-    def addr(self, cmd, **kwargs):
-        return self.iproute.addr(cmd, **kwargs)
-
-
 class FakeAddressAddEvent:
     def __init__(self, ifindex, ip, peer=None, scope=0):
         self.ifindex = ifindex
@@ -53,8 +27,8 @@ def address_config():
 
 
 @pytest.fixture
-def address_with_config(address_config):
-    return AddressEntity("eth0", FakeIPRouteProvider(), config=address_config)
+def address_with_config(iproute, address_config):
+    return AddressEntity("eth0", iproute, config=address_config)
 
 
 def test_initial_with_config(address_with_config):
@@ -71,7 +45,7 @@ def test_set_ifindex(address_with_config):
             "index": 2,
             "address": "10.1.2.3",
             "prefixlen": 24,
-            "proto": 42,
+            "proto": 52,
         }
     ]
 
@@ -101,6 +75,35 @@ def test_update_config(address_with_config):
             "index": 2,
             "address": "10.2.3.4",
             "prefixlen": 27,
-            "proto": 42,
+            "proto": 52,
         }
     ]
+
+
+def test_set_ifindex_batch(address_with_config, iproute):
+    batch = iproute.batch()
+    address_with_config.set_ifindex(2, batch)
+    assert address_with_config.iproute.iproute.addresses == []
+    assert [(kind, cmd, kwargs) for kind, cmd, kwargs, _ in batch.queued] == [
+        (
+            "addr",
+            "add",
+            {
+                "index": 2,
+                "address": "10.1.2.3",
+                "prefixlen": 24,
+                "proto": 52,
+            },
+        )
+    ]
+    batch.commit()
+    assert address_with_config.status.state == address_pb2.Address.ADDRESS_MISSING
+
+
+def test_set_ifindex_batch_no_device(address_with_config, iproute):
+    iproute.failures["10.1.2.3"] = errno.ENODEV
+    batch = iproute.batch()
+    address_with_config.set_ifindex(2, batch)
+    batch.commit()
+    assert address_with_config.ifindex is None
+    assert address_with_config.status.state == address_pb2.Address.INTERFACE_MISSING
@@ -21,6 +21,7 @@ import logging
 import os
 from paho.mqtt.client import MQTTMessage, topic_matches_sub
 import pty
+from pyroute2 import NetlinkError
 import pytest
 import subprocess
 import uuid
@@ -32,7 +33,7 @@ from routesia.mqtt import MQTT
 from routesia.netfilter.nftables import Nftables
 from routesia.rpc import RPC
 from routesia.rpcclient import RPCClient
-from routesia.rtnetlink.provider import IPRouteProvider
+from routesia.rtnetlink.provider import RT_PROTO, IPRouteProvider
 from routesia.schema.registry import SchemaRegistry
 from routesia.service import Service
 
@@ -331,6 +332,181 @@ def any_integer():
     return AnyInteger()
 
 
+class FakeService:
+    """
+    Service that records the events published and only reports subscribers
+    for the event classes in ``subscribed``. Blocking calls are made
+    directly.
+    """
+    def __init__(self):
+        self.events = []
+        self.subscribed = set()
+
+    def publish_event(self, event):
+        self.events.append(event)
+
+    def has_subscribers(self, event_class):
+        return any(cls in self.subscribed for cls in event_class.__mro__)
+
+    def subscribe_event(self, event_class, subscriber, predicate=None, **keys):
+        pass
+
+    def register_subscription_change_handler(self, handler):
+        pass
+
+    async def run_blocking(self, resource, fn, *args):
+        return fn(*args)
+
+
+@pytest.fixture
+def fake_service():
+    return FakeService()
+
+
+class FakeIPRoute:
+    "pyroute2 IPRoute giving the objects set on it and keeping the addresses added"
+    def __init__(self):
+        self.links = []
+        self.addresses = []
+        self.routes = []
+
+    def get_links(self):
+        return self.links
+
+    def get_addr(self):
+        return self.addresses
+
+    def get_neighbours(self):
+        return []
+
+    def get_routes(self):
+        return self.routes
+
+    def addr(self, cmd, **kwargs):
+        if cmd == "add":
+            self.addresses.append(kwargs)
+        elif cmd == "remove":
+            for address in self.addresses:
+                if (
+                    address["index"] == kwargs["index"] and
+                    address["address"] == kwargs["address"] and
+                    address["prefixlen"] == kwargs["prefixlen"]
+                ):
+                    self.addresses.remove(address)
+                    break
+
+
+class FakeBatch:
+    """
+    NetlinkBatch that records the requests it commits on its provider as
+    (kind, command, arguments) rather than sending them. Requests fail with
+    the errno given in the provider's ``failures`` for their destination or
+    address, or their ID for nexthops. Address requests that succeed are
+    made on the provider's ``iproute``.
+    """
+    def __init__(self, iproute):
+        self.iproute = iproute
+        self.queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.commit()
+
+    def __len__(self):
+        return len(self.queued)
+
+    def route(self, command, callback=None, **kwargs):
+        self.queued.append(("route", command, kwargs, callback))
+
+    def nexthop(self, command, callback=None, **kwargs):
+        self.queued.append(("nexthop", command, kwargs, callback))
+
+    def addr(self, command, callback=None, **kwargs):
+        self.queued.append(("addr", command, kwargs, callback))
+
+    def get_error(self, key):
+        code = self.iproute.failures.get(key)
+        return NetlinkError(code) if code else None
+
+    def commit(self):
+        queued = self.queued
+        self.queued = []
+        errors = []
+        for kind, command, kwargs, callback in queued:
+            self.iproute.requests.append((kind, command, kwargs))
+            error = self.get_error(
+                kwargs.get("dst", kwargs.get("id", kwargs.get("address")))
+            )
+            if error:
+                errors.append(error)
+            elif kind == "addr":
+                self.iproute.iproute.addr(command, **kwargs)
+            if callback:
+                callback(error)
+        return errors
+
+    def send_blackholes(self, command, destinations, table, proto):
+        failed = []
+        for destination in destinations:
+            self.iproute.requests.append(
+                ("blackhole", command, {"table": table, "dst": destination})
+            )
+            error = self.get_error(destination)
+            if error:
+                failed.append((destination, error))
+        return failed
+
+
+class FakeIPRouteProvider:
+    "IPRouteProvider whose batches are recorded by FakeBatch"
+    interface_map = {2: "eth0", 3: "eth1"}
+    interface_name_map = {"eth0": 2, "eth1": 3}
+    rt_proto = RT_PROTO
+
+    def __init__(self):
+        self.iproute = FakeIPRoute()
+        self.requests = []
+        # Errno to fail requests with by destination, address or nexthop ID
+        self.failures = {}
+        # Route summaries given by dump_own_routes()
+        self.installed = []
+        self.route_tables = None
+
+    def get_interface_name_by_index(self, index):
+        return self.interface_map[index]
+
+    def set_route_tables(self, tables):
+        self.route_tables = tables
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def bulk_batch(self):
+        return FakeBatch(self)
+
+    def dump_own_routes(self):
+        return iter(self.installed)
+
+    def get_requests(self, *keys, kind="route"):
+        """
+        Return the command of each request of ``kind`` made, followed by the
+        value of each of ``keys`` in its arguments
+        """
+        return [
+            (command,) + tuple(kwargs.get(key) for key in keys)
+            for request_kind, command, kwargs in self.requests
+            if request_kind == kind
+        ]
+
+
+@pytest.fixture
+def iproute():
+    return FakeIPRouteProvider()
+
+
 class EventWaiter:
     def __init__(self, future, **params):
         self.future = future
@@ -0,0 +1,20 @@
+"""
+tests/route/conftest.py - Route test fixtures
+"""
+
+from ipaddress import ip_network
+
+import pytest
+
+
+class FakeRouteEvent:
+    def __init__(self, destination, proto=186, scope=0, **attrs):
+        self.destination = ip_network(destination)
+        self.message = {"proto": proto, "scope": scope}
+        self.attrs = attrs
+
+
+@pytest.fixture
+def route_event():
+    "Return the route event class, taking a destination, protocol, scope and attributes"
+    return FakeRouteEvent
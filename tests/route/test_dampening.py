@@ -0,0 +1,146 @@
+"""
+tests/route/test_dampening.py
+"""
+
+import asyncio
+from ipaddress import ip_network
+
+from routesia.route.dampening import RouteDampening
+from routesia.route.entities import TableEntity
+from routesia.schema.v1 import route_pb2
+
+
+DESTINATION = ip_network("10.0.0.0/8")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_dampening(**kwargs):
+    config = route_pb2.RouteDampeningConfig(enabled=True, **kwargs)
+    reused = []
+    clock = FakeClock()
+    return RouteDampening(reused.append, config, clock), reused, clock
+
+
+def test_suppress_and_reuse():
+    async def run():
+        dampening, reused, clock = create_dampening()
+        dampening.withdrawn(DESTINATION)
+        assert not dampening.is_held(DESTINATION)
+
+        dampening.withdrawn(DESTINATION)
+        assert dampening.is_held(DESTINATION)
+        state = route_pb2.RouteDampeningState()
+        dampening.to_message(DESTINATION, state)
+        assert state.suppressed
+        assert state.flaps == 2
+        assert state.penalty == 2000
+        # Until the penalty halves to below 750
+        assert round(state.reuse_in, 1) == 21.2
+
+        clock.now += 21
+        dampening.wake(DESTINATION)
+        assert dampening.is_held(DESTINATION)
+        assert not reused
+
+        clock.now += 0.5
+        dampening.wake(DESTINATION)
+        assert not dampening.is_held(DESTINATION)
+        assert reused == [DESTINATION]
+        assert DESTINATION in dampening.timers
+
+        # Forgotten once below half the reuse threshold
+        clock.now += 15
+        dampening.wake(DESTINATION)
+        assert not dampening.histories
+        assert reused == [DESTINATION]
+
+    asyncio.run(run())
+
+
+def test_hold_down():
+    async def run():
+        dampening, reused, clock = create_dampening(hold_down=5)
+        dampening.withdrawn(DESTINATION)
+        assert dampening.is_held(DESTINATION)
+
+        clock.now += 5
+        assert not dampening.is_held(DESTINATION)
+        dampening.wake(DESTINATION)
+        assert reused == [DESTINATION]
+
+    asyncio.run(run())
+
+
+def test_ceiling():
+    async def run():
+        dampening, _, _ = create_dampening(max_suppress_time=30)
+        for _ in range(100):
+            dampening.withdrawn(DESTINATION)
+        # Decays to the reuse threshold in the maximum suppress time
+        assert dampening.histories[DESTINATION].penalty == 750 * 4
+
+    asyncio.run(run())
+
+
+def test_disable_releases():
+    async def run():
+        dampening, reused, _ = create_dampening(hold_down=5)
+        dampening.withdrawn(DESTINATION)
+        dampening.configure(route_pb2.RouteDampeningConfig())
+        assert reused == [DESTINATION]
+        assert not dampening.histories
+        assert not dampening.timers
+
+        # Nothing is recorded while disabled
+        dampening.withdrawn(DESTINATION)
+        assert not dampening.is_held(DESTINATION)
+
+    asyncio.run(run())
+
+
+def test_table_suppresses_flapping_route(iproute, route_event):
+    async def run():
+        config = route_pb2.RouteTableConfig()
+        config.id = 254
+        config.dampening.enabled = True
+        route_config = config.route.add()
+        route_config.destination = "10.0.0.0/8"
+        route_config.nexthop.add().gateway = "192.0.2.1"
+        table = TableEntity(iproute, 254, config=config)
+        table.dampening.clock = clock = FakeClock()
+        table.handle_config_change(config)
+
+        for _ in range(2):
+            table.handle_route_add_event(route_event("192.0.2.0/24", RTA_OIF=2))
+            table.handle_route_remove_event(route_event("192.0.2.0/24"))
+        assert iproute.get_requests("dst") == [
+            ("replace", "10.0.0.0/8"),
+            ("delete", "10.0.0.0/8"),
+            ("replace", "10.0.0.0/8"),
+            ("delete", "10.0.0.0/8"),
+        ]
+        iproute.requests.clear()
+
+        # The gateway is reachable again but the route stays withdrawn
+        table.handle_route_add_event(route_event("192.0.2.0/24", RTA_OIF=2))
+        assert not iproute.requests
+
+        message = route_pb2.RouteStateList()
+        table.to_message(message)
+        state = [route for route in message.route if route.destination == "10.0.0.0/8"][0]
+        assert not state.present
+        assert state.dampening.suppressed
+        assert state.dampening.flaps == 2
+
+        clock.now += 30
+        table.dampening.wake(DESTINATION)
+        assert iproute.get_requests("dst") == [("replace", "10.0.0.0/8")]
+
+    asyncio.run(run())
@@ -0,0 +1,112 @@
+"""
+tests/route/test_entities.py
+"""
+
+from ipaddress import ip_network
+
+from routesia.route.entities import TableEntity
+from routesia.schema.v1 import route_pb2
+
+
+def create_table(iproute, routes):
+    "Create a table with a route to each destination via its gateway"
+    config = route_pb2.RouteTableConfig()
+    config.id = 254
+    for destination, gateway in routes:
+        route = config.route.add()
+        route.destination = destination
+        route.nexthop.add().gateway = gateway
+    table = TableEntity(iproute, 254, config=config)
+    table.apply()
+    return table
+
+
+def test_dependents(iproute, route_event):
+    table = create_table(
+        iproute,
+        [
+            ("10.0.0.0/8", "192.0.2.1"),
+            ("10.1.0.0/16", "192.0.2.129"),
+            ("172.16.0.0/12", "198.51.100.1"),
+        ]
+    )
+    assert not iproute.requests
+    assert [str(route.destination) for route in table.get_dependents(ip_network("192.0.2.0/24"))] == [
+        "10.0.0.0/8",
+        "10.1.0.0/16",
+    ]
+
+    # Only the routes with a gateway within the new route are applied
+    table.handle_route_add_event(route_event("192.0.2.128/25", proto=2, scope=253, RTA_OIF=2))
+    assert iproute.get_requests("dst") == [("replace", "10.1.0.0/16")]
+
+
+def test_config_change_updates_dependents(iproute):
+    table = create_table(iproute, [("10.0.0.0/8", "192.0.2.1")])
+
+    table.config.route[0].nexthop[0].gateway = "198.51.100.1"
+    table.apply()
+    assert not table.get_dependents(ip_network("192.0.2.0/24"))
+    assert table.get_dependents(ip_network("198.51.100.0/24"))
+
+    del table.config.route[:]
+    table.apply()
+    assert not table.get_dependents(ip_network("198.51.100.0/24"))
+
+
+def test_remove_cascades(iproute, route_event):
+    table = create_table(
+        iproute,
+        [
+            ("10.0.0.0/8", "192.0.2.1"),
+            ("172.16.0.0/12", "10.0.0.1"),
+        ]
+    )
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("10.0.0.0/8", proto=52, RTA_GATEWAY="192.0.2.1", RTA_OIF=2))
+    table.handle_route_add_event(route_event("172.16.0.0/12", proto=52, RTA_GATEWAY="10.0.0.1", RTA_OIF=2))
+    assert iproute.get_requests("dst") == [("replace", "10.0.0.0/8"), ("replace", "172.16.0.0/12")]
+    iproute.requests.clear()
+
+    table.handle_route_remove_event(route_event("192.0.2.0/24"))
+    assert iproute.get_requests("dst") == [("delete", "10.0.0.0/8")]
+
+    table.handle_route_remove_event(route_event("10.0.0.0/8"))
+    assert iproute.get_requests("dst") == [("delete", "10.0.0.0/8"), ("delete", "172.16.0.0/12")]
+
+
+def test_apply_changed_routes(iproute, route_event):
+    table = create_table(
+        iproute,
+        [
+            ("10.0.0.0/8", "192.0.2.1"),
+            ("172.16.0.0/12", "192.0.2.1"),
+        ]
+    )
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    iproute.requests.clear()
+
+    # An unchanged config is not applied again but routes take the new
+    # messages
+    config = route_pb2.RouteTableConfig()
+    config.CopyFrom(table.config)
+    table.handle_config_change(config)
+    assert not iproute.requests
+    route = table.routes[ip_network("10.0.0.0/8")]
+    assert route.config is config.route[0]
+    assert table.find_route_config(route_event("10.0.0.0/8")) is config.route[0]
+
+    config = route_pb2.RouteTableConfig()
+    config.CopyFrom(table.config)
+    config.route[1].nexthop[0].gateway = "192.0.2.2"
+    route = config.route.add()
+    route.destination = "198.51.100.0/24"
+    route.nexthop.add().gateway = "192.0.2.1"
+    del config.route[0]
+    table.handle_config_change(config)
+    assert iproute.get_requests("dst") == [
+        ("delete", "10.0.0.0/8"),
+        ("replace", "172.16.0.0/12"),
+        ("replace", "198.51.100.0/24"),
+    ]
+    assert table.find_route_config(route_event("10.0.0.0/8")) is None
@@ -0,0 +1,85 @@
+"""
+tests/route/test_lookup.py
+"""
+
+import errno
+from ipaddress import ip_address
+
+from pyroute2 import NetlinkError
+
+from routesia.route.entities import TableEntity
+from routesia.route.lookup import set_kernel_result
+from routesia.schema.v1 import route_pb2
+
+
+def create_table(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("0.0.0.0/0", RTA_GATEWAY="192.0.2.1", RTA_OIF=2))
+    table.handle_route_add_event(route_event("10.0.0.0/8", RTA_GATEWAY="192.0.2.2", RTA_OIF=2))
+    table.handle_route_add_event(route_event("10.1.0.0/16", RTA_OIF=3))
+    table.handle_route_add_event(route_event("2001:db8::/32", RTA_OIF=3))
+    return table
+
+
+def lookup(table, address):
+    result = route_pb2.RouteLookupResult()
+    table.lookup(ip_address(address), result)
+    return result
+
+
+def test_lookup(iproute, route_event):
+    table = create_table(iproute, route_event)
+
+    result = lookup(table, "10.1.2.3")
+    assert result.address == "10.1.2.3"
+    assert result.found
+    assert result.table_id == 254
+    assert result.destination == "10.1.0.0/16"
+    assert [(nexthop.gateway, nexthop.interface) for nexthop in result.nexthop] == [("", "eth1")]
+
+    result = lookup(table, "10.2.0.1")
+    assert result.destination == "10.0.0.0/8"
+    assert [(nexthop.gateway, nexthop.interface) for nexthop in result.nexthop] == [
+        ("192.0.2.2", "eth0")
+    ]
+
+    assert lookup(table, "198.51.100.1").destination == "0.0.0.0/0"
+    assert lookup(table, "2001:db8::1").destination == "2001:db8::/32"
+    assert not lookup(table, "2001:db9::1").found
+
+
+def test_kernel_result(iproute, route_event):
+    table = create_table(iproute, route_event)
+
+    result = lookup(table, "10.1.2.3")
+    set_kernel_result(
+        iproute,
+        result,
+        {
+            "family": 2,
+            "dst_len": 16,
+            "table": 254,
+            "type": 1,
+            "attrs": [("RTA_TABLE", 254), ("RTA_DST", "10.1.0.0"), ("RTA_OIF", 3)],
+        },
+    )
+    assert result.kernel.table_id == 254
+    assert result.kernel.destination == "10.1.0.0/16"
+    assert result.kernel.type == 1
+    assert [nexthop.interface for nexthop in result.kernel.nexthop] == ["eth1"]
+    assert result.kernel_match
+
+    # The kernel gives an error rather than the blackhole route matched
+    result = lookup(table, "10.1.2.3")
+    set_kernel_result(iproute, result, NetlinkError(errno.EINVAL))
+    assert result.kernel.error == "Matched a blackhole route"
+    assert not result.kernel_match
+
+    result = route_pb2.RouteLookupResult(found=True, destination="10.1.2.0/24", blackhole=True)
+    set_kernel_result(iproute, result, NetlinkError(errno.EINVAL))
+    assert result.kernel_match
+
+    result = lookup(table, "2001:db9::1")
+    set_kernel_result(iproute, result, NetlinkError(errno.ENETUNREACH))
+    assert result.kernel.error == "Network is unreachable"
+    assert not result.kernel_match
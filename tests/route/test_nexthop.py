@@ -0,0 +1,214 @@
+"""
+tests/route/test_nexthop.py
+"""
+
+import errno
+import itertools
+from ipaddress import ip_network
+
+from routesia.route.entities import TableEntity
+from routesia.route.nexthop import MEMBER_ID_BASE, NexthopGroupEntity
+from routesia.schema.v1 import route_pb2
+
+
+def create_group(iproute, table):
+    config = route_pb2.RouteNextHopGroupConfig()
+    config.id = 100
+    for gateway in ("192.0.2.1", "198.51.100.1"):
+        config.nexthop.add().gateway = gateway
+    config.nexthop[1].hops = 2
+    return NexthopGroupEntity(iproute, table, config, itertools.count(MEMBER_ID_BASE))
+
+
+def apply_group(group, batch):
+    "Apply the group as the provider does, again once new members are installed"
+    group.apply(batch)
+    batch.commit()
+    if group.members_pending:
+        group.apply(batch)
+        batch.commit()
+
+
+def test_group_members(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("198.51.100.0/24", proto=2, scope=253, RTA_OIF=3))
+    group = create_group(iproute, table)
+    batch = iproute.batch()
+
+    apply_group(group, batch)
+    assert group.installed
+    assert group.nexthops == (("192.0.2.1", "eth0"), ("198.51.100.1", "eth1"))
+    assert iproute.requests == [
+        ("nexthop", "replace", {"id": MEMBER_ID_BASE, "oif": 2, "proto": 52, "gateway": "192.0.2.1"}),
+        ("nexthop", "replace", {"id": MEMBER_ID_BASE + 1, "oif": 3, "proto": 52, "gateway": "198.51.100.1"}),
+        ("nexthop", "replace", {"id": 100, "group": ((MEMBER_ID_BASE, 1), (MEMBER_ID_BASE + 1, 3)), "proto": 52}),
+    ]
+    iproute.requests.clear()
+
+    # Nothing changed
+    apply_group(group, batch)
+    assert not iproute.requests
+
+    # Losing a gateway only changes the group
+    table.handle_route_remove_event(route_event("198.51.100.0/24"))
+    apply_group(group, batch)
+    assert iproute.requests == [
+        ("nexthop", "replace", {"id": 100, "group": ((MEMBER_ID_BASE, 1),), "proto": 52}),
+    ]
+    iproute.requests.clear()
+
+    # The kernel does not allow empty groups
+    table.handle_route_remove_event(route_event("192.0.2.0/24"))
+    apply_group(group, batch)
+    assert not group.installed
+    assert iproute.requests == [("nexthop", "delete", {"id": 100})]
+    iproute.requests.clear()
+
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    apply_group(group, batch)
+    assert iproute.requests == [
+        ("nexthop", "replace", {"id": 100, "group": ((MEMBER_ID_BASE, 1),), "proto": 52}),
+    ]
+    iproute.requests.clear()
+
+    # Removed members are deleted
+    del group.config.nexthop[1]
+    apply_group(group, batch)
+    assert iproute.requests == [("nexthop", "delete", {"id": MEMBER_ID_BASE + 1})]
+
+
+def test_group_routes(iproute, route_event):
+    table = TableEntity(iproute, 254, nexthop_groups={})
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    group = create_group(iproute, table)
+    table.nexthop_groups[group.id] = group
+
+    table.config = route_pb2.RouteTableConfig()
+    table.config.id = 254
+    route_config = table.config.route.add()
+    route_config.destination = "10.0.0.0/8"
+    route_config.nexthop_group = group.id
+
+    # Not insertable until the group is installed
+    table.apply()
+    assert not iproute.requests
+    assert table.group_routes == {100: {ip_network("10.0.0.0/8")}}
+
+    batch = iproute.batch()
+    apply_group(group, batch)
+    iproute.requests.clear()
+    table.apply_group_routes(group.id, batch)
+    batch.commit()
+    assert iproute.requests == [
+        ("route", "replace", {"table": 254, "dst": "10.0.0.0/8", "proto": 52, "nh_id": 100}),
+    ]
+
+    # Routes only carry the group ID outside of compatibility mode
+    table.handle_route_add_event(route_event("10.0.0.0/8", proto=52, RTA_NH_ID=100))
+    route = table.routes[ip_network("10.0.0.0/8")]
+    assert route.state.nexthop_group == 100
+    assert [(nexthop.gateway, nexthop.interface) for nexthop in route.state.nexthop] == [
+        ("192.0.2.1", "eth0"),
+    ]
+
+    message = route_pb2.RouteStateList()
+    table.to_message(message)
+    assert message.route[0].nexthop_group == 100
+
+
+def test_group_rejected(iproute, route_event):
+    table = TableEntity(iproute, 254, nexthop_groups={})
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("198.51.100.0/24", proto=2, scope=253, RTA_OIF=3))
+    group = create_group(iproute, table)
+    table.nexthop_groups[group.id] = group
+    table.config = route_pb2.RouteTableConfig()
+    table.config.id = 254
+    route_config = table.config.route.add()
+    route_config.destination = "10.0.0.0/8"
+    route_config.nexthop_group = group.id
+
+    # The routes carry the members while the kernel rejects the group
+    iproute.failures[MEMBER_ID_BASE + 1] = errno.EINVAL
+    iproute.failures[100] = errno.EINVAL
+    batch = iproute.batch()
+    apply_group(group, batch)
+    assert not group.installed
+    assert group.installed_members == {MEMBER_ID_BASE: 2}
+    table.apply()
+    assert iproute.get_requests("dst", "nh_id", "multipath")[-1] == (
+        "replace",
+        "10.0.0.0/8",
+        None,
+        [
+            {"oif": 2, "hops": 0, "gateway": "192.0.2.1"},
+            {"oif": 3, "hops": 2, "gateway": "198.51.100.1"},
+        ],
+    )
+    table.handle_route_add_event(route_event("10.0.0.0/8", proto=52, RTA_OIF=2))
+
+    # Both are requested again and the routes then use the group
+    iproute.failures.clear()
+    iproute.requests.clear()
+    apply_group(group, batch)
+    assert iproute.get_requests("id", "group", kind="nexthop") == [
+        ("replace", MEMBER_ID_BASE + 1, None),
+        ("replace", 100, ((MEMBER_ID_BASE, 1),)),
+        ("replace", 100, ((MEMBER_ID_BASE, 1), (MEMBER_ID_BASE + 1, 3))),
+    ]
+    assert group.installed
+    assert group.get_route_args() == {"nh_id": 100}
+    table.apply_group_routes(group.id, batch)
+    batch.commit()
+    assert iproute.get_requests("dst", "nh_id") == [("replace", "10.0.0.0/8", 100)]
+
+    # Routes carrying the members are removed once none is usable
+    iproute.failures[100] = errno.EINVAL
+    table.handle_route_remove_event(route_event("198.51.100.0/24"))
+    apply_group(group, batch)
+    assert group.multipath
+    table.apply_group_routes(group.id, batch)
+    batch.commit()
+    iproute.requests.clear()
+    table.handle_route_remove_event(route_event("192.0.2.0/24"))
+    apply_group(group, batch)
+    assert group.get_route_args() is None
+    table.apply_group_routes(group.id, batch)
+    batch.commit()
+    assert iproute.get_requests("dst") == [("delete", "10.0.0.0/8")]
+
+
+def test_group_member_pending(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("198.51.100.0/24", proto=2, scope=253, RTA_OIF=3))
+    group = create_group(iproute, table)
+    batch = iproute.batch()
+
+    # A rejected member is left out rather than failing the group
+    iproute.failures[MEMBER_ID_BASE + 1] = errno.EINVAL
+    apply_group(group, batch)
+    assert group.installed
+    assert group.active == ((MEMBER_ID_BASE, 1),)
+    iproute.failures.clear()
+    apply_group(group, batch)
+    assert group.active == ((MEMBER_ID_BASE, 1), (MEMBER_ID_BASE + 1, 3))
+    iproute.requests.clear()
+
+    # A member whose gateway moves to another interface leaves the group
+    # until its object is replaced
+    table.handle_route_add_event(route_event("198.51.100.0/24", proto=2, scope=253, RTA_OIF=2))
+    group.apply(batch)
+    batch.commit()
+    assert iproute.get_requests("id", "oif", "group", kind="nexthop") == [
+        ("replace", MEMBER_ID_BASE + 1, 2, None),
+        ("replace", 100, None, ((MEMBER_ID_BASE, 1),)),
+    ]
+    assert group.members_pending
+    iproute.requests.clear()
+    group.apply(batch)
+    batch.commit()
+    assert iproute.get_requests("id", "group", kind="nexthop") == [
+        ("replace", 100, ((MEMBER_ID_BASE, 1), (MEMBER_ID_BASE + 1, 3))),
+    ]
@@ -0,0 +1,243 @@
+"""
+tests/route/test_prefixlist.py
+"""
+
+import asyncio
+import errno
+from ipaddress import ip_address
+import socket
+
+from routesia.route.prefixlist import (
+    BlackholeRoutes,
+    aggregate,
+    aggregate_prefixes,
+    read_prefixes,
+    update_blackholes,
+)
+from routesia.schema.v1 import route_pb2
+
+
+def blackhole_message(destination, table=254):
+    address, prefixlen = destination.split("/")
+    return {
+        "family": socket.AF_INET6 if ":" in address else socket.AF_INET,
+        "dst_len": int(prefixlen),
+        "table": table,
+        "type": 6,
+        "attrs": [("RTA_TABLE", table), ("RTA_DST", address)],
+    }
+
+
+def test_read_prefixes():
+    networks, entries, invalid = read_prefixes(
+        [
+            "; Comment\n",
+            "\n",
+            "10.0.0.0/8 ; SBL1\n",
+            "192.0.2.1\n",
+            "198.51.100.7/24\n",
+            "2001:db8::/32 # Documentation\n",
+            "10.0.0.0/33\n",
+            "bogus\n",
+        ]
+    )
+    assert networks[socket.AF_INET] == [
+        0x0a000000 << 8 | 8,
+        0xc0000201 << 8 | 32,
+        # Host bits are cleared
+        0xc6336400 << 8 | 24,
+    ]
+    assert networks[socket.AF_INET6] == [0x20010db8 << 104 | 32]
+    assert entries == 4
+    assert invalid == 2
+
+
+def pack(network, prefixlen):
+    return network << 8 | prefixlen
+
+
+def test_aggregate():
+    assert aggregate(
+        [
+            pack(0x0a000100, 24),
+            pack(0x0a000000, 24),
+            pack(0x0a000200, 23),
+            # Covered by 10.0.0.0/22 once merged
+            pack(0x0a000280, 25),
+            pack(0x0a000400, 24),
+            pack(0x0a000400, 24),
+            pack(0x0b000000, 8),
+            pack(0x0b010000, 16),
+        ],
+        32,
+    ) == [
+        pack(0x0a000000, 22),
+        pack(0x0a000400, 24),
+        pack(0x0b000000, 8),
+    ]
+
+    # Halves of the whole space
+    assert aggregate([pack(0x80000000, 1), pack(0, 1)], 32) == [pack(0, 0)]
+
+    _, prefixes = aggregate_prefixes(
+        {
+            socket.AF_INET: [pack(0xc0000200, 25), pack(0xc0000280, 25)],
+            socket.AF_INET6: [pack(0x20010db8 << 96, 33), pack(0x20010db8 << 96 | 1 << 95, 33)],
+        }
+    )
+    assert prefixes == {"192.0.2.0/24", "2001:db8::/32"}
+
+
+def test_update_blackholes(iproute):
+    iproute.failures.update({"10.3.0.0/16": errno.ENOMEM, "10.1.0.0/16": errno.ESRCH})
+    installed, added, deleted, failed = update_blackholes(
+        iproute.bulk_batch(),
+        1000,
+        52,
+        {"10.0.0.0/16", "10.1.0.0/16"},
+        frozenset({"10.0.0.0/16", "10.2.0.0/16", "10.3.0.0/16"}),
+    )
+    requests = iproute.get_requests("table", "dst", kind="blackhole")
+    # Added before deleting
+    assert sorted(requests[:2]) == [
+        ("replace", 1000, "10.2.0.0/16"),
+        ("replace", 1000, "10.3.0.0/16"),
+    ]
+    assert requests[2:] == [("delete", 1000, "10.1.0.0/16")]
+    assert installed == {"10.0.0.0/16", "10.2.0.0/16"}
+    assert (added, deleted, failed) == (1, 1, 1)
+
+
+def create_blackholes(iproute, service, tmp_path, installed=()):
+    (tmp_path / "bogons").write_text("10.0.0.0/9\n10.128.0.0/9\n192.0.2.0/24\n")
+    (tmp_path / "abuse").write_text("10.1.2.0/24\n198.51.100.0/24\n")
+    config = route_pb2.RouteTableConfigList()
+    for name in ("bogons", "abuse"):
+        prefix_list = config.prefix_list.add()
+        prefix_list.name = name
+        prefix_list.path = str(tmp_path / name)
+    table = config.table.add()
+    table.id = 1000
+    table.blackhole_list.extend(["bogons", "abuse"])
+    iproute.installed.extend(installed)
+    blackholes = BlackholeRoutes(service, iproute)
+    blackholes.configure(config)
+    return blackholes, config
+
+
+def test_blackhole_routes(iproute, fake_service, tmp_path):
+    blackholes, config = create_blackholes(
+        iproute,
+        fake_service,
+        tmp_path,
+        [
+            blackhole_message("192.0.2.0/24", table=1000),
+            blackhole_message("203.0.113.0/24", table=1000),
+            blackhole_message("2001:db8::/32", table=254),
+        ],
+    )
+    asyncio.run(blackholes.run())
+    # Only the difference with the routes already installed is applied
+    assert sorted(iproute.get_requests("table", "dst", kind="blackhole")) == [
+        ("delete", 254, "2001:db8::/32"),
+        ("delete", 1000, "203.0.113.0/24"),
+        ("replace", 1000, "10.0.0.0/8"),
+        ("replace", 1000, "198.51.100.0/24"),
+    ]
+    assert blackholes.tables[1000].installed == {
+        "10.0.0.0/8",
+        "192.0.2.0/24",
+        "198.51.100.0/24",
+    }
+    assert not blackholes.tables[254].installed
+
+    # Unchanged files are not loaded again
+    iproute.requests.clear()
+    asyncio.run(blackholes.run())
+    assert not iproute.requests
+
+    (tmp_path / "abuse").write_text("203.0.113.0/24\n")
+    asyncio.run(blackholes.reload(["abuse"]))
+    assert sorted(iproute.get_requests("table", "dst", kind="blackhole")) == [
+        ("delete", 1000, "198.51.100.0/24"),
+        ("replace", 1000, "203.0.113.0/24"),
+    ]
+
+    # Removing the reference withdraws the routes
+    iproute.requests.clear()
+    del config.table[0].blackhole_list[:]
+    blackholes.configure(config)
+    asyncio.run(blackholes.run())
+    assert len(iproute.requests) == 3
+    assert not blackholes.tables[1000].installed
+
+    states = route_pb2.RoutePrefixListStateList()
+    blackholes.to_message(states)
+    assert [(state.name, state.entries, state.prefixes) for state in states.prefix_list] == [
+        ("bogons", 3, 2),
+        ("abuse", 1, 1),
+    ]
+
+
+def test_missing_file_keeps_prefixes(iproute, fake_service, tmp_path):
+    blackholes, _ = create_blackholes(iproute, fake_service, tmp_path)
+    asyncio.run(blackholes.run())
+    # 10.1.2.0/24 is covered by the other list
+    assert len(blackholes.tables[1000].installed) == 3
+
+    (tmp_path / "abuse").unlink()
+    iproute.requests.clear()
+    asyncio.run(blackholes.reload())
+    assert not iproute.requests
+    assert blackholes.prefix_lists["abuse"].error
+
+
+def test_reconcile_blackholes(iproute, fake_service, tmp_path):
+    blackholes, _ = create_blackholes(iproute, fake_service, tmp_path)
+    asyncio.run(blackholes.run())
+    iproute.requests.clear()
+
+    missing, stale = asyncio.run(
+        blackholes.reconcile(
+            {
+                1000: {"10.0.0.0/8", "198.51.100.0/24", "203.0.113.0/24"},
+                100: {"192.0.2.0/24"},
+            }
+        )
+    )
+    assert sorted(iproute.get_requests("table", "dst", kind="blackhole")) == [
+        ("delete", 100, "192.0.2.0/24"),
+        ("delete", 1000, "203.0.113.0/24"),
+        ("replace", 1000, "192.0.2.0/24"),
+    ]
+    assert (missing, stale) == (1, 2)
+
+
+def test_lookup_blackholes(iproute, fake_service, tmp_path):
+    blackholes, _ = create_blackholes(iproute, fake_service, tmp_path)
+    asyncio.run(blackholes.run())
+
+    result = route_pb2.RouteLookupResult()
+    blackholes.lookup(1000, ip_address("10.1.2.3"), result)
+    assert result.found
+    assert result.blackhole
+    assert result.destination == "10.0.0.0/8"
+
+    # A more specific route is kept
+    result = route_pb2.RouteLookupResult(found=True, destination="10.1.0.0/16")
+    result.nexthop.add().interface = "eth0"
+    blackholes.lookup(1000, ip_address("10.1.2.3"), result)
+    assert not result.blackhole
+    assert result.destination == "10.1.0.0/16"
+
+    result = route_pb2.RouteLookupResult(found=True, destination="0.0.0.0/0")
+    result.nexthop.add().interface = "eth0"
+    blackholes.lookup(1000, ip_address("198.51.100.7"), result)
+    assert result.blackhole
+    assert result.destination == "198.51.100.0/24"
+    assert not result.nexthop
+
+    result = route_pb2.RouteLookupResult()
+    blackholes.lookup(254, ip_address("10.1.2.3"), result)
+    blackholes.lookup(1000, ip_address("2001:db8::1"), result)
+    assert not result.found
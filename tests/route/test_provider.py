@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from routesia.route.provider import RouteProvider
+from routesia.rpc import RPCInvalidArgument
+from routesia.schema.v1 import route_pb2
+from routesia.schema.v1.config_pb2 import Config
+
+
+class FakeConfig:
+    def __init__(self):
+        self.data = Config()
+        self.staged_data = Config()
+        self.staged_generation = 0
+        table = self.staged_data.route.table.add()
+        table.id = 254
+        table.name = "main"
+
+    def register_init_config_handler(self, handler):
+        pass
+
+    def register_change_handler(self, handler):
+        pass
+
+
+class FakeRPC:
+    def register(self, method, handler):
+        pass
+
+
+@pytest.fixture
+def provider(iproute, fake_service):
+    return RouteProvider(fake_service, iproute, FakeConfig(), FakeRPC())
+
+
+def route_message(destination, gateway=""):
+    msg = route_pb2.RouteTableConfig()
+    route = msg.route.add()
+    route.destination = destination
+    if gateway:
+        route.nexthop.add().gateway = gateway
+    return msg
+
+
+def get_destinations(provider):
+    return [route.destination for route in provider.config.staged_data.route.table[0].route]
+
+
+def test_staged_routes(provider):
+    async def run():
+        for i in range(4):
+            await provider.rpc_add_route(route_message(f"10.0.{i}.0/24"))
+        with pytest.raises(RPCInvalidArgument):
+            await provider.rpc_add_route(route_message("10.0.1.0/24"))
+
+        await provider.rpc_delete_route(route_message("10.0.1.0/24"))
+        await provider.rpc_update_route(route_message("10.0.3.0/24", "192.0.2.1"))
+
+        assert get_destinations(provider) == ["10.0.0.0/24", "10.0.2.0/24", "10.0.3.0/24"]
+        result = await provider.rpc_get_route(route_message("10.0.3.0/24"))
+        assert result.route[0].nexthop[0].gateway == "192.0.2.1"
+        with pytest.raises(RPCInvalidArgument):
+            await provider.rpc_get_route(route_message("10.0.1.0/24"))
+
+    asyncio.run(run())
+
+
+def test_staged_routes_replaced(provider):
+    async def run():
+        await provider.rpc_add_route(route_message("10.0.0.0/24"))
+
+        # Dropping the staged config replaces it as a whole
+        table = provider.config.staged_data.route.table[0]
+        del table.route[0]
+        table.route.add().destination = "10.0.1.0/24"
+        provider.config.staged_generation += 1
+
+        with pytest.raises(RPCInvalidArgument):
+            await provider.rpc_add_route(route_message("10.0.1.0/24"))
+        with pytest.raises(RPCInvalidArgument):
+            await provider.rpc_get_route(route_message("10.0.0.0/24"))
+
+    asyncio.run(run())
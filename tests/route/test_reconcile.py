@@ -0,0 +1,133 @@
+"""
+tests/route/test_reconcile.py
+"""
+
+import asyncio
+import socket
+from ipaddress import ip_network
+
+from routesia.route.entities import TableEntity
+from routesia.route.reconcile import InstalledRoute, RouteReconciler, route_matches
+from routesia.schema.v1 import route_pb2
+
+
+def route_message(destination, table=254, route_type=1, **attrs):
+    destination = ip_network(destination)
+    message = {
+        "family": socket.AF_INET if destination.version == 4 else socket.AF_INET6,
+        "dst_len": destination.prefixlen,
+        "table": table,
+        "type": route_type,
+        "attrs": [("RTA_TABLE", table)] + list(attrs.items()),
+    }
+    if destination.prefixlen:
+        message["attrs"].append(("RTA_DST", str(destination.network_address)))
+    return message
+
+
+def create_reconciler(iproute, service, route_event, routes, installed):
+    "Create a reconciler for a table with a route to each destination via its gateway"
+    config = route_pb2.RouteTableConfig()
+    config.id = 254
+    for destination, gateway in routes:
+        route = config.route.add()
+        route.destination = destination
+        route.nexthop.add().gateway = gateway
+    iproute.installed.extend(installed)
+    table = TableEntity(iproute, 254, config=config)
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.apply()
+    iproute.requests.clear()
+    return RouteReconciler(service, iproute, {254: table})
+
+
+def test_installed_route():
+    route = InstalledRoute.from_message(route_message("0.0.0.0/0", table=1000, RTA_GATEWAY="192.0.2.1"))
+    assert route.table == 1000
+    assert route.destination == "0.0.0.0/0"
+    assert route.default_priority
+    assert route.get_delete_args(52) == {"table": 1000, "dst": "0.0.0.0/0", "proto": 52}
+
+    route = InstalledRoute.from_message(route_message("2001:db8::/32", RTA_PRIORITY=1024))
+    assert route.destination == "2001:db8::/32"
+    assert route.default_priority
+
+
+def test_route_matches():
+    kwargs = {"table": 254, "dst": "10.0.0.0/8", "gateway": "2001:DB8::1"}
+    assert route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_GATEWAY="2001:db8::1", RTA_OIF=2)))
+    assert not route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_GATEWAY="2001:db8::2")))
+    assert not route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_OIF=2)))
+
+    kwargs["oif"] = 3
+    assert not route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_GATEWAY="2001:db8::1", RTA_OIF=2)))
+
+    kwargs = {"table": 254, "dst": "10.0.0.0/8", "multipath": [{"gateway": "192.0.2.1"}, {"oif": 2}]}
+    multipath = [
+        {"oif": 2, "attrs": [("RTA_GATEWAY", "192.0.2.1")]},
+        {"oif": 2, "attrs": []},
+    ]
+    assert route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_MULTIPATH=multipath)))
+    assert not route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_MULTIPATH=multipath[:1])))
+
+    # Compatibility mode adds the nexthops of the group
+    kwargs = {"table": 254, "dst": "10.0.0.0/8", "nh_id": 1}
+    assert route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_NH_ID=1, RTA_GATEWAY="192.0.2.1")))
+    assert not route_matches(kwargs, InstalledRoute.from_message(route_message("10.0.0.0/8", RTA_NH_ID=2)))
+
+
+def test_reconcile(iproute, fake_service, route_event):
+    reconciler = create_reconciler(
+        iproute,
+        fake_service,
+        route_event,
+        [
+            ("10.0.0.0/8", "192.0.2.1"),
+            ("10.1.0.0/16", "192.0.2.1"),
+            ("10.2.0.0/16", "192.0.2.1"),
+            ("10.3.0.0/16", "192.0.2.1"),
+            # Not insertable
+            ("10.4.0.0/16", "198.51.100.1"),
+        ],
+        [
+            route_message("10.0.0.0/8", RTA_GATEWAY="192.0.2.1"),
+            route_message("10.1.0.0/16", RTA_GATEWAY="192.0.2.2"),
+            route_message("10.3.0.0/16", RTA_GATEWAY="192.0.2.1"),
+            route_message("10.3.0.0/16", RTA_GATEWAY="192.0.2.1", RTA_PRIORITY=100),
+            route_message("10.4.0.0/16", RTA_GATEWAY="198.51.100.1"),
+            route_message("172.16.0.0/12", table=1000, RTA_OIF=2),
+        ],
+    )
+    asyncio.run(reconciler.run())
+
+    assert sorted(iproute.get_requests("table", "dst", "priority")) == [
+        ("delete", 254, "10.3.0.0/16", 100),
+        ("delete", 254, "10.4.0.0/16", None),
+        ("delete", 1000, "172.16.0.0/12", None),
+        ("replace", 254, "10.1.0.0/16", None),
+        ("replace", 254, "10.2.0.0/16", None),
+    ]
+    stats = route_pb2.RouteReconcileStats()
+    reconciler.to_message(stats)
+    assert stats.runs == 1
+    assert stats.checked == 4
+    assert stats.missing == 1
+    assert stats.changed == 1
+    assert stats.stale == 3
+    assert stats.last_drift == 5
+
+
+def test_reconcile_no_drift(iproute, fake_service, route_event):
+    reconciler = create_reconciler(
+        iproute,
+        fake_service,
+        route_event,
+        [("10.0.0.0/8", "192.0.2.1")],
+        [route_message("10.0.0.0/8", RTA_GATEWAY="192.0.2.1", RTA_OIF=2)],
+    )
+    asyncio.run(reconciler.run())
+    assert not iproute.requests
+    assert reconciler.last_drift == 0
+    # Taken as installed by us so it is deleted with its config
+    route = reconciler.tables[254].routes[ip_network("10.0.0.0/8")]
+    assert route.route_args["gateway"] == "192.0.2.1"
@@ -0,0 +1,106 @@
+"""
+tests/route/test_store.py
+"""
+
+from ipaddress import ip_address, ip_network
+
+from routesia.route.entities import TableEntity
+from routesia.route.store import RouteStore
+from routesia.schema.v1 import route_pb2
+
+
+def test_add_remove():
+    store = RouteStore(100)
+    store.add(ip_network("10.0.0.0/8"), 186, 0, "", (("192.0.2.1", "eth0"),))
+    store.add(ip_network("2001:db8::/32"), 186, 0, "", (("fe80::1", "eth0"),))
+    assert len(store) == 2
+    assert ip_network("10.0.0.0/8") in store
+    assert ip_network("10.0.0.0/16") not in store
+    assert set(store) == {ip_network("10.0.0.0/8"), ip_network("2001:db8::/32")}
+
+    assert store.remove(ip_network("10.0.0.0/8"))
+    assert not store.remove(ip_network("10.0.0.0/8"))
+    assert len(store) == 1
+
+    # The free slot is reused
+    store.add(ip_network("10.1.0.0/16"), 2, 253, "192.0.2.10", (("", "eth1"),))
+    assert len(store.info) == 2
+
+
+def test_nexthops_interned():
+    store = RouteStore(100)
+    store.add(ip_network("10.0.0.0/24"), 186, 0, "", (("192.0.2.1", "eth0"),))
+    store.add(ip_network("10.0.1.0/24"), 186, 0, "", (("192.0.2.1", "eth0"),))
+    assert store.info[0] is store.info[1]
+
+
+def test_state():
+    store = RouteStore(100)
+    store.add(
+        ip_network("10.0.0.0/8"),
+        186,
+        0,
+        "192.0.2.10",
+        (("192.0.2.1", "eth0"), ("192.0.2.2", "eth1")),
+    )
+    state = store.get_state(ip_network("10.0.0.0/8"))
+    assert state.present
+    assert state.table_id == 100
+    assert state.destination == "10.0.0.0/8"
+    assert state.protocol == 186
+    assert state.preferred_source == "192.0.2.10"
+    assert [(nexthop.gateway, nexthop.interface) for nexthop in state.nexthop] == [
+        ("192.0.2.1", "eth0"),
+        ("192.0.2.2", "eth1"),
+    ]
+    assert list(store.states()) == [state]
+
+    assert store.pop_state(ip_network("10.0.0.0/8")) == state
+    assert store.get_state(ip_network("10.0.0.0/8")) is None
+
+
+def test_table_observed_routes(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("10.0.0.0/8", RTA_GATEWAY="192.0.2.1", RTA_OIF=2))
+    assert not table.routes
+    assert len(table.observed) == 2
+
+    nexthop = route_pb2.RouteNextHop()
+    nexthop.gateway = "192.0.2.1"
+    assert table.nexthop_accessible(nexthop)
+    nexthop.interface = "eth1"
+    assert not table.nexthop_accessible(nexthop)
+
+    message = route_pb2.RouteStateList()
+    table.to_message(message)
+    assert [route.destination for route in message.route] == ["192.0.2.0/24", "10.0.0.0/8"]
+
+    table.handle_route_remove_event(route_event("10.0.0.0/8"))
+    assert len(table.observed) == 1
+
+
+def test_table_configured_route_takes_observed_state(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("10.0.0.0/8", RTA_GATEWAY="192.0.2.1", RTA_OIF=2))
+
+    route = table.create_route(ip_network("10.0.0.0/8"))
+    assert route.state.present
+    assert route.state.nexthop[0].gateway == "192.0.2.1"
+    assert not table.observed
+
+
+def test_table_index(iproute, route_event):
+    table = TableEntity(iproute, 254)
+    table.handle_route_add_event(route_event("10.0.0.0/8", proto=2, scope=253, RTA_OIF=3))
+    table.handle_route_add_event(route_event("10.1.0.0/16", RTA_GATEWAY="10.0.0.1", RTA_OIF=3))
+    configured = table.create_route(ip_network("192.0.2.0/24"))
+    configured.handle_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+    table.handle_route_add_event(route_event("192.0.2.0/24", proto=2, scope=253, RTA_OIF=2))
+
+    assert table.gateway_accessible(ip_address("192.0.2.1"))
+    assert table.gateway_accessible(ip_address("10.1.2.3"))
+    assert not table.gateway_accessible(ip_address("198.51.100.1"))
+
+    table.handle_route_remove_event(route_event("192.0.2.0/24"))
+    assert not table.gateway_accessible(ip_address("192.0.2.1"))
@@ -0,0 +1,166 @@
+"""
+tests/route/test_trie.py
+"""
+
+from ipaddress import ip_address, ip_network
+import random
+
+from routesia.route.trie import GatewayIndex, PrefixTrie, RouteIndex
+
+
+def test_covering():
+    index = RouteIndex()
+    index.add(ip_network("0.0.0.0/0"), (("192.0.2.1", "eth0"),))
+    index.add(ip_network("10.0.0.0/8"), (("", "eth0"),))
+    index.add(ip_network("10.1.0.0/16"), (("", "eth1"),))
+    index.add(ip_network("10.2.0.0/16"), (("", "eth1"),))
+    index.add(ip_network("::/0"), (("fe80::1", "eth0"),))
+    assert len(index) == 5
+
+    assert [str(destination) for destination, _ in index.covering(ip_address("10.1.2.3"))] == [
+        "10.1.0.0/16",
+        "10.0.0.0/8",
+        "0.0.0.0/0",
+    ]
+    assert [str(destination) for destination, _ in index.covering(ip_address("2001:db8::1"))] == ["::/0"]
+    assert index.lookup(ip_address("10.2.0.1")) == (ip_network("10.2.0.0/16"), (("", "eth1"),))
+    assert index.lookup(ip_address("192.0.2.1")) == (ip_network("0.0.0.0/0"), (("192.0.2.1", "eth0"),))
+
+
+def test_remove():
+    index = RouteIndex()
+    index.add(ip_network("10.0.0.0/8"), (("", "eth0"),))
+    index.add(ip_network("10.1.0.0/16"), (("", "eth1"),))
+    assert index.lookup(ip_address("10.1.0.1"))[0] == ip_network("10.1.0.0/16")
+
+    assert index.remove(ip_network("10.1.0.0/16"))
+    assert not index.remove(ip_network("10.1.0.0/16"))
+    assert not index.remove(ip_network("10.0.0.0/9"))
+    assert index.lookup(ip_address("10.1.0.1"))[0] == ip_network("10.0.0.0/8")
+
+    assert index.remove(ip_network("10.0.0.0/8"))
+    assert index.lookup(ip_address("10.1.0.1")) is None
+    assert not index
+
+
+def test_replace():
+    index = RouteIndex()
+    index.add(ip_network("2001:db8::/32"), (("fe80::1", "eth0"),))
+    index.add(ip_network("2001:db8::/32"), (("fe80::2", "eth1"),))
+    assert len(index) == 1
+    assert index.lookup(ip_address("2001:db8::1"))[1] == (("fe80::2", "eth1"),)
+
+
+def test_random():
+    rng = random.Random(0)
+    trie = PrefixTrie(32)
+    reference = {}
+
+    for _ in range(5000):
+        # Keep to a small range so prefixes overlap
+        key = rng.getrandbits(8) << 24 | rng.getrandbits(4) << 20
+        length = rng.randint(0, 32)
+        key = trie.mask(key, length)
+        if rng.random() < 0.6:
+            trie.insert(key, length, (key, length))
+            reference[key, length] = (key, length)
+        else:
+            assert trie.remove(key, length) == ((key, length) in reference)
+            reference.pop((key, length), None)
+
+    assert len(trie) == len(reference)
+    assert sorted(value for _, _, value in trie) == sorted(reference.values())
+    # Nodes that hold no prefix only branch, so there are fewer of them
+    assert len(trie.values) - len(trie.free_nodes) <= 2 * len(reference) + 1
+
+    for _ in range(1000):
+        address = rng.getrandbits(8) << 24 | rng.getrandbits(24)
+        expected = sorted(
+            (
+                (key, length)
+                for key, length in reference
+                if trie.mask(address, length) == key
+            ),
+            key=lambda prefix: -prefix[1],
+        )
+        assert [value for _, _, value in trie.covering(address)] == expected
+
+        length = rng.randint(0, 32)
+        network = trie.mask(address, length)
+        assert sorted(value for _, _, value in trie.within(network, length)) == sorted(
+            (key, prefix_length)
+            for key, prefix_length in reference
+            if prefix_length >= length and trie.mask(key, length) == network
+        )
+
+
+def test_gateway_index():
+    index = GatewayIndex()
+    index.add(ip_address("192.0.2.1"), ip_network("10.0.0.0/8"))
+    index.add(ip_address("192.0.2.1"), ip_network("10.1.0.0/16"))
+    index.add(ip_address("192.0.2.200"), ip_network("172.16.0.0/12"))
+    index.add(ip_address("2001:db8::1"), ip_network("2001:db8:1::/48"))
+
+    assert set(index.dependents(ip_network("192.0.2.0/25"))) == {
+        ip_network("10.0.0.0/8"),
+        ip_network("10.1.0.0/16"),
+    }
+    assert set(index.dependents(ip_network("0.0.0.0/0"))) == {
+        ip_network("10.0.0.0/8"),
+        ip_network("10.1.0.0/16"),
+        ip_network("172.16.0.0/12"),
+    }
+    assert set(index.dependents(ip_network("2001:db8::/32"))) == {ip_network("2001:db8:1::/48")}
+    assert not set(index.dependents(ip_network("198.51.100.0/24")))
+
+    index.remove(ip_address("192.0.2.1"), ip_network("10.0.0.0/8"))
+    index.remove(ip_address("192.0.2.1"), ip_network("10.1.0.0/16"))
+    assert list(index.dependents(ip_network("192.0.2.0/24"))) == [ip_network("172.16.0.0/12")]
+    assert not index.tries[4].get(int(ip_address("192.0.2.1")), 32)
+
+
+def test_load():
+    rng = random.Random(0)
+    inserted = PrefixTrie(32)
+    prefixes = {}
+    for _ in range(5000):
+        length = rng.randint(0, 32)
+        key = inserted.mask(rng.getrandbits(8) << 24 | rng.getrandbits(4) << 20, length)
+        prefixes[key, length] = (key, length)
+        inserted.insert(key, length, (key, length))
+
+    loaded = PrefixTrie(32)
+    loaded.load((key, length, value) for (key, length), value in sorted(prefixes.items()))
+    assert len(loaded) == len(inserted)
+    assert sorted(loaded) == sorted(inserted)
+    assert len(loaded.values) == len(inserted.values)
+
+    for _ in range(1000):
+        address = rng.getrandbits(8) << 24 | rng.getrandbits(24)
+        assert list(loaded.covering(address)) == list(inserted.covering(address))
+
+    # Loaded tries support later changes
+    for key, length in list(prefixes)[:100]:
+        assert loaded.remove(key, length)
+        inserted.remove(key, length)
+    assert sorted(loaded) == sorted(inserted)
+
+
+def test_pending():
+    index = RouteIndex()
+    index.add(ip_network("10.0.0.0/8"), (("", "eth0"),))
+    index.add(ip_network("10.1.0.0/16"), (("", "eth1"),))
+    assert not len(index.tries[4])
+
+    # Removals are checked against pending changes
+    assert index.remove(ip_network("10.1.0.0/16"))
+    assert not index.remove(ip_network("10.1.0.0/16"))
+    assert index.lookup(ip_address("10.1.0.1"))[0] == ip_network("10.0.0.0/8")
+    assert not index.pending[4]
+
+    # And against the trie once applied
+    index.add(ip_network("10.2.0.0/16"), (("", "eth1"),))
+    assert index.remove(ip_network("10.0.0.0/8"))
+    assert not index.remove(ip_network("10.3.0.0/16"))
+    assert index.lookup(ip_address("10.1.0.1")) is None
+    assert len(index) == 1
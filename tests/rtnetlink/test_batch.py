@@ -0,0 +1,238 @@
+import errno
+import socket
+from threading import Thread
+
+from pyroute2.netlink import NLM_F_ACK, NLM_F_CREATE, NLM_F_REPLACE, NLM_F_REQUEST, NLMSG_ERROR
+from pyroute2.netlink.rtnl import RTM_DELROUTE, RTM_NEWADDR, RTM_NEWROUTE
+
+from routesia.rtnetlink.batch import NLMSG_ERROR_CODE, NLMSG_HEADER, NetlinkBatch
+from routesia.rtnetlink.messages import (
+    RTM_DELNEXTHOP,
+    RTM_NEWNEXTHOP,
+    Marshal,
+    unpack_nexthop_group,
+)
+
+
+def fake_kernel(sock, writes, failures):
+    """
+    Acknowledge each request in ``writes`` datagrams that asks for it,
+    failing those whose sequence number is in ``failures`` with the given
+    errno.
+    """
+    received = []
+    for _ in range(writes):
+        data = sock.recv(65536)
+        messages = list(Marshal().parse(data))
+        received.append(messages)
+        acks = []
+        for message in messages:
+            sequence_number = message["header"]["sequence_number"]
+            code = -failures.get(sequence_number, 0)
+            if not code and not message["header"]["flags"] & NLM_F_ACK:
+                continue
+            acks.append(get_ack(sequence_number, code))
+        sock.send(b"".join(acks))
+    return received
+
+
+def get_ack(sequence_number, code=0):
+    return (
+        NLMSG_HEADER.pack(
+            NLMSG_HEADER.size + NLMSG_ERROR_CODE.size + NLMSG_HEADER.size,
+            NLMSG_ERROR,
+            0,
+            sequence_number,
+            0,
+        )
+        + NLMSG_ERROR_CODE.pack(code)
+        + NLMSG_HEADER.pack(0, 0, 0, 0, 0)
+    )
+
+
+def run_batch(batch, writes, failures, send=None):
+    received = []
+    kernel = Thread(target=lambda: received.extend(fake_kernel(batch.kernel, writes, failures)))
+    kernel.start()
+    errors = send() if send else batch.commit()
+    kernel.join()
+    return errors, received
+
+
+def create_batch(**kwargs):
+    sock, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.settimeout(5)
+    batch = NetlinkBatch(sock, **kwargs)
+    batch.kernel = kernel
+    return batch
+
+
+def test_encoding():
+    batch = create_batch()
+    batch.route("replace", dst="10.1.0.0/16", table=1000, proto=52, gateway="192.0.2.1", oif=2)
+    batch.route("delete", dst="10.2.0.0/24", table=100)
+    batch.addr("add", index=2, address="192.0.2.10", prefixlen=24, flags=0x200, proto=52)
+
+    errors, received = run_batch(batch, 1, {})
+    assert errors == []
+    assert len(received) == 1
+    replace, delete, addr = received[0]
+
+    assert replace["header"]["type"] == RTM_NEWROUTE
+    assert replace["header"]["flags"] == NLM_F_REQUEST | NLM_F_ACK | NLM_F_CREATE | NLM_F_REPLACE
+    assert replace["family"] == socket.AF_INET
+    assert replace["dst_len"] == 16
+    # Tables beyond the header field are given by RTA_TABLE
+    assert replace["table"] == 252
+    assert replace.get_attr("RTA_TABLE") == 1000
+    assert replace.get_attr("RTA_DST") == "10.1.0.0"
+    assert replace.get_attr("RTA_GATEWAY") == "192.0.2.1"
+    assert replace.get_attr("RTA_OIF") == 2
+
+    assert delete["header"]["type"] == RTM_DELROUTE
+    assert delete["table"] == 100
+
+    assert addr["header"]["type"] == RTM_NEWADDR
+    assert addr["flags"] == 0
+    assert addr.get_attr("IFA_FLAGS") == 0x200
+    assert addr.get_attr("IFA_LOCAL") == "192.0.2.10"
+    assert addr.get_attr("IFA_PROTO") == 52
+
+
+def test_nexthop_encoding():
+    batch = create_batch()
+    batch.nexthop("replace", id=1, gateway="192.0.2.1", oif=2, proto=52)
+    batch.nexthop("replace", id=2, gateway="2001:db8::1", oif=2, proto=52)
+    batch.nexthop("replace", id=10, group=[(1, 1), (2, 3)], proto=52)
+    batch.route("replace", dst="10.0.0.0/8", proto=52, nh_id=10)
+    batch.nexthop("delete", id=1)
+
+    errors, received = run_batch(batch, 1, {})
+    assert errors == []
+    member, member6, group, route, delete = received[0]
+
+    assert member["header"]["type"] == RTM_NEWNEXTHOP
+    assert member["header"]["flags"] == NLM_F_REQUEST | NLM_F_ACK | NLM_F_CREATE | NLM_F_REPLACE
+    assert member["family"] == socket.AF_INET
+    assert member["protocol"] == 52
+    assert member.get_attr("NHA_ID") == 1
+    assert member.get_attr("NHA_GATEWAY") == socket.inet_pton(socket.AF_INET, "192.0.2.1")
+    assert member.get_attr("NHA_OIF") == 2
+
+    assert member6["family"] == socket.AF_INET6
+    assert member6.get_attr("NHA_GATEWAY") == socket.inet_pton(socket.AF_INET6, "2001:db8::1")
+
+    assert group["family"] == socket.AF_UNSPEC
+    assert group.get_attr("NHA_ID") == 10
+    assert unpack_nexthop_group(group.get_attr("NHA_GROUP")) == [(1, 1), (2, 3)]
+
+    assert route.get_attr("RTA_NH_ID") == 10
+    assert route.get_attr("RTA_GATEWAY") is None
+
+    assert delete["header"]["type"] == RTM_DELNEXTHOP
+    assert delete.get_attr("NHA_ID") == 1
+
+
+def test_blackhole_encoding():
+    batch = create_batch()
+    failed, received = run_batch(
+        batch, 1, {}, lambda: batch.send_blackholes("replace", ["10.1.0.0/16"], 1000, 52)
+    )
+    assert failed == []
+    (replace,), = received
+    failed, received = run_batch(
+        batch, 1, {}, lambda: batch.send_blackholes("delete", ["2001:db8::/32"], 254, 52)
+    )
+    assert failed == []
+    (delete,), = received
+
+    assert replace["header"]["type"] == RTM_NEWROUTE
+    # Acknowledged as the last request of the write
+    assert replace["header"]["flags"] == NLM_F_REQUEST | NLM_F_ACK | NLM_F_CREATE | NLM_F_REPLACE
+    assert replace["header"]["sequence_number"] == 1
+    assert replace["family"] == socket.AF_INET
+    assert replace["dst_len"] == 16
+    assert replace["table"] == 252
+    assert replace["proto"] == 52
+    assert replace["type"] == 6
+    assert replace.get_attr("RTA_TABLE") == 1000
+    assert replace.get_attr("RTA_DST") == "10.1.0.0"
+
+    assert delete["header"]["type"] == RTM_DELROUTE
+    assert delete["header"]["sequence_number"] == 2
+    assert delete["family"] == socket.AF_INET6
+    assert delete["dst_len"] == 32
+    assert delete["table"] == 254
+    assert delete["scope"] == 255
+    assert delete["type"] == 6
+    assert delete.get_attr("RTA_DST") == "2001:db8::"
+
+
+def test_acks():
+    batch = create_batch()
+    results = []
+    for i in range(4):
+        batch.route(
+            "add",
+            dst=f"10.0.{i}.0/24",
+            oif=2,
+            callback=lambda error, i=i: results.append((i, error)),
+        )
+
+    errors, received = run_batch(batch, 1, {2: errno.EEXIST})
+    assert [error.code for error in errors] == [errno.EEXIST]
+    assert [i for i, _ in results] == [0, 1, 2, 3]
+    assert [error and error.code for _, error in results] == [None, errno.EEXIST, None, None]
+    assert len(batch) == 0
+
+
+def test_unacknowledged():
+    batch = create_batch(max_write=160)
+    destinations = [f"10.0.{i}.0/24" for i in range(6)]
+    failed, received = run_batch(
+        batch,
+        2,
+        {2: errno.ENOMEM, 5: errno.ENOMEM},
+        lambda: batch.send_blackholes("replace", destinations, 254, 52),
+    )
+    assert [len(messages) for messages in received] == [3, 3]
+    # Only the last request of each write asks for an acknowledgement
+    assert [
+        bool(message["header"]["flags"] & NLM_F_ACK) for messages in received for message in messages
+    ] == [False, False, True] * 2
+    assert [(destination, error.code) for destination, error in failed] == [
+        ("10.0.1.0/24", errno.ENOMEM),
+        ("10.0.4.0/24", errno.ENOMEM),
+    ]
+
+
+def test_max_write():
+    batch = create_batch(max_write=160)
+    results = []
+    for i in range(10):
+        batch.route("add", dst=f"10.0.{i}.0/24", oif=2, callback=results.append)
+
+    errors, received = run_batch(batch, 4, {})
+    assert errors == []
+    assert results == [None] * 10
+    assert [len(messages) for messages in received] == [3, 3, 3, 1]
+    # Sequence numbers continue across writes
+    assert [
+        message["header"]["sequence_number"] for messages in received for message in messages
+    ] == list(range(1, 11))
+
+
+def test_nonblocking():
+    batch = create_batch()
+    batch.sock.setblocking(False)
+    results = []
+    for i in range(3):
+        batch.route("add", dst=f"10.0.{i}.0/24", oif=2, callback=results.append)
+
+    # The kernel has acknowledged the write by the time it returns. The
+    # last acknowledgement was dropped and is not waited for.
+    batch.kernel.send(get_ack(1) + get_ack(2, -errno.EEXIST))
+    errors = batch.commit()
+    assert [error.code for error in errors] == [errno.EEXIST, errno.ENOBUFS]
+    assert [error and error.code for error in results] == [None, errno.EEXIST, errno.ENOBUFS]
+    assert batch.sock.gettimeout() == 0.0
@@ -0,0 +1,190 @@
+import errno
+import socket
+from threading import Thread
+
+from pyroute2.netlink import NLM_F_DUMP, NLM_F_MULTI, NLM_F_REQUEST, NLMSG_DONE
+from pyroute2.netlink.rtnl import RTM_GETROUTE, RTM_NEWROUTE
+from pyroute2.netlink.rtnl.marshal import MarshalRtnl
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.rtnetlink.batch import NLMSG_ERROR_CODE, NLMSG_HEADER
+from routesia.rtnetlink.dump import (
+    RTM_F_FIB_MATCH,
+    RTM_F_LOOKUP_TABLE,
+    decode_route_summary,
+    dump_route_summaries,
+    dump_routes,
+    get_route_destination,
+    get_route_table,
+    lookup_routes,
+)
+from routesia.rtnetlink import messages
+
+
+def encode_route(sequence_number, destination, table, proto):
+    message = rtmsg()
+    message["header"]["type"] = RTM_NEWROUTE
+    message["header"]["flags"] = NLM_F_MULTI
+    message["header"]["sequence_number"] = sequence_number
+    message["family"] = socket.AF_INET
+    message["dst_len"] = 24
+    message["table"] = table if table < 256 else 252
+    message["proto"] = proto
+    message["attrs"] = [("RTA_TABLE", table), ("RTA_DST", destination)]
+    message.encode()
+    return bytes(message.data[:message["header"]["length"]])
+
+
+def fake_kernel(sock, routes, requests):
+    """
+    Answer a route dump with ``routes`` regardless of its filters, as kernels
+    without strict checking do.
+    """
+    request = list(MarshalRtnl().parse(sock.recv(65536)))[0]
+    requests.append(request)
+    sequence_number = request["header"]["sequence_number"]
+    sock.send(b"".join(encode_route(sequence_number, *route) for route in routes))
+    # Replies to other requests are ignored
+    sock.send(encode_route(sequence_number + 1, "10.9.9.0", 254, 52))
+    sock.send(NLMSG_HEADER.pack(20, NLMSG_DONE, NLM_F_MULTI, sequence_number, 0) + bytes(4))
+
+
+def run_dump(routes, dump_fn=dump_routes, **kwargs):
+    sock, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.settimeout(5)
+    requests = []
+    thread = Thread(target=fake_kernel, args=(kernel, routes, requests))
+    thread.start()
+    replies = list(dump_fn(sock, 7, **kwargs))
+    thread.join()
+    sock.close()
+    kernel.close()
+    return requests[0], [(dict(reply["attrs"])["RTA_DST"], get_route_table(reply)) for reply in replies]
+
+
+ROUTES = [
+    ("10.0.0.0", 254, 2),
+    ("10.0.1.0", 1000, 186),
+    ("10.0.2.0", 1000, 52),
+    ("10.0.3.0", 100, 52),
+]
+
+
+def test_dump_routes():
+    request, routes = run_dump(ROUTES)
+    assert request["header"]["type"] == RTM_GETROUTE
+    assert request["header"]["flags"] == NLM_F_REQUEST | NLM_F_DUMP
+    assert request["header"]["sequence_number"] == 7
+    assert request.get_attr("RTA_TABLE") is None
+    assert routes == [(destination, table) for destination, table, _ in ROUTES]
+
+
+def test_dump_routes_table():
+    request, routes = run_dump(ROUTES, table=1000)
+    assert request["table"] == 252
+    assert request.get_attr("RTA_TABLE") == 1000
+    assert routes == [("10.0.1.0", 1000), ("10.0.2.0", 1000)]
+
+
+def test_dump_routes_proto():
+    request, routes = run_dump(ROUTES, proto=52)
+    assert request["proto"] == 52
+    assert routes == [("10.0.2.0", 1000), ("10.0.3.0", 100)]
+
+
+def test_dump_route_summaries():
+    request, routes = run_dump(ROUTES, dump_route_summaries, proto=52)
+    assert request["proto"] == 52
+    assert routes == [("10.0.2.0", 1000), ("10.0.3.0", 100)]
+
+
+def test_decode_route_summary():
+    message = messages.rtmsg()
+    message["header"]["type"] = RTM_NEWROUTE
+    message["family"] = socket.AF_INET6
+    message["dst_len"] = 32
+    message["table"] = 252
+    message["proto"] = 52
+    message["attrs"] = [
+        ("RTA_TABLE", 1000),
+        ("RTA_DST", "2001:db8::"),
+        ("RTA_PRIORITY", 1024),
+        ("RTA_NH_ID", 100),
+        (
+            "RTA_MULTIPATH",
+            [
+                {"oif": 2, "hops": 0, "flags": 0, "attrs": [("RTA_GATEWAY", "fe80::1")]},
+                {"oif": 3, "hops": 1, "flags": 0, "attrs": []},
+            ],
+        ),
+        ("RTA_PREF", 0),
+    ]
+    message.encode()
+    data = bytes(message.data[:message["header"]["length"]])
+
+    summary = decode_route_summary(data, NLMSG_HEADER.size, len(data))
+    assert summary["family"] == socket.AF_INET6
+    assert summary["dst_len"] == 32
+    assert summary["proto"] == 52
+    assert get_route_table(summary) == 1000
+    attrs = dict(summary["attrs"])
+    assert attrs["RTA_DST"] == "2001:db8::"
+    assert attrs["RTA_PRIORITY"] == 1024
+    assert attrs["RTA_NH_ID"] == 100
+    assert "RTA_PREF" not in attrs
+    assert [(nexthop["oif"], nexthop["hops"], nexthop["attrs"]) for nexthop in attrs["RTA_MULTIPATH"]] == [
+        (2, 0, [("RTA_GATEWAY", "fe80::1")]),
+        (3, 1, []),
+    ]
+
+
+def lookup_kernel(sock, writes, requests):
+    """
+    Answer route lookups with a route to the /24 of each address in table
+    100, failing those to 10.0.2.x with ENETUNREACH. Replies to each write
+    are sent in reverse.
+    """
+    for _ in range(writes):
+        received = list(MarshalRtnl().parse(sock.recv(65536)))
+        requests.append(received)
+        for request in reversed(received):
+            sequence_number = request["header"]["sequence_number"]
+            destination = request.get_attr("RTA_DST")
+            if destination.startswith("10.0.2."):
+                sock.send(
+                    NLMSG_HEADER.pack(36, 2, 0, sequence_number, 0)
+                    + NLMSG_ERROR_CODE.pack(-errno.ENETUNREACH)
+                    + NLMSG_HEADER.pack(0, 0, 0, 0, 0)
+                )
+                continue
+            network = destination.rsplit(".", 1)[0] + ".0"
+            sock.send(encode_route(sequence_number, network, 100, 2))
+
+
+def test_lookup_routes():
+    sock, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.settimeout(5)
+    requests = []
+    thread = Thread(target=lookup_kernel, args=(kernel, 2, requests))
+    thread.start()
+    addresses = ["10.0.0.1", "10.0.1.1", "10.0.2.1", "10.0.3.1"]
+    replies = list(lookup_routes(sock, addresses, max_write=80))
+    thread.join()
+    sock.close()
+    kernel.close()
+
+    assert [len(received) for received in requests] == [2, 2]
+    request = requests[0][0]
+    assert request["header"]["type"] == RTM_GETROUTE
+    assert request["header"]["flags"] == NLM_F_REQUEST
+    assert request["dst_len"] == 32
+    assert request["flags"] == RTM_F_FIB_MATCH | RTM_F_LOOKUP_TABLE
+
+    # In the order of the addresses
+    assert [address for address, _ in replies] == addresses
+    assert [
+        (get_route_destination(reply), get_route_table(reply))
+        for _, reply in replies
+        if isinstance(reply, dict)
+    ] == [("10.0.0.0/24", 100), ("10.0.1.0/24", 100), ("10.0.3.0/24", 100)]
+    assert replies[2][1].code == errno.ENETUNREACH
@@ -0,0 +1,123 @@
+from ipaddress import ip_interface, ip_network
+import pickle
+import socket
+
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.rtnetlink.events import AddressAddEvent, InterfaceAddEvent, RouteAddEvent
+
+
+def route_message(destination=None, dst_len=24):
+    attrs = [("RTA_TABLE", 254), ("RTA_OIF", 2)]
+    if destination:
+        attrs.append(("RTA_DST", destination))
+    return {
+        "family": socket.AF_INET,
+        "dst_len": dst_len,
+        "tos": 0,
+        "table": 254,
+        "attrs": attrs,
+    }
+
+
+def address_message(address, local=None):
+    attrs = [("IFA_ADDRESS", address)]
+    if local:
+        attrs.append(("IFA_LOCAL", local))
+    return {
+        "index": 2,
+        "family": socket.AF_INET,
+        "prefixlen": 24,
+        "scope": 0,
+        "attrs": attrs,
+    }
+
+
+def test_route_lazy():
+    event = RouteAddEvent(None, route_message("10.0.0.0"))
+
+    assert not hasattr(event, "__dict__")
+    assert event.get_dispatch_key() == (
+        "route", 254, socket.AF_INET, "10.0.0.0", 24, 0, 0,
+    )
+    # Routing the event does not decode the attributes
+    assert event._attrs is None
+
+    assert event.destination == ip_network("10.0.0.0/24")
+    assert event.attrs["RTA_OIF"] == 2
+
+
+def test_route_default():
+    event = RouteAddEvent(None, route_message(dst_len=0))
+
+    assert event.destination == ip_network("0.0.0.0/0")
+
+
+def test_address(iproute):
+    event = AddressAddEvent(iproute, address_message("10.0.0.1"))
+
+    assert event.ifname == "eth0"
+    assert event.ip == ip_interface("10.0.0.1/24")
+    assert event.peer is None
+
+    event = AddressAddEvent(
+        iproute, address_message("10.0.0.2", local="10.0.0.1")
+    )
+
+    assert event.ip == ip_interface("10.0.0.1/24")
+    assert event.peer == ip_interface("10.0.0.2/24")
+
+
+def test_pickle():
+    message = rtmsg()
+    message["family"] = socket.AF_INET
+    message["dst_len"] = 24
+    message["tos"] = 0
+    message["table"] = 254
+    message["attrs"] = [("RTA_TABLE", 254), ("RTA_DST", "10.0.0.0")]
+    event = RouteAddEvent(None, message)
+    event.published_time = 1.0
+
+    loaded = pickle.loads(pickle.dumps(event))
+
+    assert loaded.published_time == 1.0
+    assert loaded.destination == ip_network("10.0.0.0/24")
+    assert loaded.get_dispatch_key() == event.get_dispatch_key()
+
+
+def test_unpickle_unslotted_state():
+    # State as pickled before events were slotted
+    event = RouteAddEvent.__new__(RouteAddEvent)
+    event.__setstate__(
+        {
+            "message": route_message("10.0.0.0"),
+            "attrs": {"RTA_DST": "10.0.0.0"},
+            "family": socket.AF_INET,
+            "table": 254,
+            "destination": ip_network("10.0.0.0/24"),
+        }
+    )
+
+    assert event.destination == ip_network("10.0.0.0/24")
+    assert event.attrs["RTA_OIF"] == 2
+
+
+def test_interface_rename_lane(iproute):
+    before = InterfaceAddEvent(None, {"index": 2, "ifi_type": 1, "attrs": [("IFLA_IFNAME", "eth2")]})
+    after = InterfaceAddEvent(None, {"index": 2, "ifi_type": 1, "attrs": [("IFLA_IFNAME", "wan")]})
+    address = AddressAddEvent(iproute, address_message("10.0.0.1"))
+
+    # Coalesced together, so they must also be handled in order
+    assert before.get_coalesce_key() == after.get_coalesce_key()
+    assert before.get_dispatch_key() == after.get_dispatch_key() == address.get_dispatch_key()
+
+
+def test_route_metric_key():
+    message = route_message("10.0.0.0")
+    message["attrs"].append(("RTA_PRIORITY", 100))
+
+    # Routes to the same prefix with another metric are separate routes
+    assert (
+        RouteAddEvent(None, message).get_coalesce_key()
+        != RouteAddEvent(None, route_message("10.0.0.0")).get_coalesce_key()
+    )
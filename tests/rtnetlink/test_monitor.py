@@ -0,0 +1,88 @@
+import socket
+
+from pyroute2.netlink.rtnl import RTM_NEWROUTE, RTNLGRP_IPV4_ROUTE, RTNLGRP_LINK
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.rtnetlink.monitor import NetlinkMonitor
+
+
+def encode_route(destination, proto=0, route_type=1):
+    message = rtmsg()
+    message["family"] = socket.AF_INET
+    message["dst_len"] = 24
+    message["table"] = 254
+    message["proto"] = proto
+    message["type"] = route_type
+    message["attrs"] = [("RTA_TABLE", 254), ("RTA_DST", destination)]
+    message["header"]["type"] = RTM_NEWROUTE
+    message.encode()
+    return bytes(message.data)
+
+
+def test_read():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = NetlinkMonitor(sock=receiver)
+
+    assert monitor.read() == []
+
+    sender.send(encode_route("10.0.0.0"))
+    # Several messages in one datagram
+    sender.send(encode_route("10.0.1.0") + encode_route("10.0.2.0"))
+
+    messages = monitor.read()
+    assert [message["event"] for message in messages] == ["RTM_NEWROUTE"] * 3
+    assert [message.get_attr("RTA_DST") for message in messages] == [
+        "10.0.0.0",
+        "10.0.1.0",
+        "10.0.2.0",
+    ]
+    assert monitor.read() == []
+
+    sender.close()
+    monitor.close()
+
+
+def test_read_ignored_routes():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = NetlinkMonitor(sock=receiver, ignored_routes=[(52, 6)])
+
+    sender.send(encode_route("10.0.0.0", proto=52, route_type=6))
+    sender.send(
+        encode_route("10.0.1.0", proto=52, route_type=6)
+        + encode_route("10.0.2.0", proto=52)
+        + encode_route("10.0.3.0", proto=52, route_type=6)
+        + encode_route("10.0.4.0", route_type=6)
+    )
+
+    messages = monitor.read()
+    assert [message.get_attr("RTA_DST") for message in messages] == ["10.0.2.0", "10.0.4.0"]
+
+    sender.close()
+    monitor.close()
+
+
+def test_read_max_reads():
+    sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    monitor = NetlinkMonitor(sock=receiver, max_reads=2)
+
+    for i in range(3):
+        sender.send(encode_route(f"10.0.{i}.0"))
+
+    assert len(monitor.read()) == 2
+    assert len(monitor.read()) == 1
+
+    sender.close()
+    monitor.close()
+
+
+def test_set_groups():
+    monitor = NetlinkMonitor(groups=[RTNLGRP_LINK])
+    assert monitor.groups == {RTNLGRP_LINK}
+
+    monitor.set_groups([RTNLGRP_LINK, RTNLGRP_IPV4_ROUTE])
+    assert monitor.groups == {RTNLGRP_LINK, RTNLGRP_IPV4_ROUTE}
+
+    monitor.set_groups([RTNLGRP_IPV4_ROUTE])
+    assert monitor.groups == {RTNLGRP_IPV4_ROUTE}
+
+    monitor.close()
@@ -0,0 +1,278 @@
+import asyncio
+import socket
+
+from pyroute2.netlink.rtnl import (
+    RTNLGRP_IPV4_ROUTE,
+    RTNLGRP_IPV6_ROUTE,
+    RTNLGRP_LINK,
+    RTNLGRP_NEIGH,
+    RTM_NEWROUTE,
+)
+from pyroute2.netlink.rtnl.marshal import MarshalRtnl
+from pyroute2.netlink.rtnl.rtmsg import rtmsg
+
+from routesia.rtnetlink.events import (
+    AddressAddEvent,
+    AddressEvent,
+    InterfaceAddEvent,
+    NeighbourEvent,
+    RouteAddEvent,
+    RouteEvent,
+    RouteRemoveEvent,
+)
+from routesia.rtnetlink.provider import ROUTE_KEY, IPRouteProvider, get_fingerprint
+
+
+def link_message(index, name, mtu=1500):
+    return {
+        "event": "RTM_NEWLINK",
+        "header": {"sequence_number": 0},
+        "index": index,
+        "ifi_type": 1,
+        "change": 0,
+        "attrs": [("IFLA_IFNAME", name), ("IFLA_MTU", mtu), ("IFLA_STATS64", {"rx_packets": 0})],
+    }
+
+
+def address_message(index, address):
+    return {
+        "event": "RTM_NEWADDR",
+        "header": {"sequence_number": 0},
+        "index": index,
+        "family": socket.AF_INET,
+        "prefixlen": 24,
+        "scope": 0,
+        "attrs": [("IFA_ADDRESS", address)],
+    }
+
+
+def route_message(destination, oif, metric=None, table=254, proto=3):
+    attrs = [("RTA_TABLE", table), ("RTA_DST", destination), ("RTA_OIF", oif)]
+    if metric is not None:
+        attrs.append(("RTA_PRIORITY", metric))
+    return {
+        "event": "RTM_NEWROUTE",
+        "header": {"sequence_number": 0},
+        "family": socket.AF_INET,
+        "dst_len": 24,
+        "tos": 0,
+        "table": table if table < 256 else 252,
+        "proto": proto,
+        "type": 1,
+        "attrs": attrs,
+    }
+
+
+def get_routes(provider):
+    "Return the table, priority and destination of each route in the provider's state"
+    routes = set()
+    for key in provider.kernel_state["route"]:
+        table, priority, _, family, _ = ROUTE_KEY.unpack_from(key)
+        routes.add((table, priority, socket.inet_ntop(family, key[ROUTE_KEY.size:])))
+    return routes
+
+
+def create_provider(service, iproute):
+    provider = IPRouteProvider(service)
+    provider.iproute = iproute.iproute
+    return service, provider
+
+
+def test_fingerprint_ignores_volatile():
+    message = link_message(1, "eth0")
+    other = link_message(1, "eth0")
+    other["header"] = {"sequence_number": 10}
+    other["attrs"][2] = ("IFLA_STATS64", {"rx_packets": 10})
+    assert get_fingerprint(message) == get_fingerprint(other)
+
+    assert get_fingerprint(message) != get_fingerprint(link_message(1, "eth0", mtu=9000))
+
+
+def test_resync(fake_service, iproute):
+    service, provider = create_provider(fake_service, iproute)
+    provider.iproute.links = [link_message(1, "eth0")]
+    provider.iproute.routes = [
+        route_message("10.0.0.0", 1),
+        route_message("10.0.1.0", 1),
+        route_message("10.0.2.0", 1),
+        route_message("10.0.4.0", 1, metric=100),
+        route_message("10.0.4.0", 1, metric=200),
+    ]
+    service.subscribed.add(RouteEvent)
+    provider.update_kinds()
+    assert len(service.events) == 6
+
+    # One route changes, one is removed, one is added, and the rest is
+    # unchanged apart from volatile fields. Routes differing only in metric
+    # are distinct.
+    service.events = []
+    provider.iproute.links = [link_message(1, "eth0")]
+    provider.iproute.links[0]["attrs"][2] = ("IFLA_STATS64", {"rx_packets": 10})
+    provider.iproute.routes = [
+        route_message("10.0.0.0", 1),
+        route_message("10.0.1.0", 2),
+        route_message("10.0.3.0", 1),
+        route_message("10.0.4.0", 1, metric=200),
+    ]
+    asyncio.run(provider.resync())
+
+    events = [
+        (type(event), str(event.destination), event.get_attr("RTA_PRIORITY"))
+        for event in service.events
+    ]
+    assert events[:2] == [
+        (RouteAddEvent, "10.0.1.0/24", None),
+        (RouteAddEvent, "10.0.3.0/24", None),
+    ]
+    assert sorted(events[2:]) == [
+        (RouteRemoveEvent, "10.0.2.0/24", None),
+        (RouteRemoveEvent, "10.0.4.0/24", 100),
+    ]
+    assert get_routes(provider) == {
+        (254, 0, "10.0.0.0"),
+        (254, 0, "10.0.1.0"),
+        (254, 0, "10.0.3.0"),
+        (254, 200, "10.0.4.0"),
+    }
+    assert provider.resyncs == 1
+
+
+def test_resync_skips_removed_interface(fake_service, iproute):
+    service, provider = create_provider(fake_service, iproute)
+    provider.iproute.links = [link_message(1, "eth0")]
+    service.subscribed.add(AddressEvent)
+    provider.update_kinds()
+    service.events = []
+
+    # An address of an interface removed since the links were dumped
+    provider.iproute.addresses = [address_message(2, "192.0.2.1"), address_message(1, "192.0.2.2")]
+    asyncio.run(provider.resync())
+    assert [(type(event), str(event.ip)) for event in service.events] == [
+        (AddressAddEvent, "192.0.2.2/24"),
+    ]
+
+
+def test_update_kinds(fake_service, iproute):
+    service, provider = create_provider(fake_service, iproute)
+    provider.iproute.links = [link_message(1, "eth0")]
+    provider.iproute.routes = [route_message("10.0.0.0", 1)]
+
+    # Interfaces are always followed
+    provider.update_kinds()
+    assert provider.kinds == {"interface"}
+    assert provider.monitor.groups == {RTNLGRP_LINK}
+    assert [type(event) for event in service.events] == [InterfaceAddEvent]
+
+    service.events = []
+    service.subscribed.add(RouteRemoveEvent)
+    provider.update_kinds()
+    assert provider.kinds == {"interface", "route"}
+    assert provider.monitor.groups == {RTNLGRP_LINK, RTNLGRP_IPV4_ROUTE, RTNLGRP_IPV6_ROUTE}
+    assert [type(event) for event in service.events] == [RouteAddEvent]
+
+    service.subscribed = {NeighbourEvent}
+    provider.update_kinds()
+    assert provider.kinds == {"interface", "neighbour"}
+    assert provider.monitor.groups == {RTNLGRP_LINK, RTNLGRP_NEIGH}
+    assert not provider.kernel_state["route"]
+
+    provider.monitor.close()
+
+
+def test_overflow_resyncs(fake_service, iproute):
+    service, provider = create_provider(fake_service, iproute)
+    provider.iproute.links = [link_message(1, "eth0")]
+    provider.kinds = {"interface"}
+    provider.monitor.overflowed = True
+
+    async def overflow():
+        provider.handle_monitor()
+        await provider.resync_task
+        provider.stop()
+
+    asyncio.run(overflow())
+    assert not provider.monitor.overflowed
+    assert [type(event) for event in service.events] == [InterfaceAddEvent]
+    assert provider.resyncs == 1
+
+
+def fake_dump_routes(routes):
+    def dump_routes(table=None, proto=None, sock=None):
+        return [
+            message
+            for message in routes
+            if (table is None or message["attrs"][0][1] == table)
+            and (proto is None or message["proto"] == proto)
+        ]
+    return dump_routes
+
+
+def test_set_route_tables(fake_service, iproute):
+    service, provider = create_provider(fake_service, iproute)
+    routes = [
+        route_message("10.0.0.0", 1),
+        route_message("10.0.1.0", 1, table=1000),
+        route_message("10.0.2.0", 1, table=1000, proto=52),
+        route_message("10.0.3.0", 1, table=100),
+    ]
+    provider.iproute.routes = routes
+    provider.dump_routes = fake_dump_routes(routes)
+    provider.set_route_tables({254})
+    service.subscribed.add(RouteEvent)
+    provider.update_kinds()
+    assert [str(event.destination) for event in service.events if isinstance(event, RouteEvent)] == [
+        "10.0.0.0/24",
+        "10.0.2.0/24",
+    ]
+
+    # Notifications for other tables are dropped
+    service.events = []
+    for message in (
+        route_message("10.0.4.0", 1, table=1000),
+        route_message("10.0.5.0", 1, table=1000, proto=52),
+        route_message("10.0.6.0", 1),
+    ):
+        routes.append(message)
+        provider.handle_message(message)
+    assert [str(event.destination) for event in service.events] == ["10.0.5.0/24", "10.0.6.0/24"]
+
+    # Newly followed tables are dumped in a resync and others forgotten
+    service.events = []
+
+    async def change_tables():
+        provider.set_route_tables({100, 1000})
+        await provider.resync_task
+
+    asyncio.run(change_tables())
+    assert sorted((event.table, str(event.destination)) for event in service.events) == [
+        (100, "10.0.3.0/24"),
+        (1000, "10.0.1.0/24"),
+        (1000, "10.0.4.0/24"),
+    ]
+    assert sorted(table for table, _, _ in get_routes(provider)) == [100, 1000, 1000, 1000, 1000]
+
+    provider.monitor.close()
+
+
+def parse_route(sequence_number, metric, expires):
+    message = rtmsg()
+    message["header"]["type"] = RTM_NEWROUTE
+    message["header"]["sequence_number"] = sequence_number
+    message["family"] = socket.AF_INET
+    message["dst_len"] = 24
+    message["table"] = 254
+    message["attrs"] = [
+        ("RTA_DST", "10.0.0.0"),
+        ("RTA_CACHEINFO", {"rta_expires": expires}),
+        ("RTA_PRIORITY", metric),
+    ]
+    message.encode()
+    return list(MarshalRtnl().parse(bytes(message.data[:message["header"]["length"]])))[0]
+
+
+def test_route_fingerprint():
+    # Hashed from the raw message, skipping the header and cache info
+    message = parse_route(1, 100, 0)
+    assert message.data is not None
+    assert get_fingerprint(message) == get_fingerprint(parse_route(2, 100, 500))
+    assert get_fingerprint(message) != get_fingerprint(parse_route(1, 200, 0))
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from routesia.blockingexecutor import BlockingExecutor
+
+
+async def test_run():
+    executor = BlockingExecutor()
+
+    def add(a, b=0):
+        return a + b, threading.current_thread()
+
+    result, thread = await executor.run("foo", add, 1, b=2)
+    assert result == 3
+    assert thread is not threading.current_thread()
+
+    stats = executor.stats["foo"]
+    assert stats.calls == 1
+    assert stats.pending == 0
+    assert stats.duration.count == 1
+    executor.shutdown()
+
+
+async def test_lane_serialized():
+    executor = BlockingExecutor()
+    calls = []
+
+    def call(i):
+        calls.append(("start", i))
+        time.sleep(0.01)
+        calls.append(("end", i))
+
+    await asyncio.gather(*[executor.run("foo", call, i) for i in range(3)])
+    assert calls == [(event, i) for i in range(3) for event in ("start", "end")]
+    executor.shutdown()
+
+
+async def test_lanes_parallel():
+    executor = BlockingExecutor()
+    barrier = threading.Barrier(2, timeout=1)
+
+    # Deadlocks unless both lanes run at the same time
+    await asyncio.gather(
+        executor.run("foo", barrier.wait),
+        executor.run("bar", barrier.wait),
+    )
+    executor.shutdown()
+
+
+async def test_exception():
+    executor = BlockingExecutor()
+
+    def fail():
+        raise ValueError("foo")
+
+    with pytest.raises(ValueError):
+        await executor.run("foo", fail)
+    assert executor.stats["foo"].exceptions == 1
+    assert executor.stats["foo"].calls == 1
+    executor.shutdown()
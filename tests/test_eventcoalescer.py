@@ -0,0 +1,83 @@
+import asyncio
+from dataclasses import dataclass
+
+from routesia.event import Event
+from routesia.eventcoalescer import EventCoalescer
+
+
+@dataclass
+class StateEvent(Event):
+    key: str
+    value: int
+
+    def get_coalesce_key(self):
+        return self.key
+
+
+@dataclass
+class StateRemoveEvent(StateEvent):
+    is_removal = True
+
+
+@dataclass
+class OtherEvent(Event):
+    value: int
+
+
+async def test_coalesce_latest():
+    flushed = []
+    coalescer = EventCoalescer(0.01, flushed.extend)
+
+    passthrough = coalescer.process([
+        StateEvent("foo", 1),
+        StateEvent("bar", 1),
+        OtherEvent(1),
+        StateEvent("foo", 2),
+    ])
+
+    assert passthrough == [OtherEvent(1)]
+    assert flushed == []
+
+    await asyncio.sleep(0.02)
+
+    assert flushed == [StateEvent("foo", 2), StateEvent("bar", 1)]
+    assert coalescer.coalesced == 1
+    assert len(coalescer) == 0
+
+
+async def test_coalesce_add_remove_cancel():
+    flushed = []
+    coalescer = EventCoalescer(0.01, flushed.extend)
+
+    coalescer.process([StateEvent("foo", 1), StateRemoveEvent("foo", 2)])
+    coalescer.flush()
+
+    # Only the removal is passed on
+    assert flushed == [StateRemoveEvent("foo", 2)]
+    assert coalescer.coalesced == 1
+    assert coalescer.cancelled == 1
+    assert coalescer.held == {}
+
+
+async def test_coalesce_remove_existing():
+    flushed = []
+    coalescer = EventCoalescer(0.01, flushed.extend)
+
+    coalescer.process([StateEvent("foo", 1)])
+    coalescer.flush()
+
+    # The object existed before the window, so the removal must be passed on
+    coalescer.process([StateEvent("foo", 2), StateRemoveEvent("foo", 3)])
+    coalescer.flush()
+
+    assert flushed == [StateEvent("foo", 1), StateRemoveEvent("foo", 3)]
+
+
+async def test_coalesce_remove_unknown():
+    flushed = []
+    coalescer = EventCoalescer(0.01, flushed.extend)
+
+    coalescer.process([StateRemoveEvent("foo", 1)])
+    coalescer.flush()
+
+    assert flushed == [StateRemoveEvent("foo", 1)]
@@ -0,0 +1,139 @@
+import asyncio
+from dataclasses import dataclass
+
+from routesia.event import Event, PRIORITY_BULK, PRIORITY_CONTROL
+from routesia.eventdispatcher import EventDispatcher
+
+
+@dataclass
+class KeyedEvent(Event):
+    key: str
+    value: int
+
+    def get_dispatch_key(self):
+        return self.key
+
+
+class ControlEvent(KeyedEvent):
+    priority = PRIORITY_CONTROL
+
+
+class BulkEvent(KeyedEvent):
+    priority = PRIORITY_BULK
+
+
+async def test_lane_order():
+    received = []
+
+    async def handler(event):
+        # Yield so other lanes can interleave
+        await asyncio.sleep(0)
+        received.append((event.key, event.value))
+
+    dispatcher = EventDispatcher(handler, max_tasks=4)
+    for i in range(10):
+        dispatcher.dispatch(KeyedEvent("foo", i))
+        dispatcher.dispatch(KeyedEvent("bar", i))
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    assert [value for key, value in received if key == "foo"] == list(range(10))
+    assert [value for key, value in received if key == "bar"] == list(range(10))
+    assert dispatcher.pending == 0
+    assert not dispatcher.lanes
+
+
+async def test_max_tasks():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(event):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+
+    dispatcher = EventDispatcher(handler, max_tasks=3)
+    dispatcher.dispatch_many([KeyedEvent(str(i), i) for i in range(20)])
+
+    assert len(dispatcher.tasks) == 3
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    assert max_in_flight == 3
+    assert dispatcher.pending == 0
+
+
+async def test_lane_batch_yields_slot():
+    received = []
+
+    async def handler(event):
+        received.append(event.key)
+
+    dispatcher = EventDispatcher(handler, max_tasks=1, lane_batch=2)
+    dispatcher.dispatch_many([KeyedEvent("foo", i) for i in range(4)])
+    dispatcher.dispatch(KeyedEvent("bar", 0))
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    assert received == ["foo", "foo", "bar", "foo", "foo"]
+
+
+async def test_handler_exception():
+    received = []
+
+    async def handler(event):
+        if event.value == 0:
+            raise ValueError("foo")
+        received.append(event.value)
+
+    dispatcher = EventDispatcher(handler)
+    dispatcher.dispatch_many([KeyedEvent("foo", i) for i in range(3)])
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    assert received == [1, 2]
+
+
+async def test_priority():
+    received = []
+
+    async def handler(event):
+        received.append(event.key)
+
+    dispatcher = EventDispatcher(handler, max_tasks=1)
+    dispatcher.dispatch_many(
+        [
+            BulkEvent("bulk", 0),
+            KeyedEvent("state", 0),
+            ControlEvent("control", 0),
+        ]
+    )
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    assert received == ["control", "state", "bulk"]
+
+
+async def test_priority_starvation():
+    received = []
+
+    async def handler(event):
+        received.append(event.key)
+
+    dispatcher = EventDispatcher(handler, max_tasks=1, starvation_limit=2)
+    dispatcher.dispatch_many(
+        [BulkEvent("bulk", 0)] + [ControlEvent(f"control{i}", i) for i in range(6)]
+    )
+
+    while dispatcher.tasks:
+        await asyncio.sleep(0)
+
+    # The bulk lane is passed over twice before getting a worker
+    assert received.index("bulk") == 2
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+import gzip
+import threading
+
+import pytest
+
+from routesia.event import Event
+from routesia.eventlog import EventLogException, EventRecorder, read_event_log
+
+
+@dataclass
+class RecordedEvent(Event):
+    key: str
+    value: int
+
+
+@dataclass
+class UnpicklableEvent(Event):
+    lock: object
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "events.log"
+    recorder = EventRecorder(str(path))
+    for i in range(100):
+        recorder.record(RecordedEvent("a", i))
+    recorder.close()
+
+    entries = list(read_event_log(str(path)))
+    assert [event for _, event in entries] == [RecordedEvent("a", i) for i in range(100)]
+    times = [timestamp for timestamp, _ in entries]
+    assert times == sorted(times)
+
+
+def test_unpicklable_skipped(tmp_path):
+    path = tmp_path / "events.log"
+    recorder = EventRecorder(str(path))
+    recorder.record(RecordedEvent("a", 1))
+    recorder.record(UnpicklableEvent(threading.Lock()))
+    recorder.record(RecordedEvent("a", 2))
+    recorder.close()
+
+    assert recorder.recorded == 2
+    assert [event for _, event in read_event_log(str(path))] == [
+        RecordedEvent("a", 1),
+        RecordedEvent("a", 2),
+    ]
+
+
+def test_truncated(tmp_path):
+    path = tmp_path / "events.log"
+    recorder = EventRecorder(str(path))
+    for i in range(10):
+        recorder.record(RecordedEvent("a", i))
+    recorder.close()
+
+    with gzip.open(path, "rb") as f:
+        data = f.read()
+    with gzip.open(path, "wb") as f:
+        f.write(data[:-3])
+
+    assert [event for _, event in read_event_log(str(path))] == [
+        RecordedEvent("a", i) for i in range(9)
+    ]
+
+
+def test_not_event_log(tmp_path):
+    path = tmp_path / "events.log"
+    with gzip.open(path, "wb") as f:
+        f.write(b"garbage")
+
+    with pytest.raises(EventLogException):
+        list(read_event_log(str(path)))
@@ -1,4 +1,5 @@
 from selectors import DefaultSelector, EVENT_READ
+from threading import Thread
 import pytest
 
 from routesia.eventqueue import EventQueue
@@ -71,3 +72,118 @@ def test_multiple_items():
 
     events = selector.select(timeout=0.01)
     assert len(events) == 0
+
+
+def test_batch_get_many():
+    queue = EventQueue(batch=True)
+    queue.put("foo")
+    queue.put("bar")
+    queue.put("baz")
+
+    assert queue.get_many() == ["foo", "bar", "baz"]
+    assert len(queue) == 0
+    assert queue.get_many() == []
+
+
+def test_batch_get_many_limit():
+    queue = EventQueue(batch=True)
+    selector = DefaultSelector()
+    selector.register(queue, EVENT_READ)
+
+    queue.put("foo")
+    queue.put("bar")
+
+    assert queue.get_many(1) == ["foo"]
+
+    # The remaining item keeps the queue readable
+    events = selector.select(timeout=0.01)
+    assert len(events) == 1
+
+    assert queue.get_many(1) == ["bar"]
+
+    events = selector.select(timeout=0.01)
+    assert len(events) == 0
+
+
+def test_batch_single_signal():
+    queue = EventQueue(batch=True)
+    selector = DefaultSelector()
+    selector.register(queue, EVENT_READ)
+
+    for i in range(100):
+        queue.put(i)
+
+    events = selector.select(timeout=0.01)
+    assert len(events) == 1
+
+    assert queue.drain() == list(range(100))
+
+    events = selector.select(timeout=0.01)
+    assert len(events) == 0
+
+
+def test_priorities():
+    queue = EventQueue(batch=True, priorities=3)
+    queue.put("bulk", 2)
+    queue.put("state", 1)
+    queue.put("control", 0)
+    queue.put("control2", 0)
+
+    assert len(queue) == 4
+    assert queue.get() == "control"
+    assert queue.get_many() == ["control2", "state", "bulk"]
+
+
+def test_priorities_get_many_limit():
+    queue = EventQueue(batch=True, priorities=2)
+    selector = DefaultSelector()
+    selector.register(queue, EVENT_READ)
+
+    queue.put("bar", 1)
+    queue.put("baz", 1)
+    queue.put("foo", 0)
+
+    assert queue.get_many(2) == ["foo", "bar"]
+
+    # The remaining lower priority item keeps the queue readable
+    events = selector.select(timeout=0.01)
+    assert len(events) == 1
+
+    assert queue.get_many() == ["baz"]
+
+
+def test_batch_get_empty():
+    queue = EventQueue(batch=True)
+
+    with pytest.raises(BlockingIOError):
+        queue.get()
+
+
+def test_semaphore_get_many():
+    queue = EventQueue()
+    queue.put("foo")
+    queue.put("bar")
+
+    assert queue.get_many() == ["foo", "bar"]
+
+    with pytest.raises(BlockingIOError):
+        queue.get()
+
+
+def test_batch_threaded_producer():
+    queue = EventQueue(batch=True)
+    selector = DefaultSelector()
+    selector.register(queue, EVENT_READ)
+    count = 100000
+
+    thread = Thread(target=lambda: [queue.put(i) for i in range(count)])
+    thread.start()
+
+    items = []
+    while len(items) < count:
+        events = selector.select(timeout=1)
+        assert events, "Lost wakeup"
+        items.extend(queue.drain())
+    thread.join()
+
+    assert items == list(range(count))
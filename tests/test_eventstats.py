@@ -0,0 +1,45 @@
+from routesia.eventstats import EventStats, Histogram
+from routesia.schema.v1 import event_pb2
+
+
+def test_histogram():
+    histogram = Histogram((1, 10, 100))
+    for value in (0, 1, 5, 50, 500):
+        histogram.record(value)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == 556
+
+
+def test_event_stats_message():
+    class FooEvent:
+        pass
+
+    async def handler(event):
+        pass
+
+    stats = EventStats()
+    stats.published = 2
+    stats.record_queue_depth(5)
+    stats.record_queue_depth(3)
+    class_stats = stats.get_event_class_stats(FooEvent)
+    class_stats.handled += 1
+    class_stats.dispatch_delay.record(0.001)
+    subscriber_stats = stats.get_subscriber_stats(FooEvent, handler)
+    subscriber_stats.calls += 1
+    subscriber_stats.latency.record(0.002)
+
+    assert stats.get_subscriber_stats(FooEvent, handler) is subscriber_stats
+
+    message = event_pb2.EventStats()
+    stats.to_message(message)
+
+    assert message.published == 2
+    assert message.max_queue_depth == 5
+    assert message.queue_depth_histogram.count == 2
+    assert message.event_class[0].event_class.endswith("FooEvent")
+    assert message.event_class[0].handled == 1
+    assert message.subscriber[0].subscriber.endswith("handler")
+    assert message.subscriber[0].calls == 1
+    assert message.subscriber[0].latency.count == 1
@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+
+from routesia.event import Event
+from routesia.eventsubscription import EventRoute, Subscription
+
+
+@dataclass
+class FooEvent(Event):
+    table: int
+    name: str
+
+
+async def first(event):
+    pass
+
+
+async def second(event):
+    pass
+
+
+async def third(event):
+    pass
+
+
+def test_unfiltered():
+    route = EventRoute([Subscription(0, first), Subscription(1, second)])
+
+    assert route.get_subscribers(FooEvent(1, "foo")) == [first, second]
+
+
+def test_key():
+    route = EventRoute([
+        Subscription(0, first, keys={"table": 254}),
+        Subscription(1, second, keys={"table": {100, 254}}),
+        Subscription(2, third),
+    ])
+
+    assert route.get_subscribers(FooEvent(254, "foo")) == [first, second, third]
+    assert route.get_subscribers(FooEvent(100, "foo")) == [second, third]
+    assert route.get_subscribers(FooEvent(1, "foo")) == [third]
+
+
+def test_multiple_keys():
+    route = EventRoute([
+        Subscription(0, first, keys={"table": 254, "name": "foo"}),
+    ])
+
+    assert route.get_subscribers(FooEvent(254, "foo")) == [first]
+    assert route.get_subscribers(FooEvent(254, "bar")) == []
+
+
+def test_predicate():
+    route = EventRoute([
+        Subscription(0, first, predicate=lambda event: event.name == "foo"),
+        Subscription(1, second, keys={"table": 254}, predicate=lambda event: event.name == "bar"),
+    ])
+
+    assert route.get_subscribers(FooEvent(254, "foo")) == [first]
+    assert route.get_subscribers(FooEvent(254, "bar")) == [second]
+
+
+def test_missing_attribute():
+    route = EventRoute([Subscription(0, first, keys={"ifname": "eth0"})])
+
+    assert route.get_subscribers(FooEvent(254, "foo")) == []
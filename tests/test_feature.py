@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from routesia.feature import FeatureProvider
+
+from .test_service import BarProvider, FooProvider
+
+
+class FakeConfig:
+    def __init__(self, **data):
+        self.data = SimpleNamespace(**data)
+        self.change_handlers = []
+
+    def register_change_handler(self, handler):
+        self.change_handlers.append(handler)
+
+
+class FakeRPC:
+    def __init__(self):
+        self.loaders = {}
+
+    def register_loader(self, prefix, loader):
+        self.loaders[prefix] = loader
+
+
+async def test_features(service):
+    config = FakeConfig(foo=True, bar=False)
+    rpc = FakeRPC()
+    provider = FeatureProvider(
+        service,
+        config,
+        rpc,
+        features=(
+            ("tests.test_service.FooProvider", "foo", lambda data: data.foo),
+            ("tests.test_service.BarProvider", "bar", lambda data: data.bar),
+        ),
+    )
+
+    # Only enabled features are loaded on start
+    await provider.start()
+    assert FooProvider in service.providers
+    assert BarProvider not in service.providers
+    assert list(rpc.loaders) == ["bar"]
+
+    # Others once their methods are called
+    await rpc.loaders["bar"]()
+    assert BarProvider in service.providers
+
+
+async def test_feature_enabled_by_commit(service):
+    config = FakeConfig(foo=False)
+    provider = FeatureProvider(
+        service,
+        config,
+        FakeRPC(),
+        features=(
+            ("tests.test_service.FooProvider", "foo", lambda data: data.foo),
+        ),
+    )
+    await provider.start()
+    assert FooProvider not in service.providers
+
+    for handler in config.change_handlers:
+        await handler(SimpleNamespace(foo=True))
+    assert FooProvider in service.providers
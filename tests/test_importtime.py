@@ -0,0 +1,33 @@
+import importlib
+import sys
+
+from routesia.importtime import ImportTimer
+
+
+def test_import_time(tmp_path, monkeypatch):
+    (tmp_path / "importtime_outer.py").write_text("import importtime_inner\n")
+    (tmp_path / "importtime_inner.py").write_text("x = sum(range(1000))\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    timer = ImportTimer()
+    timer.install()
+    try:
+        importlib.import_module("importtime_outer")
+    finally:
+        timer.uninstall()
+        sys.modules.pop("importtime_outer", None)
+        sys.modules.pop("importtime_inner", None)
+
+    modules = {module.name: module for module in timer.modules}
+    assert modules["importtime_inner"].depth == 1
+    assert modules["importtime_outer"].depth == 0
+    assert modules["importtime_outer"].cumulative_time >= modules["importtime_inner"].cumulative_time
+    assert timer.total == modules["importtime_outer"].cumulative_time
+    assert "importtime_outer" in "\n".join(timer.report())
+
+
+def test_uninstall():
+    timer = ImportTimer()
+    timer.install()
+    timer.uninstall()
+    assert timer not in sys.meta_path
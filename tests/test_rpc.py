@@ -56,6 +56,29 @@ async def test_call_unknown_method(rpc, rpcclient):
         await rpcclient.request("foo")
 
 
+async def test_call_loader(rpc, rpcclient, schema_registry):
+    schema_registry.load_schema_module(test_pb2)
+    loads = []
+
+    async def handler():
+        response = test_pb2.Test()
+        response.string_value = "bar"
+        return response
+
+    async def loader():
+        loads.append(True)
+        rpc.register("foo/bar", handler)
+
+    rpc.register_loader("foo", loader)
+
+    assert (await rpcclient.request("foo/bar")).string_value == "bar"
+    with pytest.raises(RPCNoSuchMethod):
+        await rpcclient.request("foo/baz")
+    with pytest.raises(RPCNoSuchMethod):
+        await rpcclient.request("other")
+    assert len(loads) == 1
+
+
 async def test_call_invalid_parameters(rpc, rpcclient):
     async def handler():
         raise RPCInvalidArgument("Bad")
@@ -94,3 +117,32 @@ async def test_call_unsppecifiedError(rpc, rpcclient):
 
     with pytest.raises(RPCUnspecifiedError):
         await rpcclient.request("foo")
+
+
+async def test_event_stats(service, rpc, rpcclient):
+    stats = await rpcclient.request("service/event/stats")
+
+    assert stats.uptime > 0
+    # The RPC request itself does not go through the event bus
+    assert stats.queue_depth == 0
+
+
+async def test_startup_timeline(service, rpc, rpcclient):
+    timeline = await rpcclient.request("service/startup/timeline")
+
+    assert timeline.HasField("ready")
+    names = [provider.name for provider in timeline.provider]
+    assert names.index("MQTT") < names.index("RPC")
+    rpc_timeline = timeline.provider[names.index("RPC")]
+    assert "MQTT" in rpc_timeline.dependencies
+    assert rpc_timeline.start_end >= rpc_timeline.start_start >= rpc_timeline.init_end
+
+
+async def test_blocking_stats(service, rpc, rpcclient):
+    await service.run_blocking("foo", lambda: None)
+
+    stats = await rpcclient.request("service/blocking/stats")
+
+    lanes = {lane.resource: lane for lane in stats.lane}
+    assert lanes["foo"].calls == 1
+    assert lanes["foo"].duration.count == 1
@@ -1,6 +1,8 @@
+import asyncio
 from dataclasses import dataclass
+import pytest
 
-from routesia.service import Provider, Service, Event
+from routesia.service import Provider, ProviderDependencyLoop, Service, Event
 
 
 class FooProvider(Provider):
@@ -54,6 +56,99 @@ async def test_load_providers_requirement(service):
     assert isinstance(service.providers[BarProvider], BarProvider)
 
 
+async def test_load_providers_path(service):
+    service.add_provider(f"{__name__}.BarProvider")
+    service.add_provider(f"{__name__}.FooProvider")
+    await service.load_providers()
+
+    assert isinstance(service.providers[FooProvider], FooProvider)
+    assert isinstance(service.providers[BarProvider], BarProvider)
+    assert service.startup_timeline.providers[BarProvider].import_time is not None
+
+
+async def test_load_providers_optional(service):
+    service.add_optional_provider(f"{__name__}.FooProvider")
+    await service.load_providers()
+    assert FooProvider not in service.providers
+
+    service.add_provider(BarProvider)
+    await service.load_providers()
+    assert isinstance(service.providers[FooProvider], FooProvider)
+    assert isinstance(service.providers[BarProvider], BarProvider)
+
+
+class LoopProvider(Provider):
+    def __init__(self, other):
+        pass
+
+
+class OtherLoopProvider(Provider):
+    def __init__(self, loop: LoopProvider):
+        pass
+
+
+LoopProvider.__init__.__annotations__["other"] = OtherLoopProvider
+
+
+async def test_load_providers_loop(service):
+    service.add_provider(LoopProvider)
+    service.add_provider(OtherLoopProvider)
+    with pytest.raises(ProviderDependencyLoop):
+        await service.load_providers()
+
+
+class SlowProvider(Provider):
+    def __init__(self, log: list):
+        self.log = log
+
+    async def start(self):
+        self.log.append(f"{self.get_name()} start")
+        await asyncio.sleep(0.01)
+        self.log.append(f"{self.get_name()} started")
+
+
+class OtherSlowProvider(SlowProvider):
+    pass
+
+
+class DependentProvider(Provider):
+    def __init__(self, slow: SlowProvider, log: list):
+        self.log = log
+
+    def start(self):
+        self.log.append("DependentProvider start")
+
+
+async def test_start_providers_concurrent(service):
+    log = []
+    service.add_provider(DependentProvider, log=log)
+    service.add_provider(SlowProvider, log=log)
+    service.add_provider(OtherSlowProvider, log=log)
+    await service.load_providers()
+    await service.start_providers()
+
+    # Independent providers start concurrently, dependent ones wait
+    assert log.index("OtherSlowProvider start") < log.index("SlowProvider started")
+    assert log.index("SlowProvider started") < log.index("DependentProvider start")
+
+    timeline = service.startup_timeline.providers
+    assert timeline[DependentProvider].dependencies == ["SlowProvider"]
+    assert timeline[DependentProvider].init_start >= timeline[SlowProvider].init_end
+    assert timeline[DependentProvider].start_start >= timeline[SlowProvider].start_end
+
+
+async def test_load_provider(service):
+    log = []
+    service.add_provider(SlowProvider, log=log)
+    await service.load_providers()
+    await service.start_providers()
+
+    # Providers already started are not started again
+    await service.load_provider(f"{__name__}.DependentProvider", log=log)
+    assert isinstance(service.providers[DependentProvider], DependentProvider)
+    assert log == ["SlowProvider start", "SlowProvider started", "DependentProvider start"]
+
+
 @dataclass
 class FooEvent(Event):
     data: str
@@ -95,3 +190,114 @@ async def test_event_subscriber_eventwatcher(service, eventwatcher):
 
     assert isinstance(event, FooEvent)
     assert event.data == "foo"
+
+
+async def test_event_batch_order(service):
+    future = service.main_loop.create_future()
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+        if len(received) == 100:
+            future.set_result(True)
+
+    service.subscribe_event(FooEvent, handler)
+    for i in range(100):
+        service.publish_event(FooEvent(str(i)))
+    await future
+    assert received == [str(i) for i in range(100)]
+
+
+@dataclass
+class SubFooEvent(FooEvent):
+    pass
+
+
+async def test_event_subscriber_subclass(service):
+    future = service.main_loop.create_future()
+
+    async def handler(event):
+        future.set_result(event)
+
+    service.subscribe_event(FooEvent, handler)
+    service.publish_event(SubFooEvent("foo"))
+    await future
+    assert isinstance(future.result(), SubFooEvent)
+
+
+async def test_event_subscriber_key(service):
+    future = service.main_loop.create_future()
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    async def done(event):
+        future.set_result(True)
+
+    service.subscribe_event(FooEvent, handler, data="bar")
+    service.subscribe_event(FooEvent, done, data="baz")
+    service.publish_event(FooEvent("foo"))
+    service.publish_event(FooEvent("bar"))
+    service.publish_event(FooEvent("baz"))
+    await future
+    assert received == ["bar"]
+
+
+async def test_event_unsubscribe(service):
+    future = service.main_loop.create_future()
+    received = []
+
+    async def handler(event):
+        received.append(event.data)
+
+    async def done(event):
+        future.set_result(True)
+
+    service.subscribe_event(FooEvent, handler)
+    service.unsubscribe_event(FooEvent, handler)
+    service.subscribe_event(FooEvent, done)
+    service.publish_event(FooEvent("foo"))
+    await future
+    assert received == []
+
+
+async def test_subscription_change_handler(service):
+    changes = []
+
+    async def handler(event):
+        pass
+
+    service.register_subscription_change_handler(lambda: changes.append(True))
+    assert not service.has_subscribers(SubFooEvent)
+
+    service.subscribe_event(FooEvent, handler)
+    assert service.has_subscribers(SubFooEvent)
+    assert len(changes) == 1
+
+    service.unsubscribe_event(FooEvent, handler)
+    assert not service.has_subscribers(SubFooEvent)
+    assert len(changes) == 2
+
+
+class SubscriberProvider(Provider):
+    def __init__(self, service: Service):
+        self.future = service.main_loop.create_future()
+        service.subscribe_event(FooEvent, self.handle_foo)
+
+    async def handle_foo(self, event):
+        self.future.set_result(True)
+
+
+async def test_startup_timeline_first_event(service):
+    service.add_provider(SubscriberProvider)
+    await service.load_providers()
+    provider = await service.get_provider(SubscriberProvider)
+    timeline = service.startup_timeline.providers[SubscriberProvider]
+    service.startup_timeline.set_ready(service.providers, [provider.handle_foo])
+    assert timeline.first_event is None
+
+    service.publish_event(FooEvent("foo"))
+    await provider.future
+    assert timeline.first_event is not None
+    assert not service.startup_timeline.awaiting_event